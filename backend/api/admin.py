@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Site, RackConfiguration, Device, Rack, RackDevice, Passkey, PasskeyChallenge
+from .models import Site, RackConfiguration, Device, Rack, RackDevice, Passkey, PasskeyChallenge, Job
 
 
 @admin.register(Site)
@@ -158,7 +158,7 @@ class PasskeyChallengeAdmin(admin.ModelAdmin):
     list_display = ["id", "user", "challenge_type", "created_at", "expires_at", "is_expired"]
     list_filter = ["challenge_type", "created_at"]
     search_fields = ["user__username"]
-    readonly_fields = ["challenge", "created_at"]
+    readonly_fields = ["handle", "challenge", "created_at"]
     ordering = ["-created_at"]
     raw_id_fields = ["user"]
 
@@ -170,3 +170,17 @@ class PasskeyChallengeAdmin(admin.ModelAdmin):
 
     is_expired.boolean = True
     is_expired.short_description = "Expired"
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for background Job model
+    """
+
+    list_display = ["id", "kind", "status", "site", "attempts", "max_attempts", "worker", "created_at", "finished_at"]
+    list_filter = ["kind", "status", "created_at"]
+    search_fields = ["kind", "error", "worker"]
+    readonly_fields = ["progress", "result", "worker", "heartbeat_at", "started_at", "finished_at", "created_at"]
+    ordering = ["-created_at"]
+    raw_id_fields = ["site"]
@@ -15,6 +15,13 @@ class ApiConfig(AppConfig):
         """
         from django.conf import settings
 
+        # Register signal receivers that keep the device search index, user cache and rack configuration
+        # projection fresh, and that write the change event log
+        from . import auth_backends  # noqa: F401
+        from . import change_events  # noqa: F401
+        from . import device_search  # noqa: F401
+        from . import projection  # noqa: F401
+
         # Only start MCP server once and only if enabled
         # Also check if we're running the main server (not migrations, etc.)
         if settings.MCP_ENABLED and not ApiConfig.mcp_server_started and os.environ.get("RUN_MAIN") == "true":
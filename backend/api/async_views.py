@@ -0,0 +1,127 @@
+"""
+Async support for DRF views
+
+DRF dispatches synchronously, so under an ASGI server every DRF view runs in a
+worker thread. AsyncAPIView and AsyncViewSetMixin replace dispatch with a
+coroutine: authentication, permissions and throttling run in one
+sync_to_async hop, async handlers are awaited on the event loop and any
+handler that is still synchronous (writes, custom actions) keeps running in a
+thread. Async handlers read through Django's async ORM and must only
+serialize data that was loaded with select_related/prefetch_related, since
+lazy queries raise SynchronousOnlyOperation on the event loop.
+
+AsyncPageNumberPagination is a drop-in PageNumberPagination that can also
+paginate from async code, used by AsyncListModelMixin.
+"""
+
+import functools
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.paginator import InvalidPage
+from django.utils.decorators import classonlymethod
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class AsyncDispatchMixin:
+    """APIView dispatch as a coroutine; mixed sync and async handlers are allowed"""
+
+    # Tell Django's View.as_view() to mark the view as a coroutine function
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncAPIView(AsyncDispatchMixin, APIView):
+    """APIView whose async handlers run on the event loop"""
+
+
+class AsyncViewSetMixin(AsyncDispatchMixin):
+    """
+    Async dispatch for ViewSets; list this mixin before the ViewSet base class.
+
+    ViewSetMixin.as_view() builds its own view function, which Django would
+    call synchronously, so it is wrapped in a coroutine function here.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        # Keeps cls, initkwargs, actions and csrf_exempt for the router and schema generation
+        return functools.update_wrapper(async_view, view)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination with an async counterpart of paginate_queryset()"""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Count asynchronously and seed Paginator.count (a cached_property) so page() does not query
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return [obj async for obj in self.page.object_list]
+
+
+class AsyncListModelMixin:
+    """
+    Async ListModelMixin.list(); requires AsyncPageNumberPagination when pagination is enabled.
+
+    ViewSets decorated with extend_schema_view(list=...) must define an async
+    list() that calls super(), because drf-spectacular wraps inherited actions
+    in a synchronous function.
+    """
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
@@ -0,0 +1,45 @@
+"""
+Authentication backends
+
+CachedModelBackend behaves like Django's ModelBackend but keeps the users it
+loads for authenticated requests in the Django cache, so session-authenticated
+API calls do not read the auth_user table every time. Cached users are dropped
+when the user row is saved or deleted; queryset.update() sends no signals, so
+changes made that way apply when the entry expires.
+
+The cached user decides is_active, is_staff and the session auth hash, so the
+backend is only enabled (AUTH_USER_CACHE) with a cache shared by all workers.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+
+def _user_cache_key(user_id) -> str:
+    return f"auth_user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that loads session users through the cache"""
+
+    def get_user(self, user_id):
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(_user_cache_key(instance.pk))
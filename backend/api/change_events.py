@@ -0,0 +1,505 @@
+"""
+Change event log, change feeds and incremental sync
+
+Every create, update and delete of a tracked model (sites, racks, rack
+devices, providers, rack configurations, and the device catalog: devices
+and device groups) is appended to the change_events table in the same
+transaction as the change:
+
+- save() and delete() are recorded by the post_save/post_delete receivers
+  below.
+- bulk_create() and bulk_update() send no signals, so code writing in bulk
+  (configuration imports, snapshots, projection, the MCP bulk tools) calls
+  record_rows() with a queryset of the rows it wrote.
+- Deleting a site deletes everything in it, and deleting a rack deletes its
+  rack devices and unracks its providers. Only the site's or rack's event is
+  recorded for this; clients apply it to the contents. Likewise deleting a
+  device group ungroups its devices.
+
+Event data holds the object's fields (FK values as ids), without large
+blobs such as a rack configuration's config_data.
+
+Events are numbered (ChangeEvent.seq) in commit order by sequence_events(),
+which the readers call before they read, so writers pay nothing for it.
+Auto-increment ids are taken at insert, and a transaction that inserted
+earlier can commit later, so a client resuming after the highest id it saw
+could miss events. seq numbers are only handed out under the ChangeSequence
+row lock to events that are already committed, so once a client has seen
+seq N, no event can later appear with a smaller number.
+
+GET /api/changes pages through all events after a seq, for sync clients.
+GET /api/sites/<id>/events streams a site's events with Server-Sent Events.
+Within a process, one ChangeFeed polls the table every
+CHANGE_FEED_POLL_INTERVAL seconds for all connected sites and fans new events
+out to the streams, so the number of queries does not grow with the number
+of clients. Streams resume after the Last-Event-ID a reconnecting client
+sends. When a client is too far behind (more than CHANGE_FEED_REPLAY_LIMIT
+events, events already purged, or a full queue) it receives a `reset` event
+and should reload the site.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Min
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    ChangeEvent,
+    ChangeSequence,
+    Device,
+    DeviceGroup,
+    Provider,
+    Rack,
+    RackConfiguration,
+    RackDevice,
+    Site,
+)
+
+# Per tracked model: event model name, recorded fields, and the field holding the object's site
+# (rack devices are looked up through their rack; catalog objects have no site)
+TRACKED = {
+    Site: ("site", ("id", "uuid", "name", "description", "updated_at"), "id"),
+    Rack: (
+        "rack",
+        ("id", "site_id", "name", "description", "ru_height", "source_config_id", "updated_at"),
+        "site_id",
+    ),
+    RackDevice: ("rack_device", ("id", "rack_id", "device_id", "position", "instance_name", "updated_at"), None),
+    Provider: (
+        "provider",
+        (
+            "id",
+            "site_id",
+            "name",
+            "type",
+            "description",
+            "location",
+            "power_capacity",
+            "power_ports_capacity",
+            "cooling_capacity",
+            "ru_size",
+            "rack_id",
+            "position",
+            "updated_at",
+        ),
+        "site_id",
+    ),
+    RackConfiguration: ("rack_configuration", ("id", "site_id", "name", "description", "updated_at"), "site_id"),
+    Device: (
+        "device",
+        (
+            "id",
+            "device_id",
+            "name",
+            "category",
+            "provider_id",
+            "device_group_id",
+            "ru_size",
+            "power_draw",
+            "power_ports_used",
+            "color",
+            "description",
+            "updated_at",
+        ),
+        None,
+    ),
+    DeviceGroup: ("device_group", ("id", "name", "description", "updated_at"), None),
+}
+MODEL_NAMES = {name for name, _, _ in TRACKED.values()}
+
+BATCH_SIZE = 1000
+# Most events returned per page by GET /api/changes
+MAX_PAGE_SIZE = 10000
+# Events queued per stream before it is reset
+QUEUE_SIZE = 10000
+# Longest wait (seconds) between polls while the event log cannot be read
+MAX_POLL_BACKOFF = 30.0
+
+logger = logging.getLogger(__name__)
+
+_deleting = threading.local()
+
+
+class CursorExpiredError(Exception):
+    """The events after a sync cursor were purged, or the cursor is ahead of the log"""
+
+    def __init__(self, latest: int):
+        super().__init__(f"Change cursor expired; resynchronize from seq {latest}")
+        self.latest = latest
+
+
+def _site_id(instance, using: str) -> Optional[int]:
+    if isinstance(instance, RackDevice):
+        if RackDevice.rack.is_cached(instance):
+            return instance.rack.site_id
+        return Rack.objects.using(using).filter(id=instance.rack_id).values_list("site_id", flat=True).first()
+    site_field = TRACKED[type(instance)][2]
+    return getattr(instance, site_field) if site_field else None
+
+
+def record(instance, action: str, using: str = "default") -> ChangeEvent:
+    """Append an event for one object, to the database it was written to"""
+    name, fields, _ = TRACKED[type(instance)]
+    return ChangeEvent.objects.using(using).create(
+        site_id=_site_id(instance, using),
+        model=name,
+        object_id=instance.pk,
+        action=action,
+        data={field: getattr(instance, field) for field in fields},
+    )
+
+
+def record_rows(queryset, action: str, site_id: Optional[int] = None) -> int:
+    """
+    Append events for rows written in bulk, read back through `queryset`; returns events written.
+
+    Rack devices need `site_id`; other models take it from their rows.
+    """
+    name, fields, site_field = TRACKED[queryset.model]
+    written = 0
+    events = []
+    for row in queryset.order_by("id").values(*fields).iterator(chunk_size=BATCH_SIZE):
+        events.append(
+            ChangeEvent(
+                site_id=row[site_field] if site_field else site_id,
+                model=name,
+                object_id=row["id"],
+                action=action,
+                data=row,
+            )
+        )
+        if len(events) >= BATCH_SIZE:
+            ChangeEvent.objects.bulk_create(events)
+            written += len(events)
+            events = []
+    ChangeEvent.objects.bulk_create(events)
+    return written + len(events)
+
+
+def sequence_events(using: str = "default") -> int:
+    """Number the committed events that have no seq yet, in id order; returns events numbered"""
+    events = ChangeEvent.objects.using(using)
+    numbered = 0
+    while events.filter(seq=None).exists():
+        ChangeSequence.objects.using(using).get_or_create(pk=1)
+        with transaction.atomic(using=using):
+            counter = ChangeSequence.objects.using(using).filter(pk=1)
+            # Lock the counter row until commit; events are read after the lock is held
+            counter.update(value=F("value"))
+            pending = list(events.filter(seq=None).order_by("id").values_list("id", flat=True)[:BATCH_SIZE])
+            if not pending:
+                break
+            value = counter.values_list("value", flat=True).get()
+            first, last = pending[0], pending[-1]
+            if last - first + 1 == len(pending):
+                # Usually the pending ids are consecutive: number them with one UPDATE
+                events.filter(id__gte=first, id__lte=last).update(seq=F("id") + (value + 1 - first))
+            else:
+                events.bulk_update(
+                    [ChangeEvent(id=pk, seq=value + 1 + index) for index, pk in enumerate(pending)],
+                    ["seq"],
+                    batch_size=BATCH_SIZE,
+                )
+            counter.update(value=value + len(pending))
+        numbered += len(pending)
+    return numbered
+
+
+def purge_events(days: Optional[int] = None, batch_size: int = 5000) -> int:
+    """Delete events older than CHANGE_EVENT_RETENTION_DAYS; returns events deleted"""
+    days = settings.CHANGE_EVENT_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    while True:
+        ids = list(
+            ChangeEvent.objects.filter(created_at__lt=cutoff, seq__isnull=False).values_list("id", flat=True)[
+                :batch_size
+            ]
+        )
+        if not ids:
+            return deleted
+        deleted += ChangeEvent.objects.filter(id__in=ids).delete()[0]
+
+
+def _deleting_set(name: str) -> set:
+    if not hasattr(_deleting, name):
+        setattr(_deleting, name, set())
+    return getattr(_deleting, name)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Rack)
+@receiver(post_save, sender=RackDevice)
+@receiver(post_save, sender=Provider)
+@receiver(post_save, sender=RackConfiguration)
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=DeviceGroup)
+def _record_save(sender, instance, created=False, raw=False, using="default", **kwargs):
+    if not raw:
+        record(instance, ChangeEvent.ACTION_CREATED if created else ChangeEvent.ACTION_UPDATED, using)
+
+
+# The receivers turn off fast deletes of providers, so the SET_NULL of a deleted rack would now run
+# before a deleted site's providers are removed, and fail provider_rack_position_together. Unrack
+# them first, as the imports do.
+
+
+@receiver(pre_delete, sender=Site)
+def _site_deleting(sender, instance, using="default", **kwargs):
+    # Objects deleted with their site are covered by the site's event
+    _deleting_set("sites").add(instance.pk)
+    Provider.objects.using(using).filter(site_id=instance.pk, rack__isnull=False).update(
+        rack=None, position=None, updated_at=timezone.now()
+    )
+
+
+@receiver(pre_delete, sender=Rack)
+def _rack_deleting(sender, instance, using="default", **kwargs):
+    # Rack devices deleted with their rack are covered by the rack's event
+    _deleting_set("racks").add(instance.pk)
+    if instance.site_id not in _deleting_set("sites"):
+        Provider.objects.using(using).filter(rack_id=instance.pk).update(
+            rack=None, position=None, updated_at=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Rack)
+@receiver(post_delete, sender=RackDevice)
+@receiver(post_delete, sender=Provider)
+@receiver(post_delete, sender=RackConfiguration)
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=DeviceGroup)
+def _record_delete(sender, instance, using="default", **kwargs):
+    sites, racks = _deleting_set("sites"), _deleting_set("racks")
+    if sender is Site:
+        sites.discard(instance.pk)
+    elif sender is Rack:
+        racks.discard(instance.pk)
+    if sender is RackDevice and instance.rack_id in racks:
+        return
+    if sender in (Rack, Provider, RackConfiguration) and instance.site_id in sites:
+        return
+    record(instance, ChangeEvent.ACTION_DELETED, using)
+
+
+# Reading events
+
+
+def event_dict(event: ChangeEvent) -> dict:
+    return {
+        "seq": event.seq,
+        "site_id": event.site_id,
+        "model": event.model,
+        "object_id": event.object_id,
+        "action": event.action,
+        "data": event.data,
+        "created_at": event.created_at,
+    }
+
+
+def latest_seq() -> int:
+    """The highest assigned seq, after numbering pending events"""
+    sequence_events()
+    return ChangeSequence.objects.filter(pk=1).values_list("value", flat=True).first() or 0
+
+
+def _check_cursor(since: int, latest: int):
+    # With every event purged, only a client that is up to date can continue
+    oldest = ChangeEvent.objects.aggregate(oldest=Min("seq"))["oldest"] or latest + 1
+    if since > latest or since < oldest - 1:
+        raise CursorExpiredError(latest)
+
+
+def events_after(after: int, site_ids: Iterable[int], until: Optional[int] = None, limit: int = BATCH_SIZE) -> list:
+    events = ChangeEvent.objects.filter(seq__gt=after, site_id__in=list(site_ids))
+    if until is not None:
+        events = events.filter(seq__lte=until)
+    return [event_dict(event) for event in events.order_by("seq")[:limit]]
+
+
+def read_changes(
+    since: int, limit: int = BATCH_SIZE, models: Optional[Iterable[str]] = None, site_id: Optional[int] = None
+) -> dict:
+    """
+    A page of the events after seq `since`, oldest first, for incremental sync.
+
+    `next_since` is the cursor for the next page: the seq of the last event read, or `latest` when the
+    page reaches the end of the log, so filtered clients skip over events they do not read. Raises
+    CursorExpiredError when events after `since` were already purged.
+    """
+    latest = latest_seq()
+    _check_cursor(since, latest)
+    events = ChangeEvent.objects.filter(seq__gt=since, seq__lte=latest)
+    if models is not None:
+        events = events.filter(model__in=list(models))
+    if site_id is not None:
+        events = events.filter(site_id=site_id)
+    changes = [event_dict(event) for event in events.order_by("seq")[: limit + 1]]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return {
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if has_more else latest,
+        "has_more": has_more,
+        "latest": latest,
+    }
+
+
+def replay_start(last_event_id: Optional[int], site_id: int) -> tuple[Optional[int], int]:
+    """(seq to resume after, or None if the client must reset; current latest seq)"""
+    latest = latest_seq()
+    if last_event_id is None:
+        return latest, latest
+    try:
+        _check_cursor(last_event_id, latest)
+    except CursorExpiredError:
+        return None, latest
+    missed = ChangeEvent.objects.filter(site_id=site_id, seq__gt=last_event_id, seq__lte=latest).count()
+    if missed > settings.CHANGE_FEED_REPLAY_LIMIT:
+        return None, latest
+    return last_event_id, latest
+
+
+def _message(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _reset_message(latest: int) -> str:
+    return f"id: {latest}\nevent: reset\ndata: {{}}\n\n"
+
+
+class ChangeFeed:
+    """Polls the event table for every site with a connected stream in this process, and fans events out"""
+
+    RESET = object()
+
+    def __init__(self):
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+        self.last_seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, site_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        running = self._task is not None and not self._task.done()
+        if not running or self._task.get_loop() is not asyncio.get_running_loop():
+            self.last_seq = await sync_to_async(latest_seq)()
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+        self.subscribers.setdefault(site_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, site_id: int, queue: asyncio.Queue):
+        queues = self.subscribers.get(site_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[site_id]
+
+    def _publish(self, event: dict):
+        for queue in list(self.subscribers.get(event["site_id"], ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client is too slow; it gets a reset instead of the rest
+                self.unsubscribe(event["site_id"], queue)
+                queue.get_nowait()
+                queue.put_nowait(self.RESET)
+
+    async def _poll(self):
+        failures = 0
+        while self.subscribers:
+            # Back off while reads fail (e.g. "database is locked"), but never stop: streams depend on this task
+            interval = settings.CHANGE_FEED_POLL_INTERVAL * 2 ** min(failures, 10)
+            await asyncio.sleep(min(interval, max(MAX_POLL_BACKOFF, settings.CHANGE_FEED_POLL_INTERVAL)))
+            try:
+                await self._read_new_events()
+            except Exception:
+                failures += 1
+                logger.exception(f"Change feed poll failed ({failures} in a row); retrying")
+            else:
+                failures = 0
+
+    async def _read_new_events(self):
+        while self.subscribers:
+            top = await sync_to_async(latest_seq)()
+            events = await sync_to_async(events_after)(self.last_seq, list(self.subscribers), top)
+            for event in events:
+                self._publish(event)
+            if len(events) < BATCH_SIZE:
+                self.last_seq = top
+                return
+            self.last_seq = events[-1]["seq"]
+
+
+feed = ChangeFeed()
+
+
+async def stream_async(site_id: int, last_event_id: Optional[int]):
+    """SSE messages of a site's events, for ASGI servers"""
+    queue = await feed.subscribe(site_id)
+    try:
+        # Events after `latest` are delivered by the feed from here on
+        after, latest = await sync_to_async(replay_start)(last_event_id, site_id)
+        yield f"retry: {settings.CHANGE_FEED_RETRY_MS}\n\n"
+        if after is None:
+            yield _reset_message(latest)
+            return
+        sent = after
+        while sent < latest:
+            events = await sync_to_async(events_after)(sent, [site_id], latest)
+            if not events:
+                break
+            for event in events:
+                yield _message(event)
+            sent = events[-1]["seq"]
+        sent = latest
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.CHANGE_FEED_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is ChangeFeed.RESET:
+                yield _reset_message(sent)
+                return
+            if event["seq"] > sent:
+                sent = event["seq"]
+                yield _message(event)
+    finally:
+        feed.unsubscribe(site_id, queue)
+
+
+def stream_sync(site_id: int, last_event_id: Optional[int]):
+    """SSE messages of a site's events for WSGI servers (development), polling the table per stream"""
+    sent, latest = replay_start(last_event_id, site_id)
+    yield f"retry: {settings.CHANGE_FEED_RETRY_MS}\n\n"
+    if sent is None:
+        yield _reset_message(latest)
+        return
+    idle = 0.0
+    while True:
+        sequence_events()
+        events = events_after(sent, [site_id])
+        for event in events:
+            yield _message(event)
+        if events:
+            sent, idle = events[-1]["seq"], 0.0
+            continue
+        if idle >= settings.CHANGE_FEED_HEARTBEAT:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        time.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
+        idle += settings.CHANGE_FEED_POLL_INTERVAL
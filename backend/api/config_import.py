@@ -0,0 +1,500 @@
+"""
+Server-side import of exported rack configuration files
+
+Configuration exports (the JSON written by the Import/Export dialog) can hold
+thousands of racks, far more than fits in DATA_UPLOAD_MAX_MEMORY_SIZE. The
+import never loads the whole document: iter_config() parses the top-level
+object incrementally from a binary stream and yields the `racks` and provider
+arrays one element at a time, so memory use stays proportional to one batch.
+
+ConfigImporter writes a site's racks in batches of `batch_size`: the device
+references of a batch are resolved against the Device table with one IN query
+for the ids not seen before, and the batch's Rack and RackDevice rows are
+bulk-created in one transaction. Providers (`providers` or
+`resourceProviders`, placed instances only) are created in batches once all
+racks exist, so they can refer to any imported rack. Batches that have been
+committed stay committed if a later batch fails; re-running the import skips
+racks that already exist.
+
+Unracked devices (`unrackedDevices`, and `devices` entries without a rack
+position) are counted but not stored, as the relational model only holds
+placed devices.
+"""
+
+import codecs
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .change_events import record_rows
+from .models import ChangeEvent, Device, Provider, Rack, RackDevice
+
+# Top-level arrays yielded element by element instead of as a whole
+STREAMED_KEYS = frozenset({"racks", "devices", "unrackedDevices", "providers", "resourceProviders"})
+PROVIDER_KEYS = ("providers", "resourceProviders")
+PROVIDER_TYPES = {value for value, _ in Provider.PROVIDER_TYPES}
+
+READ_SIZE = 64 * 1024
+DEVICE_LOOKUP_BATCH_SIZE = 500
+MAX_SAMPLES = 20
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class ConfigParseError(ValueError):
+    """Raised when the configuration file is not a valid JSON object"""
+
+
+def provider_errors(providers: list[Provider]) -> dict[int, str]:
+    """
+    Model validation errors of unsaved providers, by list index.
+
+    bulk_create() skips Provider.save() and with it full_clean(), so imports
+    validate here. The racks are loaded with one query for clean()'s height
+    check; the site and rack foreign keys and the check constraints (which
+    clean() mirrors) are not looked up again per provider.
+    """
+    racks = Rack.objects.only("id", "ru_height").in_bulk({p.rack_id for p in providers if p.rack_id is not None})
+    errors = {}
+    for index, provider in enumerate(providers):
+        if provider.rack_id is not None:
+            if provider.rack_id not in racks:
+                errors[index] = "rack not found"
+                continue
+            provider.rack = racks[provider.rack_id]
+        try:
+            provider.full_clean(exclude=["site", "rack"], validate_constraints=False)
+        except ValidationError as e:
+            errors[index] = "; ".join(e.messages)
+    return errors
+
+
+class _StreamReader:
+    """Incremental JSON reader over a binary stream with a sliding text buffer"""
+
+    def __init__(self, stream, read_size: int = READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read more input; returns False at end of stream"""
+        if self.eof:
+            return False
+        if self.pos > self.read_size:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        # Read at least as much as is buffered so re-decoding a large value stays linear
+        data = self.stream.read(max(self.read_size, len(self.buffer) - self.pos))
+        if not data:
+            self.eof = True
+            self.buffer += self.decoder.decode(b"", final=True)
+            return False
+        self.buffer += self.decoder.decode(data)
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ("" at end of input)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, characters: str) -> str:
+        char = self.peek()
+        if not char or char not in characters:
+            found = repr(char) if char else "end of input"
+            raise ConfigParseError(f"Invalid JSON: expected one of {characters!r}, found {found}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise ConfigParseError(f"Invalid JSON: {e.msg}") from e
+            # A number ending exactly at the buffer end may continue in the next read
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_config(stream, read_size: int = READ_SIZE) -> Iterator[tuple[str, object]]:
+    """
+    Parse a configuration object from a binary stream.
+
+    Yields (key, value) for every top-level member, except that members in
+    STREAMED_KEYS holding an array yield (key, element) once per element.
+    """
+    reader = _StreamReader(stream, read_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ConfigParseError("Object keys must be strings")
+        reader.expect(":")
+        if key in STREAMED_KEYS and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            yield key, reader.value()
+        if reader.expect(",}") == "}":
+            break
+    if reader.peek():
+        raise ConfigParseError("Unexpected data after the configuration object")
+
+
+class _CountingStream:
+    """Binary stream wrapper that counts the bytes read"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@dataclass
+class ImportStats:
+    """Counters reported in progress events and the final summary"""
+
+    racks_created: int = 0
+    racks_replaced: int = 0
+    racks_skipped: int = 0
+    devices_created: int = 0
+    devices_skipped: int = 0
+    unracked_devices: int = 0
+    providers_created: int = 0
+    providers_replaced: int = 0
+    providers_skipped: int = 0
+    unknown_devices: set = field(default_factory=set)
+    # The first MAX_SAMPLES skipped items with the reason
+    skipped: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "racksCreated": self.racks_created,
+            "racksReplaced": self.racks_replaced,
+            "racksSkipped": self.racks_skipped,
+            "devicesCreated": self.devices_created,
+            "devicesSkipped": self.devices_skipped,
+            "unrackedDevices": self.unracked_devices,
+            "providersCreated": self.providers_created,
+            "providersReplaced": self.providers_replaced,
+            "providersSkipped": self.providers_skipped,
+            "unknownDevices": sorted(self.unknown_devices)[:MAX_SAMPLES],
+            "unknownDeviceCount": len(self.unknown_devices),
+            "skipped": self.skipped,
+        }
+
+
+def positive_int(value) -> Optional[int]:
+    """A whole number >= 1 (RU positions and sizes), otherwise None"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    if value != int(value) or value < 1:
+        return None
+    return int(value)
+
+
+def _capacity(value) -> int:
+    """A non-negative whole capacity; anything else counts as 0"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        return 0
+    return int(value)
+
+
+class ConfigImporter:
+    """
+    Import an exported configuration into `site`.
+
+    Racks whose name already exists in the site (case-insensitively), and
+    providers whose name and type do, are skipped, or deleted and imported
+    again with replace=True.
+    """
+
+    def __init__(self, site, batch_size: int = 250, replace: bool = False):
+        self.site = site
+        self.batch_size = max(1, batch_size)
+        self.replace = replace
+        self.stats = ImportStats()
+        self.ru_per_rack = 42
+        self._device_ids: dict[str, int] = {}
+        self._device_ru_sizes: dict[str, int] = {}
+        # Export rack id -> database Rack id, for providers placed in imported racks
+        self._rack_ids: dict[str, int] = {}
+        self._seen_names: set[str] = set()
+        self._seen_providers: set[tuple[str, str]] = set()
+
+    def run(self, stream, total_bytes: Optional[int] = None) -> Iterator[dict]:
+        """Import from a binary stream, yielding a progress event after every batch and a final summary"""
+        started = time.perf_counter()
+        reader_stream = _CountingStream(stream)
+        racks, providers = [], []
+
+        def progress(phase: str) -> dict:
+            return {
+                "event": "progress",
+                "phase": phase,
+                "bytesRead": reader_stream.bytes_read,
+                "totalBytes": total_bytes,
+                **self.stats.as_dict(),
+            }
+
+        for key, value in iter_config(reader_stream):
+            if key == "settings" and isinstance(value, dict):
+                self.ru_per_rack = positive_int(value.get("ruPerRack")) or self.ru_per_rack
+            elif key == "racks":
+                racks.append(value)
+                if len(racks) >= self.batch_size:
+                    self._import_racks(racks)
+                    racks = []
+                    yield progress("racks")
+            elif key in PROVIDER_KEYS:
+                providers.append(value)
+            elif key == "unrackedDevices" or (
+                key == "devices" and not (isinstance(value, dict) and value.get("rackId") and value.get("position"))
+            ):
+                self.stats.unracked_devices += 1
+
+        if racks:
+            self._import_racks(racks)
+            yield progress("racks")
+        for start in range(0, len(providers), self.batch_size):
+            self._import_providers(providers[start : start + self.batch_size])
+            yield progress("providers")
+
+        yield {
+            "event": "done",
+            "siteId": self.site.id,
+            "bytesRead": reader_stream.bytes_read,
+            "elapsedSeconds": round(time.perf_counter() - started, 3),
+            **self.stats.as_dict(),
+        }
+
+    def _skip(self, kind: str, label, reason: str):
+        if len(self.stats.skipped) < MAX_SAMPLES:
+            self.stats.skipped.append({"type": kind, "item": label, "reason": reason})
+
+    def _resolve_devices(self, references: set[str]):
+        """Look up device ids not seen before, in batches of IN queries"""
+        missing = sorted(references - self._device_ids.keys() - self.stats.unknown_devices)
+        for start in range(0, len(missing), DEVICE_LOOKUP_BATCH_SIZE):
+            batch = missing[start : start + DEVICE_LOOKUP_BATCH_SIZE]
+            found = {}
+            rows = Device.objects.filter(device_id__in=batch).values_list("device_id", "id", "ru_size")
+            for reference, pk, ru_size in rows:
+                found[reference] = pk
+                self._device_ru_sizes[reference] = ru_size
+            self._device_ids.update(found)
+            self.stats.unknown_devices.update(reference for reference in batch if reference not in found)
+
+    def _import_racks(self, items: list):
+        racks = {}
+        for index, item in enumerate(items):
+            name = item.get("name") if isinstance(item, dict) else None
+            if not isinstance(name, str) or not name.strip():
+                self.stats.racks_skipped += 1
+                self._skip("rack", item.get("id") if isinstance(item, dict) else index, "missing name")
+                continue
+            name = name.strip()[:255]
+            if name.lower() in self._seen_names:
+                self.stats.racks_skipped += 1
+                self._skip("rack", name, "duplicate name in file")
+                continue
+            self._seen_names.add(name.lower())
+            racks[name] = item
+
+        references = {
+            device.get("deviceId") or device.get("id")
+            for item in racks.values()
+            for device in item.get("devices") or []
+            if isinstance(device, dict) and isinstance(device.get("deviceId") or device.get("id"), str)
+        }
+        self._resolve_devices(references)
+
+        with transaction.atomic():
+            existing = dict(
+                Rack.objects.filter(site=self.site, name__lower__in=[name.lower() for name in racks])
+                .annotate(lookup_name=Lower("name"))
+                .values_list("lookup_name", "id")
+            )
+            if existing and self.replace:
+                # Providers installed in a replaced rack stay in the site, unracked
+                Provider.objects.filter(rack_id__in=existing.values()).update(
+                    rack=None, position=None, updated_at=timezone.now()
+                )
+                Rack.objects.filter(id__in=existing.values()).delete()
+                self.stats.racks_replaced += len(existing)
+            elif existing:
+                for name in list(racks):
+                    if name.lower() in existing:
+                        self.stats.racks_skipped += 1
+                        self._skip("rack", name, "already exists")
+                        del racks[name]
+
+            heights = {name: positive_int(item.get("ruSize")) or self.ru_per_rack for name, item in racks.items()}
+            Rack.objects.bulk_create(
+                [
+                    Rack(
+                        site=self.site,
+                        name=name,
+                        ru_height=heights[name],
+                        description=item.get("description") or None,
+                    )
+                    for name, item in racks.items()
+                ]
+            )
+            # MySQL does not return primary keys from bulk inserts, so read them back
+            rack_ids = dict(Rack.objects.filter(site=self.site, name__in=list(racks)).values_list("name", "id"))
+            self.stats.racks_created += len(rack_ids)
+
+            placements = []
+            for name, item in racks.items():
+                rack_id = rack_ids[name]
+                if item.get("id") is not None:
+                    self._rack_ids[str(item["id"])] = rack_id
+                placements.extend(self._placements(rack_id, name, heights[name], item.get("devices") or []))
+            RackDevice.objects.bulk_create(placements, batch_size=self.batch_size * 10)
+            self.stats.devices_created += len(placements)
+
+            # bulk_create sends no post_save, so the change events are written here
+            record_rows(Rack.objects.filter(id__in=rack_ids.values()), ChangeEvent.ACTION_CREATED, self.site.id)
+            record_rows(
+                RackDevice.objects.filter(rack_id__in=rack_ids.values()), ChangeEvent.ACTION_CREATED, self.site.id
+            )
+
+    def _placements(self, rack_id: int, rack_name: str, ru_height: int, devices: list) -> list[RackDevice]:
+        """RackDevice rows for a rack's devices, skipping those that do not fit or overlap an earlier one"""
+        placements, occupied = [], set()
+        for device in devices:
+            if not isinstance(device, dict):
+                continue
+            reference = device.get("deviceId") or device.get("id")
+            position = positive_int(device.get("position"))
+            label = f"{rack_name}/{device.get('instanceId') or reference}"
+            if reference not in self._device_ids:
+                self.stats.devices_skipped += 1
+                self._skip("device", label, "unknown device")
+                continue
+            if position is None:
+                self.stats.devices_skipped += 1
+                self._skip("device", label, "missing position")
+                continue
+            # A device occupies position through position + ru_size - 1, as in RackDeviceSerializer
+            units = range(position, position + self._device_ru_sizes[reference])
+            reason = None
+            if position + len(units) - 1 > ru_height:
+                reason = f"does not fit in the {ru_height}U rack at position {position}"
+            elif not occupied.isdisjoint(units):
+                reason = "overlaps another device"
+            if reason:
+                self.stats.devices_skipped += 1
+                self._skip("device", label, reason)
+                continue
+            occupied.update(units)
+            custom_name = device.get("customName")
+            placements.append(
+                RackDevice(
+                    rack_id=rack_id,
+                    device_id=self._device_ids[reference],
+                    position=position,
+                    instance_name=custom_name[:255] if custom_name and custom_name != device.get("name") else None,
+                )
+            )
+        return placements
+
+    def _import_providers(self, items: list):
+        providers = {}
+        for item in items:
+            if not isinstance(item, dict) or item.get("isPlaced") is False:
+                # Unplaced providers are templates in the provider library
+                continue
+            name = item.get("name")
+            if not isinstance(name, str) or not name.strip() or item.get("type") not in PROVIDER_TYPES:
+                self.stats.providers_skipped += 1
+                self._skip("provider", name or item.get("id"), "missing name or unsupported type")
+                continue
+            name = name.strip()[:255]
+            key = (name.lower(), item["type"])
+            if key in self._seen_providers:
+                self.stats.providers_skipped += 1
+                self._skip("provider", name, "duplicate name in file")
+                continue
+            self._seen_providers.add(key)
+
+            ru_size = positive_int(item.get("ruSize")) or 0
+            position = positive_int(item.get("position"))
+            rack_id = self._rack_ids.get(str(item.get("rackId"))) if ru_size and position else None
+            providers[key] = Provider(
+                site=self.site,
+                name=name,
+                type=item["type"],
+                description=item.get("description") or None,
+                location=item.get("location") or None,
+                power_capacity=_capacity(item.get("powerCapacity")),
+                power_ports_capacity=_capacity(item.get("powerPortsCapacity")),
+                cooling_capacity=_capacity(item.get("coolingCapacity")),
+                ru_size=ru_size,
+                rack_id=rack_id,
+                position=position if rack_id else None,
+            )
+        keys = list(providers)
+        for index, error in provider_errors(list(providers.values())).items():
+            self.stats.providers_skipped += 1
+            self._skip("provider", providers.pop(keys[index]).name, error)
+
+        with transaction.atomic():
+            matches = (
+                Provider.objects.filter(site=self.site, name__lower__in={name for name, _ in providers})
+                .annotate(lookup_name=Lower("name"))
+                .values_list("lookup_name", "type", "id")
+            )
+            existing = {}
+            for lookup_name, provider_type, provider_id in matches:
+                if (lookup_name, provider_type) in providers:
+                    existing.setdefault((lookup_name, provider_type), []).append(provider_id)
+            if existing and self.replace:
+                Provider.objects.filter(id__in=[pk for ids in existing.values() for pk in ids]).delete()
+                self.stats.providers_replaced += len(existing)
+            else:
+                for key in existing:
+                    self.stats.providers_skipped += 1
+                    self._skip("provider", providers.pop(key).name, "already exists")
+            Provider.objects.bulk_create(providers.values())
+            if providers:
+                created = Q()
+                for provider in providers.values():
+                    created |= Q(name=provider.name, type=provider.type)
+                record_rows(Provider.objects.filter(created, site=self.site), ChangeEvent.ACTION_CREATED, self.site.id)
+        self.stats.providers_created += len(providers)
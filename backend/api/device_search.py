@@ -0,0 +1,227 @@
+"""
+In-process search index for the device catalog.
+
+Builds an inverted index over device name, device_id, category, description and
+hardware provider name so catalog searches do not have to scan the devices table
+with LIKE queries. The index is built lazily on first use, kept per process and
+rebuilt after any Device or HardwareProvider change (signals bump a version
+number stored in the Django cache, so other workers sharing the cache notice too).
+
+Invalidation only reaches other processes through a shared cache (REDIS_URL).
+With the default per-process local memory cache, each gunicorn worker only sees
+the changes it made itself, and its index stays stale until it restarts.
+
+Every query term is matched as a prefix of indexed tokens. Results must match all
+terms and are ranked by the weight of the fields they matched in, with exact token
+matches scoring higher than prefix matches.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Device, HardwareProvider
+
+# Relative weight of a match in each indexed field
+FIELD_WEIGHTS = {
+    "device_id": 4.0,
+    "name": 3.0,
+    "category": 2.0,
+    "provider": 2.0,
+    "description": 1.0,
+}
+
+# Score multiplier for a term that is a prefix of a token rather than the whole token
+PREFIX_MATCH_FACTOR = 0.5
+
+# Number of expanded query terms remembered per index (typeahead repeats prefixes constantly)
+TERM_CACHE_SIZE = 1024
+
+VERSION_CACHE_KEY = "device_search_index_version"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class SearchResult:
+    """A page of device search results"""
+
+    count: int
+    device_ids: list[int]
+    scores: dict[int, float] = field(default_factory=dict)
+
+
+class DeviceSearchIndex:
+    """
+    Inverted index over the device catalog.
+
+    `postings` maps each token to {device pk: weight}, `vocabulary` is the sorted
+    token list used to expand prefixes with a binary search, and `sort_keys` holds
+    the catalog ordering (category, name) used to break ties between equal scores.
+    """
+
+    def __init__(self, rows):
+        self.postings: dict[str, dict[int, float]] = {}
+        self._term_cache: dict[str, dict[int, float]] = {}
+        self._term_cache_lock = threading.Lock()
+        self.categories: dict[int, str] = {}
+        self.sort_keys: dict[int, tuple[str, str]] = {}
+
+        for pk, device_id, name, category, description, provider_name in rows:
+            self.categories[pk] = (category or "").lower()
+            self.sort_keys[pk] = ((category or "").lower(), (name or "").lower())
+            values = {
+                "device_id": device_id,
+                "name": name,
+                "category": category,
+                "provider": provider_name,
+                "description": description,
+            }
+            for field_name, value in values.items():
+                weight = FIELD_WEIGHTS[field_name]
+                for token in set(tokenize(value)):
+                    postings = self.postings.setdefault(token, {})
+                    postings[pk] = postings.get(pk, 0.0) + weight
+
+        self.vocabulary = sorted(self.postings)
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _match_term(self, term: str) -> dict[int, float]:
+        """Score every device containing a token that starts with `term`"""
+        with self._term_cache_lock:
+            cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+
+        scores: dict[int, float] = {}
+        start = bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            factor = 1.0 if token == term else PREFIX_MATCH_FACTOR
+            for pk, weight in self.postings[token].items():
+                score = weight * factor
+                if score > scores.get(pk, 0.0):
+                    scores[pk] = score
+
+        with self._term_cache_lock:
+            if len(self._term_cache) >= TERM_CACHE_SIZE:
+                self._term_cache.clear()
+            self._term_cache[term] = scores
+        return scores
+
+    def search(self, query: str = "", category: Optional[str] = None, offset: int = 0, limit: int = 25) -> SearchResult:
+        """
+        Return one page of device primary keys matching the query, best matches first.
+
+        An empty query matches every device (optionally restricted to a category)
+        in catalog order.
+        """
+        terms = tokenize(query)
+        category_key = category.lower() if category else None
+
+        if terms:
+            scores = None
+            for term in terms:
+                term_scores = self._match_term(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    smaller, larger = (
+                        (scores, term_scores) if len(scores) <= len(term_scores) else (term_scores, scores)
+                    )
+                    scores = {pk: score + larger[pk] for pk, score in smaller.items() if pk in larger}
+                if not scores:
+                    return SearchResult(count=0, device_ids=[])
+        else:
+            scores = {pk: 0.0 for pk in self.categories}
+
+        if category_key:
+            scores = {pk: score for pk, score in scores.items() if self.categories[pk] == category_key}
+
+        # Only the first offset + limit results are needed, so select them with a heap instead of sorting all matches
+        ranked = heapq.nsmallest(offset + limit, scores, key=lambda pk: (-scores[pk], self.sort_keys[pk], pk))
+        page = ranked[offset:]
+        return SearchResult(count=len(scores), device_ids=page, scores={pk: scores[pk] for pk in page})
+
+
+_index: Optional[DeviceSearchIndex] = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = 0
+        cache.add(VERSION_CACHE_KEY, version, timeout=None)
+    return version
+
+
+def get_index() -> DeviceSearchIndex:
+    """Return the process-wide search index, rebuilding it if the catalog changed"""
+    global _index, _index_version
+
+    # invalidate_index() may clear _index at any time, so work with a local reference
+    version = _current_version()
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or _index_version != version:
+            rows = Device.objects.values_list(
+                "id", "device_id", "name", "category", "description", "provider__name"
+            ).iterator(chunk_size=2000)
+            index = DeviceSearchIndex(rows)
+            _index = index
+            _index_version = version
+    return index
+
+
+def invalidate_index():
+    """Mark the search index stale in this and every other process sharing the cache (see module docstring)"""
+    global _index
+
+    _index = None
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def search_devices(query: str = "", category: Optional[str] = None, offset: int = 0, limit: int = 25):
+    """
+    Search the device catalog.
+
+    Returns a tuple of (total match count, list of Device objects for the page),
+    with devices in ranked order and their provider and device group preloaded.
+    """
+    result = get_index().search(query, category=category, offset=offset, limit=limit)
+    devices = Device.objects.select_related("provider", "device_group").in_bulk(result.device_ids)
+    return result.count, [devices[pk] for pk in result.device_ids if pk in devices]
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+@receiver(post_save, sender=HardwareProvider)
+@receiver(post_delete, sender=HardwareProvider)
+def _invalidate_on_catalog_change(sender, **kwargs):
+    invalidate_index()
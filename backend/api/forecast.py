@@ -0,0 +1,160 @@
+"""
+Capacity forecasting from utilization history
+
+forecast_sites() fits a linear growth trend to the site-level utilization
+samples (see api.utilization) of every site, and projects the date each
+site reaches its RU, power, cooling and power port capacity.
+
+All sites are fitted in one pass: the samples of the lookback window are
+read with one query, and weighted least squares for every (site, metric)
+pair comes from per-site weighted sums of centered x and y, computed with
+np.bincount. x is days relative to now, so the fitted intercept is the
+trend's value today. Each row is weighted by the raw samples it averages
+and placed at the middle of its period.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Site, UtilizationSample
+
+# metric -> (used field, capacity field)
+METRICS = {
+    "ru": ("ru_used", "ru_capacity"),
+    "power": ("power_draw", "power_capacity"),
+    "cooling": ("hvac_load", "cooling_capacity"),
+    "ports": ("ports_used", "ports_capacity"),
+}
+PERIODS = {
+    UtilizationSample.RESOLUTION_RAW: timedelta(0),
+    UtilizationSample.RESOLUTION_HOUR: timedelta(hours=1),
+    UtilizationSample.RESOLUTION_DAY: timedelta(days=1),
+}
+DEFAULT_LOOKBACK_DAYS = 90
+# Fewer rows than this are not fitted
+MIN_POINTS = 3
+# Limits further out than this are reported without a date
+HORIZON_DAYS = 3650
+
+
+def default_resolution(lookback_days: int) -> str:
+    """Hourly rows for short windows, daily rows otherwise"""
+    return UtilizationSample.RESOLUTION_HOUR if lookback_days <= 14 else UtilizationSample.RESOLUTION_DAY
+
+
+def _metric(latest, capacity, points, slope, today, r2, now: datetime) -> dict:
+    result = {
+        "current": round(latest, 2),
+        "capacity": capacity,
+        "growth_per_day": None,
+        "trend_today": None,
+        "fit_r2": None,
+        "days_until_full": None,
+        "full_date": None,
+    }
+    if points < MIN_POINTS or np.isnan(slope):
+        return {**result, "status": "insufficient_history"}
+    if capacity <= 0:
+        return {**result, "status": "no_capacity"}
+    result.update(
+        {
+            "growth_per_day": round(slope, 4),
+            "trend_today": round(today, 2),
+            "fit_r2": None if np.isnan(r2) else round(r2, 4),
+        }
+    )
+    if latest >= capacity:
+        return {**result, "status": "at_capacity", "days_until_full": 0, "full_date": now.date().isoformat()}
+    if slope <= 0:
+        return {**result, "status": "not_growing"}
+    days = max(0.0, (capacity - today) / slope)
+    if days > HORIZON_DAYS:
+        return {**result, "status": "beyond_horizon"}
+    return {
+        **result,
+        "status": "growing",
+        "days_until_full": round(days, 1),
+        "full_date": (now + timedelta(days=days)).date().isoformat(),
+    }
+
+
+def forecast_sites(
+    site_ids: Optional[list[int]] = None,
+    lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+    resolution: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> list[dict]:
+    """Capacity forecasts of the given sites (all by default), ordered by site name"""
+    now = now or timezone.now()
+    resolution = resolution or default_resolution(lookback_days)
+    sites = Site.objects.order_by("name")
+    samples = UtilizationSample.objects.filter(
+        rack=None, resolution=resolution, timestamp__gte=now - timedelta(days=lookback_days), timestamp__lte=now
+    )
+    if site_ids is not None:
+        sites = sites.filter(id__in=site_ids)
+        samples = samples.filter(site_id__in=site_ids)
+    sites = list(sites.values_list("id", "name"))
+    fields = [field for pair in METRICS.values() for field in pair]
+    rows = list(samples.order_by("site_id", "timestamp").values_list("site_id", "timestamp", "samples", *fields))
+
+    site_index = {site_id: index for index, (site_id, _) in enumerate(sites)}
+    size = len(sites)
+    columns = list(zip(*rows)) or [()] * (len(fields) + 3)
+    group = np.array([site_index[site_id] for site_id in columns[0]], dtype=np.int64)
+    middle = PERIODS[resolution] / 2
+    x = np.array([(moment + middle - now).total_seconds() / 86400 for moment in columns[1]], dtype=np.float64)
+    w = np.array(columns[2], dtype=np.float64)
+
+    def sums(values):
+        return np.bincount(group, weights=w * values, minlength=size)
+
+    points = np.bincount(group, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = sums(np.ones_like(x))
+        mean_x = sums(x) / n
+    # Centered sums keep the fit exact for flat series and large values
+    xc = x - mean_x[group]
+    sxx = sums(xc * xc)
+    # Rows are ordered by site and time, so each site's last row holds its latest values
+    last = np.full(size, -1, dtype=np.int64)
+    last[group] = np.arange(len(group))
+
+    fits = {}
+    for name, (used_field, capacity_field) in METRICS.items():
+        y = np.array(columns[3 + fields.index(used_field)], dtype=np.float64)
+        capacity = np.array(columns[3 + fields.index(capacity_field)], dtype=np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_y = sums(y) / n
+            yc = y - mean_y[group]
+            sxy, syy = sums(xc * yc), sums(yc * yc)
+            slope = np.where(sxx > 1e-12, sxy / sxx, np.nan)
+            today = mean_y - slope * mean_x
+            # Undefined (nan) for a constant series
+            r2 = np.where(syy > 1e-12 * (mean_y * mean_y + 1), sxy * sxy / (sxx * syy), np.nan)
+        latest = np.where(last >= 0, y[last] if len(y) else 0, 0)
+        latest_capacity = np.where(last >= 0, capacity[last] if len(capacity) else 0, 0)
+        fits[name] = zip(
+            latest.tolist(), latest_capacity.tolist(), points.tolist(), slope.tolist(), today.tolist(), r2.tolist()
+        )
+
+    results = []
+    for index, (site_id, name) in enumerate(sites):
+        result = {
+            "site_id": site_id,
+            "site_name": name,
+            "points": int(points[index]),
+            "first_sample": None,
+            "last_sample": None,
+        }
+        if points[index]:
+            first = last[index] - points[index] + 1
+            result["first_sample"] = columns[1][first].isoformat()
+            result["last_sample"] = columns[1][last[index]].isoformat()
+        for metric, values in fits.items():
+            result[metric] = _metric(*next(values), now)
+        results.append(result)
+    return results
@@ -0,0 +1,114 @@
+"""
+Background job endpoints
+"""
+
+from django.shortcuts import get_object_or_404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from . import jobs
+from .models import Job, Site
+from .serializers import JobSerializer
+
+# Jobs returned by GET /api/jobs
+JOB_LIST_LIMIT = 100
+
+
+@extend_schema(
+    summary="List or queue background jobs",
+    description=(
+        "GET lists the most recent background jobs (newest first), optionally filtered by `status`, `kind` and "
+        "`site`. POST queues a job of a public kind, e.g. `project_configurations` to re-project a site's rack "
+        "configurations; the job is run by a `manage.py run_jobs` worker. Poll GET /api/jobs/{id} for progress."
+    ),
+    tags=["Jobs"],
+    request={
+        "application/json": {
+            "type": "object",
+            "properties": {
+                "kind": {"type": "string"},
+                "siteId": {"type": "integer"},
+                "params": {"type": "object"},
+            },
+            "required": ["kind"],
+        }
+    },
+    parameters=[
+        OpenApiParameter(name="status", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="kind", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY),
+        OpenApiParameter(name="site", type=OpenApiTypes.INT, location=OpenApiParameter.QUERY),
+    ],
+    responses={200: JobSerializer(many=True), 202: JobSerializer},
+)
+@api_view(["GET", "POST"])
+@permission_classes([AllowAny])
+def job_list(request):
+    """
+    List recent jobs or queue a new one
+    """
+    if request.method == "POST":
+        kind = request.data.get("kind")
+        handler = jobs.HANDLERS.get(kind)
+        if handler is None or not handler.public:
+            return Response({"error": f"Unknown job kind '{kind}'"}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.data.get("params") or {}
+        if not isinstance(params, dict):
+            return Response({"error": "params must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+        site = None
+        site_id = request.data.get("siteId")
+        if site_id is not None:
+            site = Site.objects.filter(id=site_id).first() if isinstance(site_id, int) else None
+            if site is None:
+                return Response({"error": "Site not found"}, status=status.HTTP_404_NOT_FOUND)
+        job = jobs.enqueue(kind, params, site=site)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    queryset = Job.objects.all()
+    for param in ("status", "kind"):
+        if request.query_params.get(param):
+            queryset = queryset.filter(**{param: request.query_params[param]})
+    if request.query_params.get("site", "").isdigit():
+        queryset = queryset.filter(site_id=int(request.query_params["site"]))
+    return Response(JobSerializer(queryset[:JOB_LIST_LIMIT], many=True).data)
+
+
+@extend_schema(
+    summary="Get background job status",
+    description="Status, latest progress, and (once finished) result or error of a background job",
+    tags=["Jobs"],
+    responses={200: JobSerializer},
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def job_detail(request, job_id):
+    """
+    Get one job's status and progress
+    """
+    return Response(JobSerializer(get_object_or_404(Job, id=job_id)).data)
+
+
+@extend_schema(
+    summary="Cancel a background job",
+    description=(
+        "Cancel a queued job, or ask a running one to stop at its next progress report. "
+        "Returns 409 if the job has already finished."
+    ),
+    tags=["Jobs"],
+    request=None,
+    responses={202: JobSerializer, 409: OpenApiTypes.OBJECT},
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def job_cancel(request, job_id):
+    """
+    Cancel a job
+    """
+    job = get_object_or_404(Job, id=job_id)
+    if not jobs.cancel(job):
+        return Response({"error": f"Job is already {job.status}"}, status=status.HTTP_409_CONFLICT)
+    job.refresh_from_db()
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,379 @@
+"""
+Database-backed background job queue
+
+Operations that can outlive a gunicorn request (background configuration
+imports, re-projecting every configuration of a site) are queued as Job rows
+and run by `manage.py run_jobs` workers. The jobs table is the only moving
+part: there is no broker, and any number of workers on any number of hosts
+can share one database.
+
+Handlers are registered per kind with @job_handler and called as
+handler(job, context). They report progress with context.report(), which
+stores it on the job (throttled to one write per PROGRESS_INTERVAL) and
+raises JobCancelled once a cancellation has been requested.
+
+Claiming is a conditional UPDATE (status queued -> running), so a job is
+only ever claimed by one worker without row locks, which SQLite lacks.
+JOB_CONCURRENCY_LIMITS caps running jobs per kind: a worker that claims a
+job beyond the limit hands it back, and of two workers racing for the last
+slot the job with the lower id keeps it. A failed job is requeued with
+exponential backoff until it has used max_attempts. While a job runs, a
+heartbeat thread refreshes its heartbeat_at every JOB_STALE_AFTER / 4
+seconds, independently of the handler's progress reports, and a running job
+whose worker stopped sending heartbeats for JOB_STALE_AFTER seconds is
+requeued (or failed) the same way.
+"""
+
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .config_import import ConfigImporter
+from .models import Job, RackConfiguration, Site
+from .projection import project_configuration
+from .snapshot import Snapshot, import_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes of one job
+PROGRESS_INTERVAL = 1.0
+# Due jobs fetched per claim attempt
+CLAIM_CANDIDATES = 10
+# Heartbeats sent per JOB_STALE_AFTER period, so a few missed ones do not make a job look stale
+HEARTBEATS_PER_STALE_PERIOD = 4
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    kind: str
+    func: Callable
+    # Public kinds can be queued through POST /api/jobs; others only from server code
+    public: bool = False
+
+
+HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, public: bool = False):
+    """Register a function as the handler of a job kind"""
+
+    def decorator(func):
+        HANDLERS[kind] = JobHandler(kind, func, public)
+        return func
+
+    return decorator
+
+
+class JobContext:
+    """Passed to handlers to report progress and notice cancellation"""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self._last_write = 0.0
+
+    def report(self, force: bool = False, **progress):
+        """Merge `progress` into the job's progress and store it (at most once per PROGRESS_INTERVAL)"""
+        self.job.progress.update(progress)
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        updated = Job.objects.filter(id=self.job.id, worker=self.job.worker, status=Job.STATUS_RUNNING).update(
+            progress=self.job.progress, heartbeat_at=timezone.now()
+        )
+        if not updated or Job.objects.filter(id=self.job.id, cancel_requested=True).exists():
+            # Cancelled, or requeued as stale and claimed by another worker
+            raise JobCancelled()
+
+
+def enqueue(
+    kind: str,
+    params: Optional[dict] = None,
+    site: Optional[Site] = None,
+    max_attempts: Optional[int] = None,
+) -> Job:
+    """Queue a job of a registered kind"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        site=site,
+        max_attempts=max(1, max_attempts or settings.JOB_MAX_ATTEMPTS),
+    )
+
+
+def cancel(job: Job) -> bool:
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    now = timezone.now()
+    if Job.objects.filter(id=job.id, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_CANCELLED, cancel_requested=True, finished_at=now
+    ):
+        _remove_job_file(job)
+        return True
+    return bool(Job.objects.filter(id=job.id, status=Job.STATUS_RUNNING).update(cancel_requested=True))
+
+
+def store_job_file(stream, max_size: int) -> str:
+    """Copy an upload stream into JOB_STORAGE_DIR for a job to read later; returns the path"""
+    os.makedirs(settings.JOB_STORAGE_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_STORAGE_DIR, f"{uuid.uuid4().hex}.upload")
+    with open(path, "wb") as f:
+        shutil.copyfileobj(stream, f, 1024 * 1024)
+    if os.path.getsize(path) > max_size:
+        os.remove(path)
+        raise ValueError(f"File exceeds {max_size} bytes")
+    return path
+
+
+def _remove_job_file(job: Job):
+    path = job.params.get("file") if isinstance(job.params, dict) else None
+    # Only files stored by store_job_file are removed
+    if path and os.path.dirname(os.path.abspath(path)) == os.path.abspath(settings.JOB_STORAGE_DIR):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def requeue_stale_jobs() -> int:
+    """Requeue (or fail, once out of attempts) running jobs whose worker stopped reporting"""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.JOB_STALE_AFTER)
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts"), cancel_requested=False).update(
+        status=Job.STATUS_QUEUED, worker="", error="Worker stopped responding"
+    )
+    failed = list(stale)
+    stale.update(status=Job.STATUS_FAILED, error="Worker stopped responding", finished_at=now)
+    for job in failed:
+        _remove_job_file(job)
+    return requeued + len(failed)
+
+
+def claim_job(worker: str, kinds: Optional[list[str]] = None) -> Optional[Job]:
+    """Claim the next due job this worker can run, or None"""
+    now = timezone.now()
+    limits = settings.JOB_CONCURRENCY_LIMITS
+    running = dict(
+        Job.objects.filter(status=Job.STATUS_RUNNING, kind__in=list(limits))
+        .values("kind")
+        .annotate(count=Count("id"))
+        .values_list("kind", "count")
+    )
+    runnable = [
+        kind
+        for kind in (kinds or HANDLERS)
+        if kind in HANDLERS and (kind not in limits or running.get(kind, 0) < limits[kind])
+    ]
+    if not runnable:
+        return None
+
+    candidates = list(
+        Job.objects.filter(status=Job.STATUS_QUEUED, run_after__lte=now, kind__in=runnable)
+        .order_by("run_after", "id")
+        .values_list("id", "kind")[:CLAIM_CANDIDATES]
+    )
+    for job_id, kind in candidates:
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+            cancel_requested=False,
+        )
+        if not claimed:
+            continue
+        if kind in limits:
+            ahead = Job.objects.filter(status=Job.STATUS_RUNNING, kind=kind, id__lt=job_id).count()
+            if ahead >= limits[kind]:
+                # Another worker took the last slot at the same time; hand the job back
+                Job.objects.filter(id=job_id, worker=worker).update(
+                    status=Job.STATUS_QUEUED, worker="", attempts=F("attempts") - 1, started_at=None
+                )
+                continue
+        return Job.objects.get(id=job_id)
+    return None
+
+
+class Heartbeat:
+    """Refreshes heartbeat_at of a running job from a background thread until stopped"""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.interval = settings.JOB_STALE_AFTER / HEARTBEATS_PER_STALE_PERIOD
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job.id}", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        from django.db import connection
+
+        mine = Job.objects.filter(id=self.job.id, worker=self.job.worker, status=Job.STATUS_RUNNING)
+        try:
+            while not self.stop_event.wait(self.interval):
+                if not mine.update(heartbeat_at=timezone.now()):
+                    # Finished, cancelled or requeued; the handler notices at its next report()
+                    return
+        except Exception:
+            logger.exception(f"Heartbeat of job {self.job.kind} #{self.job.id} failed")
+        finally:
+            connection.close()
+
+
+def run_job(job: Job):
+    """Run a claimed job and record its outcome"""
+    context = JobContext(job)
+    mine = Job.objects.filter(id=job.id, worker=job.worker, status=Job.STATUS_RUNNING)
+    try:
+        with Heartbeat(job):
+            result = HANDLERS[job.kind].func(job, context)
+    except JobCancelled:
+        finished = mine.update(status=Job.STATUS_CANCELLED, progress=job.progress, finished_at=timezone.now())
+    except Exception as e:
+        logger.exception(f"Job {job.kind} #{job.id} failed (attempt {job.attempts} of {job.max_attempts})")
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            mine.update(
+                status=Job.STATUS_QUEUED,
+                worker="",
+                error=str(e),
+                progress=job.progress,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+            return
+        finished = mine.update(
+            status=Job.STATUS_FAILED, error=str(e), progress=job.progress, finished_at=timezone.now()
+        )
+    else:
+        finished = mine.update(
+            status=Job.STATUS_SUCCEEDED, result=result, error="", progress=job.progress, finished_at=timezone.now()
+        )
+    # A job requeued as stale belongs to another worker now, which may be reading its file
+    if finished:
+        _remove_job_file(job)
+
+
+class Worker:
+    """
+    Runs queued jobs in `concurrency` threads until stopped.
+
+    With once=True, each thread exits when no job is due instead of polling.
+    """
+
+    def __init__(self, concurrency: int = 1, kinds: Optional[list[str]] = None, poll_interval: float = 1.0):
+        self.concurrency = max(1, concurrency)
+        self.kinds = kinds
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.jobs_run = 0
+        self._lock = threading.Lock()
+
+    def run(self, once: bool = False):
+        if self.concurrency == 1:
+            self._loop(0, once)
+            return
+        threads = [
+            threading.Thread(target=self._loop, args=(index, once), name=f"job-worker-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self, index: int, once: bool):
+        name = f"{self.name}:{index}"
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                if index == 0:
+                    requeue_stale_jobs()
+                job = claim_job(name, self.kinds)
+                if job is None:
+                    if once:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                logger.info(f"Running job {job.kind} #{job.id} (attempt {job.attempts} of {job.max_attempts})")
+                run_job(job)
+                with self._lock:
+                    self.jobs_run += 1
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                from django.db import connection
+
+                connection.close()
+
+
+# Built-in job kinds
+
+
+@job_handler("config_import")
+def _config_import_job(job: Job, context: JobContext) -> dict:
+    """Import an uploaded configuration file into the job's site (params: file, replace, batch_size)"""
+    importer = ConfigImporter(
+        job.site,
+        batch_size=job.params.get("batch_size") or settings.CONFIG_IMPORT_BATCH_SIZE,
+        replace=bool(job.params.get("replace")),
+    )
+    path = job.params["file"]
+    with open(path, "rb") as f:
+        for event in importer.run(f, os.path.getsize(path)):
+            if event["event"] == "progress":
+                context.report(**{key: value for key, value in event.items() if key != "event"})
+            else:
+                return {key: value for key, value in event.items() if key != "event"}
+
+
+@job_handler("project_configurations", public=True)
+def _project_configurations_job(job: Job, context: JobContext) -> dict:
+    """Re-project the rack configurations of the job's site, or of every site (params: full)"""
+    configs = RackConfiguration.objects.order_by("id")
+    if job.site_id is not None:
+        configs = configs.filter(site_id=job.site_id)
+    total = configs.count()
+    totals = {}
+    for done, config in enumerate(configs.iterator(chunk_size=50), start=1):
+        for key, value in project_configuration(config, full=bool(job.params.get("full"))).as_dict().items():
+            totals[key] = totals.get(key, 0) + value
+        context.report(configurations=done, total=total)
+    return {"configurations": total, **totals}
+
+
+@job_handler("snapshot_import")
+def _snapshot_import_job(job: Job, context: JobContext) -> dict:
+    """Load an uploaded site snapshot into the job's site (params: file, replace)"""
+    context.report(force=True, phase="importing")
+    with Snapshot(job.params["file"]) as snapshot:
+        return import_snapshot(snapshot, job.site, replace=bool(job.params.get("replace"))).as_dict()
@@ -0,0 +1,51 @@
+"""
+Django management command to report N-1 and N-2 power redundancy of sites
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Site
+from api.redundancy import FAILURE_DEPTHS, analyze_redundancy
+from api.site_matrix import get_site_matrix
+
+
+class Command(BaseCommand):
+    help = "Report whether each site's racks keep power when one or two power providers fail"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", help="Site name or id (default: all sites)")
+
+    def handle(self, *args, **options):
+        value = options["site"]
+        if value:
+            site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+            site = site or Site.objects.filter(name__lower=value.lower()).first()
+            if not site:
+                raise CommandError(f"Site '{value}' not found")
+            sites = [site]
+        else:
+            sites = Site.objects.order_by("name")
+
+        for site in sites:
+            analysis = analyze_redundancy(get_site_matrix(site.id))
+            levels = ", ".join(
+                f"N-{depth} {'ok' if analysis['survives'][f'n{depth}'] else 'AT RISK'} "
+                f"({len(analysis['racks_at_risk'][f'n{depth}'])} racks)"
+                for depth in FAILURE_DEPTHS
+            )
+            line = (
+                f"{site.name}: {analysis['power_draw']:,.0f}W of {analysis['power_capacity']:,.0f}W "
+                f"from {analysis['power_providers']} providers; {levels}"
+            )
+            style = self.style.SUCCESS if analysis["survives"][f"n{FAILURE_DEPTHS[-1]}"] else self.style.WARNING
+            self.stdout.write(style(line))
+
+            if options["verbosity"] >= 2:
+                for point in analysis["single_points_of_failure"]:
+                    self.stdout.write(
+                        f"  single point of failure: {point['provider_name']} ({point['racks_at_risk']} racks)"
+                    )
+                for rack in analysis["racks_at_risk"][f"n{FAILURE_DEPTHS[-1]}"]:
+                    self.stdout.write(
+                        f"  at risk: {rack['rack_name']} ({rack['power_draw']:,.0f}W, {rack['feed']} feed)"
+                    )
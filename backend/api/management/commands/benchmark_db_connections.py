@@ -0,0 +1,58 @@
+"""
+Django management command to measure the per-request cost of database connections
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from benchmarks.connections import MODES, run_connection_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare connecting per request with persistent connections against the configured database "
+        "(runs one read-only query per simulated request)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Simulated requests per mode")
+        parser.add_argument("--threads", type=int, default=1, help="Concurrent simulated requests")
+        parser.add_argument(
+            "--mode",
+            action="append",
+            dest="modes",
+            choices=MODES,
+            help="Only run this mode (repeatable)",
+        )
+        parser.add_argument("--database", default="default", help="Database alias to benchmark")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["threads"] < 1:
+            raise CommandError("--requests and --threads must be at least 1")
+        if options["database"] not in connections:
+            raise CommandError(f"Unknown database alias '{options['database']}'")
+
+        report = run_connection_benchmark(
+            requests=options["requests"],
+            threads=options["threads"],
+            modes=options["modes"],
+            alias=options["database"],
+        )
+
+        self.stdout.write(f"{report['vendor']}: {options['requests']} requests on {options['threads']} thread(s)")
+        for mode, result in report["results"].items():
+            line = (
+                f"  {mode:<11} mean {result['mean_ms']:>8.3f} ms  p95 {result['p95_ms']:>8.3f} ms  "
+                f"{result['throughput_rps']:>9.1f} req/s"
+            )
+            if "saving_ms" in result and mode != "connect":
+                line += f"  saves {result['saving_ms']:.3f} ms per request"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,54 @@
+"""
+Django management command to compare SQLite write concurrency with and without performance mode
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.sqlite_writes import profiles, run_sqlite_write_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent rack configuration autosaves from several processes against a temporary SQLite "
+        "database with stock and tuned connection settings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent writer processes")
+        parser.add_argument("--writes", type=int, default=200, help="Autosaves per worker")
+        parser.add_argument(
+            "--profile",
+            action="append",
+            dest="profiles",
+            choices=["stock", "tuned"],
+            help="Only run this profile (repeatable)",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["writes"] < 1:
+            raise CommandError("--workers and --writes must be at least 1")
+        unavailable = set(options["profiles"] or []) - set(profiles())
+        if unavailable:
+            raise CommandError("The tuned profile is only configured when DB_ENGINE=sqlite")
+
+        report = run_sqlite_write_benchmark(
+            workers=options["workers"], writes=options["writes"], names=options["profiles"]
+        )
+
+        self.stdout.write(f"SQLite: {options['writes']} autosaves from each of {options['workers']} worker(s)")
+        for name, result in report["results"].items():
+            line = (
+                f"  {name:<6} {result['throughput_wps']:>8.1f} saves/s  mean {result['mean_ms']:>8.3f} ms  "
+                f"p95 {result['p95_ms']:>8.3f} ms  locked {result['locked_errors']}"
+            )
+            if "speedup" in result and name != "stock":
+                line += f"  {result['speedup']:.2f}x stock"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,40 @@
+"""
+Django management command to export a site's inventory as a columnar snapshot file
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Site
+from api.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write a site's racks, rack devices, providers and the catalog entries they use to a snapshot file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Snapshot file to write")
+        parser.add_argument("--site", required=True, help="Site name or id")
+        parser.add_argument(
+            "--no-compress", action="store_true", help="Store columns uncompressed, so the file can be memory-mapped"
+        )
+
+    def handle(self, *args, **options):
+        value = options["site"]
+        site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+        site = site or Site.objects.filter(name__lower=value.lower()).first()
+        if not site:
+            raise CommandError(f"Site '{value}' not found")
+
+        started = time.perf_counter()
+        with open(options["file"], "wb") as f:
+            counts = write_snapshot(site, f, compress=not options["no_compress"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported site '{site.name}' to {options['file']} ({os.path.getsize(options['file']):,} bytes, "
+                f"{time.perf_counter() - started:.2f}s): {counts['racks']} racks, {counts['rack_devices']} devices, "
+                f"{counts['providers']} providers, {counts['devices']} device types"
+            )
+        )
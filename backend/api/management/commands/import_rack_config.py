@@ -0,0 +1,84 @@
+"""
+Django management command to import an exported rack configuration file into a site
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.config_import import ConfigImporter, ConfigParseError
+from api.models import Site
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream-import a configuration export (Import/Export JSON) into a site's racks, rack devices and "
+        "resource providers, committing one batch of racks at a time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Configuration JSON file")
+        parser.add_argument("--site", required=True, help="Site name or id to import into")
+        parser.add_argument("--create-site", action="store_true", help="Create the site if it does not exist")
+        parser.add_argument(
+            "--replace", action="store_true", help="Replace racks that already exist instead of skipping them"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CONFIG_IMPORT_BATCH_SIZE,
+            help="Racks per transaction",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if not os.path.isfile(options["file"]):
+            raise CommandError(f"File '{options['file']}' does not exist")
+
+        site = self._get_site(options["site"], options["create_site"])
+        importer = ConfigImporter(site, batch_size=options["batch_size"], replace=options["replace"])
+        total_bytes = os.path.getsize(options["file"])
+
+        try:
+            with open(options["file"], "rb") as f:
+                for event in importer.run(f, total_bytes):
+                    if event["event"] == "progress":
+                        percent = event["bytesRead"] / total_bytes * 100 if total_bytes else 100
+                        self.stdout.write(
+                            f"  {percent:5.1f}%  racks {event['racksCreated']:,}  devices {event['devicesCreated']:,}"
+                            f"  providers {event['providersCreated']:,}"
+                        )
+        except ConfigParseError as e:
+            raise CommandError(f"Invalid configuration file: {e} (batches before the error were committed)")
+
+        summary = importer.stats.as_dict()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported into site '{site.name}': {summary['racksCreated']} racks "
+                f"({summary['racksReplaced']} replaced, {summary['racksSkipped']} skipped), "
+                f"{summary['devicesCreated']} devices ({summary['devicesSkipped']} skipped), "
+                f"{summary['providersCreated']} providers ({summary['providersReplaced']} replaced, "
+                f"{summary['providersSkipped']} skipped)"
+            )
+        )
+        if summary["unrackedDevices"]:
+            self.stdout.write(f"{summary['unrackedDevices']} unracked devices are not stored")
+        if summary["unknownDeviceCount"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{summary['unknownDeviceCount']} unknown device types: {', '.join(summary['unknownDevices'])}"
+                )
+            )
+        for skipped in summary["skipped"]:
+            self.stdout.write(f"  skipped {skipped['type']} {skipped['item']}: {skipped['reason']}")
+
+    def _get_site(self, value: str, create: bool) -> Site:
+        site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+        site = site or Site.objects.filter(name__lower=value.lower()).first()
+        if site:
+            return site
+        if not create:
+            raise CommandError(f"Site '{value}' not found (use --create-site to create it)")
+        return Site.objects.create(name=value)
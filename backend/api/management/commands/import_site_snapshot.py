@@ -0,0 +1,54 @@
+"""
+Django management command to load a site snapshot file into a site
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Site
+from api.snapshot import Snapshot, SnapshotError, import_snapshot
+
+
+class Command(BaseCommand):
+    help = "Load a snapshot written by export_site_snapshot (or GET /api/sites/<id>/snapshot) into a site"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Snapshot file")
+        parser.add_argument("--site", help="Site name or id to load into (default: the snapshot's site name)")
+        parser.add_argument("--create-site", action="store_true", help="Create the site if it does not exist")
+        parser.add_argument(
+            "--replace", action="store_true", help="Replace racks that already exist instead of skipping them"
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(options["file"]):
+            raise CommandError(f"File '{options['file']}' does not exist")
+
+        started = time.perf_counter()
+        try:
+            with Snapshot(options["file"]) as snapshot:
+                site = self._get_site(options["site"] or snapshot.site["name"], options["create_site"], snapshot)
+                stats = import_snapshot(snapshot, site, replace=options["replace"]).as_dict()
+        except SnapshotError as e:
+            raise CommandError(f"Invalid snapshot: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported into site '{site.name}' in {time.perf_counter() - started:.2f}s: "
+                f"{stats['racks_created']} racks ({stats['racks_replaced']} replaced, {stats['racks_skipped']} "
+                f"skipped), {stats['devices_created']} devices, {stats['providers_created']} providers "
+                f"({stats['providers_replaced']} replaced, {stats['providers_skipped']} skipped), "
+                f"{stats['catalog_devices_created']} device types added"
+            )
+        )
+
+    def _get_site(self, value: str, create: bool, snapshot: Snapshot) -> Site:
+        site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+        site = site or Site.objects.filter(name__lower=value.lower()).first()
+        if site:
+            return site
+        if not create:
+            raise CommandError(f"Site '{value}' not found (use --create-site to create it)")
+        return Site.objects.create(name=value, description=snapshot.site.get("description"))
@@ -0,0 +1,60 @@
+"""
+Django management command to project saved rack configurations into the rack tables
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import RackConfiguration, Site
+from api.projection import project_configuration
+
+
+class Command(BaseCommand):
+    help = (
+        "Project saved rack configurations into Rack and RackDevice rows (configurations are projected on save; "
+        "use this to backfill existing ones or repair rows edited by hand)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", help="Only project configurations of this site (name or id)")
+        parser.add_argument(
+            "--full", action="store_true", help="Rewrite every projected rack, not only racks whose layout changed"
+        )
+
+    def handle(self, *args, **options):
+        configs = RackConfiguration.objects.select_related("site").order_by("id")
+        if options["site"]:
+            configs = configs.filter(site=self._get_site(options["site"]))
+
+        totals = {}
+        count = 0
+        for config in configs.iterator(chunk_size=100):
+            stats = project_configuration(config, full=options["full"]).as_dict()
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+            count += 1
+            self.stdout.write(
+                f"  {config}: {stats['racks_created']} racks created, {stats['racks_updated']} updated, "
+                f"{stats['racks_deleted']} deleted, {stats['racks_unchanged']} unchanged"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Projected {count} configurations: {totals.get('racks_created', 0)} racks created, "
+                f"{totals.get('racks_updated', 0)} updated, {totals.get('racks_deleted', 0)} deleted; "
+                f"{totals.get('placements_created', 0)} placements created, "
+                f"{totals.get('placements_updated', 0)} updated, {totals.get('placements_deleted', 0)} deleted"
+            )
+        )
+        if totals.get("placements_skipped"):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{totals['placements_skipped']} placements of device types missing from the catalog were skipped"
+                )
+            )
+
+    def _get_site(self, value: str) -> Site:
+        site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+        site = site or Site.objects.filter(name__lower=value.lower()).first()
+        if not site:
+            raise CommandError(f"Site '{value}' not found")
+        return site
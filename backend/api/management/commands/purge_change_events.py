@@ -0,0 +1,20 @@
+"""
+Django management command to delete old change events
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.change_events import purge_events
+
+
+class Command(BaseCommand):
+    help = "Delete change events older than CHANGE_EVENT_RETENTION_DAYS from the change feed log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=None, help="Keep this many days (default: CHANGE_EVENT_RETENTION_DAYS)"
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_events(days=options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change event(s)"))
@@ -0,0 +1,38 @@
+"""
+Django management command to delete expired sessions from the django_session table
+"""
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions from the database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows deleted per batch (default: SESSION_PURGE_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or settings.SESSION_PURGE_BATCH_SIZE
+        now = timezone.now()
+        deleted = 0
+
+        # Unlike clearsessions, delete in small batches so the table is not locked for one long DELETE
+        while True:
+            expired_keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by()
+                .values_list("session_key", flat=True)[:batch_size]
+            )
+            if not expired_keys:
+                break
+            deleted += Session.objects.filter(session_key__in=expired_keys).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)"))
@@ -0,0 +1,23 @@
+"""
+Django management command to delete expired passkey challenges
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.passkey_challenges import purge_expired_challenges
+
+
+class Command(BaseCommand):
+    help = "Delete expired WebAuthn/passkey challenges from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows deleted per batch (default: PASSKEY_CHALLENGE_PURGE_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_challenges(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired passkey challenge(s)"))
@@ -0,0 +1,66 @@
+"""
+Django management command to record site and rack utilization history
+"""
+
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.models import Site
+from api.utilization import downsample, prune, record_samples
+
+
+class Command(BaseCommand):
+    help = (
+        "Record a utilization sample of every site and rack, then downsample and prune the history. "
+        "Run from cron, or with --loop as a service"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", help="Only sample this site (name or id)")
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep sampling every UTILIZATION_SAMPLE_INTERVAL seconds"
+        )
+
+    def handle(self, *args, **options):
+        sites = None
+        value = options["site"]
+        if value:
+            site = Site.objects.filter(id=int(value)).first() if value.isdigit() else None
+            site = site or Site.objects.filter(name__lower=value.lower()).first()
+            if not site:
+                raise CommandError(f"Site '{value}' not found")
+            sites = [site.id]
+
+        if not options["loop"]:
+            self._run(sites)
+            return
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        interval = settings.UTILIZATION_SAMPLE_INTERVAL
+        self.stdout.write(f"Recording utilization every {interval}s")
+        while not stop.is_set():
+            started = time.monotonic()
+            close_old_connections()
+            try:
+                self._run(sites)
+            except Exception as e:
+                self.stderr.write(f"Sampling failed: {e}")
+            stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _run(self, sites):
+        recorded = record_samples(sites)
+        written = downsample()
+        deleted = prune()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recorded {recorded} samples, wrote {written['hour']} hourly and {written['day']} daily rows, "
+                f"deleted {deleted} expired rows"
+            )
+        )
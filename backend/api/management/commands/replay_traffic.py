@@ -0,0 +1,116 @@
+"""
+Django management command to replay recorded API traffic against a running server
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.loadtest import parse_access_log, parse_recording, replay, summarize
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a gunicorn access log or a TrafficRecordingMiddleware recording against a running server "
+        "and report throughput, latency percentiles and error rates"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Access log or recording to replay")
+        parser.add_argument(
+            "--format",
+            choices=["recording", "access-log"],
+            default="recording",
+            help="'recording' (JSON lines with bodies) or 'access-log' (gunicorn access log, no bodies)",
+        )
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server to replay against")
+        parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+        parser.add_argument("--multiplier", type=int, default=1, help="Replay the recorded sequence this many times")
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=0.0,
+            help="Keep the recorded pacing sped up by this factor; 0 sends requests as fast as possible",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+        parser.add_argument("--read-only", action="store_true", help="Only replay GET, HEAD and OPTIONS requests")
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help="Extra 'Name: value' header sent with every request, e.g. a session Cookie (repeatable)",
+        )
+        parser.add_argument("--output", help="Write the JSON summary to this file")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["multiplier"] < 1:
+            raise CommandError("--concurrency and --multiplier must be at least 1")
+        if options["speed"] < 0:
+            raise CommandError("--speed cannot be negative")
+
+        headers = {}
+        for header in options["header"]:
+            name, sep, value = header.partition(":")
+            if not sep or not name.strip():
+                raise CommandError(f"Invalid header '{header}', expected 'Name: value'")
+            headers[name.strip()] = value.strip()
+
+        parse = parse_access_log if options["format"] == "access-log" else parse_recording
+        try:
+            with open(options["file"]) as f:
+                requests = parse(f)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read {options['file']}: {e}")
+
+        if options["read_only"]:
+            requests = [request for request in requests if request.method in SAFE_METHODS]
+        if not requests:
+            raise CommandError("No requests to replay")
+
+        span = requests[-1].offset
+        self.stdout.write(
+            f"Replaying {len(requests)} requests x{options['multiplier']} (recorded over {span:.1f}s) against "
+            f"{options['base_url']} with concurrency {options['concurrency']}..."
+        )
+        results, elapsed = replay(
+            requests,
+            options["base_url"],
+            concurrency=options["concurrency"],
+            multiplier=options["multiplier"],
+            speed=options["speed"],
+            timeout=options["timeout"],
+            headers=headers,
+        )
+        summary = summarize(results, elapsed)
+        summary["settings"] = {
+            key: options[key] for key in ("base_url", "concurrency", "multiplier", "speed", "read_only", "format")
+        }
+        self._print_summary(summary)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(summary, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Summary written to {options['output']}"))
+
+    def _print_summary(self, summary):
+        latency = summary["latency_ms"]
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['elapsed_seconds']:.2f}s: "
+            f"{summary['throughput_rps']} req/s, p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+            f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms"
+        )
+        line = (
+            f"Errors: {summary['error_rate']:.2%} (4xx {summary['client_error_rate']:.2%}), status codes: "
+            + ", ".join(f"{status}={count}" for status, count in summary["status_codes"].items())
+        )
+        self.stdout.write(self.style.ERROR(line) if summary["error_rate"] else line)
+        for error in summary["sample_errors"]:
+            self.stdout.write(self.style.WARNING(f"  {error}"))
+
+        for endpoint, stats in summary["endpoints"].items():
+            self.stdout.write(
+                f"  {endpoint:<48} {stats['requests']:>7}  p50 {stats['latency_ms']['p50']:>8.1f} ms  "
+                f"p95 {stats['latency_ms']['p95']:>8.1f} ms  errors {stats['error_rate']:.1%}"
+            )
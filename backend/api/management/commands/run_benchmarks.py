@@ -0,0 +1,125 @@
+"""
+Django management command to run the API and MCP performance benchmarks
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.cases import build_cases
+from benchmarks.generator import DatacenterSpec, generate_datacenter
+from benchmarks.runner import compare_reports, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic datacenter in a throwaway test database, time the API hot paths and MCP "
+        "handlers, and write a JSON report"
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatacenterSpec()
+        parser.add_argument("--racks", type=int, default=defaults.racks, help="Total racks to generate (up to 100000)")
+        parser.add_argument("--racks-per-site", type=int, default=defaults.racks_per_site)
+        parser.add_argument("--devices", type=int, default=defaults.devices, help="Device catalog size")
+        parser.add_argument("--fill", type=float, default=defaults.fill, help="Fraction of each rack's RU in use")
+        parser.add_argument("--rack-configs", type=int, default=defaults.rack_configs)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--repeat", type=int, default=10, help="Timed iterations per case")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed iterations per case")
+        parser.add_argument(
+            "--case", action="append", dest="cases", help="Only run cases matching this glob (repeatable)"
+        )
+        parser.add_argument("--skip-mcp", action="store_true", help="Do not benchmark the MCP handlers")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+        parser.add_argument("--compare", help="Compare with a previous JSON report")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=None,
+            help="With --compare, fail if any case's median is this fraction slower (e.g. 0.2 for 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options["racks"] <= 100000:
+            raise CommandError("--racks must be between 1 and 100000")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline report: {e}")
+
+        spec = DatacenterSpec(
+            racks=options["racks"],
+            racks_per_site=options["racks_per_site"],
+            devices=options["devices"],
+            fill=options["fill"],
+            rack_configs=options["rack_configs"],
+            seed=options["seed"],
+        )
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f"Generating {spec.racks} racks in {spec.sites} site(s)...")
+            datacenter = generate_datacenter(spec)
+            self.stdout.write(
+                ", ".join(f"{count} {name}" for name, count in datacenter.counts.items())
+                + f" in {datacenter.seconds:.1f}s"
+            )
+
+            cases = build_cases(datacenter, include_mcp=not options["skip_mcp"])
+            report = run_benchmarks(
+                datacenter,
+                cases,
+                repeat=options["repeat"],
+                warmup=options["warmup"],
+                patterns=options["cases"],
+                progress=self._print_result,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if baseline is not None:
+            self._print_comparison(baseline, report, options["max_regression"])
+
+    def _print_result(self, name, result):
+        if "skipped" in result:
+            self.stdout.write(self.style.WARNING(f"  {name:<32} skipped: {result['skipped']}"))
+            return
+        self.stdout.write(
+            f"  {name:<32} median {result['median_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+            f"{result['queries']:>5} queries"
+        )
+
+    def _print_comparison(self, baseline, report, max_regression):
+        self.stdout.write(f"\nCompared with {baseline.get('git_commit') or 'baseline'}:")
+        regressions = []
+        for row in compare_reports(baseline, report):
+            line = (
+                f"  {row['case']:<32} {row['baseline_ms']:>9.2f} -> {row['current_ms']:>9.2f} ms "
+                f"({row['change']:+.1%})  queries {row['baseline_queries']} -> {row['current_queries']}"
+            )
+            if max_regression is not None and row["change"] > max_regression:
+                regressions.append(row["case"])
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} case(s) regressed more than {max_regression:.0%}: {', '.join(regressions)}"
+            )
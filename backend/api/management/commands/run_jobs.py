@@ -0,0 +1,48 @@
+"""
+Django management command to run queued background jobs
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.jobs import HANDLERS, Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the jobs table (imports, site re-projections). Start one or more of these "
+        "next to gunicorn; workers on any host sharing the database split the queue between them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time by this worker")
+        parser.add_argument(
+            "--kind", action="append", dest="kinds", help="Only run jobs of this kind (repeat for several kinds)"
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls of an idle queue")
+        parser.add_argument("--once", action="store_true", help="Run the jobs that are due, then exit")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        unknown = set(options["kinds"] or []) - HANDLERS.keys()
+        if unknown:
+            raise CommandError(
+                f"Unknown job kinds: {', '.join(sorted(unknown))} (known: {', '.join(sorted(HANDLERS))})"
+            )
+
+        worker = Worker(
+            concurrency=options["concurrency"], kinds=options["kinds"], poll_interval=options["poll_interval"]
+        )
+        if not options["once"]:
+            # Finish the running jobs, then exit
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: worker.stop())
+            self.stdout.write(
+                f"Worker {worker.name} running {', '.join(options['kinds'] or sorted(HANDLERS))} jobs "
+                f"({worker.concurrency} at a time)"
+            )
+
+        worker.run(once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker.name} stopped after {worker.jobs_run} jobs"))
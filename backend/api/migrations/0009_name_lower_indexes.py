@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_provider_provider_site_type_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="devicegroup",
+            index=models.Index(django.db.models.functions.text.Lower("name"), name="device_group_name_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rack",
+            index=models.Index(
+                models.F("site"), django.db.models.functions.text.Lower("name"), name="rack_site_name_lower_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(django.db.models.functions.text.Lower("name"), name="site_name_lower_idx"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+def delete_pending_challenges(apps, schema_editor):
+    # Pending challenges have no handle and expire within minutes; drop them so the unique column can be added
+    apps.get_model("api", "PasskeyChallenge").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_name_lower_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_pending_challenges, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="passkeychallenge",
+            name="handle",
+            field=models.CharField(
+                default="", help_text="Opaque id returned to the client", max_length=64, unique=True
+            ),
+            preserve_default=False,
+        ),
+    ]
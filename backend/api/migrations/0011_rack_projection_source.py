@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_passkeychallenge_handle"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rack",
+            name="source_config",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="source_config_id",
+                help_text="Rack configuration this rack is projected from (null = managed directly)",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="projected_racks",
+                to="api.rackconfiguration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rack",
+            name="source_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Digest of the projected rack as of the last projection",
+                max_length=40,
+            ),
+        ),
+        migrations.AddField(
+            model_name="rack",
+            name="source_key",
+            field=models.CharField(
+                blank=True, help_text="Rack id within the source configuration", max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="rackdevice",
+            name="source_key",
+            field=models.CharField(
+                blank=True, help_text="Device instance id within the source configuration", max_length=255, null=True
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="rack",
+            constraint=models.UniqueConstraint(fields=("source_config", "source_key"), name="rack_source_unique"),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:34
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_rack_projection_source"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(help_text="Registered job handler name", max_length=100)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict)),
+                (
+                    "progress",
+                    models.JSONField(blank=True, default=dict, help_text="Latest progress reported by the handler"),
+                ),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, default="")),
+                ("attempts", models.IntegerField(default=0)),
+                (
+                    "max_attempts",
+                    models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+                ),
+                ("cancel_requested", models.BooleanField(default=False)),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, help_text="Not started before this time (retry backoff)"
+                    ),
+                ),
+                (
+                    "worker",
+                    models.CharField(blank=True, default="", help_text="Worker running the job", max_length=255),
+                ),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "site",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="site_id",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="jobs",
+                        to="api.site",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "jobs",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+                    models.Index(fields=["kind", "status"], name="job_kind_status_idx"),
+                    models.Index(fields=["site"], name="jobs_site_id_2f3aad_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UtilizationSample",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("raw", "Raw"), ("hour", "Hourly"), ("day", "Daily")], default="raw", max_length=4
+                    ),
+                ),
+                ("timestamp", models.DateTimeField(help_text="Sample time, or start of the hour/day")),
+                ("samples", models.IntegerField(default=1, help_text="Raw samples averaged into this row")),
+                ("power_draw", models.FloatField(help_text="Average power draw in watts")),
+                ("power_draw_max", models.FloatField(help_text="Highest sampled power draw in watts")),
+                ("hvac_load", models.FloatField(help_text="Average HVAC load in BTU/hr")),
+                ("ru_used", models.FloatField(help_text="Average rack units in use")),
+                ("ru_capacity", models.IntegerField()),
+                ("ports_used", models.FloatField(help_text="Average power ports in use")),
+                (
+                    "power_capacity",
+                    models.IntegerField(help_text="Power provider capacity in watts (rack: providers in the rack)"),
+                ),
+                ("ports_capacity", models.IntegerField()),
+                ("cooling_capacity", models.IntegerField(help_text="Cooling provider capacity in BTU/hr")),
+                (
+                    "rack",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="rack_id",
+                        help_text="Rack sampled (null = whole site)",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="utilization_samples",
+                        to="api.rack",
+                    ),
+                ),
+                (
+                    "site",
+                    models.ForeignKey(
+                        db_column="site_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="utilization_samples",
+                        to="api.site",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "utilization_samples",
+                "ordering": ["timestamp"],
+                "indexes": [
+                    models.Index(fields=["site", "rack", "resolution", "timestamp"], name="util_series_idx"),
+                    models.Index(fields=["resolution", "timestamp"], name="util_resolution_time_idx"),
+                ],
+            },
+        ),
+    ]
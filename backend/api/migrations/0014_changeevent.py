@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:55
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_utilizationsample"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("site_id", models.BigIntegerField(blank=True, help_text="Site of the object", null=True)),
+                ("model", models.CharField(help_text="Object type, e.g. rack or rack_device", max_length=32)),
+                ("object_id", models.BigIntegerField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("created", "Created"), ("updated", "Updated"), ("deleted", "Deleted")], max_length=8
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Field values after the change (before a delete)",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "db_table": "change_events",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(fields=["site_id", "id"], name="change_event_site_idx"),
+                    models.Index(fields=["created_at"], name="change_event_created_idx"),
+                ],
+            },
+        ),
+    ]
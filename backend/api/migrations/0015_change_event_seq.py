@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_changeevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeSequence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "change_sequence",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="changeevent",
+            name="change_event_site_idx",
+        ),
+        migrations.AddField(
+            model_name="changeevent",
+            name="seq",
+            field=models.BigIntegerField(
+                blank=True, help_text="Sequence number, in commit order", null=True, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="changeevent",
+            name="site_id",
+            field=models.BigIntegerField(blank=True, help_text="Site of the object (empty for the catalog)", null=True),
+        ),
+        migrations.AddIndex(
+            model_name="changeevent",
+            index=models.Index(fields=["site_id", "seq"], name="change_event_site_seq_idx"),
+        ),
+    ]
@@ -1,10 +1,18 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import uuid
 
 User = get_user_model()
 
+# Expose LOWER() as a "lower" transform on CharField so case-insensitive name lookups can be
+# written as name__lower=value.lower(), which matches the functional Lower("name") indexes below.
+# (name__iexact compiles to LIKE/UPPER() on SQLite and MySQL and cannot use an index.)
+models.CharField.register_lookup(Lower)
+
 
 class HardwareProvider(models.Model):
     """
@@ -38,6 +46,10 @@ class DeviceGroup(models.Model):
     class Meta:
         db_table = "device_groups"
         ordering = ["name"]
+        indexes = [
+            # Functional index for case-insensitive name lookups (name__lower)
+            models.Index(Lower("name"), name="device_group_name_lower_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -105,6 +117,10 @@ class Site(models.Model):
     class Meta:
         db_table = "sites"
         ordering = ["name"]
+        indexes = [
+            # Functional index for case-insensitive name lookups (name__lower)
+            models.Index(Lower("name"), name="site_name_lower_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -146,6 +162,22 @@ class Rack(models.Model):
     name = models.CharField(max_length=255)
     ru_height = models.IntegerField(default=42, validators=[MinValueValidator(1)])
     description = models.TextField(blank=True, null=True)
+    # Racks projected from a saved rack configuration (see api.projection) are owned by it
+    source_config = models.ForeignKey(
+        RackConfiguration,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="projected_racks",
+        db_column="source_config_id",
+        help_text="Rack configuration this rack is projected from (null = managed directly)",
+    )
+    source_key = models.CharField(
+        max_length=255, blank=True, null=True, help_text="Rack id within the source configuration"
+    )
+    source_hash = models.CharField(
+        max_length=40, blank=True, default="", help_text="Digest of the projected rack as of the last projection"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -158,6 +190,11 @@ class Rack(models.Model):
             models.Index(fields=["name"]),
             # Composite index for common (site_id, name) lookups
             models.Index(fields=["site", "name"], name="rack_site_name_idx"),
+            # Functional index for case-insensitive (site_id, name__lower) lookups
+            models.Index("site", Lower("name"), name="rack_site_name_lower_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["source_config", "source_key"], name="rack_source_unique"),
         ]
 
     def __str__(self):
@@ -193,6 +230,9 @@ class RackDevice(models.Model):
     instance_name = models.CharField(
         max_length=255, blank=True, null=True, help_text="Custom name for this device instance"
     )
+    source_key = models.CharField(
+        max_length=255, blank=True, null=True, help_text="Device instance id within the source configuration"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -333,6 +373,169 @@ class Provider(models.Model):
         super().save(*args, **kwargs)
 
 
+class Job(models.Model):
+    """
+    A background job, queued in the database and run by `manage.py run_jobs` (see api.jobs)
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+    kind = models.CharField(max_length=100, help_text="Registered job handler name")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    site = models.ForeignKey(
+        Site, on_delete=models.CASCADE, related_name="jobs", db_column="site_id", null=True, blank=True
+    )
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.JSONField(default=dict, blank=True, help_text="Latest progress reported by the handler")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1, validators=[MinValueValidator(1)])
+    cancel_requested = models.BooleanField(default=False)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not started before this time (retry backoff)")
+    worker = models.CharField(max_length=255, blank=True, default="", help_text="Worker running the job")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            # Workers poll for queued jobs that are due
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+            models.Index(fields=["kind", "status"], name="job_kind_status_idx"),
+            models.Index(fields=["site"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class UtilizationSample(models.Model):
+    """
+    Utilization of a site (rack null) or one rack at a point in time, recorded by `manage.py record_utilization`.
+
+    Raw samples are averaged into hourly and daily rows (see api.utilization); `samples` counts the raw
+    samples a row stands for.
+    """
+
+    RESOLUTION_RAW = "raw"
+    RESOLUTION_HOUR = "hour"
+    RESOLUTION_DAY = "day"
+    RESOLUTION_CHOICES = [
+        (RESOLUTION_RAW, "Raw"),
+        (RESOLUTION_HOUR, "Hourly"),
+        (RESOLUTION_DAY, "Daily"),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="utilization_samples", db_column="site_id")
+    rack = models.ForeignKey(
+        Rack,
+        on_delete=models.CASCADE,
+        related_name="utilization_samples",
+        db_column="rack_id",
+        null=True,
+        blank=True,
+        help_text="Rack sampled (null = whole site)",
+    )
+    resolution = models.CharField(max_length=4, choices=RESOLUTION_CHOICES, default=RESOLUTION_RAW)
+    timestamp = models.DateTimeField(help_text="Sample time, or start of the hour/day")
+    samples = models.IntegerField(default=1, help_text="Raw samples averaged into this row")
+    power_draw = models.FloatField(help_text="Average power draw in watts")
+    power_draw_max = models.FloatField(help_text="Highest sampled power draw in watts")
+    hvac_load = models.FloatField(help_text="Average HVAC load in BTU/hr")
+    ru_used = models.FloatField(help_text="Average rack units in use")
+    ru_capacity = models.IntegerField()
+    ports_used = models.FloatField(help_text="Average power ports in use")
+    power_capacity = models.IntegerField(help_text="Power provider capacity in watts (rack: providers in the rack)")
+    ports_capacity = models.IntegerField()
+    cooling_capacity = models.IntegerField(help_text="Cooling provider capacity in BTU/hr")
+
+    class Meta:
+        db_table = "utilization_samples"
+        ordering = ["timestamp"]
+        indexes = [
+            # Range queries read one series (site or rack, resolution) over time
+            models.Index(fields=["site", "rack", "resolution", "timestamp"], name="util_series_idx"),
+            # Retention deletes old rows of a resolution
+            models.Index(fields=["resolution", "timestamp"], name="util_resolution_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.site_id}/{self.rack_id or 'site'} {self.resolution} {self.timestamp}"
+
+
+class ChangeEvent(models.Model):
+    """
+    A create, update or delete of a tracked object, appended by api.change_events.
+
+    seq numbers events in the order their transactions committed; it is assigned shortly after the commit
+    (see api.change_events.sequence_events). Change feeds and sync clients resume from the last seq they
+    received.
+    """
+
+    ACTION_CREATED = "created"
+    ACTION_UPDATED = "updated"
+    ACTION_DELETED = "deleted"
+    ACTION_CHOICES = [
+        (ACTION_CREATED, "Created"),
+        (ACTION_UPDATED, "Updated"),
+        (ACTION_DELETED, "Deleted"),
+    ]
+
+    seq = models.BigIntegerField(null=True, blank=True, unique=True, help_text="Sequence number, in commit order")
+    # A plain id rather than a foreign key, so events outlive their site
+    site_id = models.BigIntegerField(null=True, blank=True, help_text="Site of the object (empty for the catalog)")
+    model = models.CharField(max_length=32, help_text="Object type, e.g. rack or rack_device")
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=8, choices=ACTION_CHOICES)
+    data = models.JSONField(encoder=DjangoJSONEncoder, help_text="Field values after the change (before a delete)")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "change_events"
+        ordering = ["id"]
+        indexes = [
+            # Change feeds read a site's events after the last seq a client received
+            models.Index(fields=["site_id", "seq"], name="change_event_site_seq_idx"),
+            models.Index(fields=["created_at"], name="change_event_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq or '-'} {self.model} {self.object_id} {self.action}"
+
+
+class ChangeSequence(models.Model):
+    """
+    The last assigned ChangeEvent.seq, in a single row.
+
+    Updating the row locks it until commit, so concurrent sequencers number events one at a time.
+    """
+
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "change_sequence"
+
+    def __str__(self):
+        return str(self.value)
+
+
 class Passkey(models.Model):
     """
     Stores WebAuthn/FIDO2 passkey credentials for passwordless authentication
@@ -367,6 +570,7 @@ class PasskeyChallenge(models.Model):
     Temporary storage for WebAuthn challenges during registration/authentication
     """
 
+    handle = models.CharField(max_length=64, unique=True, help_text="Opaque id returned to the client")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="passkey_challenges", null=True, blank=True)
     challenge = models.CharField(max_length=255, help_text="Base64-encoded challenge")
     challenge_type = models.CharField(
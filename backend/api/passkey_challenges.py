@@ -0,0 +1,152 @@
+"""
+Storage for short-lived WebAuthn challenges
+
+Challenges are issued by the begin_* passkey views and consumed by the
+complete_* views a few seconds later. Each challenge gets a random opaque
+handle that is returned to the client with the WebAuthn options and sent back
+on completion, so the challenge is found with a single keyed lookup and
+consumed exactly once. Two stores are available, selected by
+settings.PASSKEY_CHALLENGE_STORE:
+
+- "db" (default): rows in the passkey_challenges table. Expired rows are reaped
+  opportunistically in small batches while issuing new challenges (at most once
+  per PASSKEY_CHALLENGE_PURGE_INTERVAL seconds) and in bulk by the
+  purge_passkey_challenges management command.
+- "cache": entries in the default Django cache that expire on their own and
+  never touch the database. Requires a cache shared by all workers (Redis) in
+  multi-process deployments.
+"""
+
+import secrets
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import PasskeyChallenge
+
+PURGE_THROTTLE_CACHE_KEY = "passkey_challenge_purge_throttle"
+
+# Random bytes in a challenge handle (encoded as URL-safe base64)
+HANDLE_BYTES = 32
+
+
+@dataclass
+class StoredChallenge:
+    """A challenge held by a store; `handle` is the opaque id handed to the client"""
+
+    handle: str
+    challenge: str
+    user_id: Optional[int] = None
+
+
+def new_handle() -> str:
+    """Generate an unguessable challenge handle"""
+    return secrets.token_urlsafe(HANDLE_BYTES)
+
+
+def purge_expired_challenges(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> int:
+    """
+    Delete expired challenge rows in batches of `batch_size`.
+
+    Stops after `max_batches` batches (or when no expired rows remain) and
+    returns the number of rows deleted. Batching keeps each DELETE short so it
+    does not hold locks on the table during login traffic.
+    """
+    batch_size = batch_size or settings.PASSKEY_CHALLENGE_PURGE_BATCH_SIZE
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        expired_ids = list(
+            PasskeyChallenge.objects.filter(expires_at__lte=timezone.now())
+            .order_by()
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not expired_ids:
+            break
+        deleted += PasskeyChallenge.objects.filter(pk__in=expired_ids).delete()[0]
+        batches += 1
+
+    return deleted
+
+
+def maybe_purge_expired_challenges() -> int:
+    """Purge one batch of expired challenges unless another request did so recently"""
+    if not cache.add(PURGE_THROTTLE_CACHE_KEY, True, timeout=settings.PASSKEY_CHALLENGE_PURGE_INTERVAL):
+        return 0
+    return purge_expired_challenges(max_batches=1)
+
+
+class DatabaseChallengeStore:
+    """Challenge store backed by the passkey_challenges table"""
+
+    def issue(self, user, challenge_type: str, challenge: str) -> StoredChallenge:
+        maybe_purge_expired_challenges()
+
+        # Only the latest challenge per user and type is ever used, so older ones can go right away
+        if user is not None:
+            PasskeyChallenge.objects.filter(user=user, challenge_type=challenge_type).delete()
+
+        challenge_obj = PasskeyChallenge.objects.create(
+            handle=new_handle(),
+            user=user,
+            challenge=challenge,
+            challenge_type=challenge_type,
+            expires_at=timezone.now() + timedelta(seconds=settings.PASSKEY_CHALLENGE_TTL_SECONDS),
+        )
+        return StoredChallenge(handle=challenge_obj.handle, challenge=challenge, user_id=challenge_obj.user_id)
+
+    def take(self, handle: str, challenge_type: str) -> Optional[StoredChallenge]:
+        """
+        Look up an unexpired challenge by handle and consume it.
+
+        The row is fetched through the unique handle index and then deleted by
+        primary key; only the request whose DELETE removes the row gets the
+        challenge back, so a handle can never be used twice.
+        """
+        challenge_obj = (
+            PasskeyChallenge.objects.filter(handle=handle, challenge_type=challenge_type, expires_at__gt=timezone.now())
+            .only("pk", "challenge", "user_id")
+            .first()
+        )
+        if challenge_obj is None:
+            return None
+        if PasskeyChallenge.objects.filter(pk=challenge_obj.pk).delete()[0] == 0:
+            return None
+        return StoredChallenge(handle=handle, challenge=challenge_obj.challenge, user_id=challenge_obj.user_id)
+
+
+class CacheChallengeStore:
+    """Challenge store backed by the Django cache; entries expire through the cache TTL"""
+
+    def _key(self, challenge_type: str, handle: str) -> str:
+        return f"passkey_challenge:{challenge_type}:{handle}"
+
+    def issue(self, user, challenge_type: str, challenge: str) -> StoredChallenge:
+        stored = StoredChallenge(handle=new_handle(), challenge=challenge, user_id=user.pk if user else None)
+        cache.set(
+            self._key(challenge_type, stored.handle),
+            (stored.challenge, stored.user_id),
+            timeout=settings.PASSKEY_CHALLENGE_TTL_SECONDS,
+        )
+        return stored
+
+    def take(self, handle: str, challenge_type: str) -> Optional[StoredChallenge]:
+        """Look up a challenge by handle and consume it; cache.delete() decides the winner of concurrent takes"""
+        key = self._key(challenge_type, handle)
+        value = cache.get(key)
+        if value is None or not cache.delete(key):
+            return None
+        challenge, user_id = value
+        return StoredChallenge(handle=handle, challenge=challenge, user_id=user_id)
+
+
+def get_challenge_store():
+    """Return the challenge store selected by settings.PASSKEY_CHALLENGE_STORE"""
+    if settings.PASSKEY_CHALLENGE_STORE == "cache":
+        return CacheChallengeStore()
+    return DatabaseChallengeStore()
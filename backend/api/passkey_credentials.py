@@ -0,0 +1,152 @@
+"""
+Passkey credential lookups and login bookkeeping for the passkey views
+
+Passkey logins need the credential's public key and signature counter, and the
+begin_* views need the ids of all of a user's credentials. Both are read from
+the database on every request, so a deleted passkey stops working and a new
+signature counter is seen by every worker straight away; a per-process cache
+would keep them stale on the other workers. Only the decoded public key is
+memoized, keyed on its stored (base64) text, so a changed key is never served.
+
+`last_used_at` is not written on the login path. Logins record the timestamp in
+an in-process buffer that a background timer writes to the database in batches
+every PASSKEY_LAST_USED_FLUSH_INTERVAL seconds (and at process exit), so a burst
+of logins turns into a handful of bulk updates instead of one write each.
+Signature counters are still written immediately, but only when they change;
+most platform authenticators always report 0.
+"""
+
+import atexit
+import base64
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Passkey
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedCredential:
+    """The parts of a Passkey needed to verify an authentication response"""
+
+    passkey_id: int
+    user_id: int
+    public_key: bytes
+    sign_count: int
+
+
+@lru_cache(maxsize=1024)
+def _decode_public_key(public_key: str) -> bytes:
+    return base64.b64decode(public_key)
+
+
+def get_credential(credential_id: str) -> Optional[CachedCredential]:
+    """Return the credential with this (base64) id, or None if no passkey has it"""
+    row = (
+        Passkey.objects.filter(credential_id=credential_id).values("id", "user_id", "public_key", "sign_count").first()
+    )
+    if row is None:
+        return None
+
+    return CachedCredential(
+        passkey_id=row["id"],
+        user_id=row["user_id"],
+        public_key=_decode_public_key(row["public_key"]),
+        sign_count=row["sign_count"],
+    )
+
+
+def get_user_credential_ids(user_id: int) -> list[bytes]:
+    """Return the decoded credential ids of every passkey the user has registered"""
+    return [
+        base64.b64decode(credential_id)
+        for credential_id in Passkey.objects.filter(user_id=user_id).values_list("credential_id", flat=True)
+    ]
+
+
+def record_authentication(credential_id: str, credential: CachedCredential, new_sign_count: int, when: datetime):
+    """
+    Record a successful login with this credential.
+
+    A changed signature counter is written straight away (it protects against
+    cloned authenticators) with a single-column UPDATE; the last-used timestamp
+    goes to the write-behind buffer.
+    """
+    if new_sign_count != credential.sign_count:
+        Passkey.objects.filter(pk=credential.passkey_id).update(sign_count=new_sign_count)
+        credential.sign_count = new_sign_count
+
+    last_used_buffer.record(credential.passkey_id, when)
+
+
+class LastUsedBuffer:
+    """Collects passkey last-used timestamps and writes them in batches"""
+
+    def __init__(self):
+        self._pending: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, passkey_id: int, when: datetime):
+        interval = settings.PASSKEY_LAST_USED_FLUSH_INTERVAL
+        with self._lock:
+            self._pending[passkey_id] = when
+            if interval > 0 and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+        # An interval of 0 disables buffering
+        if interval <= 0:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered timestamps and return the number of passkeys updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return 0
+
+        # Passkeys deleted since the login are skipped, bulk_update() only touches existing rows
+        passkeys = [Passkey(pk=passkey_id, last_used_at=when) for passkey_id, when in pending.items()]
+        return Passkey.objects.bulk_update(passkeys, ["last_used_at"], batch_size=settings.PASSKEY_LAST_USED_BATCH_SIZE)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to write buffered passkey last-used timestamps")
+        finally:
+            # The timer thread's database connection is not reused, so don't leave it open
+            connection.close()
+
+
+last_used_buffer = LastUsedBuffer()
+
+
+def flush_last_used() -> int:
+    """Write buffered passkey last-used timestamps to the database now"""
+    return last_used_buffer.flush()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        last_used_buffer.flush()
+    except Exception:
+        logger.exception("Failed to write buffered passkey last-used timestamps at exit")
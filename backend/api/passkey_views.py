@@ -4,10 +4,8 @@ WebAuthn/Passkey Authentication Views
 
 import os
 import base64
-from datetime import timedelta
 from django.contrib.auth import get_user_model, login, logout
 from django.utils import timezone
-from django.db import models
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -32,7 +30,9 @@ from webauthn.helpers.structs import (
 )
 from webauthn.helpers.cose import COSEAlgorithmIdentifier
 
-from .models import Passkey, PasskeyChallenge
+from .models import Passkey
+from .passkey_challenges import get_challenge_store
+from .passkey_credentials import flush_last_used, get_credential, get_user_credential_ids, record_authentication
 
 User = get_user_model()
 
@@ -82,7 +82,7 @@ def auth_config(request):
     responses={
         200: {
             "description": "Registration options for WebAuthn ceremony",
-            "content": {"application/json": {"example": {"options": "...", "user_id": 1}}},
+            "content": {"application/json": {"example": {"options": "...", "user_id": 1, "challenge_id": "..."}}},
         }
     },
 )
@@ -102,14 +102,9 @@ def begin_registration(request):
     # Check if user exists, create if not
     user, created = User.objects.get_or_create(username=username, defaults={"email": email})
 
-    if not created and Passkey.objects.filter(user=user).exists():
-        # User already has passkeys, require authentication first
-        pass  # Allow adding additional passkeys
-
-    # Get existing passkeys for this user (to exclude them)
-    existing_passkeys = Passkey.objects.filter(user=user)
+    # Get existing passkeys for this user (to exclude them); users may add additional passkeys
     exclude_credentials = [
-        PublicKeyCredentialDescriptor(id=base64.b64decode(pk.credential_id)) for pk in existing_passkeys
+        PublicKeyCredentialDescriptor(id=credential_id) for credential_id in get_user_credential_ids(user.id)
     ]
 
     # Generate registration options
@@ -133,12 +128,7 @@ def begin_registration(request):
 
     # Store challenge
     challenge_b64 = base64.b64encode(options.challenge).decode("utf-8")
-    PasskeyChallenge.objects.create(
-        user=user,
-        challenge=challenge_b64,
-        challenge_type="registration",
-        expires_at=timezone.now() + timedelta(minutes=5),
-    )
+    stored_challenge = get_challenge_store().issue(user, "registration", challenge_b64)
 
     # Convert options to JSON format for frontend
     options_json = options_to_json(options)
@@ -147,6 +137,7 @@ def begin_registration(request):
         {
             "options": options_json,
             "user_id": user.id,
+            "challenge_id": stored_challenge.handle,
         }
     )
 
@@ -158,7 +149,9 @@ def begin_registration(request):
         "Automatically logs the user in."
     ),
     tags=["Authentication"],
-    request={"application/json": {"example": {"user_id": 1, "credential": {}, "name": "My Laptop"}}},
+    request={
+        "application/json": {"example": {"user_id": 1, "challenge_id": "...", "credential": {}, "name": "My Laptop"}}
+    },
     responses={
         200: {
             "description": "Registration successful",
@@ -183,10 +176,11 @@ def complete_registration(request):
     Verifies the registration response and stores the credential
     """
     user_id = request.data.get("user_id")
+    challenge_id = request.data.get("challenge_id")
     credential = request.data.get("credential")
     passkey_name = request.data.get("name", "My Passkey")
 
-    if not user_id or not credential:
+    if not user_id or not challenge_id or not credential:
         return Response({"error": "Missing required fields"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
@@ -194,12 +188,9 @@ def complete_registration(request):
     except User.DoesNotExist:
         return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Get the challenge
-    try:
-        challenge_obj = PasskeyChallenge.objects.filter(
-            user=user, challenge_type="registration", expires_at__gt=timezone.now()
-        ).latest("created_at")
-    except PasskeyChallenge.DoesNotExist:
+    # Get and consume the challenge
+    challenge_obj = get_challenge_store().take(challenge_id, "registration")
+    if challenge_obj is None or challenge_obj.user_id != user.id:
         return Response({"error": "Challenge not found or expired"}, status=status.HTTP_400_BAD_REQUEST)
 
     challenge = base64.b64decode(challenge_obj.challenge)
@@ -226,9 +217,6 @@ def complete_registration(request):
             name=passkey_name,
         )
 
-        # Clean up used challenge
-        challenge_obj.delete()
-
         # Log the user in
         login(request, user)
 
@@ -260,7 +248,7 @@ def complete_registration(request):
     responses={
         200: {
             "description": "Authentication options for WebAuthn ceremony",
-            "content": {"application/json": {"example": {"options": "..."}}},
+            "content": {"application/json": {"example": {"options": "...", "challenge_id": "..."}}},
         }
     },
 )
@@ -282,14 +270,12 @@ def begin_authentication(request):
     if username:
         try:
             user = User.objects.get(username=username)
-            passkeys = Passkey.objects.filter(user=user)
+            credential_ids = get_user_credential_ids(user.id)
 
-            if not passkeys.exists():
+            if not credential_ids:
                 return Response({"error": "No passkeys found for this user"}, status=status.HTTP_404_NOT_FOUND)
 
-            allow_credentials = [
-                PublicKeyCredentialDescriptor(id=base64.b64decode(pk.credential_id)) for pk in passkeys
-            ]
+            allow_credentials = [PublicKeyCredentialDescriptor(id=credential_id) for credential_id in credential_ids]
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -302,12 +288,7 @@ def begin_authentication(request):
 
     # Store challenge
     challenge_b64 = base64.b64encode(options.challenge).decode("utf-8")
-    PasskeyChallenge.objects.create(
-        user=user,
-        challenge=challenge_b64,
-        challenge_type="authentication",
-        expires_at=timezone.now() + timedelta(minutes=5),
-    )
+    stored_challenge = get_challenge_store().issue(user, "authentication", challenge_b64)
 
     # Convert options to JSON format for frontend
     options_json = options_to_json(options)
@@ -315,6 +296,7 @@ def begin_authentication(request):
     return Response(
         {
             "options": options_json,
+            "challenge_id": stored_challenge.handle,
         }
     )
 
@@ -326,7 +308,7 @@ def begin_authentication(request):
         "Logs the user in on success."
     ),
     tags=["Authentication"],
-    request={"application/json": {"example": {"credential": {}}}},
+    request={"application/json": {"example": {"challenge_id": "...", "credential": {}}}},
     responses={
         200: {
             "description": "Authentication successful",
@@ -350,9 +332,12 @@ def complete_authentication(request):
     Verifies the authentication response and logs the user in
     """
     credential = request.data.get("credential")
+    challenge_id = request.data.get("challenge_id")
 
     if not credential:
         return Response({"error": "Missing credential"}, status=status.HTTP_400_BAD_REQUEST)
+    if not challenge_id:
+        return Response({"error": "Missing challenge_id"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Extract credential ID to find the passkey
     try:
@@ -361,26 +346,20 @@ def complete_authentication(request):
             raise ValueError("Credential ID not found")
 
         # Find the passkey
-        passkey = Passkey.objects.get(credential_id=credential_id)
-        user = passkey.user
+        passkey = get_credential(credential_id)
+        if passkey is None:
+            return Response({"error": "Passkey not found"}, status=status.HTTP_404_NOT_FOUND)
+        user = User.objects.get(pk=passkey.user_id)
 
-    except Passkey.DoesNotExist:
-        return Response({"error": "Passkey not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({"error": f"Invalid credential: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Get the challenge
-    try:
-        challenge_obj = (
-            PasskeyChallenge.objects.filter(challenge_type="authentication", expires_at__gt=timezone.now())
-            .filter(models.Q(user=user) | models.Q(user__isnull=True))
-            .latest("created_at")
-        )
-    except PasskeyChallenge.DoesNotExist:
+    # Get and consume the challenge; it must have been issued for this user or without a username
+    challenge_obj = get_challenge_store().take(challenge_id, "authentication")
+    if challenge_obj is None or challenge_obj.user_id not in (None, user.id):
         return Response({"error": "Challenge not found or expired"}, status=status.HTTP_400_BAD_REQUEST)
 
     challenge = base64.b64decode(challenge_obj.challenge)
-    public_key = base64.b64decode(passkey.public_key)
 
     try:
         # Verify the authentication response
@@ -389,17 +368,12 @@ def complete_authentication(request):
             expected_challenge=challenge,
             expected_origin=ORIGIN,
             expected_rp_id=RP_ID,
-            credential_public_key=public_key,
+            credential_public_key=passkey.public_key,
             credential_current_sign_count=passkey.sign_count,
         )
 
-        # Update sign count
-        passkey.sign_count = verification.new_sign_count
-        passkey.last_used_at = timezone.now()
-        passkey.save()
-
-        # Clean up used challenge
-        challenge_obj.delete()
+        # Update sign count and last used time
+        record_authentication(credential_id, passkey, verification.new_sign_count, timezone.now())
 
         # Log the user in
         login(request, user)
@@ -451,6 +425,8 @@ def list_passkeys(request):
     """
     List all passkeys for the current user
     """
+    # Write buffered last-used times first so the list is current
+    flush_last_used()
     passkeys = Passkey.objects.filter(user=request.user)
 
     return Response(
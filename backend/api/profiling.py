@@ -0,0 +1,185 @@
+"""
+Opt-in request profiling
+
+ProfilingMiddleware records, for every request, the wall time, the number and
+total time of SQL queries, the time spent in DRF serializers and the response
+size, and aggregates them per resolved URL name. Each response gets a
+Server-Timing header with the same breakdown so it shows up in the browser's
+network panel. The aggregates (count, mean and percentiles over the most recent
+PROFILING_SAMPLE_SIZE requests per URL name) are kept in process memory and
+served to admins by the profiling endpoint.
+
+Enable with PROFILING_ENABLED=true; when disabled the middleware removes itself
+from the middleware chain at startup and costs nothing.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+UNRESOLVED_URL_NAME = "<unresolved>"
+
+# Percentiles reported for every measurement
+PERCENTILES = (50, 90, 95, 99)
+
+# Measurements kept per request, in the order they are reported
+MEASUREMENTS = ("wall_ms", "sql_queries", "sql_ms", "serializer_ms", "response_bytes")
+
+
+@dataclass
+class RequestProfile:
+    """Measurements collected while a single request is being handled"""
+
+    started: float = field(default_factory=time.perf_counter)
+    sql_queries: int = 0
+    sql_time: float = 0.0
+    serializer_time: float = 0.0
+    serializer_depth: int = 0
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+_samples: dict[str, dict[str, deque]] = {}
+_lock = threading.Lock()
+_serializers_patched = False
+
+
+def _record_query(execute, sql, params, many, context):
+    """Database execute wrapper that adds query time to the current request profile"""
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_queries += 1
+        profile.sql_time += time.perf_counter() - started
+
+
+def _timed_to_representation(to_representation):
+    """Wrap a serializer's to_representation so only the outermost call is timed"""
+
+    def wrapper(self, instance):
+        profile = _current_profile.get()
+        if profile is None:
+            return to_representation(self, instance)
+
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            profile.serializer_depth -= 1
+            if profile.serializer_depth == 0:
+                profile.serializer_time += time.perf_counter() - started
+
+    return wrapper
+
+
+def _patch_serializers():
+    global _serializers_patched
+
+    if _serializers_patched:
+        return
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        serializer_class.to_representation = _timed_to_representation(serializer_class.to_representation)
+    _serializers_patched = True
+
+
+def _record(url_name: str, values: dict):
+    with _lock:
+        samples = _samples.get(url_name)
+        if samples is None:
+            samples = {name: deque(maxlen=settings.PROFILING_SAMPLE_SIZE) for name in MEASUREMENTS}
+            _samples[url_name] = samples
+        for name in MEASUREMENTS:
+            samples[name].append(values[name])
+
+
+def _summarize(values) -> dict:
+    ordered = sorted(values)
+    count = len(ordered)
+    summary = {"mean": round(sum(ordered) / count, 3), "max": round(ordered[-1], 3)}
+    for percentile in PERCENTILES:
+        # Nearest-rank percentile
+        rank = max(0, -(-percentile * count // 100) - 1)
+        summary[f"p{percentile}"] = round(ordered[rank], 3)
+    return summary
+
+
+def snapshot() -> dict[str, dict]:
+    """Return per-URL-name request counts and percentile summaries of every measurement"""
+    with _lock:
+        copied = {
+            url_name: {name: list(values) for name, values in samples.items()} for url_name, samples in _samples.items()
+        }
+
+    result = {}
+    for url_name, samples in sorted(copied.items()):
+        result[url_name] = {"count": len(samples["wall_ms"])}
+        for name in MEASUREMENTS:
+            result[url_name][name] = _summarize(samples[name])
+    return result
+
+
+def reset():
+    """Discard all collected samples"""
+    with _lock:
+        _samples.clear()
+
+
+def _server_timing(values: dict) -> str:
+    return ", ".join(
+        [
+            f"total;dur={values['wall_ms']:.1f}",
+            f'db;dur={values["sql_ms"]:.1f};desc="{values["sql_queries"]} queries"',
+            f"serialize;dur={values['serializer_ms']:.1f}",
+        ]
+    )
+
+
+class ProfilingMiddleware:
+    """Records per-request timings and emits Server-Timing headers when PROFILING_ENABLED is set"""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        _patch_serializers()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match and match.view_name else UNRESOLVED_URL_NAME
+        values = {
+            "wall_ms": (time.perf_counter() - profile.started) * 1000,
+            "sql_queries": profile.sql_queries,
+            "sql_ms": profile.sql_time * 1000,
+            "serializer_ms": profile.serializer_time * 1000,
+            # Streaming responses are measured up to the first byte and their size is unknown
+            "response_bytes": 0 if response.streaming else len(response.content),
+        }
+        _record(url_name, values)
+
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = _server_timing(values)
+        return response
@@ -0,0 +1,65 @@
+"""
+Request profiling endpoint
+"""
+
+from django.conf import settings
+from drf_spectacular.utils import extend_schema
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import profiling
+
+
+@extend_schema(
+    summary="Request profiling statistics",
+    description=(
+        "Per URL name request count and mean, max and p50/p90/p95/p99 of wall time, SQL query count, "
+        "SQL time, serializer time and response size, collected by the profiling middleware in this process. "
+        "Requires PROFILING_ENABLED=true and an admin (staff) user. DELETE discards the collected samples."
+    ),
+    tags=["Profiling"],
+    responses={
+        200: {
+            "description": "Profiling statistics",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "enabled": True,
+                        "sample_size": 1000,
+                        "endpoints": {
+                            "site-resource-usage": {
+                                "count": 42,
+                                "wall_ms": {
+                                    "mean": 18.2,
+                                    "max": 61.0,
+                                    "p50": 15.1,
+                                    "p90": 30.4,
+                                    "p95": 41.8,
+                                    "p99": 61.0,
+                                },
+                            }
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def profiling_stats(request):
+    """
+    Get or reset aggregated request profiling statistics
+    """
+    if request.method == "DELETE":
+        profiling.reset()
+        return Response({"success": True, "message": "Profiling statistics reset"})
+
+    return Response(
+        {
+            "enabled": settings.PROFILING_ENABLED,
+            "sample_size": settings.PROFILING_SAMPLE_SIZE,
+            "endpoints": profiling.snapshot(),
+        }
+    )
@@ -0,0 +1,362 @@
+"""
+Projection of saved rack configurations into the relational rack tables
+
+The editor autosaves whole layouts as RackConfiguration.config_data blobs,
+while capacity reports, the MCP tools and the REST rack endpoints read the
+Rack and RackDevice tables. project_configuration() keeps the two in step:
+every rack in a configuration's blob becomes a Rack in the configuration's
+site owned by it (source_config / source_key), and every placed device a
+RackDevice keyed by its instanceId (source_key).
+
+Projection is incremental. Each projected rack stores a digest of the blob
+fields it is built from (name, height and placements), so a save reads the
+stored digests with one query and only writes racks that were added, changed
+or removed. Within a changed rack, placements are matched by instanceId and
+only new, moved, re-typed, renamed or removed placements are written. Saves
+that only change editor state (metadata, colours, unracked devices) write
+nothing.
+
+Only device types that are already in the catalog are projected. Placements
+of other types (custom devices defined in the browser) are skipped and
+counted; the shared catalog is not extended from autosaved blobs. A blob rack whose name is taken by a rack the
+configuration does not own is projected as "<configuration> / <rack>".
+"""
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .change_events import record_rows
+from .config_import import positive_int
+from .models import ChangeEvent, Device, Provider, Rack, RackConfiguration, RackDevice
+
+logger = logging.getLogger(__name__)
+
+DEVICE_LOOKUP_BATCH_SIZE = 500
+BULK_BATCH_SIZE = 500
+
+
+@dataclass
+class _Placement:
+    key: str
+    device_ref: str
+    position: int
+    instance_name: Optional[str]
+
+
+@dataclass
+class _RackState:
+    key: str
+    name: str
+    ru_height: int
+    placements: dict[str, _Placement] = field(default_factory=dict)
+    digest: str = ""
+
+
+@dataclass
+class ProjectionStats:
+    """Rows written by one projection"""
+
+    racks_created: int = 0
+    racks_updated: int = 0
+    racks_deleted: int = 0
+    racks_unchanged: int = 0
+    placements_created: int = 0
+    placements_updated: int = 0
+    placements_deleted: int = 0
+    placements_skipped: int = 0
+    unknown_devices: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _rack_states(config_data) -> dict[str, _RackState]:
+    """The racks of a configuration blob, keyed by rack id, with their placements and digests"""
+    if not isinstance(config_data, dict):
+        return {}
+    settings = config_data.get("settings") if isinstance(config_data.get("settings"), dict) else {}
+    default_height = positive_int(settings.get("ruPerRack")) or 42
+
+    racks = {}
+    for item in config_data.get("racks") or []:
+        name = item.get("name") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            continue
+        key = str(item.get("id") or name)[:255]
+        if key in racks:
+            continue
+        state = _RackState(key, name.strip()[:255], positive_int(item.get("ruSize")) or default_height)
+
+        used = set()
+        for device in item.get("devices") or []:
+            if not isinstance(device, dict):
+                continue
+            reference = device.get("deviceId") or device.get("id")
+            position = positive_int(device.get("position"))
+            if not isinstance(reference, str) or position is None or position in used:
+                continue
+            placement_key = str(device.get("instanceId") or f"{reference}@{position}")[:255]
+            if placement_key in state.placements:
+                continue
+            used.add(position)
+            custom_name = device.get("customName")
+            state.placements[placement_key] = _Placement(
+                placement_key,
+                reference,
+                position,
+                custom_name[:255] if isinstance(custom_name, str) and custom_name != device.get("name") else None,
+            )
+
+        placements = sorted((p.key, p.device_ref, p.position, p.instance_name or "") for p in state.placements.values())
+        state.digest = hashlib.sha1(
+            json.dumps([state.name, state.ru_height, placements]).encode(), usedforsecurity=False
+        ).hexdigest()
+        racks[key] = state
+    return racks
+
+
+def _delete_racks(rack_ids: list[int]):
+    # Providers installed in a removed rack stay in the site, unracked
+    Provider.objects.filter(rack_id__in=rack_ids).update(rack=None, position=None, updated_at=timezone.now())
+    Rack.objects.filter(id__in=rack_ids).delete()
+
+
+def _resolve_devices(racks, stats: ProjectionStats) -> dict[str, int]:
+    """Catalog ids of the device types placed in `racks`; types missing from the catalog are counted"""
+    references = sorted({p.device_ref for rack in racks for p in rack.placements.values()})
+    device_ids = {}
+    for start in range(0, len(references), DEVICE_LOOKUP_BATCH_SIZE):
+        batch = references[start : start + DEVICE_LOOKUP_BATCH_SIZE]
+        device_ids.update(Device.objects.filter(device_id__in=batch).values_list("device_id", "id"))
+    stats.unknown_devices += len(references) - len(device_ids)
+    return device_ids
+
+
+def _rack_names(config, changed: dict[str, _RackState], current: dict[str, Rack]) -> dict[str, Optional[str]]:
+    """
+    Names for the changed racks: the blob name, or "<configuration> / <name>"
+    if another rack in the site already uses it (None if that is taken too)
+    """
+    candidates = {state.name for state in changed.values()}
+    candidates |= {f"{config.name} / {state.name}"[:255] for state in changed.values()}
+    taken = set(
+        Rack.objects.filter(site_id=config.site_id, name__lower__in=[name.lower() for name in candidates])
+        .exclude(source_config=config)
+        .annotate(lookup_name=Lower("name"))
+        .values_list("lookup_name", flat=True)
+    )
+    # Names kept by this configuration's racks that are not being rewritten
+    taken |= {rack.name.lower() for key, rack in current.items() if key not in changed}
+
+    names = {}
+    for key, state in changed.items():
+        for name in (state.name, f"{config.name} / {state.name}"[:255]):
+            if name.lower() not in taken:
+                taken.add(name.lower())
+                names[key] = name
+                break
+        else:
+            names[key] = None
+    return names
+
+
+def _sync_placements(
+    site_id: int,
+    changed: dict[str, _RackState],
+    rack_ids: dict[str, int],
+    existing_rack_ids: list[int],
+    device_ids: dict[str, int],
+    stats: ProjectionStats,
+):
+    rows = defaultdict(dict)
+    stale = []
+    for row in RackDevice.objects.filter(rack_id__in=existing_rack_ids).only(
+        "id", "rack_id", "device_id", "position", "instance_name", "source_key"
+    ):
+        if row.source_key and row.source_key not in rows[row.rack_id]:
+            rows[row.rack_id][row.source_key] = row
+        else:
+            # Added outside the projection; the blob is the source of truth for owned racks
+            stale.append(row.id)
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for key, state in changed.items():
+        rack_id = rack_ids.get(key)
+        if rack_id is None:
+            continue
+        current = rows.pop(rack_id, {})
+        for placement_key, placement in state.placements.items():
+            device_id = device_ids.get(placement.device_ref)
+            if device_id is None:
+                stats.placements_skipped += 1
+                continue
+            row = current.pop(placement_key, None)
+            if row is not None and row.position == placement.position:
+                if row.device_id != device_id or row.instance_name != placement.instance_name:
+                    row.device_id, row.instance_name, row.updated_at = device_id, placement.instance_name, now
+                    to_update.append(row)
+                continue
+            if row is not None:
+                # Moved: delete and re-create, so positions swapped within the rack never collide
+                stale.append(row.id)
+            to_create.append(
+                RackDevice(
+                    rack_id=rack_id,
+                    device_id=device_id,
+                    position=placement.position,
+                    instance_name=placement.instance_name,
+                    source_key=placement_key,
+                )
+            )
+        stale.extend(row.id for row in current.values())
+    stale.extend(row.id for remaining in rows.values() for row in remaining.values())
+
+    if stale:
+        RackDevice.objects.filter(id__in=stale).delete()
+    if to_update:
+        RackDevice.objects.bulk_update(
+            to_update, ["device_id", "instance_name", "updated_at"], batch_size=BULK_BATCH_SIZE
+        )
+    if to_create:
+        RackDevice.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    # bulk_update and bulk_create send no post_save, so the change events are written here
+    if to_update:
+        record_rows(
+            RackDevice.objects.filter(id__in=[row.id for row in to_update]), ChangeEvent.ACTION_UPDATED, site_id
+        )
+    if to_create:
+        record_rows(
+            RackDevice.objects.filter(rack_id__in={row.rack_id for row in to_create}, created_at__gte=now),
+            ChangeEvent.ACTION_CREATED,
+            site_id,
+        )
+    stats.placements_deleted += len(stale)
+    stats.placements_updated += len(to_update)
+    stats.placements_created += len(to_create)
+
+
+def project_configuration(config: RackConfiguration, full: bool = False) -> ProjectionStats:
+    """
+    Bring the racks owned by `config` in line with its config_data.
+
+    Only racks whose digest changed are written, unless `full` is set, which
+    rewrites every rack (repairing rows edited outside the projection).
+    """
+    stats = ProjectionStats()
+    desired = _rack_states(config.config_data)
+
+    with transaction.atomic():
+        current = {
+            rack.source_key: rack
+            for rack in Rack.objects.filter(source_config=config).only(
+                "id", "site_id", "name", "ru_height", "source_key", "source_hash"
+            )
+        }
+        if any(rack.site_id != config.site_id for rack in current.values()):
+            # The configuration moved to another site: project it there from scratch
+            _delete_racks([rack.id for rack in current.values()])
+            stats.racks_deleted += len(current)
+            current = {}
+
+        removed = [rack.id for key, rack in current.items() if key not in desired]
+        if removed:
+            _delete_racks(removed)
+            stats.racks_deleted += len(removed)
+            current = {key: rack for key, rack in current.items() if key in desired}
+
+        changed = {
+            key: state
+            for key, state in desired.items()
+            if full or key not in current or current[key].source_hash != state.digest
+        }
+        stats.racks_unchanged = len(desired) - len(changed)
+        if not changed:
+            return stats
+
+        device_ids = _resolve_devices(changed.values(), stats)
+        names = _rack_names(config, changed, current)
+        now = timezone.now()
+
+        updated, old_names = [], {}
+        for key, state in changed.items():
+            rack = current.get(key)
+            if rack is None:
+                continue
+            if names[key] is None:
+                # Renamed onto a name that is now taken: drop the rack rather than keep a stale one
+                _delete_racks([rack.id])
+                stats.racks_deleted += 1
+                del current[key]
+                continue
+            old_names[rack.id] = rack.name.lower()
+            rack.name, rack.ru_height, rack.source_hash, rack.updated_at = (
+                names[key],
+                state.ru_height,
+                state.digest,
+                now,
+            )
+            updated.append(rack)
+        if updated:
+            renamed = [rack for rack in updated if rack.name.lower() != old_names[rack.id]]
+            if {rack.name.lower() for rack in renamed} & {old_names[rack.id] for rack in renamed}:
+                # Names swapped between racks: park them on unique temporary names first
+                parked = [Rack(id=rack.id, name=f"__projecting__{rack.id}") for rack in renamed]
+                Rack.objects.bulk_update(parked, ["name"], batch_size=BULK_BATCH_SIZE)
+            Rack.objects.bulk_update(
+                updated, ["name", "ru_height", "source_hash", "updated_at"], batch_size=BULK_BATCH_SIZE
+            )
+            stats.racks_updated += len(updated)
+            record_rows(
+                Rack.objects.filter(id__in=[rack.id for rack in updated]), ChangeEvent.ACTION_UPDATED, config.site_id
+            )
+
+        new = {key: state for key, state in changed.items() if key not in current and names[key] is not None}
+        if new:
+            Rack.objects.bulk_create(
+                [
+                    Rack(
+                        site_id=config.site_id,
+                        name=names[key],
+                        ru_height=state.ru_height,
+                        source_config=config,
+                        source_key=key,
+                        source_hash=state.digest,
+                    )
+                    for key, state in new.items()
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            stats.racks_created += len(new)
+
+        # MySQL does not return primary keys from bulk inserts, so read them back
+        rack_ids = {key: rack.id for key, rack in current.items()}
+        if new:
+            created = Rack.objects.filter(source_config=config, source_key__in=list(new))
+            rack_ids.update(created.values_list("source_key", "id"))
+            record_rows(created, ChangeEvent.ACTION_CREATED, config.site_id)
+        _sync_placements(
+            config.site_id, changed, rack_ids, [current[key].id for key in changed if key in current], device_ids, stats
+        )
+    return stats
+
+
+@receiver(post_save, sender=RackConfiguration)
+def _project_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {"config_data", "site"} & set(update_fields)):
+        return
+    try:
+        project_configuration(instance)
+    except Exception:
+        # The configuration itself is saved; `manage.py project_rack_configurations` rebuilds the projection
+        logger.exception(f"Failed to project rack configuration {instance.pk}")
@@ -0,0 +1,177 @@
+"""
+Power redundancy analysis for a site
+
+Load is assigned to power providers in feeds:
+
+- A rack with power providers installed in it (PDUs) is fed by those
+  providers only, shared in proportion to their capacity.
+- All other racks share the site's unracked power providers (UPS, utility
+  feeds), which form the site's shared feed.
+
+A feed survives a set of provider failures when its remaining power
+capacity covers its load and, if it has power ports, its remaining ports
+cover the ports in use. N-1 is evaluated for every provider on its own,
+from per-feed totals computed once with np.bincount. For N-2, a feed whose
+load is still covered after losing both its two largest capacities and its
+two largest port counts survives every pair; the pairs of the remaining
+feeds are enumerated, and the failing ones are listed as critical pairs.
+Failures in different feeds are independent, so a site survives N-k when
+every feed does.
+
+All calculations run on the site's cached SiteMatrix.
+"""
+
+import numpy as np
+
+from .site_matrix import SiteMatrix
+
+# Failure depths analysed (N-1, N-2)
+FAILURE_DEPTHS = (1, 2)
+# Critical provider pairs listed per site; the total is always reported
+MAX_LISTED_PAIRS = 100
+
+
+def _top_k_sums(groups: np.ndarray, values: np.ndarray, size: int, depth: int) -> np.ndarray:
+    """Per group, the sum of its `depth` largest values"""
+    if not len(values):
+        return np.zeros(size)
+    order = np.lexsort((-values, groups))
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups, side="left")
+    return np.bincount(sorted_groups, weights=np.where(rank < depth, values[order], 0), minlength=size)
+
+
+def analyze_redundancy(matrix: SiteMatrix) -> dict:
+    """N-1 and N-2 power failure analysis of a site"""
+    rack_count = len(matrix.rack_ids)
+    shared = rack_count  # Group index of the shared feed
+    size = rack_count + 1
+
+    providers = np.nonzero(matrix.provider_is_power)[0]
+    provider_group = np.where(matrix.provider_rack[providers] >= 0, matrix.provider_rack[providers], shared)
+    capacity = matrix.provider_power[providers].astype(np.float64)
+    ports = matrix.provider_ports[providers].astype(np.float64)
+
+    # Feed of every rack, and each feed's load
+    has_own_feed = np.zeros(rack_count, dtype=bool)
+    has_own_feed[provider_group[provider_group < shared]] = True
+    rack_group = np.where(has_own_feed, np.arange(rack_count), shared)
+    load = np.bincount(rack_group, weights=matrix.rack_power, minlength=size)
+    ports_used = np.bincount(rack_group, weights=matrix.rack_ports.astype(np.float64), minlength=size)
+
+    group_providers = np.bincount(provider_group, minlength=size)
+    group_capacity = np.bincount(provider_group, weights=capacity, minlength=size)
+    group_ports = np.bincount(provider_group, weights=ports, minlength=size)
+
+    def survives(lost_capacity, lost_ports):
+        # Port capacity is only checked for feeds that have power ports
+        return (group_capacity - lost_capacity >= load) & (
+            (group_ports == 0) | (group_ports - lost_ports >= ports_used)
+        )
+
+    ok = {0: survives(0, 0)}
+    headroom = {0: group_capacity - load}
+    for depth in FAILURE_DEPTHS:
+        headroom[depth] = group_capacity - _top_k_sums(provider_group, capacity, size, depth) - load
+
+    # Single points of failure: providers whose loss alone takes down their feed
+    single_ok = (group_capacity[provider_group] - capacity >= load[provider_group]) & (
+        (group_ports[provider_group] == 0) | (group_ports[provider_group] - ports >= ports_used[provider_group])
+    )
+    ok[1] = ok[0] & (np.bincount(provider_group[~single_ok], minlength=size) == 0)
+
+    # A feed that survives losing its two largest capacities and port counts survives every pair;
+    # the pairs of the other feeds that survive N-1 are checked one by one below
+    ok[2] = ok[1] & survives(
+        _top_k_sums(provider_group, capacity, size, 2), _top_k_sums(provider_group, ports, size, 2)
+    )
+
+    powered = matrix.rack_power > 0
+    shared_racks = int(np.count_nonzero(powered & ~has_own_feed))
+
+    def racks_at_risk(depth):
+        at_risk = np.nonzero(powered & ~ok[depth][rack_group])[0]
+        return [
+            {
+                "rack_id": int(matrix.rack_ids[rack]),
+                "rack_name": matrix.rack_names[rack],
+                "power_draw": round(float(matrix.rack_power[rack]), 2),
+                "feed": "rack" if has_own_feed[rack] else "shared",
+            }
+            for rack in at_risk.tolist()
+        ]
+
+    single_points = [
+        {
+            "provider_id": int(matrix.provider_ids[provider]),
+            "provider_name": matrix.provider_names[provider],
+            "feed": "shared" if group == shared else "rack",
+            "racks_at_risk": shared_racks if group == shared else 1,
+        }
+        for provider, group in zip(providers[~single_ok].tolist(), provider_group[~single_ok].tolist())
+        if load[group] > 0 or ports_used[group] > 0
+    ]
+
+    # Critical pairs: two providers of a feed that survives N-1 whose joint loss takes it down
+    critical_pairs, pair_count = [], 0
+    for group in np.nonzero(ok[1] & ~ok[2] & (group_providers >= 2))[0].tolist():
+        members = np.nonzero(provider_group == group)[0]
+        first, second = np.triu_indices(len(members), k=1)
+        failing = ~(
+            (group_capacity[group] - capacity[members[first]] - capacity[members[second]] >= load[group])
+            & (
+                (group_ports[group] == 0)
+                | (group_ports[group] - ports[members[first]] - ports[members[second]] >= ports_used[group])
+            )
+        )
+        if not failing.any():
+            ok[2][group] = True
+            continue
+        pair_count += int(np.count_nonzero(failing))
+        for a, b in zip(members[first[failing]].tolist(), members[second[failing]].tolist()):
+            if len(critical_pairs) >= MAX_LISTED_PAIRS:
+                break
+            critical_pairs.append([int(matrix.provider_ids[providers[a]]), int(matrix.provider_ids[providers[b]])])
+
+    feeds = []
+    for group in np.nonzero((group_providers > 0) | ((np.arange(size) == shared) & (load > 0)))[0].tolist():
+        feed = (
+            {"feed": "shared"}
+            if group == shared
+            else {
+                "feed": "rack",
+                "rack_id": int(matrix.rack_ids[group]),
+                "rack_name": matrix.rack_names[group],
+            }
+        )
+        feed.update(
+            {
+                "providers": int(group_providers[group]),
+                "load": round(float(load[group]), 2),
+                "capacity": round(float(group_capacity[group]), 2),
+                "ports_used": int(ports_used[group]),
+                "ports_capacity": int(group_ports[group]),
+                "headroom": round(float(headroom[0][group]), 2),
+            }
+        )
+        for depth in FAILURE_DEPTHS:
+            feed[f"n{depth}_headroom"] = round(float(headroom[depth][group]), 2)
+            feed[f"n{depth}_ok"] = bool(ok[depth][group])
+        feeds.append(feed)
+
+    result = {
+        "site_id": matrix.site_id,
+        "power_draw": round(float(matrix.rack_power.sum()), 2),
+        "power_capacity": round(float(capacity.sum()), 2),
+        "power_providers": len(providers),
+        "survives": {"n0": bool(ok[0][rack_group[powered]].all())},
+        "racks_at_risk": {"n0": racks_at_risk(0)},
+        "single_points_of_failure": single_points,
+        "critical_pairs": critical_pairs,
+        "critical_pair_count": pair_count,
+        "feeds": feeds,
+    }
+    for depth in FAILURE_DEPTHS:
+        result["survives"][f"n{depth}"] = bool(ok[depth][rack_group[powered]].all())
+        result["racks_at_risk"][f"n{depth}"] = racks_at_risk(depth)
+    return result
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.db import models
-from .models import Site, RackConfiguration, Device, Rack, RackDevice, Provider, DeviceGroup, HardwareProvider
+from .models import Site, RackConfiguration, Device, Rack, RackDevice, Provider, DeviceGroup, HardwareProvider, Job
 from .validation_schemas import (
     validate_hex_color,
     validate_non_empty_string,
@@ -173,6 +173,7 @@ class RackSerializer(serializers.ModelSerializer):
             "name",
             "ru_height",
             "description",
+            "source_config",
             "devices",
             "power_utilization",
             "hvac_load",
@@ -180,7 +181,7 @@ class RackSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "site_name", "created_at", "updated_at"]
+        read_only_fields = ["id", "site_name", "source_config", "created_at", "updated_at"]
 
     def get_power_utilization(self, obj):
         """Get total power draw in watts"""
@@ -298,3 +299,31 @@ class DeviceGroupSerializer(serializers.ModelSerializer):
     def get_device_count(self, obj):
         """Get count of devices in this group"""
         return obj.devices.count()
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for background Job status and progress
+    """
+
+    site_id = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "site_id",
+            "progress",
+            "result",
+            "error",
+            "attempts",
+            "max_attempts",
+            "cancel_requested",
+            "run_after",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,313 @@
+"""
+What-if capacity simulation for a site
+
+simulate() evaluates any number of hypothetical change sets ("scenarios")
+against a site's SiteMatrix at once. Every change is flattened into rows of
+(scenario, rack, device type, count) and (scenario, provider) arrays, and the
+per-scenario power draw, port use, RU use and provider capacities are then
+computed with np.bincount over those rows. The cost grows with the number of
+changes submitted, not with the size of the site, and no ORM objects are
+loaded once the matrix is cached.
+
+Supported changes (snake_case keys, as in the rest of the REST API):
+
+    {"op": "add_devices", "device_id": "...", "count": 4, "rack_id": 12}
+    {"op": "remove_devices", "device_id": "...", "count": 2, "rack_id": 12}
+    {"op": "remove_rack", "rack_id": 12}
+    {"op": "add_provider", "type": "power", "power_capacity": 20000, "power_ports_capacity": 24}
+    {"op": "remove_provider", "provider_id": 3}
+    {"op": "swap_provider", "provider_id": 3, "power_capacity": 40000}
+
+rack_id is optional for device changes: without it, the devices count
+towards site totals only. Removing a rack also removes the providers
+installed in it. swap_provider replaces a provider with one of the same
+type whose capacities default to the old provider's. As in the recorded
+utilization, only power providers count towards power and port capacity and
+only cooling providers towards cooling capacity.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+
+from .models import Device
+from .site_matrix import SiteMatrix
+
+OPERATIONS = ("add_devices", "remove_devices", "remove_rack", "add_provider", "remove_provider", "swap_provider")
+PROVIDER_CAPACITY_FIELDS = ("power_capacity", "power_ports_capacity", "cooling_capacity")
+# Capacities each provider type contributes
+TYPE_CAPACITY_FIELDS = {"power": ("power_capacity", "power_ports_capacity"), "cooling": ("cooling_capacity",)}
+
+
+class SimulationError(ValueError):
+    """Raised for a scenario that cannot be evaluated against the site"""
+
+
+@dataclass
+class _Rows:
+    """Changes of all scenarios as flat columns"""
+
+    # Device count changes (site-wide totals)
+    device_scenario: list[int] = field(default_factory=list)
+    device_type: list[int] = field(default_factory=list)
+    device_count: list[int] = field(default_factory=list)
+    # Device count changes in a specific rack (RU checks)
+    rack_scenario: list[int] = field(default_factory=list)
+    rack_row: list[int] = field(default_factory=list)
+    rack_type: list[int] = field(default_factory=list)
+    rack_count: list[int] = field(default_factory=list)
+    removed_rack_scenario: list[int] = field(default_factory=list)
+    removed_rack_row: list[int] = field(default_factory=list)
+    removed_provider_scenario: list[int] = field(default_factory=list)
+    removed_provider_row: list[int] = field(default_factory=list)
+    # Capacity of added providers: scenario -> [power, ports, cooling]
+    added_capacity: dict[int, list[float]] = field(default_factory=dict)
+
+
+class _DeviceTypes:
+    """The matrix's device types, extended with catalog types that scenarios add to the site"""
+
+    def __init__(self, matrix: SiteMatrix, scenarios: list):
+        self.matrix = matrix
+        referenced = {
+            change.get("device_id")
+            for scenario in scenarios
+            for change in scenario.get("changes", [])
+            if isinstance(change, dict) and isinstance(change.get("device_id"), str)
+        }
+        missing = sorted(key for key in referenced if matrix.type_index(key) is None)
+        extra = list(
+            Device.objects.filter(device_id__in=missing).values_list(
+                "device_id", "power_draw", "power_ports_used", "ru_size"
+            )
+        )
+        offset = len(matrix.type_keys)
+        self.extra_index = {row[0]: offset + index for index, row in enumerate(extra)}
+        self.power = np.concatenate([matrix.type_power, np.array([row[1] for row in extra], dtype=np.float64)])
+        self.ports = np.concatenate([matrix.type_ports, np.array([row[2] for row in extra], dtype=np.int64)])
+        self.ru = np.concatenate([matrix.type_ru, np.array([row[3] for row in extra], dtype=np.int64)])
+        self.site_totals = matrix.counts.sum(axis=0)
+
+    def index(self, device_id) -> int:
+        index = self.matrix.type_index(device_id)
+        if index is None:
+            index = self.extra_index.get(device_id)
+        if index is None:
+            raise SimulationError(f"Unknown device_id '{device_id}'")
+        return index
+
+    def placed(self, index: int, rack: int = None) -> int:
+        """Devices of a type currently placed in a rack, or in the site"""
+        if index >= len(self.site_totals):
+            return 0
+        return int(self.matrix.counts[rack, index] if rack is not None else self.site_totals[index])
+
+
+def _count(change: dict) -> int:
+    count = change.get("count", 1)
+    if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+        raise SimulationError("count must be a positive integer")
+    return count
+
+
+def _capacity(change: dict, name: str, default: float = 0) -> float:
+    value = change.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise SimulationError(f"{name} must be a non-negative number")
+    return float(value)
+
+
+def _provider_capacities(matrix: SiteMatrix) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Power, port and cooling capacity of every provider, zero where its type does not provide them"""
+    power = np.where(matrix.provider_is_power, matrix.provider_power, 0).astype(np.float64)
+    ports = np.where(matrix.provider_is_power, matrix.provider_ports, 0).astype(np.float64)
+    cooling = np.where(matrix.provider_is_cooling, matrix.provider_cooling, 0).astype(np.float64)
+    return power, ports, cooling
+
+
+def _parse(matrix: SiteMatrix, scenarios: list) -> tuple[_Rows, _DeviceTypes]:
+    types = _DeviceTypes(matrix, scenarios)
+    rows = _Rows()
+    capacities = _provider_capacities(matrix)
+    providers_by_rack: dict[int, list[int]] = {}
+    for provider, rack in enumerate(matrix.provider_rack.tolist()):
+        if rack >= 0:
+            providers_by_rack.setdefault(rack, []).append(provider)
+
+    for number, scenario in enumerate(scenarios):
+        # Row 0 is the baseline, which has no changes
+        s = number + 1
+        changes = scenario.get("changes", [])
+        if not isinstance(changes, list):
+            raise SimulationError(f"Scenario {number}: changes must be a list")
+        removed_racks, changed_racks, removed_providers = set(), set(), set()
+        for c, change in enumerate(changes):
+            try:
+                if not isinstance(change, dict) or change.get("op") not in OPERATIONS:
+                    raise SimulationError(f"op must be one of {', '.join(OPERATIONS)}")
+                op = change["op"]
+                rack = None
+                if "rack_id" in change:
+                    rack = matrix.rack_index(change["rack_id"])
+                    if rack is None:
+                        raise SimulationError(f"Rack {change['rack_id']} is not in this site")
+
+                if op in ("add_devices", "remove_devices"):
+                    device_type, count = types.index(change.get("device_id")), _count(change)
+                    if op == "remove_devices":
+                        if count > types.placed(device_type, rack):
+                            where = f"rack {change['rack_id']}" if rack is not None else "the site"
+                            raise SimulationError(f"Fewer than {count} '{change['device_id']}' devices in {where}")
+                        count = -count
+                    rows.device_scenario.append(s)
+                    rows.device_type.append(device_type)
+                    rows.device_count.append(count)
+                    if rack is not None:
+                        changed_racks.add(rack)
+                        rows.rack_scenario.append(s)
+                        rows.rack_row.append(rack)
+                        rows.rack_type.append(device_type)
+                        rows.rack_count.append(count)
+
+                elif op == "remove_rack":
+                    if rack is None:
+                        raise SimulationError("rack_id is required")
+                    if rack not in removed_racks:
+                        removed_racks.add(rack)
+                        rows.removed_rack_scenario.append(s)
+                        rows.removed_rack_row.append(rack)
+                        # Providers installed in the rack go with it
+                        removed_providers.update(providers_by_rack.get(rack, ()))
+
+                elif op == "add_provider":
+                    if change.get("type") not in TYPE_CAPACITY_FIELDS:
+                        raise SimulationError("type must be 'power' or 'cooling'")
+                    added = rows.added_capacity.setdefault(s, [0.0, 0.0, 0.0])
+                    for index, name in enumerate(PROVIDER_CAPACITY_FIELDS):
+                        if name in TYPE_CAPACITY_FIELDS[change["type"]]:
+                            added[index] += _capacity(change, name)
+
+                else:
+                    provider = matrix.provider_index(change.get("provider_id"))
+                    if provider is None:
+                        raise SimulationError(f"Provider {change.get('provider_id')} is not in this site")
+                    removed_providers.add(provider)
+                    if op == "swap_provider":
+                        kind = "power" if matrix.provider_is_power[provider] else "cooling"
+                        added = rows.added_capacity.setdefault(s, [0.0, 0.0, 0.0])
+                        for index, name in enumerate(PROVIDER_CAPACITY_FIELDS):
+                            if name in TYPE_CAPACITY_FIELDS[kind]:
+                                added[index] += _capacity(change, name, float(capacities[index][provider]))
+            except SimulationError as e:
+                raise SimulationError(f"Scenario {number}, change {c}: {e}")
+
+        if removed_racks & changed_racks:
+            raise SimulationError(f"Scenario {number}: devices are changed in a rack the scenario removes")
+        rows.removed_provider_scenario.extend([s] * len(removed_providers))
+        rows.removed_provider_row.extend(sorted(removed_providers))
+    return rows, types
+
+
+def _sum(scenarios, weights, size: int) -> np.ndarray:
+    """Per-scenario sums of `weights`"""
+    if len(scenarios) == 0:
+        return np.zeros(size)
+    return np.bincount(np.asarray(scenarios, dtype=np.int64), weights=weights, minlength=size)
+
+
+def simulate(matrix: SiteMatrix, scenarios: list) -> tuple[dict, list[dict]]:
+    """Evaluate scenarios against a site; returns (baseline, results in scenario order)"""
+    rows, types = _parse(matrix, scenarios)
+    # The baseline is evaluated as an extra scenario without changes
+    scenarios = [{"name": "baseline"}, *scenarios]
+    size = len(scenarios)
+
+    device_scenario = np.asarray(rows.device_scenario, dtype=np.int64)
+    device_type = np.asarray(rows.device_type, dtype=np.int64)
+    device_count = np.asarray(rows.device_count, dtype=np.float64)
+    removed_racks = np.asarray(rows.removed_rack_row, dtype=np.int64)
+    removed_providers = np.asarray(rows.removed_provider_row, dtype=np.int64)
+
+    power_draw = (
+        matrix.rack_power.sum()
+        + _sum(device_scenario, device_count * types.power[device_type], size)
+        - _sum(rows.removed_rack_scenario, matrix.rack_power[removed_racks], size)
+    )
+    ports_used = (
+        matrix.rack_ports.sum()
+        + _sum(device_scenario, device_count * types.ports[device_type], size)
+        - _sum(rows.removed_rack_scenario, matrix.rack_ports[removed_racks].astype(np.float64), size)
+    )
+
+    added = np.zeros((size, 3))
+    for s, capacity in rows.added_capacity.items():
+        added[s] = capacity
+    capacities = []
+    for index, values in enumerate(_provider_capacities(matrix)):
+        capacities.append(
+            values.sum() - _sum(rows.removed_provider_scenario, values[removed_providers], size) + added[:, index]
+        )
+    power_capacity, ports_capacity, cooling_capacity = capacities
+    hvac_load = power_draw * settings.WATTS_TO_BTU
+
+    # RU use of the racks each scenario changes
+    overflows = [[] for _ in range(size)]
+    if rows.rack_scenario:
+        rack_keys = np.asarray(rows.rack_scenario, dtype=np.int64) * len(matrix.rack_ids) + rows.rack_row
+        ru_delta = np.asarray(rows.rack_count, dtype=np.int64) * types.ru[np.asarray(rows.rack_type)]
+        keys, inverse = np.unique(rack_keys, return_inverse=True)
+        ru_used = np.bincount(inverse.reshape(-1), weights=ru_delta, minlength=len(keys)).astype(np.int64)
+        scenario_of, rack_of = np.divmod(keys, len(matrix.rack_ids))
+        ru_used += matrix.rack_ru[rack_of]
+        over = np.nonzero(ru_used > matrix.rack_height[rack_of])[0]
+        for s, rack, used in zip(scenario_of[over].tolist(), rack_of[over].tolist(), ru_used[over].tolist()):
+            overflows[s].append(
+                {
+                    "rack_id": int(matrix.rack_ids[rack]),
+                    "rack_name": matrix.rack_names[rack],
+                    "ru_used": used,
+                    "ru_height": int(matrix.rack_height[rack]),
+                }
+            )
+
+    results = []
+    for s, values in enumerate(
+        zip(
+            power_draw.tolist(),
+            power_capacity.tolist(),
+            ports_used.tolist(),
+            ports_capacity.tolist(),
+            hvac_load.tolist(),
+            cooling_capacity.tolist(),
+        )
+    ):
+        draw, capacity, ports, port_capacity, hvac, cooling = values
+        # Resources without any provider capacity in the site are not modelled, so they are not checked
+        feasible = (
+            not overflows[s]
+            and (capacity == 0 or draw <= capacity)
+            and (port_capacity == 0 or ports <= port_capacity)
+            and (cooling == 0 or hvac <= cooling)
+        )
+        results.append(
+            {
+                "name": scenarios[s].get("name") or f"Scenario {s - 1}",
+                "feasible": feasible,
+                "power": {
+                    "draw": round(draw, 2),
+                    "capacity": round(capacity, 2),
+                    "headroom": round(capacity - draw, 2),
+                    "utilization": round(draw / capacity * 100, 2) if capacity else None,
+                },
+                "hvac": {
+                    "load_btu": round(hvac, 2),
+                    "load_tons": round(hvac / settings.BTU_PER_TON, 3),
+                    "cooling_capacity_btu": round(cooling, 2),
+                    "headroom_btu": round(cooling - hvac, 2),
+                },
+                "ports": {"used": int(ports), "capacity": int(port_capacity), "headroom": int(port_capacity - ports)},
+                "racks_over_capacity": overflows[s],
+            }
+        )
+    return results[0], results[1:]
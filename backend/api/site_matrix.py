@@ -0,0 +1,176 @@
+"""
+Precomputed array view of a site for capacity calculations
+
+Capacity questions (what-if simulations, redundancy analysis) are answered
+with NumPy array operations over a SiteMatrix instead of ORM objects. A
+matrix holds a site's device types, racks and providers as parallel arrays
+and a dense rack x device type count matrix, from which per-rack power, port
+and RU totals are derived once.
+
+Matrices are built with three values_list queries and cached per process.
+Every get_site_matrix() call checks a cheap fingerprint of the site (row
+counts and latest updated_at of its racks, rack devices and providers, and
+of the device catalog) and rebuilds the matrix when it changed. Bulk writes
+that send no signals are seen as long as they change a row count or set
+updated_at: bulk_create() and save() do, and the queryset.update() calls
+that unrack providers set it explicitly. An update() that leaves updated_at
+alone and deletes nothing is not noticed until the next change that is.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .models import Device, Provider, Rack, RackDevice
+
+# Sites whose matrices are kept in memory per process
+CACHE_SIZE = 32
+
+
+@dataclass
+class SiteMatrix:
+    site_id: int
+    fingerprint: tuple
+
+    # Device types placed in the site (columns of `counts`)
+    type_pks: np.ndarray
+    type_keys: list[str]
+    type_power: np.ndarray
+    type_ports: np.ndarray
+    type_ru: np.ndarray
+
+    # Racks (rows of `counts`)
+    rack_ids: np.ndarray
+    rack_names: list[str]
+    rack_height: np.ndarray
+    counts: np.ndarray
+
+    # Providers; provider_rack is a row of `counts`, -1 when not racked
+    provider_ids: np.ndarray
+    provider_names: list[str]
+    provider_is_power: np.ndarray
+    provider_is_cooling: np.ndarray
+    provider_power: np.ndarray
+    provider_ports: np.ndarray
+    provider_cooling: np.ndarray
+    provider_ru: np.ndarray
+    provider_rack: np.ndarray
+
+    # Derived per-rack totals
+    rack_power: np.ndarray = field(init=False)
+    rack_ports: np.ndarray = field(init=False)
+    rack_ru: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.rack_power = self.counts @ self.type_power
+        self.rack_ports = self.counts @ self.type_ports
+        racked = self.provider_rack >= 0
+        self.rack_ru = self.counts @ self.type_ru + np.bincount(
+            self.provider_rack[racked], weights=self.provider_ru[racked], minlength=len(self.rack_ids)
+        ).astype(np.int64)
+        self._type_index = {key: index for index, key in enumerate(self.type_keys)}
+        self._rack_index = {int(pk): index for index, pk in enumerate(self.rack_ids)}
+        self._provider_index = {int(pk): index for index, pk in enumerate(self.provider_ids)}
+
+    def type_index(self, device_id: str) -> Optional[int]:
+        return self._type_index.get(device_id)
+
+    def rack_index(self, rack_id) -> Optional[int]:
+        return self._rack_index.get(rack_id) if isinstance(rack_id, int) else None
+
+    def provider_index(self, provider_id) -> Optional[int]:
+        return self._provider_index.get(provider_id) if isinstance(provider_id, int) else None
+
+
+_cache: dict[int, SiteMatrix] = {}
+_lock = threading.Lock()
+
+
+def site_fingerprint(site_id: int) -> tuple:
+    """Row counts and latest modification times of everything a site matrix is built from"""
+    parts = []
+    for queryset in (
+        Rack.objects.filter(site_id=site_id),
+        RackDevice.objects.filter(rack__site_id=site_id),
+        Provider.objects.filter(site_id=site_id),
+    ):
+        aggregate = queryset.aggregate(count=Count("id"), updated=Max("updated_at"))
+        parts.append((aggregate["count"], aggregate["updated"]))
+    parts.append(Device.objects.aggregate(updated=Max("updated_at"))["updated"])
+    return tuple(parts)
+
+
+def build_site_matrix(site_id: int, fingerprint: tuple = ()) -> SiteMatrix:
+    racks = list(Rack.objects.filter(site_id=site_id).order_by("id").values_list("id", "name", "ru_height"))
+    rack_rows = {rack[0]: row for row, rack in enumerate(racks)}
+
+    placements = np.array(
+        list(RackDevice.objects.filter(rack__site_id=site_id).values_list("rack_id", "device_id")), dtype=np.int64
+    ).reshape(-1, 2)
+    type_pks, type_columns = np.unique(placements[:, 1], return_inverse=True)
+    types = {
+        pk: rest
+        for pk, *rest in Device.objects.filter(id__in=type_pks.tolist()).values_list(
+            "id", "device_id", "power_draw", "power_ports_used", "ru_size"
+        )
+    }
+    type_rows = [types[int(pk)] for pk in type_pks]
+
+    counts = np.zeros((len(racks), len(type_pks)), dtype=np.int64)
+    if len(placements):
+        rows = np.array([rack_rows[rack_id] for rack_id in placements[:, 0].tolist()], dtype=np.int64)
+        np.add.at(counts, (rows, type_columns.reshape(-1)), 1)
+
+    providers = list(
+        Provider.objects.filter(site_id=site_id)
+        .order_by("id")
+        .values_list(
+            "id", "name", "type", "power_capacity", "power_ports_capacity", "cooling_capacity", "ru_size", "rack_id"
+        )
+    )
+    provider_types = [provider[2] for provider in providers]
+
+    return SiteMatrix(
+        site_id=site_id,
+        fingerprint=fingerprint,
+        type_pks=type_pks,
+        type_keys=[row[0] for row in type_rows],
+        type_power=np.array([row[1] for row in type_rows], dtype=np.float64),
+        type_ports=np.array([row[2] for row in type_rows], dtype=np.int64),
+        type_ru=np.array([row[3] for row in type_rows], dtype=np.int64),
+        rack_ids=np.array([rack[0] for rack in racks], dtype=np.int64),
+        rack_names=[rack[1] for rack in racks],
+        rack_height=np.array([rack[2] for rack in racks], dtype=np.int64),
+        counts=counts,
+        provider_ids=np.array([provider[0] for provider in providers], dtype=np.int64),
+        provider_names=[provider[1] for provider in providers],
+        provider_is_power=np.array([kind == "power" for kind in provider_types], dtype=bool),
+        provider_is_cooling=np.array([kind == "cooling" for kind in provider_types], dtype=bool),
+        provider_power=np.array([provider[3] for provider in providers], dtype=np.float64),
+        provider_ports=np.array([provider[4] for provider in providers], dtype=np.int64),
+        provider_cooling=np.array([provider[5] for provider in providers], dtype=np.float64),
+        provider_ru=np.array([provider[6] for provider in providers], dtype=np.int64),
+        provider_rack=np.array(
+            [rack_rows.get(provider[7], -1) if provider[7] else -1 for provider in providers], dtype=np.int64
+        ),
+    )
+
+
+def get_site_matrix(site_id: int) -> SiteMatrix:
+    """The site's matrix, rebuilt if anything it is built from changed since it was cached"""
+    fingerprint = site_fingerprint(site_id)
+    with _lock:
+        matrix = _cache.get(site_id)
+    if matrix is not None and matrix.fingerprint == fingerprint:
+        return matrix
+
+    matrix = build_site_matrix(site_id, fingerprint)
+    with _lock:
+        _cache.pop(site_id, None)
+        while len(_cache) >= CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[site_id] = matrix
+    return matrix
@@ -0,0 +1,488 @@
+"""
+Columnar binary snapshots of a site's inventory
+
+A snapshot holds a whole site (racks, placed devices, resource providers and
+the catalog entries of the devices it uses) as flat columns instead of nested
+JSON, for backups, copies between environments and offline analytics.
+
+Layout (all integers little-endian):
+
+    b"RKSNAP01"                      magic
+    uint32                           length of the header
+    header                           UTF-8 JSON: site, row counts, column directory
+    column blocks                    each starting at an 8-byte boundary
+
+Every column is an array of int32. String columns hold indexes into the
+snapshot's string table (-1 for null), whose UTF-8 data and offsets are two
+more blocks, so repeated names cost four bytes per row. Each block is
+compressed with zlib by default. Snapshots written with compress=False store
+the blocks as-is; Snapshot memory-maps the file and returns such columns as
+zero-copy memoryviews, so reading one column of a large snapshot touches only
+that column's pages. Compressed columns are decompressed when first read.
+
+Saved rack configurations (the editor's layouts) are not part of a snapshot;
+racks projected from them are exported and imported as plain racks.
+"""
+
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .change_events import record_rows
+from .config_import import MAX_SAMPLES, provider_errors
+from .device_search import invalidate_index
+from .models import ChangeEvent, Device, Provider, Rack, RackDevice, Site
+
+MAGIC = b"RKSNAP01"
+FORMAT_VERSION = 1
+BULK_BATCH_SIZE = 2000
+DEVICE_LOOKUP_BATCH_SIZE = 500
+
+# Column name -> (model field, is a string) per table, in file order
+TABLES = {
+    "devices": {
+        "device_id": ("device_id", True),
+        "name": ("name", True),
+        "category": ("category", True),
+        "ru_size": ("ru_size", False),
+        "power_draw": ("power_draw", False),
+        "power_ports_used": ("power_ports_used", False),
+        "color": ("color", True),
+    },
+    "racks": {
+        "name": ("name", True),
+        "ru_height": ("ru_height", False),
+        "description": ("description", True),
+    },
+    # rack and device are row numbers in the racks and devices tables
+    "rack_devices": {
+        "rack": ("rack_id", False),
+        "device": ("device_id", False),
+        "position": ("position", False),
+        "instance_name": ("instance_name", True),
+    },
+    # rack is a row number in the racks table, -1 when the provider is not racked
+    "providers": {
+        "name": ("name", True),
+        "type": ("type", True),
+        "description": ("description", True),
+        "location": ("location", True),
+        "power_capacity": ("power_capacity", False),
+        "power_ports_capacity": ("power_ports_capacity", False),
+        "cooling_capacity": ("cooling_capacity", False),
+        "ru_size": ("ru_size", False),
+        "rack": ("rack_id", False),
+        "position": ("position", False),
+    },
+}
+
+_ALIGNMENT = 8
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable snapshot"""
+
+
+def _int32_array(values=()) -> array:
+    column = array("i", values)
+    if column.itemsize != 4:
+        raise RuntimeError("Snapshots need a platform with 4-byte C ints")
+    return column
+
+
+def _to_bytes(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array("i", column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.index)
+        return position
+
+    def blocks(self) -> tuple[bytes, array]:
+        data = bytearray()
+        offsets = _int32_array([0])
+        for value in self.index:
+            data += value.encode("utf-8")
+            offsets.append(len(data))
+        return bytes(data), offsets
+
+
+def _columns(table: str, rows: list[tuple]) -> dict[str, list]:
+    return {column: [row[index] for row in rows] for index, column in enumerate(TABLES[table])}
+
+
+def _site_rows(site: Site) -> dict[str, dict[str, list]]:
+    """The site's inventory as columns of Python values, with foreign keys turned into row numbers"""
+    racks = list(Rack.objects.filter(site=site).order_by("id").values_list("id", "name", "ru_height", "description"))
+    rack_rows = {rack[0]: row for row, rack in enumerate(racks)}
+
+    placements = list(
+        RackDevice.objects.filter(rack__site=site)
+        .order_by("rack_id", "position")
+        .values_list("rack_id", "device_id", "position", "instance_name")
+        .iterator(chunk_size=BULK_BATCH_SIZE)
+    )
+    devices = list(
+        Device.objects.filter(id__in={placement[1] for placement in placements})
+        .order_by("id")
+        .values_list("id", *[field for field, _ in TABLES["devices"].values()])
+    )
+    device_rows = {device[0]: row for row, device in enumerate(devices)}
+
+    providers = list(
+        Provider.objects.filter(site=site).order_by("id").values_list(*[f for f, _ in TABLES["providers"].values()])
+    )
+    providers = [(*provider[:-2], rack_rows.get(provider[-2], -1), provider[-1] or 0) for provider in providers]
+
+    return {
+        "devices": _columns("devices", [device[1:] for device in devices]),
+        "racks": _columns("racks", [rack[1:] for rack in racks]),
+        "rack_devices": _columns(
+            "rack_devices",
+            [(rack_rows[rack], device_rows[device], position, name) for rack, device, position, name in placements],
+        ),
+        "providers": _columns("providers", providers),
+    }
+
+
+def write_snapshot(site: Site, f, compress: bool = True) -> dict:
+    """Write a snapshot of `site` to a binary file object; returns the row counts"""
+    strings = _StringTable()
+    blocks = []
+    directory = {}
+    counts = {}
+
+    for table, rows in _site_rows(site).items():
+        counts[table] = len(next(iter(rows.values())))
+        directory[table] = {}
+        for column, values in rows.items():
+            if TABLES[table][column][1]:
+                values = [strings.add(value) for value in values]
+            directory[table][column] = len(blocks)
+            blocks.append(_to_bytes(_int32_array(values)))
+
+    string_data, string_offsets = strings.blocks()
+    blocks.append(_to_bytes(string_offsets))
+    blocks.append(string_data)
+
+    stored = [zlib.compress(block, 6) if compress else block for block in blocks]
+    entries = []
+    offset = 0
+    for raw, data in zip(blocks, stored):
+        entries.append({"offset": offset, "length": len(data), "raw_length": len(raw)})
+        offset += len(data) + (-len(data) % _ALIGNMENT)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "created_at": timezone.now().isoformat(),
+        "codec": "zlib" if compress else "none",
+        "site": {"name": site.name, "description": site.description},
+        "rows": counts,
+        "columns": {
+            table: {column: entries[index] for column, index in columns.items()} for table, columns in directory.items()
+        },
+        "strings": {"count": len(strings.index), "offsets": entries[-2], "data": entries[-1]},
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % _ALIGNMENT)
+
+    f.write(MAGIC)
+    f.write(struct.pack("<I", len(header_bytes)))
+    f.write(header_bytes)
+    for data in stored:
+        f.write(data)
+        f.write(b"\0" * (-len(data) % _ALIGNMENT))
+    return counts
+
+
+class Snapshot:
+    """
+    A snapshot file opened for reading.
+
+    Columns are read on first access: uncompressed ones straight from the
+    memory-mapped file, compressed ones decompressed into an array.
+    """
+
+    def __init__(self, path: str):
+        self._columns: dict[tuple[str, str], object] = {}
+        self._strings: Optional[list[str]] = None
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError("Snapshot file is empty")
+        try:
+            if self._map[: len(MAGIC)] != MAGIC:
+                raise SnapshotError("Not a site snapshot")
+            (header_length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+            self._base = len(MAGIC) + 4 + header_length
+            self.header = json.loads(bytes(self._map[len(MAGIC) + 4 : self._base]))
+            if self.header.get("version") != FORMAT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {self.header.get('version')}")
+        except SnapshotError:
+            self.close()
+            raise
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise SnapshotError(f"Corrupt snapshot header: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._columns.clear()
+        self._strings = None
+        try:
+            self._map.close()
+        except (AttributeError, BufferError):
+            # Columns handed out as memoryviews keep the mapping open until they are released
+            pass
+        self._file.close()
+
+    @property
+    def site(self) -> dict:
+        return self.header["site"]
+
+    @property
+    def rows(self) -> dict[str, int]:
+        return self.header["rows"]
+
+    def _block(self, entry: dict) -> bytes | memoryview:
+        start = self._base + entry["offset"]
+        if start + entry["length"] > len(self._map):
+            raise SnapshotError("Snapshot file is truncated")
+        data = memoryview(self._map)[start : start + entry["length"]]
+        if self.header["codec"] == "zlib":
+            try:
+                return zlib.decompress(data)
+            except zlib.error as e:
+                raise SnapshotError(f"Corrupt snapshot column: {e}")
+        return data
+
+    def _int32(self, entry: dict):
+        block = self._block(entry)
+        if isinstance(block, memoryview) and sys.byteorder == "little":
+            return block.cast("i")
+        column = _int32_array()
+        column.frombytes(block)
+        if sys.byteorder == "big":
+            column.byteswap()
+        return column
+
+    def column(self, table: str, name: str):
+        """A column as a sequence of ints (string columns hold string table indexes, -1 for null)"""
+        key = (table, name)
+        if key not in self._columns:
+            try:
+                entry = self.header["columns"][table][name]
+            except KeyError:
+                raise KeyError(f"No column {table}.{name} in snapshot")
+            self._columns[key] = self._int32(entry)
+        return self._columns[key]
+
+    @property
+    def strings(self) -> list[str]:
+        if self._strings is None:
+            offsets = self._int32(self.header["strings"]["offsets"])
+            data = bytes(self._block(self.header["strings"]["data"]))
+            self._strings = [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return self._strings
+
+    def values(self, table: str, name: str) -> list:
+        """A column as Python values, with string indexes resolved"""
+        column = self.column(table, name)
+        if not TABLES[table][name][1]:
+            return list(column)
+        strings = self.strings
+        return [strings[i] if i >= 0 else None for i in column]
+
+
+@dataclass
+class SnapshotImportStats:
+    racks_created: int = 0
+    racks_replaced: int = 0
+    racks_skipped: int = 0
+    devices_created: int = 0
+    catalog_devices_created: int = 0
+    providers_created: int = 0
+    providers_replaced: int = 0
+    providers_skipped: int = 0
+    # The first MAX_SAMPLES providers that failed validation, with the reason
+    skipped: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def import_snapshot(snapshot: Snapshot, site: Site, replace: bool = False) -> SnapshotImportStats:
+    """
+    Load a snapshot into `site` in one transaction.
+
+    Racks that already exist in the site (by name, case-insensitively) are
+    skipped with their devices and providers, or deleted and loaded again
+    with replace=True. Providers that exist by name and type are skipped, or
+    replaced with replace=True; providers that fail model validation are
+    skipped and listed in `skipped`.
+    Devices missing from the catalog are added to it from the snapshot.
+    """
+    stats = SnapshotImportStats()
+    try:
+        devices = {column: snapshot.values("devices", column) for column in TABLES["devices"]}
+        racks = {column: snapshot.values("racks", column) for column in TABLES["racks"]}
+        placements = {column: snapshot.values("rack_devices", column) for column in TABLES["rack_devices"]}
+        providers = {column: snapshot.values("providers", column) for column in TABLES["providers"]}
+    except (IndexError, KeyError) as e:
+        raise SnapshotError(f"Corrupt snapshot: {e}")
+
+    with transaction.atomic():
+        device_pks = _catalog_ids(devices, stats)
+
+        existing = dict(
+            Rack.objects.filter(site=site, name__lower__in=[name.lower() for name in racks["name"]])
+            .annotate(lookup_name=Lower("name"))
+            .values_list("lookup_name", "id")
+        )
+        if existing and replace:
+            # Providers installed in a replaced rack stay in the site, unracked
+            Provider.objects.filter(rack_id__in=existing.values()).update(
+                rack=None, position=None, updated_at=timezone.now()
+            )
+            Rack.objects.filter(id__in=existing.values()).delete()
+            stats.racks_replaced = len(existing)
+            existing = {}
+
+        new_rows = [row for row, name in enumerate(racks["name"]) if name.lower() not in existing]
+        stats.racks_skipped = len(racks["name"]) - len(new_rows)
+        Rack.objects.bulk_create(
+            [
+                Rack(
+                    site=site,
+                    name=racks["name"][row],
+                    ru_height=racks["ru_height"][row],
+                    description=racks["description"][row],
+                )
+                for row in new_rows
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # MySQL does not return primary keys from bulk inserts, so read them back
+        ids_by_name = dict(
+            Rack.objects.filter(site=site, name__in=[racks["name"][row] for row in new_rows]).values_list("name", "id")
+        )
+        rack_pks = {row: ids_by_name[racks["name"][row]] for row in new_rows}
+        stats.racks_created = len(rack_pks)
+
+        rack_devices = [
+            RackDevice(
+                rack_id=rack_pks[rack],
+                device_id=device_pks[device],
+                position=position,
+                instance_name=instance_name,
+            )
+            for rack, device, position, instance_name in zip(
+                placements["rack"], placements["device"], placements["position"], placements["instance_name"]
+            )
+            if rack in rack_pks
+        ]
+        RackDevice.objects.bulk_create(rack_devices, batch_size=BULK_BATCH_SIZE)
+        stats.devices_created = len(rack_devices)
+        # bulk_create sends no post_save, so the change events are written here
+        new_racks = Rack.objects.filter(id__in=rack_pks.values())
+        record_rows(new_racks, ChangeEvent.ACTION_CREATED, site.id)
+        record_rows(RackDevice.objects.filter(rack__in=new_racks), ChangeEvent.ACTION_CREATED, site.id)
+
+        existing_providers = {
+            (name, kind): pk
+            for name, kind, pk in Provider.objects.filter(site=site)
+            .annotate(lookup_name=Lower("name"))
+            .values_list("lookup_name", "type", "id")
+        }
+        if replace:
+            keys = {(name.lower(), kind) for name, kind in zip(providers["name"], providers["type"])}
+            replaced = [pk for key, pk in existing_providers.items() if key in keys]
+            Provider.objects.filter(id__in=replaced).delete()
+            stats.providers_replaced = len(replaced)
+            existing_providers = {}
+        last_provider = Provider.objects.filter(site=site).aggregate(last=Max("id"))["last"] or 0
+        new_providers = []
+        for row in range(len(providers["name"])):
+            key = (providers["name"][row].lower(), providers["type"][row])
+            rack = providers["rack"][row]
+            if key in existing_providers or (rack >= 0 and rack not in rack_pks):
+                stats.providers_skipped += 1
+                continue
+            existing_providers[key] = None
+            new_providers.append(
+                Provider(
+                    site=site,
+                    **{
+                        field: providers[column][row]
+                        for column, (field, _) in TABLES["providers"].items()
+                        if column not in ("rack", "position")
+                    },
+                    rack_id=rack_pks[rack] if rack >= 0 else None,
+                    position=providers["position"][row] if rack >= 0 else None,
+                )
+            )
+        errors = provider_errors(new_providers)
+        for index, error in errors.items():
+            stats.providers_skipped += 1
+            if len(stats.skipped) < MAX_SAMPLES:
+                stats.skipped.append({"type": "provider", "item": new_providers[index].name, "reason": error})
+        new_providers = [provider for index, provider in enumerate(new_providers) if index not in errors]
+        Provider.objects.bulk_create(new_providers, batch_size=BULK_BATCH_SIZE)
+        stats.providers_created = len(new_providers)
+        record_rows(Provider.objects.filter(site=site, id__gt=last_provider), ChangeEvent.ACTION_CREATED, site.id)
+    return stats
+
+
+def _catalog_ids(devices: dict[str, list], stats: SnapshotImportStats) -> list[int]:
+    """Database ids of the snapshot's device rows, adding devices missing from the catalog"""
+    references = devices["device_id"]
+    found = {}
+    for start in range(0, len(references), DEVICE_LOOKUP_BATCH_SIZE):
+        batch = references[start : start + DEVICE_LOOKUP_BATCH_SIZE]
+        found.update(Device.objects.filter(device_id__in=batch).values_list("device_id", "id"))
+
+    missing = [row for row, reference in enumerate(references) if reference not in found]
+    if missing:
+        Device.objects.bulk_create(
+            [
+                Device(**{field: devices[column][row] for column, (field, _) in TABLES["devices"].items()})
+                for row in missing
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        created = Device.objects.filter(device_id__in=[references[row] for row in missing])
+        found.update(created.values_list("device_id", "id"))
+        stats.catalog_devices_created = len(missing)
+        # bulk_create sends no post_save, so the search index is not invalidated by its receiver and
+        # the change events are written here
+        invalidate_index()
+        record_rows(created, ChangeEvent.ACTION_CREATED)
+    return [found[reference] for reference in references]
@@ -1,7 +1,66 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from rest_framework import status
-from .models import Site, Device, Rack
+from benchmarks.cases import build_cases
+from benchmarks.generator import DatacenterSpec, generate_datacenter
+from benchmarks.loadtest import parse_access_log, parse_recording, replay, summarize
+from benchmarks.runner import compare_reports, run_benchmarks
+from .models import (
+    ChangeEvent,
+    Device,
+    DeviceGroup,
+    HardwareProvider,
+    Job,
+    Passkey,
+    PasskeyChallenge,
+    Provider,
+    Rack,
+    RackConfiguration,
+    RackDevice,
+    Site,
+    UtilizationSample,
+)
+from . import change_events, jobs, profiling, utilization
+from .config_import import ConfigParseError, iter_config
+from .device_search import search_devices, invalidate_index
+from .forecast import forecast_sites
+from .projection import project_configuration
+from .snapshot import Snapshot
+from .passkey_challenges import (
+    CacheChallengeStore,
+    DatabaseChallengeStore,
+    PURGE_THROTTLE_CACHE_KEY,
+    new_handle,
+    purge_expired_challenges,
+)
+from .passkey_credentials import (
+    flush_last_used,
+    get_credential,
+    get_user_credential_ids,
+    last_used_buffer,
+    record_authentication,
+)
 
 
 class SiteModelTest(TestCase):
@@ -21,6 +80,10 @@ class SiteModelTest(TestCase):
         """Test string representation of site"""
         self.assertEqual(str(self.site), "Test Site")
 
+    def test_site_lower_name_lookup(self):
+        """Test case-insensitive lookup through the name__lower transform"""
+        self.assertEqual(Site.objects.get(name__lower="test site"), self.site)
+
 
 class DeviceModelTest(TestCase):
     """Test cases for Device model"""
@@ -124,6 +187,1631 @@ class RackModelTest(TestCase):
         """Test HVAC load for empty rack is 0"""
         self.assertEqual(self.rack.get_hvac_load(), 0)
 
+    def test_rack_lower_name_lookup(self):
+        """Test case-insensitive rack lookup within a site through the name__lower transform"""
+        self.assertEqual(Rack.objects.get(site=self.site, name__lower="test rack"), self.rack)
+
     def test_power_ports_empty_rack(self):
         """Test power ports count for empty rack is 0"""
         self.assertEqual(self.rack.get_power_ports_used(), 0)
+
+
+class DeviceSearchTest(TestCase):
+    """Test cases for the device catalog search index and endpoint"""
+
+    def setUp(self):
+        invalidate_index()
+        self.dell = HardwareProvider.objects.create(name="Dell")
+        Device.objects.create(
+            device_id="dell-r740", name="PowerEdge R740", category="servers", ru_size=2, power_draw=750
+        )
+        Device.objects.filter(device_id="dell-r740").update(provider=self.dell)
+        Device.objects.create(
+            device_id="cisco-9300", name="Catalyst 9300", category="network", ru_size=1, power_draw=350
+        )
+        Device.objects.create(
+            device_id="netapp-a400",
+            name="AFF A400",
+            category="storage",
+            ru_size=4,
+            power_draw=1200,
+            description="All-flash array with network attached storage",
+        )
+        invalidate_index()
+
+    def test_prefix_match(self):
+        """Test that query terms match token prefixes"""
+        count, devices = search_devices("power")
+        self.assertEqual(count, 1)
+        self.assertEqual(devices[0].device_id, "dell-r740")
+
+    def test_provider_name_is_indexed(self):
+        """Test that devices can be found by hardware provider name"""
+        count, devices = search_devices("dell")
+        self.assertEqual([d.device_id for d in devices], ["dell-r740"])
+
+    def test_ranking_prefers_stronger_fields(self):
+        """Test that a category match ranks above a description match"""
+        count, devices = search_devices("network")
+        self.assertEqual(count, 2)
+        self.assertEqual([d.device_id for d in devices], ["cisco-9300", "netapp-a400"])
+
+    def test_all_terms_must_match(self):
+        """Test that every term in a multi-term query must match"""
+        self.assertEqual(search_devices("catalyst 93")[0], 1)
+        self.assertEqual(search_devices("catalyst storage")[0], 0)
+
+    def test_index_refreshes_after_save(self):
+        """Test that saving a device invalidates the index"""
+        Device.objects.create(
+            device_id="hpe-dl380", name="ProLiant DL380", category="servers", ru_size=2, power_draw=800
+        )
+        self.assertEqual(search_devices("proliant")[0], 1)
+
+    def test_search_endpoint_paging(self):
+        """Test the search endpoint with category filter and paging"""
+        response = self.client.get("/api/devices/search", {"q": "", "page_size": 2, "page": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len(data["results"]), 1)
+
+        response = self.client.get("/api/devices/search", {"q": "a", "category": "Storage"})
+        self.assertEqual([d["device_id"] for d in response.json()["results"]], ["netapp-a400"])
+
+    def test_search_endpoint_invalid_page(self):
+        """Test that invalid paging parameters are rejected"""
+        response = self.client.get("/api/devices/search", {"q": "x", "page": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PasskeyChallengeStoreTest(TestCase):
+    """Test cases for passkey challenge storage and expiry"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="alice", email="alice@example.com")
+
+    def _create_challenge(self, challenge, expires_in):
+        return PasskeyChallenge.objects.create(
+            handle=new_handle(),
+            user=self.user,
+            challenge=challenge,
+            challenge_type="authentication",
+            expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    def test_purge_removes_only_expired(self):
+        """Test that purging deletes expired challenges in batches and keeps live ones"""
+        for i in range(5):
+            self._create_challenge(f"expired-{i}", -60)
+        self._create_challenge("live", 60)
+
+        self.assertEqual(purge_expired_challenges(batch_size=2), 5)
+        self.assertEqual(list(PasskeyChallenge.objects.values_list("challenge", flat=True)), ["live"])
+
+    def test_purge_max_batches(self):
+        """Test that max_batches bounds the amount of work done per call"""
+        for i in range(5):
+            self._create_challenge(f"expired-{i}", -60)
+
+        self.assertEqual(purge_expired_challenges(batch_size=2, max_batches=1), 2)
+        self.assertEqual(PasskeyChallenge.objects.count(), 3)
+
+    def test_issue_replaces_previous_challenge(self):
+        """Test that issuing a challenge keeps a single row per user and type"""
+        store = DatabaseChallengeStore()
+        first = store.issue(self.user, "registration", "first")
+        second = store.issue(self.user, "registration", "second")
+        store.issue(self.user, "authentication", "auth")
+
+        self.assertEqual(PasskeyChallenge.objects.filter(challenge_type="registration").count(), 1)
+        self.assertIsNone(store.take(first.handle, "registration"))
+        self.assertEqual(store.take(second.handle, "registration").challenge, "second")
+
+    def test_issue_purges_expired_once_per_interval(self):
+        """Test that issuing challenges opportunistically reaps expired rows"""
+        self._create_challenge("expired", -60)
+        DatabaseChallengeStore().issue(None, "authentication", "anon")
+        self.assertFalse(PasskeyChallenge.objects.filter(challenge="expired").exists())
+        self.assertTrue(cache.get(PURGE_THROTTLE_CACHE_KEY))
+
+        self._create_challenge("expired-again", -60)
+        DatabaseChallengeStore().issue(None, "authentication", "anon-2")
+        self.assertTrue(PasskeyChallenge.objects.filter(challenge="expired-again").exists())
+
+    def test_take_consumes_once(self):
+        """Test that a handle is looked up by key and can only be taken once"""
+        store = DatabaseChallengeStore()
+        stored = store.issue(None, "authentication", "anon")
+        self.assertIsNone(stored.user_id)
+        self.assertIsNone(store.take(stored.handle, "registration"))
+
+        taken = store.take(stored.handle, "authentication")
+        self.assertEqual((taken.challenge, taken.user_id), ("anon", None))
+        self.assertIsNone(store.take(stored.handle, "authentication"))
+        self.assertEqual(PasskeyChallenge.objects.count(), 0)
+
+    def test_take_ignores_expired(self):
+        """Test that expired challenges cannot be taken"""
+        challenge = self._create_challenge("expired", -60)
+        self.assertIsNone(DatabaseChallengeStore().take(challenge.handle, "authentication"))
+
+    @override_settings(PASSKEY_CHALLENGE_TTL_SECONDS=60)
+    def test_cache_store_round_trip(self):
+        """Test that the cache store issues and consumes challenges without database rows"""
+        store = CacheChallengeStore()
+        stored = store.issue(self.user, "registration", "cached")
+
+        taken = store.take(stored.handle, "registration")
+        self.assertEqual((taken.challenge, taken.user_id), ("cached", self.user.pk))
+        self.assertIsNone(store.take(stored.handle, "registration"))
+        self.assertEqual(PasskeyChallenge.objects.count(), 0)
+
+    def test_complete_authentication_requires_handle(self):
+        """Test that completing authentication without a challenge handle is rejected"""
+        response = self.client.post(
+            "/api/auth/passkey/login/complete", {"credential": {"id": "abc"}}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["error"], "Missing challenge_id")
+
+    def test_purge_command(self):
+        """Test the purge_passkey_challenges management command"""
+        self._create_challenge("expired", -60)
+        out = StringIO()
+        call_command("purge_passkey_challenges", "--batch-size", "10", stdout=out)
+        self.assertIn("Deleted 1 expired passkey challenge(s)", out.getvalue())
+
+
+class PasskeyCredentialTest(TestCase):
+    """Test cases for the passkey credential lookups"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="bob", email="bob@example.com")
+        self.passkey = Passkey.objects.create(
+            user=self.user, credential_id="Y3JlZC0x", public_key="cHVibGljLWtleQ==", sign_count=0, name="Laptop"
+        )
+
+    def tearDown(self):
+        flush_last_used()
+
+    def test_get_credential_reads_current_row(self):
+        """Test that credential lookups decode the public key and see sign count changes and deletes at once"""
+        with self.assertNumQueries(1):
+            credential = get_credential("Y3JlZC0x")
+        self.assertEqual(credential.public_key, b"public-key")
+        self.assertEqual(credential.user_id, self.user.id)
+        self.assertIsNone(get_credential("missing"))
+
+        # Writes from another process send no signals here
+        Passkey.objects.filter(pk=self.passkey.pk).update(sign_count=7)
+        self.assertEqual(get_credential("Y3JlZC0x").sign_count, 7)
+        Passkey.objects.filter(pk=self.passkey.pk).delete()
+        self.assertIsNone(get_credential("Y3JlZC0x"))
+
+    def test_user_credential_ids(self):
+        """Test that a new passkey is listed in the user's credential ids"""
+        self.assertEqual(get_user_credential_ids(self.user.id), [b"cred-1"])
+        Passkey.objects.create(user=self.user, credential_id="Y3JlZC0y", public_key="", name="Phone")
+        self.assertEqual(sorted(get_user_credential_ids(self.user.id)), [b"cred-1", b"cred-2"])
+
+    @override_settings(PASSKEY_LAST_USED_FLUSH_INTERVAL=3600)
+    def test_last_used_is_written_behind(self):
+        """Test that logins buffer last_used_at and only write changed sign counts"""
+        credential = get_credential("Y3JlZC0x")
+        when = timezone.now()
+
+        with self.assertNumQueries(0):
+            record_authentication("Y3JlZC0x", credential, 0, when)
+        self.assertEqual(len(last_used_buffer), 1)
+        self.passkey.refresh_from_db()
+        self.assertIsNone(self.passkey.last_used_at)
+
+        record_authentication("Y3JlZC0x", credential, 5, when)
+        self.assertEqual(get_credential("Y3JlZC0x").sign_count, 5)
+
+        self.assertEqual(flush_last_used(), 1)
+        self.passkey.refresh_from_db()
+        self.assertEqual((self.passkey.sign_count, self.passkey.last_used_at), (5, when))
+        self.assertEqual(len(last_used_buffer), 0)
+
+    @override_settings(PASSKEY_LAST_USED_FLUSH_INTERVAL=0)
+    def test_last_used_written_immediately_when_buffering_disabled(self):
+        """Test that a flush interval of 0 writes last_used_at on every login"""
+        when = timezone.now()
+        record_authentication("Y3JlZC0x", get_credential("Y3JlZC0x"), 0, when)
+        self.passkey.refresh_from_db()
+        self.assertEqual(self.passkey.last_used_at, when)
+
+
+class SessionStorageTest(TestCase):
+    """Test cases for session storage and cached user loading"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="carol", email="carol@example.com")
+
+    def test_users_are_read_on_every_request_by_default(self):
+        """Test that deactivating a user applies to the next request without the user cache"""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/api/auth/user").status_code, status.HTTP_200_OK)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertNotEqual(self.client.get("/api/auth/user").status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=["api.auth_backends.CachedModelBackend"],
+        SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    )
+    def test_authenticated_requests_skip_database(self):
+        """Test that repeat session-authenticated requests need no database queries"""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/api/auth/user").json()["user"]["username"], "carol")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/user")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTHENTICATION_BACKENDS=["api.auth_backends.CachedModelBackend"])
+    def test_cached_user_invalidated_on_save(self):
+        """Test that saving a user drops the cached copy"""
+        self.client.force_login(self.user)
+        self.client.get("/api/auth/user")
+
+        self.user.email = "carol@new.example.com"
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/user").json()["user"]["email"], "carol@new.example.com")
+
+    def test_purge_expired_sessions_command(self):
+        """Test that the purge command deletes only expired sessions"""
+        now = timezone.now()
+        for i in range(3):
+            Session.objects.create(session_key=f"expired{i}", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command("purge_expired_sessions", "--batch-size", "2", stdout=out)
+        self.assertIn("Deleted 3 expired session(s)", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+class ConnectionBenchmarkTest(TestCase):
+    """Test cases for the connection benchmark"""
+
+    def test_benchmark_command(self):
+        """Test that the connection benchmark reports the saving of persistent connections"""
+        out = StringIO()
+        call_command("benchmark_db_connections", "--requests", "20", "--threads", "2", stdout=out)
+        self.assertIn("connect", out.getvalue())
+        self.assertIn("saves", out.getvalue())
+
+
+@skipUnless(hasattr(settings, "SQLITE_PERFORMANCE_OPTIONS"), "SQLite performance mode needs DB_ENGINE=sqlite")
+class SQLitePerformanceModeTest(TestCase):
+    """Test cases for the SQLite tuning profile and the write concurrency benchmark"""
+
+    def test_pragmas_applied_on_connect(self):
+        """Test that a new connection runs in WAL mode with the tuned pragmas and immediate transactions"""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {
+                **connections["default"].settings_dict,
+                "NAME": os.path.join(directory, "tuned.sqlite3"),
+                "OPTIONS": settings.SQLITE_PERFORMANCE_OPTIONS,
+            }
+            db = SQLiteDatabaseWrapper(settings_dict, alias="sqlite-tuning-test")
+            try:
+                with db.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in ("journal_mode", "synchronous", "cache_size", "temp_store"):
+                        cursor.execute(f"PRAGMA {pragma}")
+                        pragmas[pragma] = cursor.fetchone()[0]
+                self.assertEqual(pragmas["journal_mode"], "wal")
+                self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+                self.assertLess(pragmas["cache_size"], 0)  # Size in KiB rather than pages
+                self.assertEqual(pragmas["temp_store"], 2)  # MEMORY
+                self.assertEqual(db.transaction_mode, "IMMEDIATE")
+            finally:
+                db.close()
+
+    def test_benchmark_command(self):
+        """Test that the write benchmark runs both profiles from separate processes"""
+        out = StringIO()
+        call_command("benchmark_sqlite_writes", "--workers", "2", "--writes", "5", stdout=out)
+        self.assertIn("stock", out.getvalue())
+        self.assertIn("x stock", out.getvalue())
+
+
+class AsyncViewTest(TestCase):
+    """Test cases for the async read views served under ASGI"""
+
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.create(name="Async Site")
+        self.rack = Rack.objects.create(site=self.site, name="A1")
+        for index in range(3):
+            device = Device.objects.create(
+                device_id=f"async-{index}", name=f"Async {index}", category="servers", ru_size=1, power_draw=100
+            )
+            RackDevice.objects.create(rack=self.rack, device=device, position=index + 1)
+        RackConfiguration.objects.create(site=self.site, name="Config A", config_data={"racks": []})
+
+    def test_views_are_coroutines(self):
+        """Test that the read-heavy endpoints resolve to async views"""
+        for url in (
+            f"/api/sites/{self.site.id}/resource-usage",
+            f"/api/racks/{self.rack.id}/resource-usage",
+            f"/api/sites/{self.site.id}/racks",
+            "/api/rack-configs",
+            "/api/racks",
+            "/api/devices",
+        ):
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    async def test_resource_usage(self):
+        """Test that resource usage is computed from prefetched data without lazy queries"""
+        response = await self.async_client.get(f"/api/sites/{self.site.id}/resource-usage")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["total_power_draw"], 300)
+        self.assertEqual(response.json()["racks"][0]["device_count"], 3)
+
+        response = await self.async_client.get(f"/api/racks/{self.rack.id}/resource-usage")
+        self.assertEqual(response.json()["site_name"], "Async Site")
+        self.assertEqual(len(response.json()["devices"]), 3)
+
+    async def test_paginated_listing(self):
+        """Test that async pagination matches PageNumberPagination, including invalid pages"""
+        response = await self.async_client.get("/api/devices")
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len(data["results"]), 3)
+
+        response = await self.async_client.get("/api/racks", {"site_id": self.site.id})
+        self.assertEqual(response.json()["results"][0]["power_utilization"], 300)
+
+        response = await self.async_client.get("/api/racks", {"page": 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_sync_handlers_still_work(self):
+        """Test that writes on the async views keep running synchronously"""
+        response = await self.async_client.post(
+            f"/api/sites/{self.site.id}/racks",
+            {"name": "Config B", "configData": {"racks": []}},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = await self.async_client.get(f"/api/sites/{self.site.id}/racks/Config B")
+        self.assertEqual(response.json()["name"], "Config B")
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_SIZE=50)
+class ProfilingMiddlewareTest(TestCase):
+    """Test cases for the request profiling middleware and endpoint"""
+
+    def setUp(self):
+        profiling.reset()
+        Site.objects.create(name="Profiled Site")
+
+    def test_records_per_url_name(self):
+        """Test that requests are aggregated by URL name with SQL and serializer measurements"""
+        for _ in range(3):
+            response = self.client.get("/api/sites")
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn("queries", response["Server-Timing"])
+
+        stats = profiling.snapshot()["site-list"]
+        self.assertEqual(stats["count"], 3)
+        self.assertGreaterEqual(stats["sql_queries"]["p50"], 1)
+        self.assertGreater(stats["serializer_ms"]["max"], 0)
+        self.assertEqual(stats["response_bytes"]["max"], len(response.content))
+        self.assertLessEqual(stats["wall_ms"]["p50"], stats["wall_ms"]["p99"])
+
+    def test_samples_are_bounded(self):
+        """Test that only the most recent PROFILING_SAMPLE_SIZE requests are kept"""
+        for _ in range(60):
+            self.client.get("/api/auth/config")
+        self.assertEqual(profiling.snapshot()["auth-config"]["count"], 50)
+
+    def test_endpoint_requires_admin(self):
+        """Test that the profiling endpoint is restricted to staff users"""
+        user = get_user_model().objects.create_user(username="dave")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/api/profiling").status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        self.client.get("/api/sites")
+        response = self.client.get("/api/profiling")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("site-list", response.json()["endpoints"])
+
+        self.client.delete("/api/profiling")
+        self.assertNotIn("site-list", profiling.snapshot())
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        """Test that nothing is recorded when profiling is disabled"""
+        response = self.client.get("/api/sites")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(profiling.snapshot(), {})
+
+
+class BenchmarkSuiteTest(TestCase):
+    """Test cases for the benchmark data generator and runner"""
+
+    def test_generator_is_deterministic(self):
+        """Test that the same spec produces the same placements and respects the requested scale"""
+        spec = DatacenterSpec(racks=12, racks_per_site=5, devices=20, rack_configs=3)
+        datacenter = generate_datacenter(spec)
+
+        self.assertEqual(datacenter.counts["sites"], 3)
+        self.assertEqual(Rack.objects.count(), 12)
+        self.assertEqual(RackConfiguration.objects.count(), 3)
+        placements = list(
+            RackDevice.objects.order_by("rack__name", "position").values_list("device__device_id", "position")
+        )
+
+        RackConfiguration.objects.all().delete()
+        Site.objects.all().delete()
+        Device.objects.all().delete()
+        HardwareProvider.objects.all().delete()
+        generate_datacenter(spec)
+        self.assertEqual(
+            list(RackDevice.objects.order_by("rack__name", "position").values_list("device__device_id", "position")),
+            placements,
+        )
+
+    def test_run_and_compare(self):
+        """Test that the runner times every API case and reports comparable results"""
+        datacenter = generate_datacenter(DatacenterSpec(racks=10, devices=10, rack_configs=2))
+        report = run_benchmarks(datacenter, build_cases(datacenter, include_mcp=False), repeat=2, warmup=0)
+
+        self.assertEqual(report["dataset"]["counts"]["racks"], 10)
+        self.assertIn("api.add_device", report["results"])
+        self.assertEqual(report["results"]["api.rack_config.load"]["iterations"], 2)
+
+        comparison = compare_reports(report, report)
+        self.assertEqual({row["change"] for row in comparison}, {0.0})
+
+
+class TrafficReplayTest(TestCase):
+    """Test cases for traffic recording and the load-test replay harness"""
+
+    def setUp(self):
+        fd, self.recording = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, self.recording)
+
+    def test_parse_access_log(self):
+        """Test that gunicorn access log lines are parsed with relative offsets and other lines skipped"""
+        lines = [
+            '127.0.0.1 - - [10/Oct/2026:13:55:38 +0000] "GET /api/sites/1/racks?x=1 HTTP/1.1" 200 512 "-" "curl" 1500',
+            "[2026-10-10 13:55:37 +0000] [42] [INFO] Booting worker with pid: 42",
+            '127.0.0.1 - - [10/Oct/2026:13:55:36 +0000] "POST /api/save HTTP/1.1" 201 12 "-" "Mozilla/5.0" 25000',
+        ]
+        requests = parse_access_log(lines)
+        self.assertEqual(
+            [(r.method, r.path, r.offset) for r in requests],
+            [
+                ("POST", "/api/save", 0.0),
+                ("GET", "/api/sites/1/racks?x=1", 2.0),
+            ],
+        )
+        self.assertEqual(requests[0].recorded_ms, 25.0)
+
+    def test_middleware_records_requests(self):
+        """Test that requests are recorded with bodies and excluded prefixes are skipped"""
+        with override_settings(TRAFFIC_RECORDING_FILE=self.recording):
+            client = Client()
+            client.post("/api/sites", {"name": "Recorded Site"}, content_type="application/json")
+            client.get("/api/sites?page=1")
+            client.get("/api/auth/config")
+
+        with open(self.recording) as f:
+            requests = parse_recording(f)
+        self.assertEqual([(r.method, r.path) for r in requests], [("POST", "/api/sites"), ("GET", "/api/sites?page=1")])
+        self.assertEqual(json.loads(requests[0].body), {"name": "Recorded Site"})
+        self.assertEqual(requests[0].content_type, "application/json")
+        self.assertEqual(requests[0].recorded_status, 201)
+
+    def test_replay_and_summarize(self):
+        """Test that a replay reports throughput, percentiles and errors per endpoint"""
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status = 500 if self.path.startswith("/api/broken") else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        lines = [
+            json.dumps({"ts": 100.0, "method": "GET", "path": "/api/sites/1/racks"}),
+            json.dumps({"ts": 100.5, "method": "GET", "path": "/api/sites/2/racks"}),
+            json.dumps({"ts": 101.0, "method": "GET", "path": "/api/broken"}),
+        ]
+        results, elapsed = replay(
+            parse_recording(lines), f"http://127.0.0.1:{server.server_port}", concurrency=2, multiplier=4
+        )
+        summary = summarize(results, elapsed)
+
+        self.assertEqual(summary["requests"], 12)
+        self.assertEqual(summary["status_codes"], {"200": 8, "500": 4})
+        self.assertAlmostEqual(summary["error_rate"], 1 / 3, places=3)
+        self.assertEqual(summary["endpoints"]["GET /api/sites/{id}/racks"]["requests"], 8)
+        self.assertLessEqual(summary["latency_ms"]["p50"], summary["latency_ms"]["p99"])
+
+
+class ConfigImportTest(TestCase):
+    """Test cases for the streaming configuration import"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Import Site")
+        Device.objects.create(device_id="srv-1u", name="Server", category="servers", ru_size=1, power_draw=300)
+        Device.objects.create(device_id="sw-1u", name="Switch", category="network", ru_size=1, power_draw=150)
+        self.config = {
+            "configId": "config-1",
+            "settings": {"totalPowerCapacity": 10000, "ruPerRack": 48},
+            "racks": [
+                {
+                    "id": "rack-1",
+                    "name": "Räck 1",
+                    "devices": [
+                        {"id": "srv-1u", "name": "Server", "position": 1, "customName": "web-01"},
+                        {"id": "sw-1u", "name": "Switch", "position": 42, "customName": "Switch"},
+                        {"id": "legacy-9000", "name": "Legacy", "position": 10},
+                    ],
+                },
+                {"id": "rack-2", "name": "Rack 2", "ruSize": 42, "devices": [{"id": "srv-1u", "position": 3}]},
+                {"id": "rack-3", "name": "rack 2", "devices": []},
+                {"id": "rack-4", "name": "Rack 4", "devices": []},
+            ],
+            "unrackedDevices": [{"id": "srv-1u", "instanceId": "spare-1"}],
+            "providers": [
+                {
+                    "name": "PDU A",
+                    "type": "power",
+                    "powerCapacity": 5000,
+                    "ruSize": 1,
+                    "rackId": "rack-1",
+                    "position": 48,
+                },
+                {"name": "CRAC", "type": "cooling", "coolingCapacity": 60000, "isPlaced": True},
+                {"name": "PDU template", "type": "power", "isPlaced": False},
+            ],
+        }
+
+    def test_parser_streams_array_elements(self):
+        """Test that top-level arrays are yielded per element even when reads split values and characters"""
+        data = json.dumps(self.config, ensure_ascii=False).encode("utf-8")
+        members = list(iter_config(BytesIO(data), read_size=3))
+
+        self.assertEqual(members[0], ("configId", "config-1"))
+        self.assertEqual(members[1], ("settings", self.config["settings"]))
+        self.assertEqual(
+            [value["name"] for key, value in members if key == "racks"], ["Räck 1", "Rack 2", "rack 2", "Rack 4"]
+        )
+        self.assertEqual(len([key for key, _ in members if key == "providers"]), 3)
+
+        with self.assertRaises(ConfigParseError):
+            list(iter_config(BytesIO(data[:-20])))
+        with self.assertRaises(ConfigParseError):
+            list(iter_config(BytesIO(b'["not", "an", "object"]')))
+
+    @override_settings(CONFIG_IMPORT_BATCH_SIZE=2)
+    def test_import_endpoint(self):
+        """Test that the import commits racks, devices and providers in batches and reports progress"""
+        response = self.client.post(
+            f"/api/sites/{self.site.id}/import", data=json.dumps(self.config), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual([event["event"] for event in events], ["progress"] * 4 + ["done"])
+        done = events[-1]
+        self.assertEqual((done["racksCreated"], done["racksSkipped"]), (3, 1))
+        self.assertEqual((done["devicesCreated"], done["devicesSkipped"]), (3, 1))
+        self.assertEqual((done["providersCreated"], done["unrackedDevices"]), (2, 1))
+        self.assertEqual(done["unknownDevices"], ["legacy-9000"])
+
+        rack = Rack.objects.get(site=self.site, name="Räck 1")
+        self.assertEqual(rack.ru_height, 48)
+        self.assertEqual(list(rack.rack_devices.values_list("position", "instance_name")), [(1, "web-01"), (42, None)])
+        self.assertEqual(Provider.objects.get(name="PDU A").rack, rack)
+
+    def test_import_validates_providers(self):
+        """Test that providers failing model validation are skipped with the reason and the rest are created"""
+        self.config["providers"].append(
+            {"name": "PDU B", "type": "power", "ruSize": 2, "rackId": "rack-2", "position": 42}
+        )
+        response = self.client.post(
+            f"/api/sites/{self.site.id}/import", data=json.dumps(self.config), content_type="application/json"
+        )
+        done = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()][-1]
+        self.assertEqual((done["providersCreated"], done["providersSkipped"]), (2, 1))
+        skipped = [item for item in done["skipped"] if item["type"] == "provider"]
+        self.assertEqual(skipped[0]["item"], "PDU B")
+        self.assertIn("exceeds rack height", skipped[0]["reason"])
+        self.assertFalse(Provider.objects.filter(name="PDU B").exists())
+
+    def test_import_skips_overlapping_and_oversized_devices(self):
+        """Test that multi-RU devices overlapping another device or extending past the rack top are skipped"""
+        Device.objects.create(device_id="srv-2u", name="Server 2U", category="servers", ru_size=2, power_draw=500)
+        self.config["racks"][1]["devices"] = [
+            {"id": "srv-2u", "instanceId": "db-01", "position": 3},
+            {"id": "srv-1u", "instanceId": "web-02", "position": 4},
+            {"id": "srv-1u", "instanceId": "web-03", "position": 5},
+            {"id": "srv-2u", "instanceId": "db-02", "position": 42},
+        ]
+        response = self.client.post(
+            f"/api/sites/{self.site.id}/import", data=json.dumps(self.config), content_type="application/json"
+        )
+        done = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()][-1]
+
+        skipped = {item["item"]: item["reason"] for item in done["skipped"] if item["type"] == "device"}
+        self.assertEqual(skipped["Rack 2/web-02"], "overlaps another device")
+        self.assertEqual(skipped["Rack 2/db-02"], "does not fit in the 42U rack at position 42")
+        rack = Rack.objects.get(site=self.site, name="Rack 2")
+        self.assertEqual(list(rack.rack_devices.order_by("position").values_list("position", flat=True)), [3, 5])
+
+    def test_import_endpoint_errors(self):
+        """Test that an empty body is rejected and invalid JSON ends the stream with an error event"""
+        url = f"/api/sites/{self.site.id}/import"
+        self.assertEqual(self.client.post(url, data=b"", content_type="application/json").status_code, 400)
+        self.assertEqual(
+            self.client.post("/api/sites/999999/import", data=b"{}", content_type="application/json").status_code, 404
+        )
+
+        response = self.client.post(url, data=b'{"racks": [{"name": "A"}, ', content_type="application/json")
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]["event"], "error")
+        self.assertEqual(events[-1]["error"], "Invalid configuration file")
+
+    async def test_import_endpoint_under_asgi(self):
+        """Test that progress is streamed from an async iterator when served under ASGI"""
+        response = await self.async_client.post(
+            f"/api/sites/{self.site.id}/import", data=json.dumps(self.config), content_type="application/json"
+        )
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body.splitlines()[-1])["racksCreated"], 3)
+        self.assertEqual(await Rack.objects.filter(site_id=self.site.id).acount(), 3)
+
+    def test_import_command_skips_or_replaces_existing_racks(self):
+        """Test that re-running the import skips existing racks unless --replace is given"""
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.config, f)
+        self.addCleanup(os.remove, path)
+
+        call_command("import_rack_config", path, "--site", "New Site", "--create-site", stdout=StringIO())
+        site = Site.objects.get(name="New Site")
+        self.assertEqual(Rack.objects.filter(site=site).count(), 3)
+
+        out = StringIO()
+        call_command("import_rack_config", path, "--site", str(site.id), stdout=out)
+        self.assertIn("0 racks (0 replaced, 4 skipped)", out.getvalue())
+
+        RackDevice.objects.filter(rack__site=site).delete()
+        out = StringIO()
+        call_command("import_rack_config", path, "--site", "new site", "--replace", "--batch-size", "1", stdout=out)
+        self.assertIn("3 racks (3 replaced, 1 skipped)", out.getvalue())
+        self.assertIn("2 providers (2 replaced, 0 skipped)", out.getvalue())
+        self.assertEqual(Provider.objects.filter(site=site).count(), 2)
+        self.assertEqual(RackDevice.objects.filter(rack__site=site).count(), 3)
+
+
+class RackConfigurationProjectionTest(TestCase):
+    """Test cases for projecting saved rack configurations into Rack and RackDevice rows"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Projection Site")
+        Device.objects.create(device_id="srv-1u", name="Server", category="servers", ru_size=1, power_draw=300)
+        Device.objects.create(device_id="sw-1u", name="Switch", category="network", ru_size=1, power_draw=150)
+        Device.objects.create(device_id="gpu-4u", name="GPU Node", category="compute", ru_size=4, power_draw=2400)
+        self.data = {
+            "settings": {"ruPerRack": 48},
+            "racks": [
+                {
+                    "id": "rack-a",
+                    "name": "Rack A",
+                    "devices": [
+                        {"id": "srv-1u", "name": "Server", "instanceId": "i-1", "position": 1, "customName": "web-01"},
+                        {"id": "sw-1u", "name": "Switch", "instanceId": "i-2", "position": 40, "customName": "Switch"},
+                    ],
+                },
+                {
+                    "id": "rack-b",
+                    "name": "Rack B",
+                    "ruSize": 42,
+                    "devices": [
+                        {"id": "gpu-4u", "name": "GPU Node", "instanceId": "i-3", "position": 10},
+                        {
+                            "id": "custom-gpu",
+                            "name": "Custom GPU",
+                            "ruSize": 4,
+                            "powerDraw": 2400,
+                            "instanceId": "i-5",
+                            "position": 20,
+                        },
+                    ],
+                },
+            ],
+        }
+        self.config = RackConfiguration.objects.create(site=self.site, name="Layout", config_data=self.data)
+
+    def _save(self, data):
+        self.config.config_data = data
+        with CaptureQueriesContext(connection) as queries:
+            self.config.save()
+        # Writes made by the projection, leaving out the configuration's own UPDATE and change events
+        return [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            and "rack_configurations" not in q["sql"]
+            and "change_events" not in q["sql"]
+        ]
+
+    def test_save_projects_racks_and_placements(self):
+        """Test that saving a configuration creates its racks and placements, skipping unknown device types"""
+        racks = {rack.source_key: rack for rack in Rack.objects.filter(source_config=self.config)}
+        self.assertEqual(set(racks), {"rack-a", "rack-b"})
+        self.assertEqual((racks["rack-a"].name, racks["rack-a"].ru_height), ("Rack A", 48))
+        self.assertEqual(racks["rack-b"].ru_height, 42)
+
+        web = RackDevice.objects.get(source_key="i-1")
+        self.assertEqual((web.rack_id, web.position, web.instance_name), (racks["rack-a"].id, 1, "web-01"))
+        self.assertIsNone(RackDevice.objects.get(source_key="i-2").instance_name)
+        self.assertEqual(RackDevice.objects.get(source_key="i-3").device.device_id, "gpu-4u")
+        self.assertFalse(Device.objects.filter(device_id="custom-gpu").exists())
+        self.assertFalse(RackDevice.objects.filter(source_key="i-5").exists())
+
+        stats = project_configuration(self.config, full=True)
+        self.assertEqual((stats.placements_skipped, stats.unknown_devices), (1, 1))
+
+    def test_save_writes_only_changed_racks(self):
+        """Test that a save rewrites only the racks and placements that changed"""
+        placements = {row.source_key: row.id for row in RackDevice.objects.all()}
+        rack_b = Rack.objects.get(source_key="rack-b")
+
+        data = json.loads(json.dumps(self.data))
+        data["metadata"] = {"note": "editor state only"}
+        self.assertEqual(self._save(data), [])
+
+        data["racks"][0]["devices"][0]["customName"] = "web-02"
+        data["racks"][0]["devices"][1]["position"] = 41
+        data["racks"][0]["devices"].append({"id": "srv-1u", "name": "Server", "instanceId": "i-4", "position": 2})
+        self.assertTrue(self._save(data))
+
+        rows = {row.source_key: row for row in RackDevice.objects.all()}
+        self.assertEqual(rows["i-1"].id, placements["i-1"])
+        self.assertEqual(rows["i-1"].instance_name, "web-02")
+        self.assertEqual(rows["i-2"].position, 41)
+        self.assertEqual(rows["i-3"].id, placements["i-3"])
+        self.assertEqual(rows["i-4"].position, 2)
+        self.assertEqual(Rack.objects.get(id=rack_b.id).updated_at, rack_b.updated_at)
+
+    def test_removed_racks_and_renames(self):
+        """Test that racks removed from the blob are deleted and names taken by other racks get a prefix"""
+        Rack.objects.create(site=self.site, name="Rack C")
+        rack_a = Rack.objects.get(source_key="rack-a")
+        Provider.objects.create(site=self.site, name="PDU", type="power", ru_size=1, rack=rack_a, position=48)
+
+        data = json.loads(json.dumps(self.data))
+        data["racks"] = [dict(data["racks"][1], name="Rack A"), {"id": "rack-c", "name": "Rack C", "devices": []}]
+        self._save(data)
+
+        names = dict(Rack.objects.filter(source_config=self.config).values_list("source_key", "name"))
+        self.assertEqual(names, {"rack-b": "Rack A", "rack-c": "Layout / Rack C"})
+        self.assertEqual(RackDevice.objects.count(), 1)
+        pdu = Provider.objects.get(name="PDU")
+        self.assertEqual((pdu.rack, pdu.position), (None, None))
+
+        data["racks"] = [dict(data["racks"][0], name="Rack C"), dict(data["racks"][1], name="Rack A")]
+        self._save(data)
+        names = dict(Rack.objects.filter(source_config=self.config).values_list("source_key", "name"))
+        self.assertEqual(names, {"rack-b": "Layout / Rack C", "rack-c": "Rack A"})
+
+    def test_delete_and_command_rebuild(self):
+        """Test that the command repairs edited rows and deleting a configuration removes its racks"""
+        RackDevice.objects.filter(source_key="i-1").delete()
+        out = StringIO()
+        call_command("project_rack_configurations", "--site", "projection site", stdout=out)
+        self.assertFalse(RackDevice.objects.filter(source_key="i-1").exists())
+        call_command("project_rack_configurations", "--full", stdout=out)
+        self.assertTrue(RackDevice.objects.filter(source_key="i-1").exists())
+        self.assertIn("Projected 1 configurations", out.getvalue())
+
+        self.config.delete()
+        self.assertFalse(Rack.objects.filter(site=self.site).exists())
+
+
+class JobQueueTest(TestCase):
+    """Test cases for the database-backed background job queue"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Job Site")
+        self.calls = []
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        overrides = override_settings(
+            JOB_RETRY_DELAY=0, JOB_CONCURRENCY_LIMITS={"config_import": 1, "flaky": 1}, JOB_STORAGE_DIR=storage.name
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        def flaky(job, context):
+            self.calls.append(job.attempts)
+            context.report(force=True, step=job.attempts)
+            if job.attempts < job.params["succeed_on"]:
+                raise RuntimeError(f"attempt {job.attempts} failed")
+            return {"attempts": job.attempts}
+
+        jobs.HANDLERS["flaky"] = jobs.JobHandler("flaky", flaky)
+        self.addCleanup(jobs.HANDLERS.pop, "flaky")
+
+    def test_failed_jobs_are_retried_until_out_of_attempts(self):
+        """Test that a failing job is retried with backoff and fails once it has used max_attempts"""
+        retried = jobs.enqueue("flaky", {"succeed_on": 2}, max_attempts=3)
+        exhausted = jobs.enqueue("flaky", {"succeed_on": 5}, max_attempts=2)
+        with self.assertLogs("api.jobs", "ERROR") as logs:
+            call_command("run_jobs", "--once", stdout=StringIO())
+        self.assertEqual(len(logs.records), 3)
+
+        retried.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts, retried.result), ("succeeded", 2, {"attempts": 2}))
+        self.assertEqual(retried.progress, {"step": 2})
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.attempts), ("failed", 2))
+        self.assertEqual(exhausted.error, "attempt 2 failed")
+
+    def test_concurrency_limit_and_stale_jobs(self):
+        """Test that per-kind limits hold jobs back and jobs of dead workers are requeued"""
+        running = jobs.enqueue("flaky", {"succeed_on": 1})
+        self.assertEqual(jobs.claim_job("worker-a").id, running.id)
+        queued = jobs.enqueue("flaky", {"succeed_on": 1})
+        self.assertIsNone(jobs.claim_job("worker-b"))
+
+        Job.objects.filter(id=running.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        running.refresh_from_db()
+        self.assertEqual((running.status, running.worker), ("queued", ""))
+        self.assertEqual(jobs.claim_job("worker-b").id, running.id)
+        self.assertEqual(Job.objects.get(id=queued.id).status, "queued")
+
+    def test_stale_worker_keeps_job_file(self):
+        """Test that a worker whose job was requeued does not delete the file the new attempt reads"""
+        path = jobs.store_job_file(BytesIO(b"{}"), 1024)
+        job = jobs.enqueue("flaky", {"succeed_on": 1, "file": path})
+        stale = jobs.claim_job("worker-a")
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        jobs.requeue_stale_jobs()
+        current = jobs.claim_job("worker-b")
+
+        jobs.run_job(stale)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Job.objects.get(id=job.id).worker, "worker-b")
+        jobs.run_job(current)
+        self.assertFalse(os.path.exists(path))
+
+    def test_background_import_and_job_endpoints(self):
+        """Test that a background import is queued, run by a worker and reported through /api/jobs"""
+        Device.objects.create(device_id="srv-1u", name="Server", category="servers", ru_size=1, power_draw=300)
+        config = {"racks": [{"id": "r1", "name": "Rack 1", "devices": [{"id": "srv-1u", "position": 1}]}]}
+        response = self.client.post(
+            f"/api/sites/{self.site.id}/import?background=true",
+            data=json.dumps(config),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()["id"]
+        path = Job.objects.get(id=job_id).params["file"]
+        self.assertTrue(os.path.exists(path))
+
+        call_command("run_jobs", "--once", "--kind", "config_import", stdout=StringIO())
+        body = self.client.get(f"/api/jobs/{job_id}").json()
+        self.assertEqual(body["status"], "succeeded")
+        self.assertEqual((body["result"]["racksCreated"], body["result"]["devicesCreated"]), (1, 1))
+        self.assertFalse(os.path.exists(path))
+
+        response = self.client.post(
+            "/api/jobs",
+            data={"kind": "project_configurations", "siteId": self.site.id},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        queued_id = response.json()["id"]
+        self.assertEqual(self.client.post(f"/api/jobs/{queued_id}/cancel").json()["status"], "cancelled")
+        self.assertEqual(self.client.post(f"/api/jobs/{queued_id}/cancel").status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            self.client.post("/api/jobs", data={"kind": "config_import"}, content_type="application/json").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        listed = self.client.get(f"/api/jobs?site={self.site.id}&status=cancelled").json()
+        self.assertEqual([job["id"] for job in listed], [queued_id])
+
+
+class JobHeartbeatTest(TransactionTestCase):
+    """Test cases for job heartbeats sent independently of progress reports"""
+
+    @override_settings(JOB_STALE_AFTER=0.2)
+    def test_long_step_keeps_job_alive(self):
+        """Test that a handler step longer than JOB_STALE_AFTER without report() is not requeued as stale"""
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow(job, context):
+            started.set()
+            finish.wait(5)
+            return {}
+
+        jobs.HANDLERS["slow"] = jobs.JobHandler("slow", slow)
+        self.addCleanup(jobs.HANDLERS.pop, "slow")
+        job = jobs.enqueue("slow")
+        claimed = jobs.claim_job("worker-a")
+        runner = threading.Thread(target=jobs.run_job, args=(claimed,))
+        runner.start()
+        try:
+            started.wait(5)
+            time.sleep(0.5)
+            self.assertEqual(jobs.requeue_stale_jobs(), 0)
+        finally:
+            finish.set()
+            runner.join()
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.STATUS_SUCCEEDED)
+
+
+class SiteSnapshotTest(TestCase):
+    """Test cases for columnar site snapshot export and import"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Snapshot Site", description="Primary")
+        self.server = Device.objects.create(
+            device_id="srv-2u", name="Server", category="servers", ru_size=2, power_draw=450, power_ports_used=2
+        )
+        rack_a = Rack.objects.create(site=self.site, name="Rack A", ru_height=48, description="Row 1")
+        rack_b = Rack.objects.create(site=self.site, name="Rack B")
+        RackDevice.objects.create(rack=rack_a, device=self.server, position=1, instance_name="db-01")
+        RackDevice.objects.create(rack=rack_a, device=self.server, position=3)
+        RackDevice.objects.create(rack=rack_b, device=self.server, position=10, instance_name="web-01")
+        Provider.objects.create(
+            site=self.site, name="PDU A", type="power", power_capacity=5000, ru_size=1, rack=rack_a, position=48
+        )
+        Provider.objects.create(site=self.site, name="CRAC", type="cooling", cooling_capacity=60000)
+
+    def _inventory(self, site):
+        return (
+            set(Rack.objects.filter(site=site).values_list("name", "ru_height", "description")),
+            set(
+                RackDevice.objects.filter(rack__site=site).values_list(
+                    "rack__name", "device__device_id", "position", "instance_name"
+                )
+            ),
+            set(
+                Provider.objects.filter(site=site).values_list(
+                    "name", "type", "power_capacity", "cooling_capacity", "rack__name", "position"
+                )
+            ),
+        )
+
+    def test_export_and_import_round_trip(self):
+        """Test that a snapshot downloaded from one site loads the same inventory into another"""
+        response = self.client.get(f"/api/sites/{self.site.id}/snapshot")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("snapshot-site.rksnap", response["Content-Disposition"])
+        data = b"".join(response.streaming_content)
+        self.assertTrue(data.startswith(b"RKSNAP01"))
+
+        copy = Site.objects.create(name="Copy")
+        response = self.client.post(
+            f"/api/sites/{copy.id}/snapshot", data=data, content_type="application/octet-stream"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()["racks_created"], response.json()["devices_created"]), (2, 3))
+        self.assertEqual(self._inventory(copy), self._inventory(self.site))
+
+        response = self.client.post(
+            f"/api/sites/{copy.id}/snapshot", data=data, content_type="application/octet-stream"
+        )
+        self.assertEqual((response.json()["racks_skipped"], response.json()["providers_skipped"]), (2, 2))
+        response = self.client.post(
+            f"/api/sites/{copy.id}/snapshot?replace=true", data=data, content_type="application/octet-stream"
+        )
+        self.assertEqual((response.json()["racks_replaced"], response.json()["providers_replaced"]), (2, 2))
+        self.assertEqual(self._inventory(copy), self._inventory(self.site))
+
+        response = self.client.post(
+            f"/api/sites/{copy.id}/snapshot", data=b"not a snapshot", content_type="application/octet-stream"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_validates_providers(self):
+        """Test that snapshot providers failing model validation are skipped with the reason"""
+        # Written without save(), so full_clean() never saw it
+        Provider.objects.filter(name="PDU A").update(ru_size=2)
+        data = b"".join(self.client.get(f"/api/sites/{self.site.id}/snapshot").streaming_content)
+
+        copy = Site.objects.create(name="Copy")
+        body = self.client.post(
+            f"/api/sites/{copy.id}/snapshot", data=data, content_type="application/octet-stream"
+        ).json()
+        self.assertEqual((body["providers_created"], body["providers_skipped"]), (1, 1))
+        self.assertEqual(body["skipped"][0]["item"], "PDU A")
+        self.assertIn("exceeds rack height", body["skipped"][0]["reason"])
+        self.assertEqual(list(Provider.objects.filter(site=copy).values_list("name", flat=True)), ["CRAC"])
+
+    def test_uncompressed_columns_are_memory_mapped(self):
+        """Test that uncompressed snapshots expose columns without copying and restore missing catalog devices"""
+        fd, path = tempfile.mkstemp(suffix=".rksnap")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command("export_site_snapshot", path, "--site", "snapshot site", "--no-compress", stdout=StringIO())
+
+        with Snapshot(path) as snapshot:
+            self.assertEqual(snapshot.rows, {"devices": 1, "racks": 2, "rack_devices": 3, "providers": 2})
+            positions = snapshot.column("rack_devices", "position")
+            self.assertIsInstance(positions, memoryview)
+            self.assertEqual(sorted(positions), [1, 3, 10])
+            del positions
+            self.assertEqual(snapshot.values("providers", "rack"), [0, -1])
+            self.assertEqual(snapshot.values("devices", "power_draw"), [450])
+
+        self.site.delete()
+        self.server.delete()
+        call_command("import_site_snapshot", path, "--create-site", stdout=StringIO())
+        site = Site.objects.get(name="Snapshot Site")
+        self.assertEqual(site.description, "Primary")
+        server = Device.objects.get(device_id="srv-2u")
+        self.assertEqual((server.ru_size, server.power_draw, server.power_ports_used), (2, 450, 2))
+        self.assertEqual(RackDevice.objects.filter(rack__site=site, device=server).count(), 3)
+
+
+class CapacitySimulationTest(TestCase):
+    """Test cases for the what-if capacity simulator"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Simulation Site")
+        self.server = Device.objects.create(
+            device_id="sim-srv", name="Server", category="servers", ru_size=2, power_draw=500, power_ports_used=2
+        )
+        self.switch = Device.objects.create(
+            device_id="sim-sw", name="Switch", category="network", ru_size=1, power_draw=100, power_ports_used=1
+        )
+        self.rack_a = Rack.objects.create(site=self.site, name="Rack A", ru_height=4)
+        self.rack_b = Rack.objects.create(site=self.site, name="Rack B")
+        RackDevice.objects.create(rack=self.rack_a, device=self.server, position=1)
+        RackDevice.objects.create(rack=self.rack_b, device=self.server, position=1)
+        self.ups = Provider.objects.create(
+            site=self.site, name="UPS", type="power", power_capacity=1500, power_ports_capacity=8
+        )
+        self.pdu = Provider.objects.create(
+            site=self.site, name="PDU", type="power", power_capacity=500, ru_size=1, rack=self.rack_a, position=4
+        )
+        Provider.objects.create(site=self.site, name="CRAC", type="cooling", cooling_capacity=6000)
+
+    def _simulate(self, *scenarios):
+        return self.client.post(
+            f"/api/sites/{self.site.id}/simulate", data={"scenarios": list(scenarios)}, content_type="application/json"
+        )
+
+    def test_scenarios_project_capacity(self):
+        """Test that each scenario is evaluated independently against the baseline"""
+        response = self._simulate(
+            {"name": "grow", "changes": [{"op": "add_devices", "device_id": "sim-sw", "count": 2}]},
+            {
+                "name": "bigger ups",
+                "changes": [
+                    {"op": "swap_provider", "provider_id": self.ups.id, "power_capacity": 3000},
+                    {"op": "add_devices", "device_id": "sim-srv", "count": 1, "rack_id": self.rack_a.id},
+                ],
+            },
+            {"name": "drop rack a", "changes": [{"op": "remove_rack", "rack_id": self.rack_a.id}]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        baseline = data["baseline"]
+        self.assertEqual(baseline["power"], {"draw": 1000, "capacity": 2000, "headroom": 1000, "utilization": 50})
+        self.assertEqual(baseline["hvac"]["load_btu"], round(1000 * settings.WATTS_TO_BTU, 2))
+        self.assertEqual(baseline["ports"], {"used": 4, "capacity": 8, "headroom": 4})
+        self.assertTrue(baseline["feasible"])
+
+        grow, bigger, drop = data["scenarios"]
+        self.assertEqual((grow["power"]["draw"], grow["ports"]["used"]), (1200, 6))
+        self.assertEqual(bigger["power"]["capacity"], 3500)
+        self.assertEqual(bigger["power"]["draw"], 1500)
+        # Rack A holds a 2U server and the 1U PDU in 4U; another 2U server does not fit
+        self.assertEqual(
+            bigger["racks_over_capacity"],
+            [{"rack_id": self.rack_a.id, "rack_name": "Rack A", "ru_used": 5, "ru_height": 4}],
+        )
+        self.assertFalse(bigger["feasible"])
+        # Removing the rack also removes the PDU installed in it
+        self.assertEqual((drop["power"]["draw"], drop["power"]["capacity"]), (500, 1500))
+        self.assertTrue(drop["hvac"]["headroom_btu"] > baseline["hvac"]["headroom_btu"])
+
+    def test_capacities_count_by_provider_type(self):
+        """Test that only power providers add power and ports and only cooling providers add cooling"""
+        crac = Provider.objects.create(
+            site=self.site, name="CRAC 2", type="cooling", cooling_capacity=4000, power_capacity=900
+        )
+        self.ups.cooling_capacity = 5000
+        self.ups.save()
+        response = self._simulate(
+            {"name": "no crac", "changes": [{"op": "remove_provider", "provider_id": crac.id}]},
+            {"name": "bigger crac", "changes": [{"op": "swap_provider", "provider_id": crac.id, "power_capacity": 50}]},
+            {"name": "new crac", "changes": [{"op": "add_provider", "type": "cooling", "power_capacity": 700}]},
+        )
+        data = response.json()
+        baseline = data["baseline"]
+        self.assertEqual(baseline["power"]["capacity"], 2000)
+        self.assertEqual(baseline["hvac"]["cooling_capacity_btu"], 10000)
+        no_crac, bigger_crac, new_crac = data["scenarios"]
+        self.assertEqual((no_crac["power"]["capacity"], no_crac["hvac"]["cooling_capacity_btu"]), (2000, 6000))
+        self.assertEqual((bigger_crac["power"]["capacity"], bigger_crac["hvac"]["cooling_capacity_btu"]), (2000, 10000))
+        self.assertEqual(new_crac["power"]["capacity"], 2000)
+
+    def test_invalid_scenarios_are_rejected(self):
+        """Test that impossible changes are reported with the scenario and change that caused them"""
+        response = self._simulate(
+            {"changes": [{"op": "remove_devices", "device_id": "sim-srv", "count": 3}]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Scenario 0, change 0", response.json()["details"])
+
+        other = Rack.objects.create(site=Site.objects.create(name="Other"), name="Elsewhere")
+        response = self._simulate({"changes": [{"op": "remove_rack", "rack_id": other.id}]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._simulate({"changes": [{"op": "add_devices", "device_id": "missing"}]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_matrix_is_rebuilt_after_changes(self):
+        """Test that the cached site matrix follows writes to the site"""
+        self.assertEqual(self._simulate().json()["baseline"]["power"]["draw"], 1000)
+        RackDevice.objects.create(rack=self.rack_b, device=self.switch, position=10)
+        self.assertEqual(self._simulate().json()["baseline"]["power"]["draw"], 1100)
+
+
+class PowerRedundancyTest(TestCase):
+    """Test cases for N-1/N-2 power redundancy analysis"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Redundancy Site")
+        server = Device.objects.create(
+            device_id="red-srv", name="Server", category="servers", ru_size=1, power_draw=500, power_ports_used=1
+        )
+        self.racks = {}
+        for name, servers in (("A", 2), ("B", 1), ("C", 1)):
+            rack = self.racks[name] = Rack.objects.create(site=self.site, name=f"Rack {name}")
+            for position in range(servers):
+                RackDevice.objects.create(rack=rack, device=server, position=position + 1)
+        # Rack A has A/B PDUs, each able to carry the rack alone; rack B has a single PDU
+        self.pdus = [
+            Provider.objects.create(
+                site=self.site, name=name, type="power", power_capacity=capacity, ru_size=1, rack=rack, position=42
+            )
+            for name, capacity, rack in (
+                ("PDU A1", 1000, self.racks["A"]),
+                ("PDU A2", 1000, self.racks["A"]),
+                ("PDU B1", 600, self.racks["B"]),
+            )
+        ]
+        # Rack C is fed by the shared UPSes
+        for index in range(3):
+            Provider.objects.create(site=self.site, name=f"UPS {index}", type="power", power_capacity=1000)
+
+    def test_racks_at_risk(self):
+        """Test that N-1 and N-2 failures report the racks whose feed cannot carry their load"""
+        response = self.client.get(f"/api/sites/{self.site.id}/power-redundancy")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["survives"], {"n0": True, "n1": False, "n2": False})
+        self.assertEqual([rack["rack_name"] for rack in data["racks_at_risk"]["n1"]], ["Rack B"])
+        self.assertEqual([rack["rack_name"] for rack in data["racks_at_risk"]["n2"]], ["Rack A", "Rack B"])
+        self.assertEqual([point["provider_name"] for point in data["single_points_of_failure"]], ["PDU B1"])
+        self.assertEqual(data["critical_pairs"], [[self.pdus[0].id, self.pdus[1].id]])
+
+        shared = next(feed for feed in data["feeds"] if feed["feed"] == "shared")
+        self.assertEqual((shared["load"], shared["capacity"]), (500, 3000))
+        self.assertEqual((shared["n1_headroom"], shared["n2_headroom"]), (1500, 500))
+
+    def test_port_capacity_is_checked(self):
+        """Test that a feed without enough power ports after a failure puts its racks at risk"""
+        # Rack A's two servers need both PDUs' ports
+        for pdu in self.pdus[:2]:
+            pdu.power_ports_capacity = 1
+            pdu.save()
+        data = self.client.get(f"/api/sites/{self.site.id}/power-redundancy").json()
+        self.assertIn("Rack A", [rack["rack_name"] for rack in data["racks_at_risk"]["n1"]])
+
+    def test_capacity_and_ports_of_different_providers(self):
+        """Test that failures are evaluated per provider when capacity and ports peak on different PDUs"""
+        for pdu, ports in zip(self.pdus[:2], (1, 3)):
+            pdu.power_ports_capacity = ports
+            pdu.save()
+        third = Provider.objects.create(
+            site=self.site,
+            name="PDU A3",
+            type="power",
+            power_capacity=600,
+            power_ports_capacity=3,
+            ru_size=1,
+            rack=self.racks["A"],
+            position=41,
+        )
+        data = self.client.get(f"/api/sites/{self.site.id}/power-redundancy").json()
+
+        rack_a = next(feed for feed in data["feeds"] if feed.get("rack_name") == "Rack A")
+        self.assertEqual((rack_a["n1_ok"], rack_a["n2_ok"]), (True, False))
+        self.assertNotIn("Rack A", [rack["rack_name"] for rack in data["racks_at_risk"]["n1"]])
+        self.assertNotIn("PDU A1", [point["provider_name"] for point in data["single_points_of_failure"]])
+        self.assertEqual(data["critical_pairs"], [[self.pdus[0].id, self.pdus[1].id], [self.pdus[1].id, third.id]])
+
+
+class UtilizationHistoryTest(TestCase):
+    """Test cases for utilization sampling, downsampling, retention and range queries"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="History Site")
+        self.server = Device.objects.create(
+            device_id="hist-srv", name="Server", category="servers", ru_size=2, power_draw=400, power_ports_used=2
+        )
+        self.rack = Rack.objects.create(site=self.site, name="Rack A")
+        RackDevice.objects.create(rack=self.rack, device=self.server, position=1)
+        Provider.objects.create(site=self.site, name="UPS", type="power", power_capacity=2000)
+        self.start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=3)
+
+    def _record(self, hours, servers_added=0):
+        for _ in range(servers_added):
+            RackDevice.objects.create(rack=self.rack, device=self.server, position=3 + RackDevice.objects.count() * 2)
+        utilization.record_samples([self.site.id], now=self.start + timedelta(hours=hours))
+
+    def test_samples_are_downsampled_and_pruned(self):
+        """Test that raw samples are averaged into hours and days, and expire per resolution"""
+        self._record(0)
+        self._record(0.5, servers_added=1)
+        self._record(1)
+        self._record(25)
+        raw = UtilizationSample.objects.filter(resolution="raw", rack=None)
+        self.assertEqual(list(raw.values_list("power_draw", flat=True)), [400, 800, 800, 800])
+        self.assertEqual(raw.first().hvac_load, 400 * settings.WATTS_TO_BTU)
+        self.assertEqual(UtilizationSample.objects.filter(resolution="raw", rack=self.rack).count(), 4)
+
+        now = self.start + timedelta(hours=25, minutes=10)
+        self.assertEqual(utilization.downsample(now), {"hour": 4, "day": 2})
+        # Nothing new to downsample on a second run
+        self.assertEqual(utilization.downsample(now), {"hour": 0, "day": 0})
+        first_hour = UtilizationSample.objects.get(resolution="hour", rack=None, timestamp=self.start)
+        self.assertEqual((first_hour.samples, first_hour.power_draw, first_hour.power_draw_max), (2, 600, 800))
+        first_day = UtilizationSample.objects.get(resolution="day", rack=None, timestamp=self.start)
+        self.assertEqual((first_day.samples, round(first_day.power_draw, 2)), (3, 666.67))
+
+        with self.settings(UTILIZATION_RAW_RETENTION_DAYS=1, UTILIZATION_HOURLY_RETENTION_DAYS=0):
+            self.assertEqual(utilization.prune(now), 6)
+        self.assertFalse(
+            UtilizationSample.objects.filter(resolution="raw", timestamp__lt=self.start + timedelta(hours=2))
+        )
+
+    def test_range_query(self):
+        """Test that the endpoint returns one series as parallel arrays"""
+        for hour in range(3):
+            self._record(hour, servers_added=1 if hour else 0)
+        url = f"/api/sites/{self.site.id}/utilization"
+        response = self.client.get(
+            url,
+            {
+                "start": self.start.isoformat(),
+                "end": (self.start + timedelta(hours=2)).isoformat(),
+                "rack": self.rack.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual((data["resolution"], data["rack_id"]), ("raw", self.rack.id))
+        self.assertEqual(data["power_draw"], [400, 800])
+        self.assertEqual(data["ru_used"], [2, 4])
+        self.assertEqual(data["ru_capacity"], [42, 42])
+        self.assertEqual(len(data["timestamps"]), 2)
+
+        response = self.client.get(url, {"start": self.start.isoformat(), "resolution": "day"})
+        self.assertEqual(response.json()["power_capacity"], [])
+        self.assertEqual(self.client.get(url, {"start": "yesterday"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {"resolution": "minute"}).status_code, status.HTTP_400_BAD_REQUEST)
+        other = Rack.objects.create(site=Site.objects.create(name="Other"), name="Elsewhere")
+        self.assertEqual(self.client.get(url, {"rack": other.id}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CapacityForecastTest(TestCase):
+    """Test cases for capacity forecasting over utilization history"""
+
+    def setUp(self):
+        self.growing = Site.objects.create(name="Growing")
+        self.flat = Site.objects.create(name="Flat")
+        self.empty = Site.objects.create(name="Empty")
+        self.today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = []
+        for day in range(1, 31):
+            for site, ru_used in ((self.growing, 100 + 2 * (30 - day)), (self.flat, 50)):
+                # Daily rows of the last 30 days; the growing site adds 2 RU and 100W a day
+                rows.append(
+                    UtilizationSample(
+                        site=site,
+                        resolution="day",
+                        timestamp=self.today - timedelta(days=day),
+                        samples=288,
+                        power_draw=ru_used * 50,
+                        power_draw_max=ru_used * 50,
+                        hvac_load=ru_used * 50 * settings.WATTS_TO_BTU,
+                        ru_used=ru_used,
+                        ru_capacity=420,
+                        ports_used=ru_used,
+                        power_capacity=20000,
+                        ports_capacity=0,
+                        cooling_capacity=60000,
+                    )
+                )
+        UtilizationSample.objects.bulk_create(rows)
+
+    def test_forecast_projects_limits(self):
+        """Test that every site is forecast from one batched pass over the history"""
+        with self.assertNumQueries(2):
+            empty, flat, growing = forecast_sites(lookback_days=60, now=self.today)
+        self.assertEqual(
+            (empty["site_name"], empty["points"], empty["ru"]["status"]), ("Empty", 0, "insufficient_history")
+        )
+        self.assertEqual((flat["ru"]["status"], flat["ru"]["fit_r2"]), ("not_growing", None))
+        self.assertEqual(growing["points"], 30)
+
+        ru = growing["ru"]
+        self.assertEqual((ru["status"], ru["growth_per_day"], ru["current"], ru["fit_r2"]), ("growing", 2, 158, 1))
+        # Yesterday's row stands for its midpoint, so the trend is at 159 RU now and reaches 420 RU 130.5 days later
+        self.assertEqual((ru["trend_today"], ru["days_until_full"]), (159, 130.5))
+        self.assertEqual(ru["full_date"], (self.today + timedelta(days=130.5)).date().isoformat())
+        self.assertEqual(growing["power"]["days_until_full"], (20000 - 7950) / 100)
+        self.assertEqual(growing["ports"]["status"], "no_capacity")
+
+        response = self.client.get("/api/capacity-forecast", {"lookback_days": 60})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["resolution"], "day")
+        self.assertEqual([site["site_name"] for site in response.json()["sites"]], ["Empty", "Flat", "Growing"])
+
+    def test_single_site_and_validation(self):
+        """Test the site filter and parameter validation"""
+        data = self.client.get("/api/capacity-forecast", {"site": self.growing.id, "lookback_days": 10}).json()
+        self.assertEqual([site["site_id"] for site in data["sites"]], [self.growing.id])
+        self.assertEqual(data["resolution"], "hour")
+        self.assertEqual(data["sites"][0]["ru"]["status"], "insufficient_history")
+        response = self.client.get("/api/capacity-forecast", {"site": 999999})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get("/api/capacity-forecast", {"lookback_days": "0"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeFeedTest(TestCase):
+    """Test cases for the change event log and the per-site change stream"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Feed Site")
+        self.server = Device.objects.create(
+            device_id="feed-srv", name="Server", category="servers", ru_size=1, power_draw=100
+        )
+        ChangeEvent.objects.all().delete()
+
+    def _events(self, **filters):
+        return list(ChangeEvent.objects.filter(**filters).values_list("model", "action", "object_id"))
+
+    def test_changes_are_recorded(self):
+        """Test that saves, deletes and bulk imports are logged, without cascaded rack devices"""
+        rack = Rack.objects.create(site=self.site, name="Rack A")
+        placement = RackDevice.objects.create(rack=rack, device=self.server, position=1)
+        rack.ru_height = 48
+        rack.save()
+        pdu = Provider.objects.create(site=self.site, name="PDU", type="power", ru_size=1, rack=rack, position=48)
+        rack_id = rack.id
+        rack.delete()
+        self.assertEqual(
+            self._events(),
+            [
+                ("rack", "created", rack_id),
+                ("rack_device", "created", placement.id),
+                ("rack", "updated", rack_id),
+                ("provider", "created", pdu.id),
+                ("rack", "deleted", rack_id),
+            ],
+        )
+        event = ChangeEvent.objects.get(model="rack_device")
+        self.assertEqual((event.site_id, event.data["rack_id"], event.data["position"]), (self.site.id, rack_id, 1))
+        self.assertEqual(ChangeEvent.objects.get(model="rack", action="updated").data["ru_height"], 48)
+        pdu.refresh_from_db()
+        self.assertEqual((pdu.rack_id, pdu.position), (None, None))
+
+        ChangeEvent.objects.all().delete()
+        config = {
+            "racks": [{"id": "r1", "name": "Imported", "devices": [{"id": "feed-srv", "position": 2}]}],
+            "providers": [{"name": "UPS", "type": "power", "powerCapacity": 5000}],
+        }
+        response = self.client.post(
+            f"/api/sites/{self.site.id}/import", data=json.dumps(config), content_type="application/json"
+        )
+        b"".join(response.streaming_content)
+        self.assertEqual(
+            [(model, action) for model, action, _ in self._events(site_id=self.site.id)],
+            [("rack", "created"), ("rack_device", "created"), ("provider", "created")],
+        )
+
+        ChangeEvent.objects.all().delete()
+        RackConfiguration.objects.create(
+            site=self.site,
+            name="Layout",
+            config_data={"racks": [{"id": "p1", "name": "Projected", "devices": [{"id": "feed-srv", "position": 5}]}]},
+        )
+        self.assertEqual(
+            [(model, action) for model, action, _ in self._events()],
+            [("rack_configuration", "created"), ("rack", "created"), ("rack_device", "created")],
+        )
+        self.assertNotIn("config_data", ChangeEvent.objects.get(model="rack_configuration").data)
+
+    def test_stream_replay(self):
+        """Test that a reconnecting client is sent missed events, or a reset when too far behind"""
+        Rack.objects.create(site=self.site, name="Before")
+        change_events.sequence_events()
+        last_seq = ChangeEvent.objects.get().seq
+        Rack.objects.create(site=Site.objects.create(name="Other"), name="Elsewhere")
+        missed = [Rack.objects.create(site=self.site, name=f"Missed {index}") for index in range(2)]
+
+        stream = change_events.stream_sync(self.site.id, last_seq)
+        self.assertTrue(next(stream).startswith("retry:"))
+        messages = [next(stream), next(stream)]
+        stream.close()
+        self.assertEqual(
+            [json.loads(message.split("data: ")[1])["object_id"] for message in messages], [missed[0].id, missed[1].id]
+        )
+        self.assertIn("event: change", messages[0])
+
+        with self.settings(CHANGE_FEED_REPLAY_LIMIT=1):
+            stream = change_events.stream_sync(self.site.id, last_seq)
+            self.assertIn("event: reset", list(stream)[-1])
+
+        url = f"/api/sites/{self.site.id}/events"
+        response = self.client.get(url, HTTP_ACCEPT="text/event-stream", HTTP_LAST_EVENT_ID="latest")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/sites/999999/events").status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, HTTP_ACCEPT="text/event-stream")
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "text/event-stream"))
+        response.close()
+
+    @override_settings(CHANGE_FEED_POLL_INTERVAL=0.01)
+    async def test_stream_delivers_new_events(self):
+        """Test that events written after a client connects reach its stream, and only its site's"""
+        stream = change_events.stream_async(self.site.id, None)
+        self.assertTrue((await anext(stream)).startswith("retry:"))
+        create_rack = sync_to_async(Rack.objects.create)
+        await create_rack(site=await Site.objects.acreate(name="Other"), name="Elsewhere")
+        rack = await create_rack(site=self.site, name="Live")
+
+        message = await asyncio.wait_for(anext(stream), timeout=5)
+        event = json.loads(message.split("data: ")[1])
+        self.assertEqual((event["model"], event["action"], event["object_id"]), ("rack", "created", rack.id))
+        await stream.aclose()
+        self.assertEqual(change_events.feed.subscribers, {})
+        await asyncio.wait_for(change_events.feed._task, timeout=5)
+
+    @override_settings(CHANGE_FEED_POLL_INTERVAL=0.01)
+    async def test_feed_survives_failed_polls(self):
+        """Test that a failed read of the event log is logged and the feed keeps polling"""
+        read = change_events.events_after
+        failures = [OperationalError("database is locked")]
+
+        def flaky_read(*args):
+            if failures:
+                raise failures.pop()
+            return read(*args)
+
+        stream = change_events.stream_async(self.site.id, None)
+        with mock.patch.object(change_events, "events_after", side_effect=flaky_read):
+            with self.assertLogs("api.change_events", "ERROR"):
+                await anext(stream)
+                rack = await sync_to_async(Rack.objects.create)(site=self.site, name="Retried")
+                message = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertEqual(json.loads(message.split("data: ")[1])["object_id"], rack.id)
+        await stream.aclose()
+        await asyncio.wait_for(change_events.feed._task, timeout=5)
+
+
+class ChangeLogSyncTest(TestCase):
+    """Test cases for change sequencing and the incremental sync endpoint"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Sync Site")
+
+    def test_catalog_and_site_changes(self):
+        """Test that catalog objects are logged without a site, and a site delete logs only the site"""
+        site_id = self.site.id
+        group = DeviceGroup.objects.create(name="Compute")
+        device = Device.objects.create(
+            device_id="sync-srv", name="Server", category="servers", ru_size=1, power_draw=100, device_group=group
+        )
+        rack = Rack.objects.create(site=self.site, name="Rack A")
+        RackDevice.objects.create(rack=rack, device=device, position=1)
+        Provider.objects.create(site=self.site, name="PDU", type="power", ru_size=1, rack=rack, position=42)
+        group_id = group.id
+        group.delete()
+        self.site.name = "Renamed"
+        self.site.save()
+        self.site.delete()
+
+        events = list(ChangeEvent.objects.values_list("model", "action", "site_id"))
+        self.assertEqual(
+            events[:3], [("site", "created", site_id), ("device_group", "created", None), ("device", "created", None)]
+        )
+        self.assertEqual(
+            events[-3:],
+            [("device_group", "deleted", None), ("site", "updated", site_id), ("site", "deleted", site_id)],
+        )
+        self.assertEqual(ChangeEvent.objects.get(model="device").data["device_group_id"], group_id)
+        self.assertEqual(ChangeEvent.objects.get(model="site", action="updated").data["name"], "Renamed")
+
+    def test_sequence_numbers(self):
+        """Test that events are numbered once, in id order, continuing the sequence across gaps in ids"""
+        for index in range(3):
+            Rack.objects.create(site=self.site, name=f"Rack {index}")
+        self.assertEqual(change_events.sequence_events(), 4)
+        self.assertEqual(change_events.sequence_events(), 0)
+
+        for index in range(3, 6):
+            Rack.objects.create(site=self.site, name=f"Rack {index}")
+        # A gap in the pending ids, as left by a transaction that has not committed yet
+        ChangeEvent.objects.filter(seq=None).order_by("id")[1].delete()
+        self.assertEqual(change_events.sequence_events(), 2)
+        events = ChangeEvent.objects.order_by("id")
+        self.assertEqual(list(events.values_list("seq", flat=True)), [1, 2, 3, 4, 5, 6])
+
+    def test_changes_endpoint(self):
+        """Test paging through changes with the cursor, filters and an expired cursor"""
+        device = Device.objects.create(device_id="sync-srv", name="Server", category="servers", ru_size=1, power_draw=1)
+        for index in range(3):
+            Rack.objects.create(site=self.site, name=f"Rack {index}")
+
+        response = self.client.get("/api/changes", {"limit": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([change["seq"] for change in data["changes"]], [1, 2, 3])
+        self.assertEqual((data["next_since"], data["has_more"], data["latest"]), (3, True, 5))
+        data = self.client.get("/api/changes", {"since": data["next_since"]}).json()
+        self.assertEqual(([change["model"] for change in data["changes"]], data["has_more"]), (["rack"] * 2, False))
+
+        data = self.client.get("/api/changes", {"model": "device,site"}).json()
+        self.assertEqual([change["object_id"] for change in data["changes"]], [self.site.id, device.id])
+        self.assertEqual(data["next_since"], 5)
+        data = self.client.get("/api/changes", {"site": self.site.id, "model": "rack"}).json()
+        self.assertEqual(len(data["changes"]), 3)
+        self.assertEqual(self.client.get("/api/changes", {"since": 5}).json()["changes"], [])
+
+        for params in ({"since": "-1"}, {"limit": 0}, {"model": "passkey"}):
+            self.assertEqual(self.client.get("/api/changes", params).status_code, status.HTTP_400_BAD_REQUEST)
+
+        ChangeEvent.objects.filter(seq__lte=2).update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(change_events.purge_events(), 2)
+        response = self.client.get("/api/changes", {"since": 1})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.json()["latest"], 5)
+        self.assertEqual(self.client.get("/api/changes", {"since": 2}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get("/api/changes", {"since": 9}).status_code, status.HTTP_410_GONE)
+
+        # With the whole log purged, an up-to-date cursor still continues
+        ChangeEvent.objects.update(created_at=timezone.now() - timedelta(days=60))
+        change_events.purge_events()
+        self.assertEqual(self.client.get("/api/changes", {"since": 5}).json()["latest"], 5)
+        self.assertEqual(self.client.get("/api/changes", {"since": 4}).status_code, status.HTTP_410_GONE)
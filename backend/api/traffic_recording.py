@@ -0,0 +1,69 @@
+"""
+Opt-in API traffic recording
+
+TrafficRecordingMiddleware appends one JSON line per request (time, method,
+path with query string, content type, body, response status and duration) to
+TRAFFIC_RECORDING_FILE. Unlike the gunicorn access log the recording includes
+request bodies, so `manage.py replay_traffic` can replay write-heavy sessions
+such as rack configuration autosaves faithfully.
+
+Paths starting with any TRAFFIC_RECORDING_EXCLUDE prefix (authentication and
+admin by default) are never recorded, and bodies larger than
+TRAFFIC_RECORDING_MAX_BODY bytes are dropped.
+"""
+
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_write_lock = threading.Lock()
+
+
+class TrafficRecordingMiddleware:
+    """Appends every non-excluded request to TRAFFIC_RECORDING_FILE as a JSON line"""
+
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_RECORDING_FILE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.path = settings.TRAFFIC_RECORDING_FILE
+        self.exclude = tuple(settings.TRAFFIC_RECORDING_EXCLUDE)
+        self.max_body = settings.TRAFFIC_RECORDING_MAX_BODY
+
+    def __call__(self, request):
+        if request.path.startswith(self.exclude):
+            return self.get_response(request)
+
+        # Read the body before the view consumes the stream
+        body = request.body if int(request.META.get("CONTENT_LENGTH") or 0) <= self.max_body else None
+
+        started_at = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        entry = {
+            "ts": round(started_at, 6),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "content_type": request.content_type or "",
+            "body": body.decode("utf-8", errors="replace") if body else None,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        self._write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return response
+
+    def _write(self, line: str):
+        # One O_APPEND write per line keeps lines from different workers from interleaving
+        data = line.encode("utf-8")
+        with _write_lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
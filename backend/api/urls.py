@@ -2,6 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import passkey_views
+from . import profiling_views
+from . import job_views
 
 # Create router for ViewSets (trailing_slash=False allows URLs without trailing slashes)
 router = DefaultRouter(trailing_slash=False)
@@ -17,19 +19,27 @@ urlpatterns = [
     path("devices-json", views.get_devices, name="devices-json"),
     path("validation-schemas", views.get_validation_schemas, name="validation-schemas"),
     # Rack configuration endpoints (specific before general)
-    path("sites/<int:site_id>/racks/<str:rack_name>", views.get_rack_configuration, name="get-rack-config"),
-    path("sites/<int:site_id>/racks", views.rack_operations_view, name="rack-operations"),
+    path("sites/<int:site_id>/racks/<str:rack_name>", views.RackConfigurationView.as_view(), name="get-rack-config"),
+    path("sites/<int:site_id>/racks", views.RackOperationsView.as_view(), name="rack-operations"),
     path("rack-configs/<int:rack_id>", views.delete_rack_configuration, name="delete-rack-config"),
-    path("rack-configs", views.get_all_racks, name="get-all-racks"),
+    path("rack-configs", views.AllRackConfigurationsView.as_view(), name="get-all-racks"),
     # Device and Rack management endpoints
     path("sites/<int:site_id>/create-rack", views.create_rack, name="create-rack"),
+    path("sites/<int:site_id>/import", views.import_rack_config, name="import-config"),
+    path("sites/<int:site_id>/snapshot", views.site_snapshot, name="site-snapshot"),
+    path("sites/<int:site_id>/simulate", views.simulate_site, name="simulate-site"),
+    path("sites/<int:site_id>/power-redundancy", views.site_power_redundancy, name="site-power-redundancy"),
+    path("sites/<int:site_id>/utilization", views.site_utilization_history, name="site-utilization-history"),
+    path("sites/<int:site_id>/events", views.site_change_stream, name="site-change-stream"),
     path("racks/<int:rack_id>/add-device", views.add_device_to_rack, name="add-device-to-rack"),
     path("rack-devices/<int:rack_device_id>", views.remove_device_from_rack, name="remove-device-from-rack"),
     # Provider management endpoints
     path("sites/<int:site_id>/create-provider", views.create_provider, name="create-provider"),
     # Resource usage endpoints
-    path("sites/<int:site_id>/resource-usage", views.get_site_resource_usage, name="site-resource-usage"),
-    path("racks/<int:rack_id>/resource-usage", views.get_rack_resource_usage, name="rack-resource-usage"),
+    path("sites/<int:site_id>/resource-usage", views.SiteResourceUsageView.as_view(), name="site-resource-usage"),
+    path("racks/<int:rack_id>/resource-usage", views.RackResourceUsageView.as_view(), name="rack-resource-usage"),
+    path("capacity-forecast", views.capacity_forecast, name="capacity-forecast"),
+    path("changes", views.list_changes, name="list-changes"),
     # Passkey/WebAuthn authentication endpoints
     path("auth/config", passkey_views.auth_config, name="auth-config"),
     path("auth/passkey/register/begin", passkey_views.begin_registration, name="passkey-register-begin"),
@@ -40,6 +50,12 @@ urlpatterns = [
     path("auth/passkey/<int:passkey_id>", passkey_views.delete_passkey, name="passkey-delete"),
     path("auth/logout", passkey_views.logout_view, name="logout"),
     path("auth/user", passkey_views.current_user, name="current-user"),
+    # Background jobs
+    path("jobs", job_views.job_list, name="job-list"),
+    path("jobs/<int:job_id>", job_views.job_detail, name="job-detail"),
+    path("jobs/<int:job_id>/cancel", job_views.job_cancel, name="job-cancel"),
+    # Request profiling (admin only, requires PROFILING_ENABLED)
+    path("profiling", profiling_views.profiling_stats, name="profiling-stats"),
     # Include router URLs (sites, devices, racks CRUD)
     path("", include(router.urls)),
 ]
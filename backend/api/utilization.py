@@ -0,0 +1,198 @@
+"""
+Utilization history of sites and racks
+
+record_samples() appends one raw UtilizationSample per site and per rack,
+computed from the cached SiteMatrix. `manage.py record_utilization --loop`
+does this every UTILIZATION_SAMPLE_INTERVAL seconds, followed by:
+
+- downsample(): raw samples of every completed hour are averaged into one
+  hourly row per series, and hourly rows of every completed day into one
+  daily row. Each level resumes after the latest row it already wrote, so
+  it can run any number of times.
+- prune(): rows older than the retention of their resolution are deleted
+  (UTILIZATION_RAW_RETENTION_DAYS, _HOURLY_, _DAILY_; 0 keeps them forever).
+
+series() reads one series for the range query endpoint.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Max, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import Site, UtilizationSample
+from .site_matrix import get_site_matrix
+
+# Averaged fields, weighted by `samples` when downsampling
+AVERAGED_FIELDS = ("power_draw", "hvac_load", "ru_used", "ports_used")
+# Fields whose highest value in a period is kept
+MAX_FIELDS = ("power_draw_max", "ru_capacity", "power_capacity", "ports_capacity", "cooling_capacity")
+SERIES_FIELDS = ("samples", *AVERAGED_FIELDS, *MAX_FIELDS)
+
+# (source, target, database truncation, period) of each downsampling level
+LEVELS = (
+    (UtilizationSample.RESOLUTION_RAW, UtilizationSample.RESOLUTION_HOUR, TruncHour, timedelta(hours=1)),
+    (UtilizationSample.RESOLUTION_HOUR, UtilizationSample.RESOLUTION_DAY, TruncDay, timedelta(days=1)),
+)
+
+# Queries without an explicit resolution use the finest one kept for their span
+AUTO_RESOLUTION_SPANS = (
+    (timedelta(days=2), UtilizationSample.RESOLUTION_RAW),
+    (timedelta(days=60), UtilizationSample.RESOLUTION_HOUR),
+)
+
+BATCH_SIZE = 1000
+
+
+def _period_start(moment: datetime, resolution: str) -> datetime:
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if resolution == UtilizationSample.RESOLUTION_DAY else moment
+
+
+def record_samples(sites=None, now: Optional[datetime] = None) -> int:
+    """Append a raw sample for each site (all by default) and each of its racks; returns rows written"""
+    now = (now or timezone.now()).replace(microsecond=0)
+    rows = []
+    for site_id in sites if sites is not None else Site.objects.values_list("id", flat=True):
+        matrix = get_site_matrix(site_id)
+        power, cooling = matrix.provider_is_power, matrix.provider_is_cooling
+        racked = power & (matrix.provider_rack >= 0)
+        rack_count = len(matrix.rack_ids)
+        rack_power_capacity = np.bincount(
+            matrix.provider_rack[racked], weights=matrix.provider_power[racked], minlength=rack_count
+        )
+        rack_ports_capacity = np.bincount(
+            matrix.provider_rack[racked], weights=matrix.provider_ports[racked], minlength=rack_count
+        )
+
+        series = [
+            (
+                None,
+                float(matrix.rack_power.sum()),
+                float(matrix.rack_ru.sum()),
+                int(matrix.rack_height.sum()),
+                float(matrix.rack_ports.sum()),
+                int(matrix.provider_power[power].sum()),
+                int(matrix.provider_ports[power].sum()),
+                int(matrix.provider_cooling[cooling].sum()),
+            )
+        ]
+        series.extend(
+            zip(
+                matrix.rack_ids.tolist(),
+                matrix.rack_power.tolist(),
+                matrix.rack_ru.tolist(),
+                matrix.rack_height.tolist(),
+                matrix.rack_ports.tolist(),
+                rack_power_capacity.astype(np.int64).tolist(),
+                rack_ports_capacity.astype(np.int64).tolist(),
+                [0] * rack_count,
+            )
+        )
+        for rack_id, draw, ru_used, ru_capacity, ports_used, power_capacity, ports_capacity, cooling_capacity in series:
+            rows.append(
+                UtilizationSample(
+                    site_id=site_id,
+                    rack_id=rack_id,
+                    timestamp=now,
+                    power_draw=draw,
+                    power_draw_max=draw,
+                    hvac_load=draw * settings.WATTS_TO_BTU,
+                    ru_used=ru_used,
+                    ru_capacity=ru_capacity,
+                    ports_used=ports_used,
+                    power_capacity=power_capacity,
+                    ports_capacity=ports_capacity,
+                    cooling_capacity=cooling_capacity,
+                )
+            )
+    UtilizationSample.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def downsample(now: Optional[datetime] = None) -> dict:
+    """Average completed hours into hourly rows and completed days into daily rows; returns rows written"""
+    now = now or timezone.now()
+    written = {}
+    for source, target, trunc, period in LEVELS:
+        end = _period_start(now, target)
+        done = dict(
+            UtilizationSample.objects.filter(resolution=target)
+            .values("site_id")
+            .annotate(latest=Max("timestamp"))
+            .values_list("site_id", "latest")
+        )
+        rows = []
+        sites = UtilizationSample.objects.filter(resolution=source).order_by().values_list("site_id", flat=True)
+        for site_id in sites.distinct():
+            pending = UtilizationSample.objects.filter(site_id=site_id, resolution=source, timestamp__lt=end)
+            if site_id in done:
+                pending = pending.filter(timestamp__gte=done[site_id] + period)
+            aggregates = (
+                pending.annotate(period=trunc("timestamp"))
+                .values("rack_id", "period")
+                .annotate(
+                    total=Sum("samples"),
+                    **{f"sum_{name}": Sum(F(name) * F("samples")) for name in AVERAGED_FIELDS},
+                    **{f"max_{name}": Max(name) for name in MAX_FIELDS},
+                )
+                .order_by()
+            )
+            for row in aggregates:
+                rows.append(
+                    UtilizationSample(
+                        site_id=site_id,
+                        rack_id=row["rack_id"],
+                        resolution=target,
+                        timestamp=row["period"],
+                        samples=row["total"],
+                        **{name: row[f"sum_{name}"] / row["total"] for name in AVERAGED_FIELDS},
+                        **{name: row[f"max_{name}"] for name in MAX_FIELDS},
+                    )
+                )
+        UtilizationSample.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        written[target] = len(rows)
+    return written
+
+
+def prune(now: Optional[datetime] = None) -> int:
+    """Delete rows older than the retention of their resolution; returns rows deleted"""
+    now = now or timezone.now()
+    deleted = 0
+    for resolution, days in (
+        (UtilizationSample.RESOLUTION_RAW, settings.UTILIZATION_RAW_RETENTION_DAYS),
+        (UtilizationSample.RESOLUTION_HOUR, settings.UTILIZATION_HOURLY_RETENTION_DAYS),
+        (UtilizationSample.RESOLUTION_DAY, settings.UTILIZATION_DAILY_RETENTION_DAYS),
+    ):
+        if days > 0:
+            deleted += UtilizationSample.objects.filter(
+                resolution=resolution, timestamp__lt=now - timedelta(days=days)
+            ).delete()[0]
+    return deleted
+
+
+def auto_resolution(start: datetime, end: datetime) -> str:
+    for span, resolution in AUTO_RESOLUTION_SPANS:
+        if end - start <= span:
+            return resolution
+    return UtilizationSample.RESOLUTION_DAY
+
+
+def series(site_id: int, rack_id: Optional[int], resolution: str, start: datetime, end: datetime) -> dict:
+    """One utilization series as parallel arrays, oldest first"""
+    rows = list(
+        UtilizationSample.objects.filter(
+            site_id=site_id, rack_id=rack_id, resolution=resolution, timestamp__gte=start, timestamp__lt=end
+        )
+        .order_by("timestamp")
+        .values_list("timestamp", *SERIES_FIELDS)
+    )
+    columns = list(zip(*rows)) or [()] * (len(SERIES_FIELDS) + 1)
+    data = {"timestamps": [moment.isoformat() for moment in columns[0]]}
+    for name, values in zip(SERIES_FIELDS, columns[1:]):
+        data[name] = [round(value, 2) if isinstance(value, float) else value for value in values]
+    return data
@@ -1,19 +1,37 @@
 import json
 import os
+import tempfile
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action, permission_classes
+from rest_framework.decorators import api_view, action, permission_classes, renderer_classes
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.db import IntegrityError
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
-from .models import Site, RackConfiguration, Device, Rack, RackDevice, Provider, DeviceGroup
+from .async_views import AsyncAPIView, AsyncListModelMixin, AsyncViewSetMixin
+from . import change_events, jobs, utilization
+from .config_import import ConfigImporter, ConfigParseError
+from .models import Site, RackConfiguration, Device, Rack, RackDevice, Provider, DeviceGroup, UtilizationSample
+from .forecast import DEFAULT_LOOKBACK_DAYS, default_resolution, forecast_sites
+from .redundancy import analyze_redundancy
+from .simulation import SimulationError, simulate
+from .site_matrix import get_site_matrix
+from .snapshot import Snapshot, SnapshotError, import_snapshot, write_snapshot
 from .serializers import (
     SiteSerializer,
     RackConfigurationSerializer,
@@ -25,8 +43,10 @@ from .serializers import (
     ProviderSerializer,
     ProviderCreateSerializer,
     DeviceGroupSerializer,
+    JobSerializer,
 )
 from .validation_schemas import get_all_schemas
+from .device_search import search_devices
 
 
 @extend_schema_view(
@@ -146,17 +166,18 @@ class SiteViewSet(viewsets.ModelViewSet):
         )
     ],
 )
-@api_view(["GET", "POST"])
-@permission_classes([AllowAny])
-def rack_operations_view(request, site_id):
+class RackOperationsView(AsyncAPIView):
     """
     Combined view for GET (list racks) and POST (save rack) operations
     """
-    if request.method == "GET":
+
+    permission_classes = [AllowAny]
+
+    async def get(self, request, site_id):
         try:
-            site = get_object_or_404(Site, id=site_id)
+            site = await aget_object_or_404(Site, id=site_id)
             racks = RackConfiguration.objects.select_related("site").filter(site=site)
-            serializer = RackConfigurationSerializer(racks, many=True)
+            serializer = RackConfigurationSerializer([rack async for rack in racks], many=True)
             return Response(serializer.data)
         except Exception as e:
             return Response(
@@ -164,7 +185,8 @@ def rack_operations_view(request, site_id):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-    elif request.method == "POST":
+    def post(self, request, site_id):
+        # Writes stay synchronous and run in a worker thread
         try:
             site = get_object_or_404(Site, id=site_id)
 
@@ -205,26 +227,28 @@ def rack_operations_view(request, site_id):
         OpenApiParameter(name="rack_name", type=OpenApiTypes.STR, location=OpenApiParameter.PATH),
     ],
 )
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def get_rack_configuration(request, site_id, rack_name):
+class RackConfigurationView(AsyncAPIView):
     """
     Get a specific rack configuration
     """
-    try:
-        site = get_object_or_404(Site, id=site_id)
-        rack = RackConfiguration.objects.select_related("site").filter(site=site, name=rack_name).first()
 
-        if not rack:
-            return Response({"error": "Rack configuration not found"}, status=status.HTTP_404_NOT_FOUND)
+    permission_classes = [AllowAny]
 
-        serializer = RackConfigurationSerializer(rack)
-        return Response(serializer.data)
-    except Exception as e:
-        return Response(
-            {"error": "Failed to fetch rack configuration", "details": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    async def get(self, request, site_id, rack_name):
+        try:
+            site = await aget_object_or_404(Site, id=site_id)
+            rack = await RackConfiguration.objects.select_related("site").filter(site=site, name=rack_name).afirst()
+
+            if not rack:
+                return Response({"error": "Rack configuration not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            serializer = RackConfigurationSerializer(rack)
+            return Response(serializer.data)
+        except Exception as e:
+            return Response(
+                {"error": "Failed to fetch rack configuration", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
 
 @extend_schema(
@@ -255,21 +279,23 @@ def delete_rack_configuration(request, rack_id):
     description="Retrieve all rack configurations across all sites",
     tags=["Legacy"],
 )
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def get_all_racks(request):
+class AllRackConfigurationsView(AsyncAPIView):
     """
     Get all rack configurations across all sites
     """
-    try:
-        racks = RackConfiguration.objects.select_related("site").all()
-        serializer = RackConfigurationSerializer(racks, many=True)
-        return Response(serializer.data)
-    except Exception as e:
-        return Response(
-            {"error": "Failed to fetch rack configurations", "details": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+
+    permission_classes = [AllowAny]
+
+    async def get(self, request):
+        try:
+            racks = RackConfiguration.objects.select_related("site").all()
+            serializer = RackConfigurationSerializer([rack async for rack in racks], many=True)
+            return Response(serializer.data)
+        except Exception as e:
+            return Response(
+                {"error": "Failed to fetch rack configurations", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
 
 @extend_schema(
@@ -304,6 +330,531 @@ def load_rack_config(request):
         )
 
 
+def _import_events(importer, stream, total_bytes):
+    # The response has started by the time the import fails, so errors are reported as the last event
+    try:
+        yield from importer.run(stream, total_bytes)
+    except ConfigParseError as e:
+        yield {"event": "error", "error": "Invalid configuration file", "details": str(e), **importer.stats.as_dict()}
+    except Exception as e:
+        error = {"event": "error", "error": "Failed to import configuration", "details": str(e)}
+        yield {**error, **importer.stats.as_dict()}
+
+
+def _upload_length(request, label: str):
+    """Content-Length of a raw file upload, or an error response if it is missing or too large"""
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length <= 0:
+        return 0, Response({"error": f"{label} is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if content_length > settings.CONFIG_IMPORT_MAX_SIZE:
+        return content_length, Response(
+            {"error": f"{label} exceeds {settings.CONFIG_IMPORT_MAX_SIZE} bytes"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    return content_length, None
+
+
+def _ndjson(events):
+    for event in events:
+        yield json.dumps(event) + "\n"
+
+
+async def _ndjson_async(events):
+    # Each batch runs in a worker thread; the event loop sends the progress line in between
+    next_event = sync_to_async(next)
+    while (event := await next_event(events, None)) is not None:
+        yield json.dumps(event) + "\n"
+
+
+@extend_schema(
+    summary="Import a configuration file into a site",
+    description=(
+        "Stream-import an exported rack configuration (the Import/Export JSON) into a site's racks, rack devices "
+        "and resource providers. The request body is the file itself and is parsed incrementally, so it may be "
+        "larger than the usual request size limit (up to CONFIG_IMPORT_MAX_SIZE). The response is a stream of "
+        "JSON lines: a `progress` event after every committed batch of racks, then a `done` event with the "
+        "totals, or an `error` event. Racks that already exist in the site are skipped unless `replace=true`. "
+        "With `background=true` the file is stored and imported by a job worker; poll /api/jobs/{id}."
+    ),
+    tags=["Racks"],
+    request={"application/json": OpenApiTypes.OBJECT},
+    responses={(200, "application/x-ndjson"): OpenApiTypes.STR, 202: JobSerializer},
+    parameters=[
+        OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH),
+        OpenApiParameter(
+            name="replace",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="Replace racks that already exist in the site instead of skipping them",
+        ),
+        OpenApiParameter(
+            name="background",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="Queue the import as a background job and return the job (202) instead of streaming",
+        ),
+    ],
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def import_rack_config(request, site_id):
+    """
+    Import a configuration file into a site, streaming progress as JSON lines
+    """
+    site = get_object_or_404(Site, id=site_id)
+
+    content_length, error = _upload_length(request, "Configuration file")
+    if error:
+        return error
+
+    replace = request.query_params.get("replace", "").lower() == "true"
+    if request.query_params.get("background", "").lower() == "true":
+        # Store the upload and let a job worker import it, outside the request timeout
+        try:
+            path = jobs.store_job_file(request.stream, settings.CONFIG_IMPORT_MAX_SIZE)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        job = jobs.enqueue("config_import", {"file": path, "replace": replace}, site=site)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    importer = ConfigImporter(site, batch_size=settings.CONFIG_IMPORT_BATCH_SIZE, replace=replace)
+    # Read the raw body; request.data would load and parse the whole file
+    events = _import_events(importer, request.stream, content_length)
+    streaming_content = _ndjson_async(events) if isinstance(request._request, ASGIRequest) else _ndjson(events)
+    return StreamingHttpResponse(streaming_content, content_type="application/x-ndjson")
+
+
+@extend_schema(
+    summary="Export or import a site snapshot",
+    description=(
+        "GET downloads the site's racks, rack devices, resource providers and the catalog entries they use as a "
+        "compact columnar binary snapshot (zlib-compressed; `compress=false` writes a memory-mappable file). "
+        "POST loads a snapshot (the request body is the file) into the site in one transaction: racks that "
+        "already exist are skipped unless `replace=true`, and devices missing from the catalog are added. "
+        "With `background=true` the import runs as a background job and the job is returned (202)."
+    ),
+    tags=["Sites"],
+    request={"application/octet-stream": OpenApiTypes.BINARY},
+    responses={(200, "application/octet-stream"): OpenApiTypes.BINARY, 202: JobSerializer},
+    parameters=[
+        OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH),
+        OpenApiParameter(
+            name="compress",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="GET: compress columns (default true)",
+        ),
+        OpenApiParameter(
+            name="replace",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="POST: replace racks that already exist in the site instead of skipping them",
+        ),
+        OpenApiParameter(
+            name="background",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="POST: import as a background job",
+        ),
+    ],
+)
+@api_view(["GET", "POST"])
+@permission_classes([AllowAny])
+def site_snapshot(request, site_id):
+    """
+    Download a site snapshot, or load one into the site
+    """
+    site = get_object_or_404(Site, id=site_id)
+
+    if request.method == "GET":
+        f = tempfile.TemporaryFile()
+        try:
+            write_snapshot(site, f, compress=request.query_params.get("compress", "").lower() != "false")
+        except Exception as e:
+            f.close()
+            return Response(
+                {"error": "Failed to export snapshot", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        f.seek(0)
+        filename = f"{slugify(site.name) or f'site-{site.id}'}.rksnap"
+        return FileResponse(f, as_attachment=True, filename=filename, content_type="application/octet-stream")
+
+    _, error = _upload_length(request, "Snapshot file")
+    if error:
+        return error
+    replace = request.query_params.get("replace", "").lower() == "true"
+    try:
+        path = jobs.store_job_file(request.stream, settings.CONFIG_IMPORT_MAX_SIZE)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    if request.query_params.get("background", "").lower() == "true":
+        job = jobs.enqueue("snapshot_import", {"file": path, "replace": replace}, site=site)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    try:
+        with Snapshot(path) as snapshot:
+            stats = import_snapshot(snapshot, site, replace=replace)
+        return Response({"siteId": site.id, **stats.as_dict()})
+    except SnapshotError as e:
+        return Response({"error": "Invalid snapshot", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError as e:
+        return Response(
+            {"error": "Snapshot conflicts with existing data", "details": str(e)}, status=status.HTTP_409_CONFLICT
+        )
+    except Exception as e:
+        return Response(
+            {"error": "Failed to import snapshot", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    finally:
+        os.remove(path)
+
+
+@extend_schema(
+    summary="Simulate capacity changes",
+    description=(
+        "Evaluate hypothetical change sets (scenarios) against a site without modifying it. Each scenario lists "
+        "changes such as adding or removing devices, removing a rack, or adding, removing or swapping a provider, "
+        "and is answered with projected power draw and capacity, HVAC load and cooling capacity, port use and "
+        "racks that would run out of RU."
+    ),
+    tags=["Sites"],
+    request={"application/json": OpenApiTypes.OBJECT},
+    responses={200: OpenApiTypes.OBJECT},
+    parameters=[OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH)],
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def simulate_site(request, site_id):
+    """
+    Run what-if capacity scenarios against a site
+    """
+    get_object_or_404(Site, id=site_id)
+    scenarios = request.data.get("scenarios") if isinstance(request.data, dict) else None
+    if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+        return Response({"error": "scenarios must be a list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(scenarios) > settings.SIMULATION_MAX_SCENARIOS:
+        return Response(
+            {"error": f"At most {settings.SIMULATION_MAX_SCENARIOS} scenarios per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    started = time.perf_counter()
+    try:
+        baseline, results = simulate(get_site_matrix(site_id), scenarios)
+    except SimulationError as e:
+        return Response({"error": "Invalid scenario", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {"error": "Failed to run simulation", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return Response(
+        {
+            "site_id": site_id,
+            "baseline": baseline,
+            "scenarios": results,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    )
+
+
+@extend_schema(
+    summary="Analyze power redundancy",
+    description=(
+        "Assign rack load to the site's power providers and report whether every rack keeps power when any one "
+        "(N-1) or any two (N-2) power providers fail, with the racks at risk, single points of failure and "
+        "failover headroom per feed."
+    ),
+    tags=["Sites"],
+    responses={200: OpenApiTypes.OBJECT},
+    parameters=[OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH)],
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def site_power_redundancy(request, site_id):
+    """
+    N-1 and N-2 power redundancy analysis of a site
+    """
+    get_object_or_404(Site, id=site_id)
+    try:
+        return Response(analyze_redundancy(get_site_matrix(site_id)))
+    except Exception as e:
+        return Response(
+            {"error": "Failed to analyze power redundancy", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@extend_schema(
+    summary="Get utilization history",
+    description=(
+        "Power, HVAC, RU and power port utilization of a site or one of its racks over a time range, as parallel "
+        "arrays. Samples are recorded by `manage.py record_utilization` and averaged into hourly and daily rows."
+    ),
+    tags=["Sites"],
+    responses={200: OpenApiTypes.OBJECT},
+    parameters=[
+        OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH),
+        OpenApiParameter(
+            name="start", type=OpenApiTypes.DATETIME, location=OpenApiParameter.QUERY, description="Default: 24h ago"
+        ),
+        OpenApiParameter(
+            name="end", type=OpenApiTypes.DATETIME, location=OpenApiParameter.QUERY, description="Default: now"
+        ),
+        OpenApiParameter(
+            name="resolution",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=["raw", "hour", "day"],
+            description="Default: the finest resolution kept for the range",
+        ),
+        OpenApiParameter(
+            name="rack",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description="Rack ID (default: the whole site)",
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def site_utilization_history(request, site_id):
+    """
+    Utilization series of a site or rack
+    """
+    get_object_or_404(Site, id=site_id)
+    params = request.query_params
+    now = timezone.now()
+    try:
+        start = parse_datetime(params["start"]) if params.get("start") else now - timedelta(days=1)
+        end = parse_datetime(params["end"]) if params.get("end") else now
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return Response({"error": "start and end must be ISO 8601 date-times"}, status=status.HTTP_400_BAD_REQUEST)
+    start, end = (moment if timezone.is_aware(moment) else timezone.make_aware(moment) for moment in (start, end))
+    if start >= end:
+        return Response({"error": "start must be before end"}, status=status.HTTP_400_BAD_REQUEST)
+
+    resolution = params.get("resolution") or utilization.auto_resolution(start, end)
+    if resolution not in dict(UtilizationSample.RESOLUTION_CHOICES):
+        return Response({"error": "resolution must be raw, hour or day"}, status=status.HTTP_400_BAD_REQUEST)
+    rack_id = params.get("rack")
+    if rack_id is not None:
+        if not rack_id.isdigit():
+            return Response({"error": "rack must be a rack ID"}, status=status.HTTP_400_BAD_REQUEST)
+        rack_id = get_object_or_404(Rack, id=int(rack_id), site_id=site_id).id
+
+    return Response(
+        {
+            "site_id": site_id,
+            "rack_id": rack_id,
+            "resolution": resolution,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            **utilization.series(site_id, rack_id, resolution, start, end),
+        }
+    )
+
+
+class _EventStreamRenderer(BaseRenderer):
+    """Accepts `text/event-stream` for the change feed; error responses are sent as JSON"""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+@extend_schema(
+    summary="Stream a site's changes",
+    description=(
+        "Server-Sent Events stream of the changes to a site's racks, rack devices, resource providers and rack "
+        "configurations. Each `change` event carries the event id, the object type and id, the action "
+        "(created, updated, deleted) and the object's fields, so clients can apply it instead of refetching the "
+        "site. Reconnecting clients resume after the `Last-Event-ID` header (or `since`); a `reset` event means "
+        "the client missed too many changes and should reload the site."
+    ),
+    tags=["Sites"],
+    responses={(200, "text/event-stream"): OpenApiTypes.STR},
+    parameters=[
+        OpenApiParameter(name="site_id", type=OpenApiTypes.INT, location=OpenApiParameter.PATH),
+        OpenApiParameter(
+            name="since",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description="Replay events after this id first (the Last-Event-ID header takes precedence)",
+        ),
+    ],
+)
+@api_view(["GET"])
+@renderer_classes([JSONRenderer, _EventStreamRenderer])
+@permission_classes([AllowAny])
+def site_change_stream(request, site_id):
+    """
+    Stream a site's change events
+    """
+    get_object_or_404(Site, id=site_id)
+    last_event_id = request.META.get("HTTP_LAST_EVENT_ID") or request.query_params.get("since")
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            return Response({"error": "Last-Event-ID must be an event id"}, status=status.HTTP_400_BAD_REQUEST)
+        last_event_id = int(last_event_id)
+
+    if isinstance(request._request, ASGIRequest):
+        streaming_content = change_events.stream_async(site_id, last_event_id)
+    else:
+        # Development server: each stream polls the table in its own thread
+        streaming_content = change_events.stream_sync(site_id, last_event_id)
+    response = StreamingHttpResponse(streaming_content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@extend_schema(
+    summary="List changes since a cursor",
+    description=(
+        "Incremental sync: the creates, updates and deletes of sites, racks, rack devices, resource providers, "
+        "rack configurations, devices and device groups after sequence number `since`, oldest first. Store "
+        "`next_since` and pass it as `since` on the next call; keep calling while `has_more` is true. A 410 "
+        "response means the events after `since` were purged: download the inventory again and continue from "
+        "the `latest` seq in the response."
+    ),
+    tags=["Sites"],
+    responses={200: OpenApiTypes.OBJECT, 410: OpenApiTypes.OBJECT},
+    parameters=[
+        OpenApiParameter(
+            name="since",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description="Return changes after this sequence number (default 0: from the start of the log)",
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description=f"Changes per page (default 1000, at most {change_events.MAX_PAGE_SIZE})",
+        ),
+        OpenApiParameter(
+            name="model",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description=(
+                "Only these object types, comma-separated: site, rack, rack_device, provider, rack_configuration, "
+                "device, device_group"
+            ),
+        ),
+        OpenApiParameter(
+            name="site", type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, description="Only this site"
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def list_changes(request):
+    """
+    Changes after a sequence number
+    """
+    params = request.query_params
+    for name in ("since", "limit", "site"):
+        if params.get(name) and not params[name].isdigit():
+            return Response({"error": f"{name} must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+    since = int(params.get("since") or 0)
+    limit = int(params.get("limit") or change_events.BATCH_SIZE)
+    if not 1 <= limit <= change_events.MAX_PAGE_SIZE:
+        return Response(
+            {"error": f"limit must be between 1 and {change_events.MAX_PAGE_SIZE}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    models = None
+    if params.get("model"):
+        models = {name.strip() for name in params["model"].split(",")}
+        unknown = models - change_events.MODEL_NAMES
+        if unknown:
+            return Response(
+                {"error": f"Unknown model: {', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+    site_id = int(params["site"]) if params.get("site") else None
+
+    try:
+        return Response(change_events.read_changes(since, limit, models, site_id))
+    except change_events.CursorExpiredError as e:
+        return Response({"error": str(e), "latest": e.latest}, status=status.HTTP_410_GONE)
+
+
+@extend_schema(
+    summary="Forecast capacity limits",
+    description=(
+        "Fit a linear growth trend to each site's utilization history and project the date it reaches its RU, "
+        "power, cooling and power port capacity. All sites are fitted in one pass."
+    ),
+    tags=["Sites"],
+    responses={200: OpenApiTypes.OBJECT},
+    parameters=[
+        OpenApiParameter(
+            name="site", type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, description="Only this site"
+        ),
+        OpenApiParameter(
+            name="lookback_days",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description=f"Days of history fitted (default {DEFAULT_LOOKBACK_DAYS})",
+        ),
+        OpenApiParameter(
+            name="resolution",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=["raw", "hour", "day"],
+            description="History rows fitted (default: hourly up to 14 days, daily beyond)",
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def capacity_forecast(request):
+    """
+    Capacity forecasts of all sites
+    """
+    params = request.query_params
+    site = params.get("site")
+    lookback = params.get("lookback_days", str(DEFAULT_LOOKBACK_DAYS))
+    if site is not None and not site.isdigit():
+        return Response({"error": "site must be a site ID"}, status=status.HTTP_400_BAD_REQUEST)
+    if not lookback.isdigit() or not 1 <= int(lookback) <= 3650:
+        return Response({"error": "lookback_days must be between 1 and 3650"}, status=status.HTTP_400_BAD_REQUEST)
+    resolution = params.get("resolution")
+    if resolution is not None and resolution not in dict(UtilizationSample.RESOLUTION_CHOICES):
+        return Response({"error": "resolution must be raw, hour or day"}, status=status.HTTP_400_BAD_REQUEST)
+
+    resolution = resolution or default_resolution(int(lookback))
+    started = time.perf_counter()
+    try:
+        sites = forecast_sites(
+            site_ids=[int(site)] if site is not None else None, lookback_days=int(lookback), resolution=resolution
+        )
+    except Exception as e:
+        return Response(
+            {"error": "Failed to forecast capacity", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    if site is not None and not sites:
+        return Response({"error": "Site not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(
+        {
+            "generated_at": timezone.now().isoformat(),
+            "lookback_days": int(lookback),
+            "resolution": resolution,
+            "sites": sites,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    )
+
+
 @extend_schema(
     summary="Get devices from JSON file",
     description="Retrieve device templates from the static devices.json file (legacy compatibility)",
@@ -352,6 +903,9 @@ def get_validation_schemas(request):
 
 # ==================== Device Management Endpoints ====================
 
+DEVICE_SEARCH_PAGE_SIZE = 25
+DEVICE_SEARCH_MAX_PAGE_SIZE = 100
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -394,7 +948,7 @@ def get_validation_schemas(request):
         summary="Delete a device", description="Delete a device template from the database", tags=["Devices"]
     ),
 )
-class DeviceViewSet(viewsets.ModelViewSet):
+class DeviceViewSet(AsyncViewSetMixin, AsyncListModelMixin, viewsets.ModelViewSet):
     """
     ViewSet for Device CRUD operations
     """
@@ -404,9 +958,65 @@ class DeviceViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
     @method_decorator(cache_page(60 * 10))  # Cache for 10 minutes
-    def list(self, request, *args, **kwargs):
+    async def list(self, request, *args, **kwargs):
         """List all devices with caching"""
-        return super().list(request, *args, **kwargs)
+        return await super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        summary="Search devices",
+        description=(
+            "Search the device catalog by name, device ID, category, description and hardware provider. "
+            "Every term is prefix-matched and results are ranked by relevance."
+        ),
+        tags=["Devices"],
+        parameters=[
+            OpenApiParameter(name="q", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(
+                name="category",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Restrict results to a category (case-insensitive exact match)",
+                required=False,
+            ),
+            OpenApiParameter(name="page", type=OpenApiTypes.INT, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(
+                name="page_size",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description=f"Results per page (default {DEVICE_SEARCH_PAGE_SIZE}, max {DEVICE_SEARCH_MAX_PAGE_SIZE})",
+                required=False,
+            ),
+        ],
+    )
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        """
+        Search devices using the in-process catalog index
+        """
+        try:
+            page = int(request.query_params.get("page", 1))
+            page_size = int(request.query_params.get("page_size", DEVICE_SEARCH_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if page < 1 or page_size < 1:
+            return Response({"error": "page and page_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = min(page_size, DEVICE_SEARCH_MAX_PAGE_SIZE)
+
+        count, devices = search_devices(
+            request.query_params.get("q", ""),
+            category=request.query_params.get("category"),
+            offset=(page - 1) * page_size,
+            limit=page_size,
+        )
+        return Response(
+            {
+                "count": count,
+                "page": page,
+                "page_size": page_size,
+                "results": DeviceSerializer(devices, many=True).data,
+            }
+        )
 
     def create(self, request, *args, **kwargs):
         """
@@ -453,7 +1063,7 @@ class DeviceViewSet(viewsets.ModelViewSet):
         summary="Delete a rack", description="Delete a rack and all associated device placements", tags=["Racks"]
     ),
 )
-class RackViewSet(viewsets.ModelViewSet):
+class RackViewSet(AsyncViewSetMixin, AsyncListModelMixin, viewsets.ModelViewSet):
     """
     ViewSet for Rack CRUD operations
     """
@@ -462,6 +1072,10 @@ class RackViewSet(viewsets.ModelViewSet):
     serializer_class = RackSerializer
     permission_classes = [AllowAny]
 
+    async def list(self, request, *args, **kwargs):
+        """List racks with the async ORM"""
+        return await super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         """Filter by site_id if provided"""
         queryset = Rack.objects.select_related("site").prefetch_related("rack_devices__device")
@@ -594,53 +1208,55 @@ def remove_device_from_rack(request, rack_device_id):
         }
     },
 )
-@api_view(["GET"])
-@permission_classes([AllowAny])
-@cache_page(60 * 5)  # Cache for 5 minutes
-def get_site_resource_usage(request, site_id):
+class SiteResourceUsageView(AsyncAPIView):
     """
     Get resource usage (power and HVAC) for a specific site
     """
-    try:
-        site = get_object_or_404(Site, id=site_id)
-        racks = Rack.objects.filter(site=site).prefetch_related("rack_devices__device")
 
-        total_power = 0
-        total_hvac = 0
-        rack_data = []
-
-        for rack in racks:
-            rack_power = rack.get_power_utilization()
-            rack_hvac = rack.get_hvac_load()
+    permission_classes = [AllowAny]
 
-            total_power += rack_power
-            total_hvac += rack_hvac
+    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    async def get(self, request, site_id):
+        try:
+            site = await aget_object_or_404(Site, id=site_id)
+            racks = [rack async for rack in Rack.objects.filter(site=site).prefetch_related("rack_devices__device")]
+
+            total_power = 0
+            total_hvac = 0
+            rack_data = []
+
+            for rack in racks:
+                rack_power = rack.get_power_utilization()
+                rack_hvac = rack.get_hvac_load()
+
+                total_power += rack_power
+                total_hvac += rack_hvac
+
+                rack_data.append(
+                    {
+                        "id": rack.id,
+                        "name": rack.name,
+                        "power_draw": rack_power,
+                        "hvac_load": rack_hvac,
+                        "device_count": len(rack.rack_devices.all()),
+                    }
+                )
 
-            rack_data.append(
+            return Response(
                 {
-                    "id": rack.id,
-                    "name": rack.name,
-                    "power_draw": rack_power,
-                    "hvac_load": rack_hvac,
-                    "device_count": rack.rack_devices.count(),
+                    "site_id": site.id,
+                    "site_name": site.name,
+                    "total_power_draw": total_power,
+                    "total_hvac_load": total_hvac,
+                    "rack_count": len(racks),
+                    "racks": rack_data,
                 }
             )
-
-        return Response(
-            {
-                "site_id": site.id,
-                "site_name": site.name,
-                "total_power_draw": total_power,
-                "total_hvac_load": total_hvac,
-                "rack_count": racks.count(),
-                "racks": rack_data,
-            }
-        )
-    except Exception as e:
-        return Response(
-            {"error": "Failed to calculate resource usage", "details": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        except Exception as e:
+            return Response(
+                {"error": "Failed to calculate resource usage", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
 
 @extend_schema(
@@ -667,44 +1283,48 @@ def get_site_resource_usage(request, site_id):
         }
     },
 )
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def get_rack_resource_usage(request, rack_id):
+class RackResourceUsageView(AsyncAPIView):
     """
     Get resource usage (power and HVAC) for a specific rack
     """
-    try:
-        rack = get_object_or_404(Rack.objects.prefetch_related("rack_devices__device"), id=rack_id)
 
-        devices = []
-        for rd in rack.rack_devices.all():
-            devices.append(
+    permission_classes = [AllowAny]
+
+    async def get(self, request, rack_id):
+        try:
+            rack = await aget_object_or_404(
+                Rack.objects.select_related("site").prefetch_related("rack_devices__device"), id=rack_id
+            )
+
+            devices = []
+            for rd in rack.rack_devices.all():
+                devices.append(
+                    {
+                        "id": rd.id,
+                        "device_name": rd.instance_name or rd.device.name,
+                        "position": rd.position,
+                        "ru_size": rd.device.ru_size,
+                        "power_draw": rd.device.power_draw,
+                        "hvac_load": rd.device.power_draw * 3.41,
+                    }
+                )
+
+            return Response(
                 {
-                    "id": rd.id,
-                    "device_name": rd.instance_name or rd.device.name,
-                    "position": rd.position,
-                    "ru_size": rd.device.ru_size,
-                    "power_draw": rd.device.power_draw,
-                    "hvac_load": rd.device.power_draw * 3.41,
+                    "rack_id": rack.id,
+                    "rack_name": rack.name,
+                    "site_name": rack.site.name,
+                    "total_power_draw": rack.get_power_utilization(),
+                    "total_hvac_load": rack.get_hvac_load(),
+                    "ru_height": rack.ru_height,
+                    "devices": devices,
                 }
             )
-
-        return Response(
-            {
-                "rack_id": rack.id,
-                "rack_name": rack.name,
-                "site_name": rack.site.name,
-                "total_power_draw": rack.get_power_utilization(),
-                "total_hvac_load": rack.get_hvac_load(),
-                "ru_height": rack.ru_height,
-                "devices": devices,
-            }
-        )
-    except Exception as e:
-        return Response(
-            {"error": "Failed to calculate rack resource usage", "details": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        except Exception as e:
+            return Response(
+                {"error": "Failed to calculate rack resource usage", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
 
 # ==================== Provider Management Endpoints ====================
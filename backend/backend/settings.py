@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
@@ -117,6 +118,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.profiling.ProfilingMiddleware",  # First, so timings cover the whole middleware chain; off unless enabled
+    "api.traffic_recording.TrafficRecordingMiddleware",  # Off unless TRAFFIC_RECORDING_FILE is set
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # CORS middleware must be before CommonMiddleware
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -127,6 +130,26 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Request profiling
+# Set PROFILING_ENABLED=true to record wall time, SQL count/time, serializer time and response size
+# per URL name, add Server-Timing headers to responses and serve percentiles to admins at /api/profiling.
+# The most recent PROFILING_SAMPLE_SIZE requests per URL name are kept in memory by each worker.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_SIZE = int(os.getenv("PROFILING_SAMPLE_SIZE", "1000"))
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", "true").lower() == "true"
+
+# Traffic recording
+# Set TRAFFIC_RECORDING_FILE to append every request (method, path, body, status, duration) as JSON lines,
+# for replay against gunicorn with `manage.py replay_traffic`. Authentication and admin requests are
+# excluded by default so recordings never contain passwords.
+TRAFFIC_RECORDING_FILE = os.getenv("TRAFFIC_RECORDING_FILE", "")
+TRAFFIC_RECORDING_EXCLUDE = [
+    prefix.strip()
+    for prefix in os.getenv("TRAFFIC_RECORDING_EXCLUDE", "/api/auth/,/admin/").split(",")
+    if prefix.strip()
+]
+TRAFFIC_RECORDING_MAX_BODY = int(os.getenv("TRAFFIC_RECORDING_MAX_BODY", str(1024 * 1024)))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = os.getenv("CORS_ALLOW_ALL_ORIGINS", "False").lower() == "true"
 CORS_ALLOWED_ORIGINS = (
@@ -163,6 +186,9 @@ WSGI_APPLICATION = "backend.wsgi.application"
 DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
 
 if DB_ENGINE == "mysql":
+    # Under the ASGI server (gunicorn with UvicornWorker) synchronous code runs in a fresh thread per request,
+    # so a persistent per-thread connection is never reused and only stays open idle until it expires. Keep
+    # DB_CONN_MAX_AGE at 0 (close at the end of each request) unless running a thread-based WSGI server.
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.mysql",
@@ -171,6 +197,8 @@ if DB_ENGINE == "mysql":
             "PASSWORD": os.getenv("DB_PASSWORD", ""),
             "HOST": os.getenv("DB_HOST", "localhost"),
             "PORT": os.getenv("DB_PORT", "3306"),
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "0")),
+            "CONN_HEALTH_CHECKS": True,
             "OPTIONS": {
                 "charset": "utf8mb4",
             },
@@ -178,10 +206,31 @@ if DB_ENGINE == "mysql":
     }
 else:
     # SQLite database - simple and no external dependencies
+    # Performance mode (SQLITE_TUNING=true) is applied to every new connection: a WAL journal so readers and
+    # the writer no longer block each other, synchronous=NORMAL (a power loss, but not an application crash,
+    # can lose the last commits), a SQLITE_CACHE_SIZE_KB page cache, memory-mapped reads of the first
+    # SQLITE_MMAP_SIZE bytes and temporary tables in memory. Transactions start with BEGIN IMMEDIATE and wait
+    # up to SQLITE_BUSY_TIMEOUT seconds for the write lock, so concurrent autosaves from several workers queue
+    # up instead of failing with "database is locked". WAL needs a local filesystem (not NFS).
+    SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+    SQLITE_PERFORMANCE_OPTIONS = {
+        "init_command": ";".join(
+            [
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))}",
+                f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+                "PRAGMA temp_store=MEMORY",
+            ]
+        ),
+        "timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+        "transaction_mode": "IMMEDIATE",
+    }
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": SQLITE_PERFORMANCE_OPTIONS if SQLITE_TUNING else {},
         }
     }
 
@@ -243,7 +292,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.async_views.AsyncPageNumberPagination",
     "PAGE_SIZE": 100,
     "EXCEPTION_HANDLER": "api.exception_handlers.custom_exception_handler",
 }
@@ -282,11 +331,86 @@ else:
 # JSON parsing limit (match Express limit of 10mb)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 
+# Server-side configuration import (POST /api/sites/<id>/import, manage.py import_rack_config): the file is
+# parsed as a stream, so it is not subject to DATA_UPLOAD_MAX_MEMORY_SIZE. Racks are written
+# CONFIG_IMPORT_BATCH_SIZE at a time, one transaction per batch.
+CONFIG_IMPORT_MAX_SIZE = int(os.getenv("CONFIG_IMPORT_MAX_SIZE", str(1024 * 1024 * 1024)))  # 1GB
+CONFIG_IMPORT_BATCH_SIZE = int(os.getenv("CONFIG_IMPORT_BATCH_SIZE", "250"))
+
+# Background jobs
+# Long-running operations (background imports, site re-projections) are queued in the jobs table and run by
+# `manage.py run_jobs` workers, outside the gunicorn request timeout. No broker is needed.
+# A failed job is retried up to JOB_MAX_ATTEMPTS times in total, JOB_RETRY_DELAY seconds later (doubling
+# per attempt). Workers send a heartbeat for each running job every JOB_STALE_AFTER / 4 seconds; a running
+# job without a heartbeat for JOB_STALE_AFTER seconds is treated as abandoned by a dead worker and requeued.
+# JOB_CONCURRENCY_LIMITS caps running jobs per kind across all workers ("kind=limit,kind=limit"). Uploaded
+# files of background imports are kept in JOB_STORAGE_DIR until their job finishes.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", "30"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "600"))
+JOB_CONCURRENCY_LIMITS = {
+    kind.strip(): int(limit)
+    for kind, _, limit in (
+        item.partition("=") for item in os.getenv("JOB_CONCURRENCY_LIMITS", "config_import=1").split(",") if item
+    )
+}
+JOB_STORAGE_DIR = os.getenv("JOB_STORAGE_DIR", str(BASE_DIR / "job_files"))
+
 # Session settings
 SESSION_COOKIE_SAMESITE = "Lax"
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
 
+# Session storage, selected with SESSION_BACKEND:
+#   "cached_db" (default with REDIS_URL) - read from the cache, written through to django_session as a fallback
+#   "cache" - cache only
+#   "signed_cookies" - stored in a signed cookie, no server-side reads or writes at all
+#   "db" (default without REDIS_URL) - django_session only (Django's default)
+# "cache" and "cached_db" need a cache shared by all workers (REDIS_URL): with the per-process local memory
+# cache, a logout only clears the session in the worker that handled it and the others keep accepting it.
+# Expired django_session rows are removed by `manage.py purge_expired_sessions`.
+SESSION_ENGINES = {
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+    "db": "django.contrib.sessions.backends.db",
+}
+SESSION_BACKEND = os.getenv("SESSION_BACKEND") or ("cached_db" if REDIS_URL else "db")
+if SESSION_BACKEND not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f"SESSION_BACKEND must be one of {', '.join(SESSION_ENGINES)}, got {SESSION_BACKEND!r}")
+if SESSION_BACKEND in ("cache", "cached_db") and not REDIS_URL:
+    raise ImproperlyConfigured(f"SESSION_BACKEND={SESSION_BACKEND} requires a shared cache; set REDIS_URL")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_PURGE_BATCH_SIZE = int(os.getenv("SESSION_PURGE_BATCH_SIZE", "1000"))
+
+# With AUTH_USER_CACHE=true, authenticated users are loaded from the cache instead of the auth_user table on
+# every request, for up to AUTH_USER_CACHE_TIMEOUT seconds. Cached users are dropped by signals, which
+# queryset.update() does not send, so deactivations and password changes made that way apply only when the
+# entry expires. It needs a cache shared by all workers (REDIS_URL): with the per-process local memory cache,
+# other workers would keep serving the old user.
+AUTH_USER_CACHE = os.getenv("AUTH_USER_CACHE", "false").lower() == "true"
+if AUTH_USER_CACHE and not REDIS_URL:
+    raise ImproperlyConfigured("AUTH_USER_CACHE requires a shared cache; set REDIS_URL")
+AUTHENTICATION_BACKENDS = [
+    "api.auth_backends.CachedModelBackend" if AUTH_USER_CACHE else "django.contrib.auth.backends.ModelBackend"
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", "300"))
+
+# Passkey challenge storage
+# "db" stores WebAuthn challenges in the passkey_challenges table (expired rows are reaped in
+# batches while issuing challenges and by `manage.py purge_passkey_challenges`).
+# "cache" keeps them in the default cache only; use a shared cache (REDIS_URL) with multiple workers.
+PASSKEY_CHALLENGE_STORE = os.getenv("PASSKEY_CHALLENGE_STORE", "db")
+PASSKEY_CHALLENGE_TTL_SECONDS = int(os.getenv("PASSKEY_CHALLENGE_TTL_SECONDS", "300"))
+PASSKEY_CHALLENGE_PURGE_INTERVAL = int(os.getenv("PASSKEY_CHALLENGE_PURGE_INTERVAL", "60"))
+PASSKEY_CHALLENGE_PURGE_BATCH_SIZE = int(os.getenv("PASSKEY_CHALLENGE_PURGE_BATCH_SIZE", "500"))
+
+# Passkey logins
+# Login timestamps (last_used_at) are buffered and written in batches every
+# PASSKEY_LAST_USED_FLUSH_INTERVAL seconds; 0 writes them on every login.
+PASSKEY_LAST_USED_FLUSH_INTERVAL = int(os.getenv("PASSKEY_LAST_USED_FLUSH_INTERVAL", "30"))
+PASSKEY_LAST_USED_BATCH_SIZE = int(os.getenv("PASSKEY_LAST_USED_BATCH_SIZE", "100"))
+
 # CSRF settings
 CSRF_COOKIE_SAMESITE = "Lax"
 CSRF_COOKIE_HTTPONLY = False  # Must be False for JavaScript to read it
@@ -302,6 +426,25 @@ MCP_PORT = int(os.getenv("MCP_PORT", "3001"))
 WATTS_TO_BTU = float(os.getenv("WATTS_TO_BTU", "3.412"))
 BTU_PER_TON = float(os.getenv("BTU_PER_TON", "12000"))
 
+# What-if capacity simulation: most scenarios evaluated per request
+SIMULATION_MAX_SCENARIOS = int(os.getenv("SIMULATION_MAX_SCENARIOS", "10000"))
+
+# Utilization history (manage.py record_utilization): seconds between samples with --loop,
+# and days raw, hourly and daily rows are kept (0 = forever)
+UTILIZATION_SAMPLE_INTERVAL = int(os.getenv("UTILIZATION_SAMPLE_INTERVAL", "300"))
+UTILIZATION_RAW_RETENTION_DAYS = int(os.getenv("UTILIZATION_RAW_RETENTION_DAYS", "7"))
+UTILIZATION_HOURLY_RETENTION_DAYS = int(os.getenv("UTILIZATION_HOURLY_RETENTION_DAYS", "90"))
+UTILIZATION_DAILY_RETENTION_DAYS = int(os.getenv("UTILIZATION_DAILY_RETENTION_DAYS", "0"))
+
+# Change feed (GET /api/sites/<id>/events): seconds between polls of the event log, seconds between
+# keepalive comments, reconnect delay sent to clients, most events replayed to a reconnecting client
+# before it is told to reload, and days events are kept (manage.py purge_change_events)
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1.0"))
+CHANGE_FEED_HEARTBEAT = int(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+CHANGE_FEED_RETRY_MS = int(os.getenv("CHANGE_FEED_RETRY_MS", "3000"))
+CHANGE_FEED_REPLAY_LIMIT = int(os.getenv("CHANGE_FEED_REPLAY_LIMIT", "1000"))
+CHANGE_EVENT_RETENTION_DAYS = int(os.getenv("CHANGE_EVENT_RETENTION_DAYS", "30"))
+
 # drf-spectacular settings for OpenAPI/Swagger documentation
 SPECTACULAR_SETTINGS = {
     "TITLE": "RackSum API",
@@ -0,0 +1,14 @@
+"""
+Performance benchmarks for the RackSum API and MCP handlers
+
+- generator: builds a deterministic synthetic datacenter (sites, racks, device
+  catalog, placements, providers and saved rack configurations) at any scale
+- cases: the timed operations (API hot paths and MCP tool handlers)
+- runner: runs the cases and produces a JSON report that can be compared with
+  a report from another commit
+
+Run through the management command:
+
+    python manage.py run_benchmarks --racks 1000 --output bench.json
+    python manage.py run_benchmarks --racks 1000 --compare bench.json
+"""
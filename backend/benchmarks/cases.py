@@ -0,0 +1,184 @@
+"""
+Benchmark cases
+
+Each case is one operation that the runner calls repeatedly. API cases go
+through the Django test client, so URL routing, middleware, DRF and rendering
+are all included. MCP cases call the tool handlers directly.
+"""
+
+import importlib
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import Client
+
+from api.models import RackConfiguration, Rack, Site
+
+from .generator import GeneratedDatacenter
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class BenchmarkError(Exception):
+    """Raised when a benchmarked operation does not return the expected result"""
+
+
+@dataclass
+class BenchmarkCase:
+    """A named operation to time; `run` receives the iteration number"""
+
+    name: str
+    run: Callable[[int], object]
+    before_each: Optional[Callable[[], None]] = None
+    setup: Optional[Callable[[int], None]] = None
+    skip_reason: Optional[str] = None
+
+
+def _expect(response, status_code: int = 200):
+    if response.status_code != status_code:
+        raise BenchmarkError(f"{response.request['PATH_INFO']} returned {response.status_code}, expected {status_code}")
+    return response
+
+
+def load_mcp_handlers():
+    """
+    Import the local MCP handlers module, or return None if the MCP SDK is not installed.
+
+    The local mcp package shadows the installed MCP SDK of the same name, so (as
+    in mcp/tests/conftest.py) the SDK's mcp.types is imported with the backend
+    directory removed from sys.path and then registered under the local package.
+    """
+    try:
+        return importlib.import_module("mcp.handlers")
+    except ModuleNotFoundError:
+        pass
+
+    for name in [name for name in sys.modules if name == "mcp" or name.startswith("mcp.")]:
+        del sys.modules[name]
+    saved_path = sys.path[:]
+    sys.path[:] = [path for path in sys.path if Path(path or ".").resolve() != BACKEND_DIR]
+    try:
+        sdk_types = importlib.import_module("mcp.types")
+    except ImportError:
+        return None
+    finally:
+        sys.path[:] = saved_path
+        for name in [name for name in sys.modules if name == "mcp" or name.startswith("mcp.")]:
+            del sys.modules[name]
+
+    importlib.import_module("mcp")
+    sys.modules["mcp.types"] = sdk_types
+    return importlib.import_module("mcp.handlers")
+
+
+def _api_cases(datacenter: GeneratedDatacenter, client: Client) -> list[BenchmarkCase]:
+    site_id = datacenter.site_ids[0]
+    rack_id = datacenter.sample_rack_ids[0]
+    config_name = datacenter.sample_rack_config_names[0] if datacenter.sample_rack_config_names else None
+    device_id = datacenter.device_ids[0]
+    scratch_racks = []
+
+    def create_scratch_racks(iterations: int):
+        # add-device needs an empty slot every iteration, so give each iteration its own empty rack
+        site = Site.objects.create(name="Bench Scratch Site")
+        Rack.objects.bulk_create([Rack(site=site, name=f"scratch-{index:05d}") for index in range(iterations)])
+        scratch_racks.extend(Rack.objects.filter(site=site).order_by("name").values_list("id", flat=True))
+
+    cases = [
+        BenchmarkCase("api.racks.list_site", lambda i: _expect(client.get("/api/racks", {"site_id": site_id}))),
+        BenchmarkCase("api.racks.list_all", lambda i: _expect(client.get("/api/racks"))),
+        BenchmarkCase(
+            "api.site_resource_usage",
+            lambda i: _expect(client.get(f"/api/sites/{site_id}/resource-usage")),
+            # The view is wrapped in cache_page; measure the uncached computation
+            before_each=cache.clear,
+        ),
+        BenchmarkCase("api.rack_resource_usage", lambda i: _expect(client.get(f"/api/racks/{rack_id}/resource-usage"))),
+        BenchmarkCase(
+            "api.add_device",
+            lambda i: _expect(
+                client.post(
+                    f"/api/racks/{scratch_racks[i]}/add-device",
+                    {"device": device_id, "position": 1},
+                    content_type="application/json",
+                ),
+                201,
+            ),
+            setup=create_scratch_racks,
+        ),
+    ]
+
+    if config_name is None:
+        skip = "no rack configurations generated (--rack-configs 0)"
+        for name in ("api.rack_config.save", "api.rack_config.load", "api.rack_config.list"):
+            cases.append(BenchmarkCase(name, lambda i: None, skip_reason=skip))
+        return cases
+
+    config_data = RackConfiguration.objects.get(site_id=site_id, name=config_name).config_data
+    cases += [
+        BenchmarkCase(
+            "api.rack_config.save",
+            lambda i: _expect(
+                client.post(
+                    f"/api/sites/{site_id}/racks",
+                    {"name": config_name, "configData": config_data},
+                    content_type="application/json",
+                ),
+                201,
+            ),
+        ),
+        BenchmarkCase(
+            "api.rack_config.load", lambda i: _expect(client.get(f"/api/sites/{site_id}/racks/{config_name}"))
+        ),
+        BenchmarkCase("api.rack_config.list", lambda i: _expect(client.get(f"/api/sites/{site_id}/racks"))),
+    ]
+    return cases
+
+
+def _mcp_cases(datacenter: GeneratedDatacenter) -> list[BenchmarkCase]:
+    names = [
+        "mcp.get_site_stats",
+        "mcp.get_site_details",
+        "mcp.get_rack_details",
+        "mcp.get_resource_summary",
+        "mcp.get_available_resources",
+        "mcp.search_devices",
+    ]
+    handlers = load_mcp_handlers()
+    if handlers is None:
+        return [BenchmarkCase(name, lambda i: None, skip_reason="MCP SDK is not installed") for name in names]
+
+    site = Site.objects.get(id=datacenter.site_ids[0])
+    rack = Rack.objects.get(id=datacenter.sample_rack_ids[0])
+
+    def call(handler, *args, **kwargs):
+        def run(i):
+            result = async_to_sync(handler)(*args, **kwargs)
+            if result and result[0].text.startswith("Error"):
+                raise BenchmarkError(result[0].text)
+            return result
+
+        return run
+
+    calls = [
+        call(handlers.get_site_stats),
+        call(handlers.get_site_details, site.name),
+        call(handlers.get_rack_details, site.name, rack.name),
+        call(handlers.get_resource_summary),
+        call(handlers.get_available_resources),
+        call(handlers.search_devices, "bench server"),
+    ]
+    return [BenchmarkCase(name, run) for name, run in zip(names, calls)]
+
+
+def build_cases(datacenter: GeneratedDatacenter, include_mcp: bool = True) -> list[BenchmarkCase]:
+    """All benchmark cases for a generated datacenter"""
+    client = Client()
+    cases = _api_cases(datacenter, client)
+    if include_mcp:
+        cases += _mcp_cases(datacenter)
+    return cases
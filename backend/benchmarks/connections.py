@@ -0,0 +1,95 @@
+"""
+Per-request database connection cost
+
+Simulates the connection lifecycle of a request against the configured
+database without going through HTTP:
+
+- connect: a new connection per request (CONN_MAX_AGE=0, Django's default)
+- persistent: one connection per thread kept across requests (CONN_MAX_AGE>0
+  with CONN_HEALTH_CHECKS), as with a threaded WSGI worker
+
+Every simulated request runs one query, so the difference between the modes
+is the connection setup and teardown a request pays for.
+"""
+
+import copy
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.db.utils import load_backend
+
+from .runner import _percentile
+
+QUERY = "SELECT 1"
+
+
+MODES = ["connect", "persistent"]
+
+
+def _settings_for(mode: str, base: dict) -> dict:
+    settings_dict = copy.deepcopy(base)
+    settings_dict["CONN_MAX_AGE"] = None if mode == "persistent" else 0
+    settings_dict["CONN_HEALTH_CHECKS"] = mode == "persistent"
+    return settings_dict
+
+
+def run_mode(mode: str, requests: int = 500, threads: int = 1, alias: str = "default") -> dict:
+    """Run `requests` simulated requests on `threads` threads and return per-request timings in ms"""
+    settings_dict = _settings_for(mode, connections[alias].settings_dict)
+    backend = load_backend(settings_dict["ENGINE"])
+    local = threading.local()
+    wrappers = []
+
+    def wrapper():
+        # One wrapper per request, except in persistent mode where each thread keeps its own
+        if mode != "persistent":
+            return backend.DatabaseWrapper(settings_dict, alias=f"bench-{mode}")
+        if not hasattr(local, "wrapper"):
+            local.wrapper = backend.DatabaseWrapper(settings_dict, alias=f"bench-{mode}")
+            wrappers.append(local.wrapper)
+        return local.wrapper
+
+    def request(_):
+        started = time.perf_counter()
+        db = wrapper()
+        # What the request_started and request_finished signals do around every request
+        db.close_if_unusable_or_obsolete()
+        with db.cursor() as cursor:
+            cursor.execute(QUERY)
+            cursor.fetchone()
+        db.close_if_unusable_or_obsolete()
+        return (time.perf_counter() - started) * 1000
+
+    # Warm up: first connection and server variable queries
+    request(None)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        durations = sorted(executor.map(request, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    for db in wrappers:
+        db.inc_thread_sharing()
+        db.close()
+
+    return {
+        "requests": requests,
+        "threads": threads,
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(_percentile(durations, 95), 3),
+        "throughput_rps": round(requests / elapsed, 1),
+    }
+
+
+def run_connection_benchmark(requests: int = 500, threads: int = 1, modes=None, alias: str = "default") -> dict:
+    """Run every mode and report the saving per request against connecting every time"""
+    modes = modes or MODES
+    results = {mode: run_mode(mode, requests=requests, threads=threads, alias=alias) for mode in modes}
+    baseline = results.get("connect")
+    if baseline:
+        for result in results.values():
+            result["saving_ms"] = round(baseline["mean_ms"] - result["mean_ms"], 3)
+    return {"vendor": connections[alias].vendor, "results": results}
@@ -0,0 +1,217 @@
+"""
+Deterministic synthetic datacenter generator
+
+The same DatacenterSpec (including the seed) always produces the same sites,
+racks, device catalog, placements, providers and rack configurations, so
+benchmark runs on different commits measure identical data. Rows are written
+with bulk_create one site at a time, which keeps memory flat up to 100k racks.
+"""
+
+import math
+import random
+import time
+from dataclasses import asdict, dataclass, field
+
+from django.db import transaction
+
+from api.device_search import invalidate_index
+from api.models import Device, HardwareProvider, Provider, Rack, RackConfiguration, RackDevice, Site
+
+# Rows per INSERT statement
+BATCH_SIZE = 2000
+
+VENDORS = ["Cisco", "Dell", "HPE", "Juniper", "NetApp", "APC", "Vertiv", "Arista"]
+
+# (category, possible RU sizes, power draw range in watts, power ports used)
+DEVICE_PROFILES = [
+    ("servers", (1, 2, 4), (250, 1200), 2),
+    ("network", (1, 2), (80, 750), 2),
+    ("storage", (2, 4), (400, 1600), 2),
+    ("power", (1, 2), (0, 150), 0),
+    ("cooling", (1,), (50, 300), 1),
+]
+
+
+@dataclass
+class DatacenterSpec:
+    """Size and shape of a generated datacenter"""
+
+    racks: int = 100
+    racks_per_site: int = 250
+    devices: int = 200
+    fill: float = 0.6
+    ru_height: int = 42
+    providers_per_site: int = 4
+    rack_configs: int = 200
+    seed: int = 42
+
+    @property
+    def sites(self) -> int:
+        return max(1, math.ceil(self.racks / self.racks_per_site))
+
+
+@dataclass
+class GeneratedDatacenter:
+    """Row counts and handles to sample objects used by the benchmark cases"""
+
+    spec: DatacenterSpec
+    site_ids: list = field(default_factory=list)
+    sample_rack_ids: list = field(default_factory=list)
+    sample_rack_config_names: list = field(default_factory=list)
+    device_ids: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def summary(self) -> dict:
+        return {"spec": asdict(self.spec), "counts": self.counts, "generate_seconds": round(self.seconds, 3)}
+
+
+def _create_catalog(spec: DatacenterSpec, rng: random.Random) -> list[Device]:
+    vendors = HardwareProvider.objects.bulk_create([HardwareProvider(name=f"Bench {name}") for name in VENDORS])
+    vendors = list(HardwareProvider.objects.filter(name__in=[v.name for v in vendors]).order_by("name"))
+
+    devices = []
+    for index in range(spec.devices):
+        category, ru_sizes, (min_power, max_power), ports = DEVICE_PROFILES[index % len(DEVICE_PROFILES)]
+        vendor = vendors[index % len(vendors)]
+        ru_size = rng.choice(ru_sizes)
+        devices.append(
+            Device(
+                device_id=f"bench-{category}-{index:05d}",
+                name=f"{vendor.name} {category.title()} {ru_size}U Model {index:05d}",
+                category=category,
+                provider=vendor,
+                ru_size=ru_size,
+                power_draw=rng.randint(min_power, max_power),
+                power_ports_used=ports,
+                color=f"#{rng.randrange(0x1000000):06X}",
+                description=f"Synthetic {ru_size}U {category} device for benchmarks",
+            )
+        )
+    Device.objects.bulk_create(devices, batch_size=BATCH_SIZE)
+    # Reload so primary keys are set on every backend (MySQL does not return them from bulk_create)
+    return list(Device.objects.filter(device_id__startswith="bench-").order_by("device_id"))
+
+
+def _fill_rack(spec: DatacenterSpec, rng: random.Random, catalog: list[Device]) -> list[tuple[Device, int]]:
+    """Choose devices for one rack, stacked from RU 1 up to the fill ratio"""
+    target = int(spec.ru_height * spec.fill)
+    placements = []
+    position = 1
+    while True:
+        device = rng.choice(catalog)
+        if device.ru_size == 0 or position + device.ru_size - 1 > target:
+            break
+        placements.append((device, position))
+        position += device.ru_size
+    return placements
+
+
+def _rack_config_data(spec: DatacenterSpec, rack_name: str, placements: list[tuple[Device, int]]) -> dict:
+    """Rack configuration in the format the frontend saves"""
+    return {
+        "metadata": {"description": f"Benchmark configuration for {rack_name}"},
+        "settings": {"totalPowerCapacity": 10000, "hvacCapacity": 36000, "ruPerRack": spec.ru_height},
+        "racks": [
+            {
+                "id": "rack-1",
+                "name": rack_name,
+                "ruSize": spec.ru_height,
+                "devices": [
+                    {
+                        "id": device.device_id,
+                        "name": device.name,
+                        "category": device.category,
+                        "ruSize": device.ru_size,
+                        "powerDraw": device.power_draw,
+                        "position": position,
+                        "instanceId": f"{device.device_id}-{position}",
+                        "customName": device.name,
+                    }
+                    for device, position in placements
+                ],
+            }
+        ],
+        "unrackedDevices": [],
+    }
+
+
+def generate_datacenter(spec: DatacenterSpec) -> GeneratedDatacenter:
+    """Populate the current database with a synthetic datacenter described by `spec`"""
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    result = GeneratedDatacenter(spec=spec)
+    counts = {"sites": 0, "racks": 0, "rack_devices": 0, "providers": 0, "rack_configurations": 0}
+
+    with transaction.atomic():
+        catalog = _create_catalog(spec, rng)
+    result.device_ids = [device.id for device in catalog]
+    counts["devices"] = len(catalog)
+
+    racks_left = spec.racks
+    configs_left = spec.rack_configs
+    for site_index in range(spec.sites):
+        site_racks = min(spec.racks_per_site, racks_left)
+        racks_left -= site_racks
+
+        with transaction.atomic():
+            site = Site.objects.create(name=f"Bench Site {site_index:04d}", description="Synthetic benchmark site")
+            Rack.objects.bulk_create(
+                [
+                    Rack(site=site, name=f"R{site_index:04d}-{rack_index:05d}", ru_height=spec.ru_height)
+                    for rack_index in range(site_racks)
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            racks = list(Rack.objects.filter(site=site).order_by("name").values_list("id", "name"))
+
+            placements_by_rack = {rack_id: _fill_rack(spec, rng, catalog) for rack_id, _ in racks}
+            RackDevice.objects.bulk_create(
+                [
+                    RackDevice(rack_id=rack_id, device=device, position=position)
+                    for rack_id, placements in placements_by_rack.items()
+                    for device, position in placements
+                ],
+                batch_size=BATCH_SIZE,
+            )
+
+            providers = [
+                Provider(
+                    site=site,
+                    name=f"{'UPS' if index % 2 == 0 else 'CRAC'}-{index + 1:02d}",
+                    type="power" if index % 2 == 0 else "cooling",
+                    power_capacity=rng.randint(20, 200) * 1000 if index % 2 == 0 else 0,
+                    cooling_capacity=rng.randint(10, 60) * 12000 if index % 2 == 1 else 0,
+                )
+                for index in range(spec.providers_per_site)
+            ]
+            Provider.objects.bulk_create(providers, batch_size=BATCH_SIZE)
+
+            site_configs = racks[: max(0, configs_left)]
+            configs_left -= len(site_configs)
+            RackConfiguration.objects.bulk_create(
+                [
+                    RackConfiguration(
+                        site=site, name=name, config_data=_rack_config_data(spec, name, placements_by_rack[rack_id])
+                    )
+                    for rack_id, name in site_configs
+                ],
+                batch_size=BATCH_SIZE,
+            )
+
+        result.site_ids.append(site.id)
+        if site_index == 0:
+            result.sample_rack_ids = [rack_id for rack_id, _ in racks[:10]]
+            result.sample_rack_config_names = [name for _, name in site_configs[:10]]
+        counts["sites"] += 1
+        counts["racks"] += len(racks)
+        counts["rack_devices"] += sum(len(placements) for placements in placements_by_rack.values())
+        counts["providers"] += len(providers)
+        counts["rack_configurations"] += len(site_configs)
+
+    # bulk_create does not send the signals that keep the device search index current
+    invalidate_index()
+
+    result.counts = counts
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,231 @@
+"""
+Replay recorded API traffic against a running server
+
+Request sequences come either from a gunicorn access log written with the
+access_log_format in gunicorn.conf.py, or from a TrafficRecordingMiddleware
+recording (JSON lines, which also carry request bodies). The sequence is
+replayed `multiplier` times side by side by a pool of `concurrency` worker
+threads, each with its own keep-alive HTTP connection.
+
+With speed=0 requests are sent as fast as the workers can go, which measures
+maximum throughput. With speed > 0 every request is held back until its
+recorded offset divided by `speed`, which reproduces the recorded traffic mix
+and arrival rate (speed=2 replays an hour of traffic in 30 minutes).
+"""
+
+import http.client
+import json
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from .runner import _percentile
+
+# %(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s
+ACCESS_LOG_RE = re.compile(
+    r'^(?P<host>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" '
+    r'(?P<status>\d{3}) (?P<bytes>\S+) "[^"]*" "[^"]*" (?P<micros>\d+)'
+)
+ACCESS_LOG_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Path segments that are ids, collapsed when grouping results per endpoint
+_ID_SEGMENT_RE = re.compile(r"/(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?=/|$)")
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class RecordedRequest:
+    """A request to replay; `offset` is seconds since the first recorded request"""
+
+    method: str
+    path: str
+    offset: float = 0.0
+    body: Optional[str] = None
+    content_type: str = ""
+    recorded_status: Optional[int] = None
+    recorded_ms: Optional[float] = None
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of one replayed request"""
+
+    endpoint: str
+    status: int
+    latency_ms: float
+    error: Optional[str] = None
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """Group requests by method and path with ids replaced by {id} and the query string dropped"""
+    return f"{method} {_ID_SEGMENT_RE.sub('/{id}', path.split('?', 1)[0])}"
+
+
+def _with_offsets(requests: list[RecordedRequest], timestamps: list[float]) -> list[RecordedRequest]:
+    if timestamps:
+        first = min(timestamps)
+        for request, timestamp in zip(requests, timestamps):
+            request.offset = timestamp - first
+    return sorted(requests, key=lambda request: request.offset)
+
+
+def parse_access_log(lines: Iterable[str]) -> list[RecordedRequest]:
+    """Parse gunicorn access log lines; lines in other formats are skipped"""
+    requests, timestamps = [], []
+    for line in lines:
+        match = ACCESS_LOG_RE.match(line.strip())
+        if not match:
+            continue
+        requests.append(
+            RecordedRequest(
+                method=match["method"],
+                path=match["path"],
+                recorded_status=int(match["status"]),
+                recorded_ms=int(match["micros"]) / 1000,
+            )
+        )
+        timestamps.append(datetime.strptime(match["time"], ACCESS_LOG_TIME_FORMAT).timestamp())
+    return _with_offsets(requests, timestamps)
+
+
+def parse_recording(lines: Iterable[str]) -> list[RecordedRequest]:
+    """Parse a TrafficRecordingMiddleware recording (one JSON object per line)"""
+    requests, timestamps = [], []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        entry = json.loads(line)
+        requests.append(
+            RecordedRequest(
+                method=entry["method"],
+                path=entry["path"],
+                body=entry.get("body"),
+                content_type=entry.get("content_type", ""),
+                recorded_status=entry.get("status"),
+                recorded_ms=entry.get("duration_ms"),
+            )
+        )
+        timestamps.append(entry["ts"])
+    return _with_offsets(requests, timestamps)
+
+
+class _Worker(threading.local):
+    """Per-thread keep-alive connection to the target server"""
+
+    connection: Optional[http.client.HTTPConnection] = None
+
+
+def _send(worker: _Worker, base_url, request: RecordedRequest, timeout: float, extra_headers: dict) -> ReplayResult:
+    endpoint = endpoint_key(request.method, request.path)
+    headers = dict(extra_headers)
+    if request.body is not None and request.content_type:
+        headers["Content-Type"] = request.content_type
+    body = request.body.encode("utf-8") if request.body is not None else None
+
+    started = time.perf_counter()
+    try:
+        if worker.connection is None:
+            connection_class = http.client.HTTPSConnection if base_url.scheme == "https" else http.client.HTTPConnection
+            worker.connection = connection_class(base_url.hostname, base_url.port, timeout=timeout)
+        worker.connection.request(request.method, base_url.path.rstrip("/") + request.path, body=body, headers=headers)
+        response = worker.connection.getresponse()
+        response.read()
+        if response.getheader("Connection", "").lower() == "close":
+            worker.connection.close()
+            worker.connection = None
+        return ReplayResult(endpoint, response.status, (time.perf_counter() - started) * 1000)
+    except (OSError, http.client.HTTPException) as e:
+        if worker.connection is not None:
+            worker.connection.close()
+            worker.connection = None
+        return ReplayResult(endpoint, 0, (time.perf_counter() - started) * 1000, error=f"{type(e).__name__}: {e}")
+
+
+def replay(
+    requests: list[RecordedRequest],
+    base_url: str,
+    concurrency: int = 4,
+    multiplier: int = 1,
+    speed: float = 0.0,
+    timeout: float = 30.0,
+    headers: Optional[dict] = None,
+) -> tuple[list[ReplayResult], float]:
+    """
+    Replay the requests and return the results and the total wall time in seconds.
+
+    Recordings carry no headers, so authentication (a session cookie, for
+    example) has to be passed in `headers` and is sent with every request.
+    """
+    target = urlsplit(base_url)
+    schedule = [request for _ in range(multiplier) for request in requests]
+    if speed > 0:
+        schedule.sort(key=lambda request: request.offset)
+
+    worker = _Worker()
+    started = time.perf_counter()
+
+    def run(request: RecordedRequest) -> ReplayResult:
+        if speed > 0:
+            delay = started + request.offset / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return _send(worker, target, request, timeout, headers or {})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, schedule))
+    return results, time.perf_counter() - started
+
+
+def _latency_summary(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    summary = {"mean": round(statistics.fmean(ordered), 3), "max": round(ordered[-1], 3)}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}"] = round(_percentile(ordered, percentile), 3)
+    return summary
+
+
+def summarize(results: list[ReplayResult], elapsed: float) -> dict:
+    """
+    Throughput, latency percentiles (ms) and error rates, overall and per endpoint.
+
+    `error_rate` counts connection failures and 5xx responses; 4xx responses are
+    reported separately as `client_error_rate` since replayed writes can
+    legitimately conflict with data created earlier in the run.
+    """
+
+    def stats(group: list[ReplayResult], seconds: float) -> dict:
+        errors = sum(1 for result in group if result.status == 0 or result.status >= 500)
+        client_errors = sum(1 for result in group if 400 <= result.status < 500)
+        return {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / seconds, 2) if seconds else None,
+            "latency_ms": _latency_summary([result.latency_ms for result in group]),
+            "error_rate": round(errors / len(group), 4),
+            "client_error_rate": round(client_errors / len(group), 4),
+        }
+
+    if not results:
+        return {"requests": 0, "elapsed_seconds": round(elapsed, 3), "endpoints": {}}
+
+    by_endpoint: dict[str, list[ReplayResult]] = {}
+    for result in results:
+        by_endpoint.setdefault(result.endpoint, []).append(result)
+
+    summary = stats(results, elapsed)
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["status_codes"] = dict(sorted(Counter(str(result.status) for result in results).items()))
+    summary["sample_errors"] = sorted({result.error for result in results if result.error})[:5]
+    summary["endpoints"] = {
+        endpoint: stats(group, elapsed)
+        for endpoint, group in sorted(by_endpoint.items(), key=lambda item: len(item[1]), reverse=True)
+    }
+    return summary
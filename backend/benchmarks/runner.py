@@ -0,0 +1,132 @@
+"""
+Benchmark runner and JSON reports
+
+Every case runs `warmup` untimed iterations followed by `repeat` timed ones.
+The report records wall time statistics and the median number of SQL queries
+per iteration for each case, together with the generated data set and the
+environment, so two reports (for example from two commits) can be compared
+with compare_reports().
+"""
+
+import fnmatch
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .cases import BenchmarkCase
+from .generator import GeneratedDatacenter
+
+REPORT_VERSION = 1
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _percentile(ordered: list[float], percentile: int) -> float:
+    # Nearest-rank percentile of an already sorted list
+    rank = max(0, -(-percentile * len(ordered) // 100) - 1)
+    return ordered[rank]
+
+
+def run_case(case: BenchmarkCase, repeat: int, warmup: int) -> dict:
+    """Time a single case and return its statistics (durations in milliseconds)"""
+    if case.skip_reason:
+        return {"skipped": case.skip_reason}
+    if case.setup:
+        case.setup(warmup + repeat)
+
+    durations = []
+    queries = []
+    for iteration in range(warmup + repeat):
+        if case.before_each:
+            case.before_each()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            case.run(iteration)
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            durations.append(elapsed * 1000)
+            queries.append(len(captured.captured_queries))
+
+    ordered = sorted(durations)
+    return {
+        "iterations": repeat,
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(_percentile(ordered, 95), 3),
+        "max_ms": round(ordered[-1], 3),
+        "queries": int(statistics.median(queries)),
+    }
+
+
+def run_benchmarks(
+    datacenter: GeneratedDatacenter,
+    cases: list[BenchmarkCase],
+    repeat: int = 10,
+    warmup: int = 2,
+    patterns: Optional[list[str]] = None,
+    progress=None,
+) -> dict:
+    """Run every case whose name matches one of `patterns` (all cases if none) and build the report"""
+    results = {}
+    for case in cases:
+        if patterns and not any(fnmatch.fnmatch(case.name, pattern) for pattern in patterns):
+            continue
+        results[case.name] = run_case(case, repeat=repeat, warmup=warmup)
+        if progress:
+            progress(case.name, results[case.name])
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "platform": platform.platform(),
+        },
+        "dataset": datacenter.summary(),
+        "settings": {"repeat": repeat, "warmup": warmup},
+        "results": results,
+    }
+
+
+def compare_reports(baseline: dict, current: dict) -> list[dict]:
+    """
+    Compare the median times of two reports case by case.
+
+    `change` is the relative change of the median (0.25 means 25% slower than
+    the baseline). Cases missing or skipped in either report are left out.
+    """
+    comparison = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median_ms" not in base or "median_ms" not in result:
+            continue
+        change = (result["median_ms"] - base["median_ms"]) / base["median_ms"] if base["median_ms"] else 0.0
+        comparison.append(
+            {
+                "case": name,
+                "baseline_ms": base["median_ms"],
+                "current_ms": result["median_ms"],
+                "change": round(change, 4),
+                "baseline_queries": base.get("queries"),
+                "current_queries": result.get("queries"),
+            }
+        )
+    return comparison
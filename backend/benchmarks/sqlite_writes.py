@@ -0,0 +1,205 @@
+"""
+SQLite write concurrency
+
+Runs `workers` processes, standing in for gunicorn workers, that each perform
+`writes` rack configuration autosaves (RackConfiguration update_or_create, as
+the save endpoint does) followed by a read of the site's configurations,
+against a fresh SQLite file. Each profile is a set of SQLite connection
+OPTIONS:
+
+- stock: Django's defaults (rollback journal, synchronous=FULL, deferred
+  transactions, 5 second busy timeout)
+- tuned: SQLITE_PERFORMANCE_OPTIONS from settings (WAL, synchronous=NORMAL,
+  larger cache, mmap, immediate transactions, longer busy timeout)
+
+The rack configuration projection is disconnected in the workers: the
+benchmark payload has no racks to project, and the projection writes through
+the default database rather than the benchmark file.
+
+Autosaves that fail with "database is locked" are counted rather than
+retried, so the report shows both throughput and how many saves a user would
+have lost.
+"""
+
+import copy
+import multiprocessing
+import os
+import queue
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import connections
+
+ALIAS = "sqlite_write_benchmark"
+RACKS_PER_WORKER = 5
+DEVICES_PER_RACK = 20
+STARTUP_TIMEOUT = 60
+SITE_NAME = "SQLite write benchmark"
+
+
+def profiles() -> dict:
+    """Connection OPTIONS per profile; `tuned` is only available when settings define the SQLite tuning"""
+    result = {"stock": {}}
+    tuned = getattr(settings, "SQLITE_PERFORMANCE_OPTIONS", None)
+    if tuned is not None:
+        result["tuned"] = tuned
+    return result
+
+
+def _payload(worker: int, write: int) -> dict:
+    # Roughly the size of a half-filled rack as the frontend autosaves it
+    return {
+        "devices": [
+            {"instanceId": f"{worker}-{write}-{slot}", "deviceId": "server-1u", "position": slot, "customName": None}
+            for slot in range(1, DEVICES_PER_RACK + 1)
+        ],
+        "savedBy": worker,
+        "revision": write,
+    }
+
+
+def _create_schema():
+    from api.models import ChangeEvent, RackConfiguration, Site
+
+    with connections[ALIAS].schema_editor() as editor:
+        editor.create_model(Site)
+        editor.create_model(RackConfiguration)
+        # Each autosave also appends a change event
+        editor.create_model(ChangeEvent)
+    Site.objects.using(ALIAS).create(name=SITE_NAME)
+
+
+def _worker(settings_dict: dict, worker: int, writes: int, barrier, results):
+    try:
+        import django
+
+        django.setup()
+        from django.db import OperationalError
+        from django.db.models.signals import post_save
+        from api.models import RackConfiguration, Site
+        from api.projection import _project_on_save
+
+        post_save.disconnect(_project_on_save, sender=RackConfiguration)
+        connections.settings[ALIAS] = settings_dict
+        if worker == 0:
+            _create_schema()
+        barrier.wait(timeout=STARTUP_TIMEOUT)
+        site_id = Site.objects.using(ALIAS).values_list("id", flat=True).get(name=SITE_NAME)
+
+        latencies, locked = [], 0
+        started = time.perf_counter()
+        for write in range(writes):
+            saved = time.perf_counter()
+            try:
+                RackConfiguration.objects.using(ALIAS).update_or_create(
+                    site_id=site_id,
+                    name=f"worker-{worker}-rack-{write % RACKS_PER_WORKER}",
+                    defaults={"config_data": _payload(worker, write)},
+                )
+                len(RackConfiguration.objects.using(ALIAS).filter(site_id=site_id).values_list("id", "name"))
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                locked += 1
+            latencies.append((time.perf_counter() - saved) * 1000)
+        elapsed = time.perf_counter() - started
+        connections[ALIAS].close()
+        results.put({"latencies": latencies, "locked": locked, "elapsed": elapsed})
+    except Exception as e:
+        # Release the other workers if this one fails before the start line
+        barrier.abort()
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _settings_for(options: dict, path: str) -> dict:
+    settings_dict = copy.deepcopy(connections["default"].settings_dict)
+    settings_dict.update(
+        {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": path,
+            "OPTIONS": copy.deepcopy(options),
+            "CONN_MAX_AGE": None,
+            "CONN_HEALTH_CHECKS": False,
+            "ATOMIC_REQUESTS": False,
+            "TEST": {},
+        }
+    )
+    return settings_dict
+
+
+def _collect(results, processes, timeout: float) -> list[dict]:
+    deadline = time.monotonic() + timeout
+    outcomes = []
+    while len(outcomes) < len(processes):
+        try:
+            outcomes.append(results.get(timeout=1))
+        except queue.Empty:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"SQLite write benchmark did not finish within {timeout}s")
+            if not any(process.is_alive() for process in processes) and results.empty():
+                raise RuntimeError("Benchmark worker exited without reporting")
+    return outcomes
+
+
+def run_profile(options: dict, workers: int = 4, writes: int = 200, timeout: float = 600) -> dict:
+    """Run the autosave workload with the given connection OPTIONS against a new database file"""
+    # Imported here: spawned workers import this module before django.setup(), and runner imports models
+    from .runner import _percentile
+
+    with tempfile.TemporaryDirectory(prefix="racksum-sqlite-bench-") as directory:
+        settings_dict = _settings_for(options, os.path.join(directory, "bench.sqlite3"))
+
+        # Fresh interpreters like gunicorn workers, rather than forks sharing this process's connections
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=_worker, args=(settings_dict, worker, writes, barrier, results))
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            outcomes = _collect(results, processes, timeout)
+        finally:
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+    # Workers released by another worker's failure report BrokenBarrierError; report the cause instead
+    errors = sorted(
+        (outcome["error"] for outcome in outcomes if "error" in outcome), key=lambda error: "BrokenBarrier" in error
+    )
+    if errors:
+        raise RuntimeError(f"Benchmark worker failed: {errors[0]}")
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome["latencies"])
+    locked = sum(outcome["locked"] for outcome in outcomes)
+    elapsed = max(outcome["elapsed"] for outcome in outcomes)
+    total = workers * writes
+    return {
+        "workers": workers,
+        "writes": total,
+        "saved": total - locked,
+        "locked_errors": locked,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_wps": round((total - locked) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def run_sqlite_write_benchmark(workers: int = 4, writes: int = 200, names=None) -> dict:
+    """Run every profile (or the named ones) and report the speedup over stock"""
+    available = profiles()
+    names = names or list(available)
+    results = {name: run_profile(available[name], workers=workers, writes=writes) for name in names}
+    baseline = results.get("stock")
+    if baseline and baseline["throughput_wps"]:
+        for result in results.values():
+            result["speedup"] = round(result["throughput_wps"] / baseline["throughput_wps"], 2)
+    return {"workers": workers, "writes_per_worker": writes, "results": results}
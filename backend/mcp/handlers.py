@@ -2,17 +2,74 @@
 MCP tool handler implementations for RackSum datacenter management
 """
 
+import json
 import logging
-from typing import Optional
+from typing import AsyncIterator, Generator, Iterator, Optional
 from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.functions import Lower
 from mcp.types import TextContent
 
-from api.models import Site, Rack, Device, RackDevice, DeviceGroup, Provider
+from api.change_events import CursorExpiredError, MAX_PAGE_SIZE, read_changes, record_rows
+from api.models import ChangeEvent, Site, Rack, Device, RackDevice, DeviceGroup, Provider
+from api.device_search import search_devices as search_device_index, invalidate_index
 from .formatters import format_power, format_hvac, format_space_utilization, calculate_heat_output
 from . import json_formatters
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+# Number of rows fetched per database round trip when streaming large outputs
+STREAM_CHUNK_SIZE = 100
+
+# Number of rows inserted per INSERT statement by the bulk write tools
+BULK_CREATE_BATCH_SIZE = 500
+
+
+def _lower(value):
+    """Lowercase a name for name__lower lookups, passing non-strings through unchanged"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _site_stats_lines(site) -> list[str]:
+    """Text lines describing a single site in the site statistics output"""
+    racks = list(site.racks.all())
+    total_devices = sum(rack.rack_devices.count() for rack in racks)
+    total_power = sum(rack.get_power_utilization() for rack in racks)
+    total_hvac = sum(rack.get_hvac_load() for rack in racks)
+
+    lines = [f"\n📍 Site: {site.name}"]
+    if site.description:
+        lines.append(f"   Description: {site.description}")
+    lines.append(f"   Racks: {len(racks)}")
+    lines.append(f"   Devices: {total_devices}")
+    lines.append(f"   Total Power: {format_power(total_power)}")
+    lines.append(f"   Total HVAC Load: {format_hvac(total_hvac)}")
+    lines.append(f"   Created: {site.created_at.strftime('%Y-%m-%d %H:%M')}")
+    return lines
+
+
+def _rack_summary_lines(rack) -> list[str]:
+    """Text lines describing a single rack in the site details output"""
+    devices = list(rack.rack_devices.all())
+    power = rack.get_power_utilization()
+    hvac = rack.get_hvac_load()
+    ru_used = sum(device.device.ru_size for device in devices)
+    ru_available = rack.ru_height - ru_used
+
+    lines = [f"\n🔲 Rack: {rack.name}"]
+    if rack.description:
+        lines.append(f"   Description: {rack.description}")
+    lines.append(f"   Height: {rack.ru_height}U")
+    lines.append(f"   Space Used: {format_space_utilization(ru_used, rack.ru_height)}")
+    lines.append(f"   Available: {ru_available}U")
+    lines.append(f"   Devices: {len(devices)}")
+    lines.append(f"   Power: {format_power(power)}")
+    lines.append(f"   HVAC Load: {format_hvac(hvac)}")
+    return lines
+
 
 async def get_site_stats(output_format: str = "text") -> list[TextContent]:
     """Get statistics for all sites"""
@@ -38,20 +95,7 @@ async def get_site_stats(output_format: str = "text") -> list[TextContent]:
             stats.append("=== SITE STATISTICS ===\n")
 
             for site in sites:
-                racks = list(site.racks.all())
-                total_racks = len(racks)
-                total_devices = sum(rack.rack_devices.count() for rack in racks)
-                total_power = sum(rack.get_power_utilization() for rack in racks)
-                total_hvac = sum(rack.get_hvac_load() for rack in racks)
-
-                stats.append(f"\n📍 Site: {site.name}")
-                if site.description:
-                    stats.append(f"   Description: {site.description}")
-                stats.append(f"   Racks: {total_racks}")
-                stats.append(f"   Devices: {total_devices}")
-                stats.append(f"   Total Power: {format_power(total_power)}")
-                stats.append(f"   Total HVAC Load: {format_hvac(total_hvac)}")
-                stats.append(f"   Created: {site.created_at.strftime('%Y-%m-%d %H:%M')}")
+                stats.extend(_site_stats_lines(site))
 
             logger.info(f"Successfully retrieved stats for {len(sites)} sites")
             return "\n".join(stats)
@@ -72,7 +116,7 @@ async def get_site_details(site_name: str, output_format: str = "text") -> list[
             logger.info(f"Fetching details for site: {site_name} (format: {output_format})")
             # Use prefetch_related to avoid N+1 queries
             # Use case-insensitive lookup for better user experience
-            site = Site.objects.prefetch_related("racks__rack_devices__device").get(name__iexact=site_name)
+            site = Site.objects.prefetch_related("racks__rack_devices__device").get(name__lower=_lower(site_name))
         except Site.DoesNotExist:
             logger.warning(f"Site not found: {site_name}")
             return f"Site '{site_name}' not found."
@@ -99,21 +143,7 @@ async def get_site_details(site_name: str, output_format: str = "text") -> list[
             if racks:
                 details.append("--- RACKS ---")
                 for rack in racks:
-                    devices = list(rack.rack_devices.all())
-                    power = rack.get_power_utilization()
-                    hvac = rack.get_hvac_load()
-                    ru_used = sum(device.device.ru_size for device in devices)
-                    ru_available = rack.ru_height - ru_used
-
-                    details.append(f"\n🔲 Rack: {rack.name}")
-                    if rack.description:
-                        details.append(f"   Description: {rack.description}")
-                    details.append(f"   Height: {rack.ru_height}U")
-                    details.append(f"   Space Used: {format_space_utilization(ru_used, rack.ru_height)}")
-                    details.append(f"   Available: {ru_available}U")
-                    details.append(f"   Devices: {len(devices)}")
-                    details.append(f"   Power: {format_power(power)}")
-                    details.append(f"   HVAC Load: {format_hvac(hvac)}")
+                    details.extend(_rack_summary_lines(rack))
 
             logger.info(f"Successfully retrieved details for site: {site_name}")
             return "\n".join(details)
@@ -133,8 +163,8 @@ async def get_rack_details(site_name: str, rack_name: str, output_format: str =
         try:
             logger.info(f"Fetching rack details: {site_name}/{rack_name} (format: {output_format})")
             # Use case-insensitive lookups for better user experience
-            site = Site.objects.get(name__iexact=site_name)
-            rack = Rack.objects.prefetch_related("rack_devices__device").get(site=site, name__iexact=rack_name)
+            site = Site.objects.get(name__lower=_lower(site_name))
+            rack = Rack.objects.prefetch_related("rack_devices__device").get(site=site, name__lower=_lower(rack_name))
         except Site.DoesNotExist:
             logger.warning(f"Site not found: {site_name}")
             return f"Site '{site_name}' not found."
@@ -269,6 +299,55 @@ async def get_available_resources(
     return [TextContent(type="text", text=result)]
 
 
+async def search_devices(
+    query: str = "",
+    category: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 25,
+    output_format: str = "text",
+) -> list[TextContent]:
+    """Search the device catalog using the in-process search index"""
+
+    @sync_to_async
+    def search():
+        try:
+            logger.info(f"Searching devices: '{query}' category={category} page={page} (format: {output_format})")
+            current_page = max(int(page or 1), 1)
+            size = min(max(int(page_size or 25), 1), 100)
+            total, devices = search_device_index(
+                query or "", category=category, offset=(current_page - 1) * size, limit=size
+            )
+
+            if output_format == "json":
+                return json_formatters.format_device_search_json(query, total, current_page, size, devices)
+
+            if not devices:
+                category_part = f" in category '{category}'" if category else ""
+                return f"No devices found matching '{query}'{category_part}."
+
+            results = [f"=== DEVICE SEARCH: {query} ===\n"]
+            first = (current_page - 1) * size + 1
+            results.append(f"Showing {first}-{first + len(devices) - 1} of {total} matches (page {current_page})")
+            for device in devices:
+                results.append(f"\n   • {device.name} ({device.device_id})")
+                results.append(f"     Category: {device.category}")
+                if device.provider:
+                    results.append(f"     Provider: {device.provider.name}")
+                if device.description:
+                    results.append(f"     Description: {device.description}")
+                results.append(f"     Size: {device.ru_size}U")
+                results.append(f"     Power: {device.power_draw} W")
+
+            logger.info(f"Device search returned {len(devices)} of {total} matches")
+            return "\n".join(results)
+        except Exception as e:
+            logger.error(f"Error searching devices: {e}", exc_info=True)
+            return f"Error searching devices: {str(e)}"
+
+    result = await search()
+    return [TextContent(type="text", text=result)]
+
+
 async def get_resource_summary(output_format: str = "text") -> list[TextContent]:
     """Get overall resource utilization summary"""
 
@@ -406,13 +485,13 @@ async def create_rack(arguments: dict) -> list[TextContent]:
             logger.info(f"Creating rack '{rack_name}' in site '{site_name}'")
 
             try:
-                site = Site.objects.get(name__iexact=site_name)
+                site = Site.objects.get(name__lower=_lower(site_name))
             except Site.DoesNotExist:
                 logger.warning(f"Site '{site_name}' not found")
                 return f"❌ Site '{site_name}' not found."
 
             # Check if rack already exists
-            if Rack.objects.filter(site=site, name__iexact=rack_name).exists():
+            if Rack.objects.filter(site=site, name__lower=_lower(rack_name)).exists():
                 logger.warning(f"Rack '{rack_name}' already exists in site '{site_name}'")
                 return f"❌ Rack '{rack_name}' already exists in site '{site_name}'."
 
@@ -440,8 +519,8 @@ async def delete_rack(site_name: str, rack_name: str) -> list[TextContent]:
         try:
             logger.info(f"Attempting to delete rack '{rack_name}' from site '{site_name}'")
             try:
-                site = Site.objects.get(name__iexact=site_name)
-                rack = Rack.objects.get(site=site, name__iexact=rack_name)
+                site = Site.objects.get(name__lower=_lower(site_name))
+                rack = Rack.objects.get(site=site, name__lower=_lower(rack_name))
             except Site.DoesNotExist:
                 logger.warning(f"Site '{site_name}' not found")
                 return f"❌ Site '{site_name}' not found."
@@ -477,13 +556,13 @@ async def update_site_name(old_name: str, new_name: str) -> list[TextContent]:
         try:
             logger.info(f"Attempting to rename site from '{old_name}' to '{new_name}'")
             try:
-                site = Site.objects.get(name__iexact=old_name)
+                site = Site.objects.get(name__lower=_lower(old_name))
             except Site.DoesNotExist:
                 logger.warning(f"Site '{old_name}' not found")
                 return f"❌ Site '{old_name}' not found."
 
             # Check if new name already exists
-            if Site.objects.filter(name__iexact=new_name).exclude(id=site.id).exists():
+            if Site.objects.filter(name__lower=_lower(new_name)).exclude(id=site.id).exists():
                 logger.warning(f"Site named '{new_name}' already exists")
                 return f"❌ A site named '{new_name}' already exists."
 
@@ -509,7 +588,7 @@ async def create_device_group(arguments: dict) -> list[TextContent]:
             name = arguments.get("name")
             logger.info(f"Creating device group: {name}")
 
-            if DeviceGroup.objects.filter(name__iexact=name).exists():
+            if DeviceGroup.objects.filter(name__lower=_lower(name)).exists():
                 logger.warning(f"Device group '{name}' already exists")
                 return f"❌ Device group '{name}' already exists."
 
@@ -536,7 +615,7 @@ async def create_provider(arguments: dict) -> list[TextContent]:
             name = arguments.get("name")
             logger.info(f"Creating provider: {name}")
 
-            if Provider.objects.filter(name__iexact=name).exists():
+            if Provider.objects.filter(name__lower=_lower(name)).exists():
                 logger.warning(f"Provider '{name}' already exists")
                 return f"❌ Provider '{name}' already exists."
 
@@ -555,3 +634,443 @@ async def create_provider(arguments: dict) -> list[TextContent]:
 
     result = await create()
     return [TextContent(type="text", text=result)]
+
+
+async def get_changes(since: int = 0, limit: int = 100, output_format: str = "text") -> list[TextContent]:
+    """Get the inventory changes after a sequence number"""
+    logger.info(f"Fetching changes since {since} (limit: {limit}, format: {output_format})")
+    if not isinstance(since, int) or since < 0 or not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+        return [TextContent(type="text", text=f"❌ since must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}.")]
+    try:
+        page = await sync_to_async(read_changes)(since, limit)
+    except CursorExpiredError as e:
+        return [TextContent(type="text", text=f"❌ {e}. Reload the inventory, then continue from {e.latest}.")]
+
+    if output_format == "json":
+        return [TextContent(type="text", text=json.dumps(page, indent=2, cls=DjangoJSONEncoder))]
+
+    lines = [f"=== CHANGES SINCE {since} ===\n"]
+    for change in page["changes"]:
+        name = change["data"].get("name") or change["data"].get("instance_name") or ""
+        site = f" (site {change['site_id']})" if change["site_id"] is not None else ""
+        lines.append(f"#{change['seq']} {change['action']} {change['model']} {change['object_id']} {name}{site}")
+    if not page["changes"]:
+        lines.append("No changes.")
+    lines.append(f"\nNext since: {page['next_since']}" + (" (more changes available)" if page["has_more"] else ""))
+    return [TextContent(type="text", text="\n".join(lines))]
+
+
+async def get_server_metrics(output_format: str = "text") -> list[TextContent]:
+    """Get per-tool call metrics collected by this MCP server process"""
+    logger.info(f"Fetching server metrics (format: {output_format})")
+    data = metrics.snapshot()
+
+    if output_format == "json":
+        return [TextContent(type="text", text=json.dumps({"tools": data}, indent=2))]
+
+    if not data:
+        return [TextContent(type="text", text="No tool calls recorded yet.")]
+
+    lines = ["=== MCP SERVER METRICS ===\n"]
+    for tool, values in data.items():
+        calls = values["calls"] or 1
+        lines.append(f"\n🔧 {tool}")
+        lines.append(f"   Calls: {values['calls']} (errors: {values['errors']})")
+        lines.append(f"   Avg Time: {values['duration_seconds_sum'] / calls * 1000:.1f} ms")
+        lines.append(f"   Max Time: {values['duration_seconds_max'] * 1000:.1f} ms")
+        lines.append(f"   Avg DB Queries: {values['db_queries'] / calls:.1f}")
+        lines.append(f"   Avg DB Time: {values['db_time_seconds'] / calls * 1000:.1f} ms")
+        lines.append(f"   Avg Response Size: {values['response_bytes'] / calls:,.0f} bytes")
+
+    return [TextContent(type="text", text="\n".join(lines))]
+
+
+# ==================== Bulk Write Handlers ====================
+#
+# Bulk variants of the create tools. Each one checks every requested name
+# against the database with a single IN query, inserts all valid items with
+# bulk_create() inside one transaction, and reports an outcome per item.
+# bulk_create() sends no post_save, so the inserted rows are read back through
+# `created` and written to the change event log in the same transaction.
+# bulk_create() also skips model validation, so every item is validated on its
+# own first: only the bad items fail instead of rolling back the whole batch.
+
+
+def _existing_names(queryset, field: str, names: list[str]) -> set[str]:
+    """Return the lowercased values of `field` that already exist, using one IN query"""
+    lowered = {name.lower() for name in names}
+    if not lowered:
+        return set()
+    return set(
+        queryset.filter(**{f"{field}__lower__in": lowered})
+        .annotate(lookup_name=Lower(field))
+        .values_list("lookup_name", flat=True)
+    )
+
+
+def _validation_error(obj, exclude=None) -> Optional[str]:
+    """Field validation errors of an unsaved object, or None (uniqueness is checked separately)"""
+    try:
+        obj.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items())
+    return None
+
+
+def _format_bulk_report(title: str, outcomes: list[tuple[str, bool, str]]) -> str:
+    """Format per-item outcomes of a bulk operation"""
+    created = sum(1 for _, ok, _ in outcomes if ok)
+    report = [f"=== {title} ===\n", f"Created: {created}", f"Failed: {len(outcomes) - created}\n"]
+    for label, ok, message in outcomes:
+        report.append(f"{'✅' if ok else '❌'} {label}: {message}")
+    return "\n".join(report)
+
+
+def _bulk_insert(model, pending: list, outcomes: list, describe, created) -> None:
+    """Insert pending objects in one transaction and record their outcomes"""
+    if not pending:
+        return
+    try:
+        with transaction.atomic():
+            objs = [obj for _, obj in pending]
+            model.objects.bulk_create(objs, batch_size=BULK_CREATE_BATCH_SIZE)
+            record_rows(created(objs), ChangeEvent.ACTION_CREATED)
+    except Exception as e:
+        logger.error(f"Error bulk creating {model.__name__}: {e}", exc_info=True)
+        for index, obj in pending:
+            outcomes[index] = (outcomes[index][0], False, f"not created, batch rolled back ({str(e)})")
+        return
+    for index, obj in pending:
+        outcomes[index] = (outcomes[index][0], True, describe(obj))
+
+
+async def bulk_create_devices(arguments: dict) -> list[TextContent]:
+    """Create several device types in a single transaction"""
+
+    @sync_to_async
+    def create():
+        try:
+            items = arguments.get("devices") or []
+            logger.info(f"Bulk creating {len(items)} devices")
+            if not items:
+                return "❌ No devices provided."
+
+            required = ["device_id", "name", "category", "ru_size", "power_draw"]
+            device_ids = [
+                item["device_id"] for item in items if isinstance(item, dict) and isinstance(item.get("device_id"), str)
+            ]
+            existing = _existing_names(Device.objects.all(), "device_id", device_ids)
+
+            outcomes = []
+            pending = []
+            seen = set()
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    outcomes.append((f"item {index + 1}", False, "not an object"))
+                    continue
+                label = item.get("device_id") or f"item {index + 1}"
+                missing = [field for field in required if item.get(field) in (None, "")]
+                if missing:
+                    outcomes.append((label, False, f"missing {', '.join(missing)}"))
+                    continue
+                if not isinstance(item["device_id"], str):
+                    outcomes.append((label, False, "device_id must be a string"))
+                    continue
+                key = item["device_id"].lower()
+                if key in existing:
+                    outcomes.append((label, False, "already exists"))
+                    continue
+                if key in seen:
+                    outcomes.append((label, False, "duplicate in request"))
+                    continue
+                device = Device(
+                    device_id=item["device_id"],
+                    name=item["name"],
+                    category=item["category"],
+                    ru_size=item["ru_size"],
+                    power_draw=item["power_draw"],
+                    power_ports_used=item.get("power_ports_used", 1),
+                    color=item.get("color", "#000000"),
+                    description=item.get("description", ""),
+                )
+                error = _validation_error(device)
+                if error:
+                    outcomes.append((label, False, f"invalid {error}"))
+                    continue
+                seen.add(key)
+                outcomes.append((label, False, "pending"))
+                pending.append((index, device))
+
+            _bulk_insert(
+                Device,
+                pending,
+                outcomes,
+                lambda d: f"created ({d.name}, {d.ru_size}U, {d.power_draw}W)",
+                lambda objs: Device.objects.filter(device_id__in=[d.device_id for d in objs]),
+            )
+            # bulk_create() does not send post_save, so refresh the search index explicitly
+            invalidate_index()
+            logger.info(f"Bulk device creation finished: {sum(1 for o in outcomes if o[1])}/{len(items)} created")
+            return _format_bulk_report("BULK DEVICE CREATION", outcomes)
+        except Exception as e:
+            logger.error(f"Error bulk creating devices: {e}", exc_info=True)
+            return f"❌ Error creating devices: {str(e)}"
+
+    result = await create()
+    return [TextContent(type="text", text=result)]
+
+
+async def bulk_create_racks(arguments: dict) -> list[TextContent]:
+    """Create several racks in a site in a single transaction"""
+
+    @sync_to_async
+    def create():
+        try:
+            site_name = arguments.get("site_name")
+            items = arguments.get("racks") or []
+            logger.info(f"Bulk creating {len(items)} racks in site '{site_name}'")
+
+            try:
+                site = Site.objects.get(name__lower=_lower(site_name))
+            except Site.DoesNotExist:
+                logger.warning(f"Site '{site_name}' not found")
+                return f"❌ Site '{site_name}' not found."
+
+            if not items:
+                return "❌ No racks provided."
+
+            rack_names = [
+                item["rack_name"] for item in items if isinstance(item, dict) and isinstance(item.get("rack_name"), str)
+            ]
+            existing = _existing_names(Rack.objects.filter(site=site), "name", rack_names)
+
+            outcomes = []
+            pending = []
+            seen = set()
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    outcomes.append((f"item {index + 1}", False, "not an object"))
+                    continue
+                rack_name = item.get("rack_name")
+                label = rack_name or f"item {index + 1}"
+                if not rack_name:
+                    outcomes.append((label, False, "missing rack_name"))
+                    continue
+                if not isinstance(rack_name, str):
+                    outcomes.append((label, False, "rack_name must be a string"))
+                    continue
+                key = rack_name.lower()
+                if key in existing:
+                    outcomes.append((label, False, f"already exists in site '{site.name}'"))
+                    continue
+                if key in seen:
+                    outcomes.append((label, False, "duplicate in request"))
+                    continue
+                rack = Rack(
+                    site=site,
+                    name=rack_name,
+                    ru_height=item.get("ru_height", 42),
+                    description=item.get("description", ""),
+                )
+                error = _validation_error(rack, exclude=["site"])
+                if error:
+                    outcomes.append((label, False, f"invalid {error}"))
+                    continue
+                seen.add(key)
+                outcomes.append((label, False, "pending"))
+                pending.append((index, rack))
+
+            _bulk_insert(
+                Rack,
+                pending,
+                outcomes,
+                lambda r: f"created ({r.ru_height}U)",
+                lambda objs: Rack.objects.filter(site=site, name__in=[r.name for r in objs]),
+            )
+            logger.info(f"Bulk rack creation finished: {sum(1 for o in outcomes if o[1])}/{len(items)} created")
+            return f"Site: {site.name}\n\n" + _format_bulk_report("BULK RACK CREATION", outcomes)
+        except Exception as e:
+            logger.error(f"Error bulk creating racks: {e}", exc_info=True)
+            return f"❌ Error creating racks: {str(e)}"
+
+    result = await create()
+    return [TextContent(type="text", text=result)]
+
+
+async def bulk_create_device_groups(arguments: dict) -> list[TextContent]:
+    """Create several device groups in a single transaction"""
+
+    @sync_to_async
+    def create():
+        try:
+            items = arguments.get("device_groups") or []
+            logger.info(f"Bulk creating {len(items)} device groups")
+            if not items:
+                return "❌ No device groups provided."
+
+            names = [item["name"] for item in items if isinstance(item, dict) and isinstance(item.get("name"), str)]
+            existing = _existing_names(DeviceGroup.objects.all(), "name", names)
+
+            outcomes = []
+            pending = []
+            seen = set()
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    outcomes.append((f"item {index + 1}", False, "not an object"))
+                    continue
+                name = item.get("name")
+                label = name or f"item {index + 1}"
+                if not name:
+                    outcomes.append((label, False, "missing name"))
+                    continue
+                if not isinstance(name, str):
+                    outcomes.append((label, False, "name must be a string"))
+                    continue
+                key = name.lower()
+                if key in existing:
+                    outcomes.append((label, False, "already exists"))
+                    continue
+                if key in seen:
+                    outcomes.append((label, False, "duplicate in request"))
+                    continue
+                group = DeviceGroup(name=name, description=item.get("description", ""))
+                error = _validation_error(group)
+                if error:
+                    outcomes.append((label, False, f"invalid {error}"))
+                    continue
+                seen.add(key)
+                outcomes.append((label, False, "pending"))
+                pending.append((index, group))
+
+            _bulk_insert(
+                DeviceGroup,
+                pending,
+                outcomes,
+                lambda g: "created",
+                lambda objs: DeviceGroup.objects.filter(name__in=[g.name for g in objs]),
+            )
+            logger.info(f"Bulk device group creation finished: {sum(1 for o in outcomes if o[1])}/{len(items)} created")
+            return _format_bulk_report("BULK DEVICE GROUP CREATION", outcomes)
+        except Exception as e:
+            logger.error(f"Error bulk creating device groups: {e}", exc_info=True)
+            return f"❌ Error creating device groups: {str(e)}"
+
+    result = await create()
+    return [TextContent(type="text", text=result)]
+
+
+# ==================== Streaming Handlers ====================
+#
+# Streaming variants yield one TextContent per site or rack as soon as it has
+# been formatted, instead of building the whole response in memory. Rows are
+# pulled from the database with iterator() so memory stays bounded by
+# STREAM_CHUNK_SIZE regardless of how many racks a site has. For text output,
+# joining the chunks with newlines reproduces the non-streaming output; JSON
+# output is a sequence of standalone documents (a header, then one per site or
+# rack) rather than the single document the non-streaming tools return. Errors
+# are raised rather than yielded as text, since part of the output may already
+# be sent.
+
+
+async def _stream_chunks(chunks: Generator[str, None, None]) -> AsyncIterator[TextContent]:
+    """Drive a synchronous chunk generator from async code, one chunk at a time"""
+    next_chunk = sync_to_async(lambda: next(chunks, None))
+    try:
+        while True:
+            chunk = await next_chunk()
+            if chunk is None:
+                return
+            yield TextContent(type="text", text=chunk)
+    finally:
+        # Also runs when the consumer stops early (a client disconnecting), so the
+        # generator's database cursor is closed instead of being abandoned
+        await sync_to_async(chunks.close)()
+
+
+def _iter_site_stats(output_format: str) -> Iterator[str]:
+    """Yield site statistics one site at a time"""
+    try:
+        logger.info(f"Streaming site statistics (format: {output_format})")
+        sites = Site.objects.prefetch_related("racks__rack_devices__device").iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        count = 0
+        for site in sites:
+            if count == 0 and output_format != "json":
+                yield "=== SITE STATISTICS ===\n"
+            count += 1
+            if output_format == "json":
+                yield json.dumps(json_formatters.site_stats_data(site))
+            else:
+                yield "\n".join(_site_stats_lines(site))
+
+        if count == 0:
+            logger.info("No sites found in database")
+            if output_format == "json":
+                yield json_formatters.format_site_stats_json([])
+            else:
+                yield "No sites found in the database."
+            return
+
+        logger.info(f"Successfully streamed stats for {count} sites")
+    except Exception as e:
+        logger.error(f"Error streaming site stats: {e}", exc_info=True)
+        raise
+
+
+def _iter_site_details(site_name: str, output_format: str) -> Iterator[str]:
+    """Yield site details as a header chunk followed by one chunk per rack"""
+    try:
+        logger.info(f"Streaming details for site: {site_name} (format: {output_format})")
+        site = Site.objects.get(name__lower=_lower(site_name))
+        rack_count = site.racks.count()
+    except Site.DoesNotExist:
+        logger.warning(f"Site not found: {site_name}")
+        yield f"Site '{site_name}' not found."
+        return
+    except Exception as e:
+        logger.error(f"Error fetching site details: {e}", exc_info=True)
+        raise
+
+    try:
+        if output_format == "json":
+            yield json.dumps(
+                {
+                    "name": site.name,
+                    "description": site.description or "",
+                    "created_at": site.created_at.isoformat(),
+                    "updated_at": site.updated_at.isoformat(),
+                    "racks_count": rack_count,
+                }
+            )
+        else:
+            header = [f"=== SITE DETAILS: {site.name} ===\n"]
+            if site.description:
+                header.append(f"Description: {site.description}")
+            header.append(f"Created: {site.created_at.strftime('%Y-%m-%d %H:%M')}")
+            header.append(f"Last Updated: {site.updated_at.strftime('%Y-%m-%d %H:%M')}\n")
+            header.append(f"Total Racks: {rack_count}\n")
+            if rack_count:
+                header.append("--- RACKS ---")
+            yield "\n".join(header)
+
+        racks = site.racks.prefetch_related("rack_devices__device").iterator(chunk_size=STREAM_CHUNK_SIZE)
+        for rack in racks:
+            if output_format == "json":
+                yield json.dumps(json_formatters.rack_summary_data(rack))
+            else:
+                yield "\n".join(_rack_summary_lines(rack))
+
+        logger.info(f"Successfully streamed details for site: {site_name}")
+    except Exception as e:
+        logger.error(f"Error formatting site details: {e}", exc_info=True)
+        raise
+
+
+def stream_site_stats(output_format: str = "text") -> AsyncIterator[TextContent]:
+    """Stream statistics for all sites, one chunk per site"""
+    return _stream_chunks(_iter_site_stats(output_format))
+
+
+def stream_site_details(site_name: str, output_format: str = "text") -> AsyncIterator[TextContent]:
+    """Stream details of a site, one chunk per rack"""
+    return _stream_chunks(_iter_site_details(site_name, output_format))
@@ -6,61 +6,62 @@ import json
 from typing import Dict, List, Any
 
 
+def site_stats_data(site: Any) -> Dict[str, Any]:
+    """Build the statistics entry for a single site"""
+    racks = list(site.racks.all())
+    total_devices = sum(rack.rack_devices.count() for rack in racks)
+    total_power = sum(rack.get_power_utilization() for rack in racks)
+    total_hvac = sum(rack.get_hvac_load() for rack in racks)
+
+    return {
+        "name": site.name,
+        "description": site.description or "",
+        "racks_count": len(racks),
+        "devices_count": total_devices,
+        "power_watts": round(total_power, 2),
+        "power_kw": round(total_power / 1000, 2),
+        "hvac_btu_hr": round(total_hvac, 2),
+        "hvac_tons": round(total_hvac / 12000, 2),  # Will be replaced with settings
+        "created_at": site.created_at.isoformat(),
+    }
+
+
 def format_site_stats_json(sites: List[Any]) -> str:
     """Format site statistics as JSON"""
     if not sites:
         return json.dumps({"sites": [], "message": "No sites found"})
 
-    sites_data = []
-    for site in sites:
-        racks = list(site.racks.all())
-        total_devices = sum(rack.rack_devices.count() for rack in racks)
-        total_power = sum(rack.get_power_utilization() for rack in racks)
-        total_hvac = sum(rack.get_hvac_load() for rack in racks)
-
-        sites_data.append(
-            {
-                "name": site.name,
-                "description": site.description or "",
-                "racks_count": len(racks),
-                "devices_count": total_devices,
-                "power_watts": round(total_power, 2),
-                "power_kw": round(total_power / 1000, 2),
-                "hvac_btu_hr": round(total_hvac, 2),
-                "hvac_tons": round(total_hvac / 12000, 2),  # Will be replaced with settings
-                "created_at": site.created_at.isoformat(),
-            }
-        )
+    sites_data = [site_stats_data(site) for site in sites]
 
     return json.dumps({"sites": sites_data}, indent=2)
 
 
-def format_site_details_json(site: Any) -> str:
-    """Format site details as JSON"""
-    racks_data = []
+def rack_summary_data(rack: Any) -> Dict[str, Any]:
+    """Build the summary entry for a single rack within a site"""
+    devices = list(rack.rack_devices.all())
+    power = rack.get_power_utilization()
+    hvac = rack.get_hvac_load()
+    ru_used = sum(device.device.ru_size for device in devices)
+    ru_available = rack.ru_height - ru_used
 
-    for rack in site.racks.all():
-        devices = list(rack.rack_devices.all())
-        power = rack.get_power_utilization()
-        hvac = rack.get_hvac_load()
-        ru_used = sum(device.device.ru_size for device in devices)
-        ru_available = rack.ru_height - ru_used
+    return {
+        "name": rack.name,
+        "description": rack.description or "",
+        "ru_height": rack.ru_height,
+        "ru_used": ru_used,
+        "ru_available": ru_available,
+        "utilization_percent": round((ru_used / rack.ru_height * 100) if rack.ru_height > 0 else 0, 1),
+        "devices_count": len(devices),
+        "power_watts": round(power, 2),
+        "power_kw": round(power / 1000, 2),
+        "hvac_btu_hr": round(hvac, 2),
+        "hvac_tons": round(hvac / 12000, 2),
+    }
 
-        racks_data.append(
-            {
-                "name": rack.name,
-                "description": rack.description or "",
-                "ru_height": rack.ru_height,
-                "ru_used": ru_used,
-                "ru_available": ru_available,
-                "utilization_percent": round((ru_used / rack.ru_height * 100) if rack.ru_height > 0 else 0, 1),
-                "devices_count": len(devices),
-                "power_watts": round(power, 2),
-                "power_kw": round(power / 1000, 2),
-                "hvac_btu_hr": round(hvac, 2),
-                "hvac_tons": round(hvac / 12000, 2),
-            }
-        )
+
+def format_site_details_json(site: Any) -> str:
+    """Format site details as JSON"""
+    racks_data = [rack_summary_data(rack) for rack in site.racks.all()]
 
     site_data = {
         "name": site.name,
@@ -150,6 +151,27 @@ def format_available_resources_json(devices_list: List[Any]) -> str:
     return json.dumps({"total_device_types": len(devices_list), "categories": categories_list}, indent=2)
 
 
+def format_device_search_json(query: str, total: int, page: int, page_size: int, devices: List[Any]) -> str:
+    """Format device search results as JSON"""
+    results = [
+        {
+            "device_id": device.device_id,
+            "name": device.name,
+            "category": device.category,
+            "provider": device.provider.name if device.provider else None,
+            "description": device.description or "",
+            "ru_size": device.ru_size,
+            "power_watts": device.power_draw,
+            "power_ports_used": device.power_ports_used,
+        }
+        for device in devices
+    ]
+
+    return json.dumps(
+        {"query": query, "total": total, "page": page, "page_size": page_size, "results": results}, indent=2
+    )
+
+
 def format_resource_summary_json(sites: List[Any], racks: Any, stats: Dict[str, Any]) -> str:
     """Format resource summary as JSON"""
     summary_data = {
@@ -0,0 +1,176 @@
+"""
+Per-tool metrics for the MCP server
+
+Records call count, errors, wall time histogram, database query count,
+database time and response size for every tool call. Database activity is
+attributed to the tool call that issued it through a context variable, which
+asgiref copies into the sync_to_async threads the handlers run their ORM
+code in. Metrics are kept in process memory and rendered either in the
+Prometheus text exposition format or as a plain dictionary.
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the wall time histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class ToolCall:
+    """Measurements collected while a single tool call is running"""
+
+    tool: str
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_time: float = 0.0
+    response_bytes: int = 0
+    error: bool = False
+
+
+@dataclass
+class ToolMetrics:
+    """Aggregated measurements for one tool"""
+
+    calls: int = 0
+    errors: int = 0
+    duration_sum: float = 0.0
+    duration_max: float = 0.0
+    bucket_counts: list = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    db_queries: int = 0
+    db_time: float = 0.0
+    response_bytes: int = 0
+
+
+_current_call: ContextVar[Optional[ToolCall]] = ContextVar("mcp_current_tool_call", default=None)
+_metrics: dict[str, ToolMetrics] = {}
+_lock = threading.Lock()
+
+
+def _record_query(execute, sql, params, many, context):
+    """Database execute wrapper that attributes query time to the running tool call"""
+    call = _current_call.get()
+    if call is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        call.db_queries += 1
+        call.db_time += time.perf_counter() - started
+
+
+def _install_wrapper(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_wrapper(connection)
+
+
+def install():
+    """Attach the query recorder to current and future database connections"""
+    connection_created.connect(_on_connection_created, dispatch_uid="mcp_metrics_query_recorder")
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+
+
+def start_call(tool: str) -> tuple[ToolCall, object]:
+    """Begin measuring a tool call; returns the call and a token for finish_call()"""
+    call = ToolCall(tool=tool)
+    return call, _current_call.set(call)
+
+
+def finish_call(call: ToolCall, token) -> None:
+    """Stop measuring a tool call and fold it into the per-tool metrics"""
+    _current_call.reset(token)
+    duration = time.perf_counter() - call.started
+
+    with _lock:
+        metrics = _metrics.setdefault(call.tool, ToolMetrics())
+        metrics.calls += 1
+        metrics.errors += int(call.error)
+        metrics.duration_sum += duration
+        metrics.duration_max = max(metrics.duration_max, duration)
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                metrics.bucket_counts[index] += 1
+                break
+        metrics.db_queries += call.db_queries
+        metrics.db_time += call.db_time
+        metrics.response_bytes += call.response_bytes
+
+    logger.info(
+        f"tool={call.tool} duration_ms={duration * 1000:.1f} db_queries={call.db_queries} "
+        f"db_ms={call.db_time * 1000:.1f} response_bytes={call.response_bytes} error={call.error}"
+    )
+
+
+def reset():
+    """Discard all collected metrics"""
+    with _lock:
+        _metrics.clear()
+
+
+def snapshot() -> dict[str, dict]:
+    """Return a copy of the collected metrics keyed by tool name"""
+    with _lock:
+        result = {}
+        for tool, metrics in sorted(_metrics.items()):
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(DURATION_BUCKETS, metrics.bucket_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = metrics.calls
+            result[tool] = {
+                "calls": metrics.calls,
+                "errors": metrics.errors,
+                "duration_seconds_sum": round(metrics.duration_sum, 6),
+                "duration_seconds_max": round(metrics.duration_max, 6),
+                "duration_seconds_buckets": buckets,
+                "db_queries": metrics.db_queries,
+                "db_time_seconds": round(metrics.db_time, 6),
+                "response_bytes": metrics.response_bytes,
+            }
+        return result
+
+
+def render_prometheus() -> str:
+    """Render the collected metrics in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = []
+
+    def counter(name, help_text, key):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for tool, values in data.items():
+            lines.append(f'{name}{{tool="{tool}"}} {values[key]}')
+
+    counter("mcp_tool_calls_total", "Number of MCP tool calls.", "calls")
+    counter("mcp_tool_errors_total", "Number of MCP tool calls that raised an exception.", "errors")
+
+    lines.append("# HELP mcp_tool_call_duration_seconds Wall time of MCP tool calls.")
+    lines.append("# TYPE mcp_tool_call_duration_seconds histogram")
+    for tool, values in data.items():
+        for bound, count in values["duration_seconds_buckets"].items():
+            lines.append(f'mcp_tool_call_duration_seconds_bucket{{tool="{tool}",le="{bound}"}} {count}')
+        lines.append(f'mcp_tool_call_duration_seconds_sum{{tool="{tool}"}} {values["duration_seconds_sum"]}')
+        lines.append(f'mcp_tool_call_duration_seconds_count{{tool="{tool}"}} {values["calls"]}')
+
+    counter("mcp_tool_db_queries_total", "Database queries issued by MCP tool calls.", "db_queries")
+    counter("mcp_tool_db_time_seconds_total", "Time spent in database queries by MCP tool calls.", "db_time_seconds")
+    counter("mcp_tool_response_bytes_total", "Bytes of text returned by MCP tool calls.", "response_bytes")
+
+    return "\n".join(lines) + "\n"
@@ -10,6 +10,7 @@ import sys
 import django
 import asyncio
 import logging
+from contextlib import aclosing
 from mcp.server import Server
 from mcp.types import TextContent
 from mcp.server.stdio import stdio_server
@@ -21,6 +22,7 @@ django.setup()
 
 from .tools import get_tool_definitions  # noqa: E402
 from . import handlers  # noqa: E402
+from . import metrics  # noqa: E402
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -29,6 +31,10 @@ logging.basicConfig(level=logging.INFO, format="[MCP] %(asctime)s - %(levelname)
 # Create MCP server instance
 app = Server("racksum-stats")
 
+# Attribute database queries to the tool call that issued them
+metrics.install()
+TOOL_NAMES = {tool.name for tool in get_tool_definitions()}
+
 
 @app.list_tools()
 async def list_tools():
@@ -38,6 +44,20 @@ async def list_tools():
 
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    """Route tool calls to appropriate handlers, recording per-tool metrics"""
+    call, token = metrics.start_call(name if name in TOOL_NAMES else "unknown")
+    try:
+        result = await dispatch_tool(name, arguments)
+        call.response_bytes = sum(len(content.text.encode("utf-8")) for content in result)
+        return result
+    except Exception:
+        call.error = True
+        raise
+    finally:
+        metrics.finish_call(call, token)
+
+
+async def dispatch_tool(name: str, arguments: dict) -> list[TextContent]:
     """Route tool calls to appropriate handlers"""
 
     # Extract output_format, default to "text" for backward compatibility
@@ -64,9 +84,21 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         limit = arguments.get("limit")
         return await handlers.get_available_resources(category, limit, output_format)
 
+    elif name == "search_devices":
+        return await handlers.search_devices(
+            arguments.get("query", ""),
+            arguments.get("category"),
+            arguments.get("page", 1),
+            arguments.get("page_size", 25),
+            output_format,
+        )
+
     elif name == "get_resource_summary":
         return await handlers.get_resource_summary(output_format)
 
+    elif name == "get_changes":
+        return await handlers.get_changes(arguments.get("since", 0), arguments.get("limit", 100), output_format)
+
     elif name == "create_device":
         return await handlers.create_device(arguments)
 
@@ -90,13 +122,63 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     elif name == "create_device_group":
         return await handlers.create_device_group(arguments)
 
+    elif name == "bulk_create_devices":
+        return await handlers.bulk_create_devices(arguments)
+
+    elif name == "bulk_create_racks":
+        return await handlers.bulk_create_racks(arguments)
+
+    elif name == "bulk_create_device_groups":
+        return await handlers.bulk_create_device_groups(arguments)
+
     elif name == "create_provider":
         return await handlers.create_provider(arguments)
 
+    elif name == "get_server_metrics":
+        return await handlers.get_server_metrics(output_format)
+
     else:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
+async def stream_tool(name: str, arguments: dict):
+    """
+    Route tool calls to streaming handlers, yielding TextContent chunks.
+
+    Tools without a streaming handler fall back to call_tool() and yield its
+    result as-is, so any tool can be requested over the streaming endpoint.
+    """
+    output_format = arguments.get("output_format", "text")
+
+    if name == "get_site_stats":
+        stream = handlers.stream_site_stats(output_format)
+
+    elif name == "get_site_details":
+        site_name = arguments.get("site_name")
+        if not site_name:
+            yield TextContent(type="text", text="Error: site_name is required")
+            return
+        stream = handlers.stream_site_details(site_name, output_format)
+
+    else:
+        for content in await call_tool(name, arguments):
+            yield content
+        return
+
+    call, token = metrics.start_call(name)
+    try:
+        async for content in stream:
+            call.response_bytes += len(content.text.encode("utf-8"))
+            yield content
+    except Exception:
+        call.error = True
+        raise
+    finally:
+        # Close the handler's stream (and its database cursor) when the consumer stops early
+        await stream.aclose()
+        metrics.finish_call(call, token)
+
+
 async def main_stdio():
     """Run MCP server with stdio transport"""
     logger.info("Starting RackSum MCP server with stdio transport...")
@@ -137,12 +219,64 @@ async def handle_mcp_request(request):
         return Response(content=json.dumps({"error": str(e)}), media_type="application/json", status_code=500)
 
 
+async def handle_mcp_stream_request(request):
+    """
+    Handle streaming HTTP MCP tool calls as Server-Sent Events.
+
+    Accepts the same body as a "tools/call" request and emits one "chunk"
+    event per piece of output as soon as it is produced, followed by a
+    final "done" event. If the handler fails, even after some chunks were
+    sent, the stream ends with an "error" event instead of "done".
+    """
+    import json
+    from starlette.responses import Response, StreamingResponse
+
+    try:
+        body = await request.json()
+    except Exception as e:
+        return Response(content=json.dumps({"error": str(e)}), media_type="application/json", status_code=400)
+
+    params = body.get("params", {})
+    tool_name = params.get("name")
+    arguments = params.get("arguments", {})
+
+    async def event_stream():
+        count = 0
+        try:
+            # aclosing() closes the tool's stream as soon as the response stops, e.g. when the client disconnects
+            async with aclosing(stream_tool(tool_name, arguments)) as contents:
+                async for content in contents:
+                    count += 1
+                    yield f"event: chunk\ndata: {json.dumps({'type': content.type, 'text': content.text})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'chunks': count})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming MCP request: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def handle_metrics_request(request):
+    """Expose per-tool metrics in the Prometheus text format"""
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 def create_http_app():
     """Create Starlette app for HTTP transport"""
     from starlette.applications import Starlette
     from starlette.routing import Route
 
-    routes = [Route("/mcp", handle_mcp_request, methods=["POST"])]
+    routes = [
+        Route("/mcp", handle_mcp_request, methods=["POST"]),
+        Route("/mcp/stream", handle_mcp_stream_request, methods=["POST"]),
+        Route("/metrics", handle_metrics_request, methods=["GET"]),
+    ]
     return Starlette(debug=True, routes=routes)
 
 
@@ -0,0 +1,129 @@
+"""
+Tests for MCP bulk write handlers
+"""
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from api.models import Site, Rack, Device, DeviceGroup
+from mcp import handlers
+
+
+class TestBulkCreateRacks(TestCase):
+    """Test cases for bulk_create_racks handler"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Datacenter 1")
+        Rack.objects.create(site=self.site, name="Rack-A1", ru_height=42)
+
+    def test_bulk_create_racks_site_not_found(self):
+        """Test bulk_create_racks with non-existent site"""
+        result = async_to_sync(handlers.bulk_create_racks)({"site_name": "Nowhere", "racks": [{"rack_name": "R1"}]})
+
+        self.assertIn("Site 'Nowhere' not found", result[0].text)
+
+    def test_bulk_create_racks_reports_per_item_outcomes(self):
+        """Test that valid racks are created and invalid ones are reported"""
+        arguments = {
+            "site_name": "datacenter 1",
+            "racks": [
+                {"rack_name": "Rack-B1", "ru_height": 48},
+                {"rack_name": "rack-a1"},
+                {"rack_name": "Rack-B2"},
+                {"rack_name": "RACK-B2"},
+                {"ru_height": 42},
+            ],
+        }
+
+        result = async_to_sync(handlers.bulk_create_racks)(arguments)
+
+        text = result[0].text
+        self.assertIn("Created: 2", text)
+        self.assertIn("Failed: 3", text)
+        self.assertIn("✅ Rack-B1: created (48U)", text)
+        self.assertIn("❌ rack-a1: already exists", text)
+        self.assertIn("❌ RACK-B2: duplicate in request", text)
+        self.assertIn("❌ item 5: missing rack_name", text)
+        self.assertEqual(
+            sorted(Rack.objects.filter(site=self.site).values_list("name", flat=True)),
+            ["Rack-A1", "Rack-B1", "Rack-B2"],
+        )
+
+    def test_bulk_create_racks_constant_query_count(self):
+        """Test that query count does not grow with the number of racks"""
+        racks = [{"rack_name": f"Rack-{index}"} for index in range(50)]
+
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(handlers.bulk_create_racks)({"site_name": "Datacenter 1", "racks": racks})
+
+        self.assertEqual(Rack.objects.filter(site=self.site).count(), 51)
+        # Including reading the new racks back and inserting their change events
+        self.assertLessEqual(len(queries), 8)
+
+
+class TestBulkCreateDevices(TestCase):
+    """Test cases for bulk_create_devices handler"""
+
+    def test_bulk_create_devices(self):
+        """Test that devices are created and duplicates or incomplete items are rejected"""
+        Device.objects.create(device_id="server-1", name="Server", category="Server", ru_size=1, power_draw=100)
+        arguments = {
+            "devices": [
+                {"device_id": "server-1", "name": "Dup", "category": "Server", "ru_size": 1, "power_draw": 100},
+                {"device_id": "switch-1", "name": "Switch", "category": "Network", "ru_size": 1, "power_draw": 150},
+                {"device_id": "storage-1", "name": "Storage", "category": "Storage", "ru_size": 2},
+            ]
+        }
+
+        result = async_to_sync(handlers.bulk_create_devices)(arguments)
+
+        text = result[0].text
+        self.assertIn("❌ server-1: already exists", text)
+        self.assertIn("✅ switch-1: created (Switch, 1U, 150W)", text)
+        self.assertIn("❌ storage-1: missing power_draw", text)
+        self.assertTrue(Device.objects.filter(device_id="switch-1", power_ports_used=1).exists())
+        self.assertFalse(Device.objects.filter(device_id="storage-1").exists())
+
+    def test_bulk_create_devices_invalid_items(self):
+        """Test that items with invalid values fail on their own and the valid items are still created"""
+        arguments = {
+            "devices": [
+                {"device_id": "ok-1", "name": "OK", "category": "Server", "ru_size": 1, "power_draw": 100},
+                {"device_id": "bad-ru", "name": "Bad", "category": "Server", "ru_size": "two", "power_draw": 100},
+                {"device_id": "bad-power", "name": "Bad", "category": "Server", "ru_size": 1, "power_draw": -5},
+                {"device_id": 42, "name": "Bad", "category": "Server", "ru_size": 1, "power_draw": 100},
+                "not a device",
+            ]
+        }
+
+        text = async_to_sync(handlers.bulk_create_devices)(arguments)[0].text
+
+        self.assertIn("✅ ok-1: created", text)
+        self.assertIn("❌ bad-ru: invalid ru_size", text)
+        self.assertIn("❌ bad-power: invalid power_draw", text)
+        self.assertIn("❌ 42: device_id must be a string", text)
+        self.assertIn("❌ item 5: not an object", text)
+        self.assertEqual(list(Device.objects.values_list("device_id", flat=True)), ["ok-1"])
+
+    def test_bulk_create_devices_empty(self):
+        """Test bulk_create_devices with no devices"""
+        result = async_to_sync(handlers.bulk_create_devices)({"devices": []})
+
+        self.assertIn("No devices provided", result[0].text)
+
+
+class TestBulkCreateDeviceGroups(TestCase):
+    """Test cases for bulk_create_device_groups handler"""
+
+    def test_bulk_create_device_groups(self):
+        """Test that device groups are created with case-insensitive duplicate detection"""
+        DeviceGroup.objects.create(name="Switches")
+        arguments = {"device_groups": [{"name": "switches"}, {"name": "Firewalls", "description": "Edge"}]}
+
+        result = async_to_sync(handlers.bulk_create_device_groups)(arguments)
+
+        text = result[0].text
+        self.assertIn("❌ switches: already exists", text)
+        self.assertIn("✅ Firewalls: created", text)
+        self.assertEqual(DeviceGroup.objects.get(name="Firewalls").description, "Edge")
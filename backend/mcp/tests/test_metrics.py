@@ -0,0 +1,73 @@
+"""
+Tests for MCP server metrics
+"""
+
+import json
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from api.models import Site, Rack
+from mcp import handlers, metrics
+
+
+class TestToolMetrics(TestCase):
+    """Test cases for per-tool metrics collection"""
+
+    def setUp(self):
+        metrics.reset()
+        metrics.install()
+        site = Site.objects.create(name="Datacenter 1")
+        Rack.objects.create(site=site, name="Rack-A1", ru_height=42)
+
+    def tearDown(self):
+        metrics.reset()
+
+    def run_tool(self, tool, handler, *args):
+        call, token = metrics.start_call(tool)
+        result = async_to_sync(handler)(*args)
+        call.response_bytes = sum(len(content.text.encode("utf-8")) for content in result)
+        metrics.finish_call(call, token)
+        return result
+
+    def test_records_calls_queries_and_response_size(self):
+        """Test that calls, DB queries and response bytes are attributed to the tool"""
+        result = self.run_tool("get_site_details", handlers.get_site_details, "Datacenter 1")
+        self.run_tool("get_site_details", handlers.get_site_details, "Datacenter 1")
+
+        data = metrics.snapshot()["get_site_details"]
+        self.assertEqual(data["calls"], 2)
+        self.assertEqual(data["errors"], 0)
+        self.assertGreaterEqual(data["db_queries"], 2)
+        self.assertEqual(data["response_bytes"], 2 * len(result[0].text.encode("utf-8")))
+        self.assertEqual(data["duration_seconds_buckets"]["+Inf"], 2)
+
+    def test_queries_outside_tool_calls_are_ignored(self):
+        """Test that queries issued outside a tool call are not recorded"""
+        self.run_tool("get_site_stats", handlers.get_site_stats)
+        before = metrics.snapshot()["get_site_stats"]["db_queries"]
+
+        list(Site.objects.all())
+
+        self.assertEqual(metrics.snapshot()["get_site_stats"]["db_queries"], before)
+
+    def test_render_prometheus(self):
+        """Test Prometheus text exposition output"""
+        self.run_tool("get_site_stats", handlers.get_site_stats)
+
+        text = metrics.render_prometheus()
+        self.assertIn("# TYPE mcp_tool_call_duration_seconds histogram", text)
+        self.assertIn('mcp_tool_calls_total{tool="get_site_stats"} 1', text)
+        self.assertIn('mcp_tool_call_duration_seconds_bucket{tool="get_site_stats",le="+Inf"} 1', text)
+        self.assertIn('mcp_tool_db_queries_total{tool="get_site_stats"}', text)
+
+    def test_get_server_metrics_handler(self):
+        """Test the get_server_metrics tool handler in both formats"""
+        empty = async_to_sync(handlers.get_server_metrics)()
+        self.assertIn("No tool calls recorded", empty[0].text)
+
+        self.run_tool("get_site_stats", handlers.get_site_stats)
+
+        text = async_to_sync(handlers.get_server_metrics)()[0].text
+        self.assertIn("MCP SERVER METRICS", text)
+        self.assertIn("get_site_stats", text)
+        data = json.loads(async_to_sync(handlers.get_server_metrics)("json")[0].text)
+        self.assertEqual(data["tools"]["get_site_stats"]["calls"], 1)
@@ -0,0 +1,44 @@
+"""
+Tests for the MCP device search handler
+"""
+
+import json
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from api.models import Device
+from api.device_search import invalidate_index
+from mcp import handlers
+
+
+class TestSearchDevices(TestCase):
+    """Test cases for search_devices handler"""
+
+    def setUp(self):
+        for index in range(5):
+            Device.objects.create(
+                device_id=f"server-{index}", name=f"Server {index}", category="Server", ru_size=1, power_draw=300
+            )
+        Device.objects.create(device_id="switch-1", name="Core Switch", category="Network", ru_size=1, power_draw=150)
+        invalidate_index()
+
+    def test_search_devices_text(self):
+        """Test text output with paging information"""
+        result = async_to_sync(handlers.search_devices)("serv", page_size=2)
+
+        text = result[0].text
+        self.assertIn("DEVICE SEARCH: serv", text)
+        self.assertIn("Showing 1-2 of 5 matches (page 1)", text)
+
+    def test_search_devices_no_matches(self):
+        """Test search with no matching devices"""
+        result = async_to_sync(handlers.search_devices)("router")
+
+        self.assertIn("No devices found matching 'router'", result[0].text)
+
+    def test_search_devices_json(self):
+        """Test JSON output"""
+        result = async_to_sync(handlers.search_devices)("core", output_format="json")
+
+        data = json.loads(result[0].text)
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["results"][0]["device_id"], "switch-1")
@@ -0,0 +1,108 @@
+"""
+Tests for the streaming HTTP endpoint of the MCP server
+"""
+
+import importlib.util
+import json
+import os
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from mcp.types import TextContent
+from starlette.testclient import TestClient
+from mcp import handlers
+
+# conftest.py maps mcp.server to the installed SDK, so load the local server module from its file
+_spec = importlib.util.spec_from_file_location(
+    "mcp.http_server", os.path.join(os.path.dirname(os.path.dirname(__file__)), "server.py")
+)
+server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(server)
+
+
+def parse_events(body):
+    """Split a Server-Sent Events body into (event, data) pairs"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def fake_stream(*chunks, error=None):
+    for chunk in chunks:
+        yield TextContent(type="text", text=chunk)
+    if error:
+        raise error
+
+
+class TestStreamEndpoint(SimpleTestCase):
+    """Test cases for POST /mcp/stream"""
+
+    def setUp(self):
+        self.client = TestClient(server.create_http_app())
+
+    def stream(self, name, **arguments):
+        response = self.client.post("/mcp/stream", json={"params": {"name": name, "arguments": arguments}})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        return parse_events(response.text)
+
+    def test_stream_chunks_then_done(self):
+        """Test that every chunk is sent as a chunk event followed by a done event"""
+        with mock.patch.object(handlers, "stream_site_stats", return_value=fake_stream("header", "Site 1")):
+            events = self.stream("get_site_stats")
+
+        self.assertEqual(
+            events,
+            [
+                ("chunk", {"type": "text", "text": "header"}),
+                ("chunk", {"type": "text", "text": "Site 1"}),
+                ("done", {"chunks": 2}),
+            ],
+        )
+
+    def test_stream_error_after_partial_output(self):
+        """Test that a failure after some chunks ends the stream with an error event and no done event"""
+        stream = fake_stream("header", error=RuntimeError("database went away"))
+        with mock.patch.object(handlers, "stream_site_details", return_value=stream):
+            events = self.stream("get_site_details", site_name="Datacenter 1")
+
+        self.assertEqual(
+            events,
+            [
+                ("chunk", {"type": "text", "text": "header"}),
+                ("error", {"error": "database went away"}),
+            ],
+        )
+
+    def test_stream_missing_site_name(self):
+        """Test that argument errors are reported as a chunk of a completed stream"""
+        events = self.stream("get_site_details")
+
+        self.assertEqual(events[0], ("chunk", {"type": "text", "text": "Error: site_name is required"}))
+        self.assertEqual(events[-1], ("done", {"chunks": 1}))
+
+    def test_stopping_early_closes_handler_stream(self):
+        """Test that a consumer stopping after the first chunk closes the handler's stream"""
+        closed = []
+
+        async def stream():
+            try:
+                for chunk in ("header", "Site 1", "Site 2"):
+                    yield TextContent(type="text", text=chunk)
+            finally:
+                closed.append(True)
+
+        async def first_chunk():
+            contents = server.stream_tool("get_site_stats", {})
+            chunk = await anext(contents)
+            await contents.aclose()
+            # Checked before the event loop shuts down, which would close any generator left open
+            return chunk, list(closed)
+
+        with mock.patch.object(handlers, "stream_site_stats", return_value=stream()):
+            chunk, closed_before_shutdown = async_to_sync(first_chunk)()
+
+        self.assertEqual(chunk.text, "header")
+        self.assertEqual(closed_before_shutdown, [True])
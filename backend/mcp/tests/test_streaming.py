@@ -0,0 +1,126 @@
+"""
+Tests for streaming MCP handlers
+"""
+
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from mcp.types import TextContent
+from api.models import Site, Rack, Device, RackDevice
+from mcp import handlers
+
+
+async def collect(stream):
+    """Drain an async stream of TextContent into a list"""
+    return [content async for content in stream]
+
+
+class TestStreamSiteDetails(TestCase):
+    """Test cases for stream_site_details handler"""
+
+    def setUp(self):
+        self.site = Site.objects.create(name="Datacenter 1", description="Main facility")
+        device = Device.objects.create(
+            device_id="server-1", name="Server", category="Server", ru_size=2, power_draw=500, color="#FF0000"
+        )
+        for index in range(3):
+            rack = Rack.objects.create(site=self.site, name=f"Rack-A{index + 1}", ru_height=42)
+            RackDevice.objects.create(rack=rack, device=device, position=1)
+
+    def test_stream_site_details_not_found(self):
+        """Test streaming a non-existent site yields a single error chunk"""
+        chunks = async_to_sync(collect)(handlers.stream_site_details("Nonexistent"))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("not found", chunks[0].text)
+
+    def test_stream_site_details_one_chunk_per_rack(self):
+        """Test that the header and every rack arrive as separate chunks"""
+        chunks = async_to_sync(collect)(handlers.stream_site_details("datacenter 1"))
+
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(all(isinstance(chunk, TextContent) for chunk in chunks))
+        self.assertIn("SITE DETAILS: Datacenter 1", chunks[0].text)
+        self.assertIn("Total Racks: 3", chunks[0].text)
+        self.assertIn("Rack: Rack-A1", chunks[1].text)
+        self.assertIn("Rack: Rack-A3", chunks[3].text)
+
+    def test_stream_site_details_matches_full_output(self):
+        """Test that joined chunks equal the non-streaming text output"""
+        chunks = async_to_sync(collect)(handlers.stream_site_details("Datacenter 1"))
+        full = async_to_sync(handlers.get_site_details)("Datacenter 1")
+
+        self.assertEqual("\n".join(chunk.text for chunk in chunks), full[0].text)
+
+    def test_stream_site_details_json(self):
+        """Test that JSON chunks are standalone JSON documents"""
+        chunks = async_to_sync(collect)(handlers.stream_site_details("Datacenter 1", "json"))
+
+        header = json.loads(chunks[0].text)
+        self.assertEqual(header["racks_count"], 3)
+        racks = [json.loads(chunk.text) for chunk in chunks[1:]]
+        self.assertEqual([rack["name"] for rack in racks], ["Rack-A1", "Rack-A2", "Rack-A3"])
+        self.assertEqual(racks[0]["power_watts"], 500)
+
+    def test_stream_site_details_error_after_header(self):
+        """Test that a failure mid-stream is raised instead of being yielded as a chunk"""
+        chunks = []
+
+        async def consume():
+            async for chunk in handlers.stream_site_details("Datacenter 1"):
+                chunks.append(chunk)
+
+        with mock.patch.object(handlers, "_rack_summary_lines", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                async_to_sync(consume)()
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("SITE DETAILS: Datacenter 1", chunks[0].text)
+
+    def test_stream_closed_early_closes_generator(self):
+        """Test that a consumer stopping mid-stream closes the database generator behind it"""
+        closed = []
+
+        def chunks():
+            try:
+                yield from handlers._iter_site_details("Datacenter 1", "text")
+            finally:
+                closed.append(True)
+
+        # Hold a reference so the generator can only be closed explicitly, not by garbage collection
+        generator = chunks()
+
+        async def first_chunk():
+            stream = handlers._stream_chunks(generator)
+            chunk = await anext(stream)
+            await stream.aclose()
+            return chunk
+
+        chunk = async_to_sync(first_chunk)()
+
+        self.assertIn("SITE DETAILS: Datacenter 1", chunk.text)
+        self.assertEqual(closed, [True])
+
+
+class TestStreamSiteStats(TestCase):
+    """Test cases for stream_site_stats handler"""
+
+    def test_stream_site_stats_empty(self):
+        """Test streaming stats with no sites"""
+        chunks = async_to_sync(collect)(handlers.stream_site_stats())
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("No sites found", chunks[0].text)
+
+    def test_stream_site_stats_one_chunk_per_site(self):
+        """Test that each site is emitted as its own chunk"""
+        Site.objects.create(name="Site 1")
+        Site.objects.create(name="Site 2")
+
+        chunks = async_to_sync(collect)(handlers.stream_site_stats())
+
+        self.assertEqual(len(chunks), 3)
+        self.assertIn("SITE STATISTICS", chunks[0].text)
+        self.assertIn("Site: Site 1", chunks[1].text)
+        self.assertIn("Site: Site 2", chunks[2].text)
@@ -90,6 +90,16 @@ class TestToolDefinitions(TestCase):
         self.assertIn("resource", summary_tool.description.lower())
         self.assertEqual(summary_tool.inputSchema["required"], [])
 
+    def test_bulk_create_racks_tool(self):
+        """Test bulk_create_racks tool definition"""
+        tools = get_tool_definitions()
+        bulk_tool = next((t for t in tools if t.name == "bulk_create_racks"), None)
+
+        self.assertIsNotNone(bulk_tool)
+        self.assertEqual(bulk_tool.inputSchema["required"], ["site_name", "racks"])
+        self.assertEqual(bulk_tool.inputSchema["properties"]["racks"]["type"], "array")
+        self.assertEqual(bulk_tool.inputSchema["properties"]["racks"]["items"]["required"], ["rack_name"])
+
     def test_all_tool_names_unique(self):
         """Test that all tool names are unique"""
         tools = get_tool_definitions()
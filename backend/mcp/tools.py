@@ -79,6 +79,29 @@ def get_tool_definitions() -> list[Tool]:
                 },
             },
         ),
+        Tool(
+            name="search_devices",
+            description=(
+                "Search the device catalog by name, device ID, category, description or hardware provider. "
+                "Terms are prefix-matched, results are ranked by relevance and paged"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Search terms (e.g. 'dell r74')"},
+                    "category": {"type": "string", "description": "Restrict results to a category (optional)"},
+                    "page": {"type": "integer", "description": "Page number, starting at 1 (default: 1)"},
+                    "page_size": {"type": "integer", "description": "Results per page (default: 25, max: 100)"},
+                    "output_format": {
+                        "type": "string",
+                        "enum": ["text", "json"],
+                        "description": "Output format: 'text' (default, human-readable) or 'json' (structured data)",
+                        "default": "text",
+                    },
+                },
+                "required": ["query"],
+            },
+        ),
         Tool(
             name="get_resource_summary",
             description="Get overall resource utilization summary across all sites",
@@ -95,6 +118,55 @@ def get_tool_definitions() -> list[Tool]:
                 "required": [],
             },
         ),
+        Tool(
+            name="get_server_metrics",
+            description=(
+                "Get per-tool metrics for this MCP server: call count, errors, wall time, "
+                "database query count and time, and response size"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "output_format": {
+                        "type": "string",
+                        "enum": ["text", "json"],
+                        "description": "Output format: 'text' (default, human-readable) or 'json' (structured data)",
+                        "default": "text",
+                    }
+                },
+                "required": [],
+            },
+        ),
+        Tool(
+            name="get_changes",
+            description=(
+                "Get the changes to sites, racks, rack devices, providers, rack configurations, devices and device "
+                "groups after a sequence number, oldest first. Pass the returned next_since as since on the next "
+                "call to follow the inventory without downloading it again"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "since": {
+                        "type": "integer",
+                        "description": "Return changes after this sequence number (default 0: from the start)",
+                        "default": 0,
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of changes to return (default 100)",
+                        "default": 100,
+                    },
+                    "output_format": {
+                        "type": "string",
+                        "enum": ["text", "json"],
+                        "description": "Output format: 'text' (default, human-readable) or 'json' (structured data)",
+                        "default": "text",
+                    },
+                },
+                "required": [],
+            },
+        ),
         Tool(
             name="create_device",
             description="Create a new device type that can be placed in racks",
@@ -166,6 +238,95 @@ def get_tool_definitions() -> list[Tool]:
                 "required": ["name"],
             },
         ),
+        Tool(
+            name="bulk_create_devices",
+            description=(
+                "Create many device types in one call. Names are checked in a single query, all valid devices "
+                "are inserted in one transaction, and the outcome of every item is reported"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "devices": {
+                        "type": "array",
+                        "description": "Devices to create, using the same fields as create_device",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "device_id": {"type": "string", "description": "Unique identifier for the device"},
+                                "name": {"type": "string", "description": "Display name of the device"},
+                                "category": {"type": "string", "description": "Device category"},
+                                "ru_size": {"type": "integer", "description": "Rack unit size of the device"},
+                                "power_draw": {"type": "integer", "description": "Power consumption in watts"},
+                                "power_ports_used": {
+                                    "type": "integer",
+                                    "description": "Number of PDU power ports required (default: 1)",
+                                },
+                                "color": {"type": "string", "description": "Hex color code (default: #000000)"},
+                                "description": {"type": "string", "description": "Optional description"},
+                            },
+                            "required": ["device_id", "name", "category", "ru_size", "power_draw"],
+                        },
+                    },
+                },
+                "required": ["devices"],
+            },
+        ),
+        Tool(
+            name="bulk_create_racks",
+            description=(
+                "Create many racks in a site in one call. Names are checked in a single query, all valid racks "
+                "are inserted in one transaction, and the outcome of every item is reported"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "site_name": {"type": "string", "description": "Name of the site to add the racks to"},
+                    "racks": {
+                        "type": "array",
+                        "description": "Racks to create",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "rack_name": {"type": "string", "description": "Name of the new rack"},
+                                "ru_height": {
+                                    "type": "integer",
+                                    "description": "Height of the rack in rack units (default: 42)",
+                                },
+                                "description": {"type": "string", "description": "Optional description of the rack"},
+                            },
+                            "required": ["rack_name"],
+                        },
+                    },
+                },
+                "required": ["site_name", "racks"],
+            },
+        ),
+        Tool(
+            name="bulk_create_device_groups",
+            description=(
+                "Create many device groups in one call. Names are checked in a single query, all valid groups "
+                "are inserted in one transaction, and the outcome of every item is reported"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "device_groups": {
+                        "type": "array",
+                        "description": "Device groups to create",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "Name of the device group"},
+                                "description": {"type": "string", "description": "Optional description"},
+                            },
+                            "required": ["name"],
+                        },
+                    },
+                },
+                "required": ["device_groups"],
+            },
+        ),
         Tool(
             name="create_provider",
             description="Create a new hardware/equipment provider",
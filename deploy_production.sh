@@ -173,11 +173,27 @@ sed -e "s|/opt/racker|${INSTALL_DIR}|g" \
     -e "s|Group=www-data|Group=${SERVICE_GROUP}|g" \
     "${INSTALL_DIR}/racker.service" > "/etc/systemd/system/${SERVICE_NAME}.service"
 
+# Background job worker (manage.py run_jobs)
+sed -e "s|/opt/racker|${INSTALL_DIR}|g" \
+    -e "s|User=www-data|User=${SERVICE_USER}|g" \
+    -e "s|Group=www-data|Group=${SERVICE_GROUP}|g" \
+    -e "s|After=network.target racker.service|After=network.target ${SERVICE_NAME}.service|g" \
+    "${INSTALL_DIR}/racker-jobs.service" > "/etc/systemd/system/${SERVICE_NAME}-jobs.service"
+
+# Utilization history sampler (manage.py record_utilization --loop)
+sed -e "s|/opt/racker|${INSTALL_DIR}|g" \
+    -e "s|User=www-data|User=${SERVICE_USER}|g" \
+    -e "s|Group=www-data|Group=${SERVICE_GROUP}|g" \
+    -e "s|After=network.target racker.service|After=network.target ${SERVICE_NAME}.service|g" \
+    "${INSTALL_DIR}/racker-utilization.service" > "/etc/systemd/system/${SERVICE_NAME}-utilization.service"
+
 # Reload systemd
 systemctl daemon-reload
 
-# Enable service
+# Enable services
 systemctl enable ${SERVICE_NAME}.service
+systemctl enable ${SERVICE_NAME}-jobs.service
+systemctl enable ${SERVICE_NAME}-utilization.service
 
 echo -e "${GREEN}✓ Systemd service installed${NC}"
 
@@ -198,7 +214,7 @@ echo "   - WebAuthn configuration (WEBAUTHN_RP_ID, WEBAUTHN_ORIGIN)"
 echo "   - Sentry DSN (optional)"
 echo ""
 echo "3. Start the service:"
-echo "   ${YELLOW}sudo systemctl start ${SERVICE_NAME}${NC}"
+echo "   ${YELLOW}sudo systemctl start ${SERVICE_NAME} ${SERVICE_NAME}-jobs ${SERVICE_NAME}-utilization${NC}"
 echo ""
 echo "4. Check service status:"
 echo "   ${YELLOW}sudo systemctl status ${SERVICE_NAME}${NC}"
@@ -57,8 +57,8 @@ certfile = os.getenv('SSL_CERTFILE', None)
 # Preload app for better performance
 preload_app = True
 
-# Django WSGI application path
-wsgi_app = 'backend.wsgi:application'
+# Django ASGI application path (served natively by UvicornWorker; the async views run on its event loop)
+wsgi_app = 'backend.asgi:application'
 
 def when_ready(server):
     """Called just after the server is started."""
@@ -109,7 +109,7 @@ export function usePasskey() {
         throw new Error(data.error || 'Failed to begin registration');
       }
 
-      const { options, user_id } = await beginResponse.json();
+      const { options, user_id, challenge_id } = await beginResponse.json();
       
       // Parse the options
       const publicKeyOptions = JSON.parse(options);
@@ -154,6 +154,7 @@ export function usePasskey() {
         credentials: 'same-origin',
         body: JSON.stringify({
           user_id,
+          challenge_id,
           credential: credentialJSON,
           name: passkeyName,
         }),
@@ -206,7 +207,7 @@ export function usePasskey() {
         throw new Error(data.error || 'Failed to begin authentication');
       }
 
-      const { options } = await beginResponse.json();
+      const { options, challenge_id } = await beginResponse.json();
       
       // Parse the options
       const publicKeyOptions = JSON.parse(options);
@@ -251,6 +252,7 @@ export function usePasskey() {
         },
         credentials: 'same-origin',
         body: JSON.stringify({
+          challenge_id,
           credential: credentialJSON,
         }),
       });
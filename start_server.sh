@@ -136,7 +136,7 @@ if [ "$MODE" = "production" ]; then
 
     # Start Gunicorn
     cd ..
-    exec gunicorn --config gunicorn.conf.py --chdir backend backend.wsgi:application
+    exec gunicorn --config gunicorn.conf.py --chdir backend backend.asgi:application
 else
     # Development mode with Django runserver
     echo "🚀 Starting development server..."